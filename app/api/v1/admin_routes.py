@@ -1,8 +1,11 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
+from app.auth.dependencies import require_operator
+from app.db.monitoring import pool_metrics
 from app.models.admin import AdminLoginRequest
 from app.models.response import APIResponse
 from app.services.auth_service import authenticate_admin
 from app.utils.jwt import create_access_token
+from app.db.circuit_breaker import DATABASE_UNAVAILABLE_ERRORS
 from app.utils.responses import success_response, error_response
 
 router = APIRouter(prefix="/admin", tags=["admin"])
@@ -46,6 +49,8 @@ async def admin_login(payload: AdminLoginRequest):
             status_code=200
         )
 
+    except DATABASE_UNAVAILABLE_ERRORS:
+        raise
     except Exception as e:
         return error_response(
             code="INTERNAL_ERROR",
@@ -53,3 +58,13 @@ async def admin_login(payload: AdminLoginRequest):
             details={"error": str(e)},
             status_code=500
         )
+
+
+@router.get("/db/pools", response_model=APIResponse)
+async def database_pools(current_admin: dict = Depends(require_operator)):
+    """
+    Connection pool metrics per replica set member
+
+    Exposes member addresses, so it requires an operator token.
+    """
+    return success_response(data=pool_metrics.snapshot())
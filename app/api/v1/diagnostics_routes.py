@@ -0,0 +1,166 @@
+import asyncio
+import os
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import PlainTextResponse
+
+from app.auth.dependencies import require_operator
+from app.models.response import APIResponse
+from app.utils.concurrency import ADAPTIVE_CONCURRENCY_ENABLED, concurrency_limit
+from app.utils.loop_lag import loop_monitor
+from app.utils.memory import (
+    SnapshotNotFoundError,
+    TracemallocNotRunningError,
+    diff_snapshots,
+    gc_stats,
+    memory_status,
+    object_type_counts,
+    start_tracing,
+    stop_tracing,
+    take_snapshot,
+)
+from app.utils.profiler import ProfileInProgressError, profile_worker, request_profiler
+from app.utils.responses import error_response, success_response
+
+router = APIRouter(prefix="/admin/diagnostics", tags=["diagnostics"])
+
+
+@router.get("/profile", response_class=PlainTextResponse)
+async def profile(
+    seconds: float = Query(10, gt=0, le=120, description="How long to sample"),
+    interval_ms: float = Query(5, ge=1, le=100, description="Milliseconds between samples"),
+    all_threads: bool = Query(False, description="Sample every thread, not just the event loop"),
+    current_admin: dict = Depends(require_operator)
+):
+    """
+    Profile this worker with a sampling profiler
+
+    Returns collapsed stacks (`frame;frame;frame count` per line), ready for
+    flamegraph.pl, speedscope or inferno. Only the worker that serves the
+    request is profiled. Requires an operator token.
+    """
+    try:
+        collapsed = await profile_worker(seconds, interval_ms / 1000, all_threads)
+    except ProfileInProgressError as e:
+        return error_response(code="PROFILE_IN_PROGRESS", message=str(e), status_code=409)
+    return PlainTextResponse(
+        collapsed,
+        headers={"Content-Disposition": f'attachment; filename="profile-{os.getpid()}.collapsed"'}
+    )
+
+
+@router.get("/slow-requests", response_model=APIResponse)
+async def slow_requests(current_admin: dict = Depends(require_operator)):
+    """
+    Profiles of the slowest sampled requests on this worker
+
+    Requests are sampled at PROFILE_REQUEST_SAMPLE_RATE. Each entry carries
+    the route, trace ID, duration and its collapsed stacks. Requires an
+    operator token.
+    """
+    return success_response(data={
+        "sample_rate": request_profiler.sample_rate,
+        "requests": request_profiler.slowest(),
+    })
+
+
+@router.get("/memory", response_model=APIResponse)
+async def memory(current_admin: dict = Depends(require_operator)):
+    """
+    RSS and tracemalloc state of this worker
+
+    Requires an operator token.
+    """
+    return success_response(data=memory_status())
+
+
+@router.post("/memory/tracemalloc/start", response_model=APIResponse)
+async def start_tracemalloc(
+    frames: int = Query(1, ge=1, le=50, description="Frames stored per allocation"),
+    current_admin: dict = Depends(require_operator)
+):
+    """
+    Start tracing allocations on this worker
+
+    Allocations get slower while tracing; stop it when done. Restarting
+    with a different frame count drops existing snapshots.
+    """
+    return success_response(data=start_tracing(frames))
+
+
+@router.post("/memory/tracemalloc/stop", response_model=APIResponse)
+async def stop_tracemalloc(current_admin: dict = Depends(require_operator)):
+    """
+    Stop tracing allocations and drop all snapshots
+    """
+    return success_response(data=stop_tracing())
+
+
+@router.post("/memory/snapshots", response_model=APIResponse)
+async def create_snapshot(current_admin: dict = Depends(require_operator)):
+    """
+    Take a tracemalloc snapshot to diff against later
+    """
+    try:
+        snapshot_id = await asyncio.to_thread(take_snapshot)
+    except TracemallocNotRunningError as e:
+        return error_response(code="TRACEMALLOC_NOT_RUNNING", message=str(e), status_code=409)
+    return success_response(data={"snapshot_id": snapshot_id}, status_code=201)
+
+
+@router.get("/memory/diff", response_model=APIResponse)
+async def diff_memory(
+    base: int = Query(..., description="Earlier snapshot ID"),
+    target: Optional[int] = Query(None, description="Later snapshot ID; a new snapshot if omitted"),
+    group_by: str = Query("lineno", pattern="^(lineno|filename|traceback)$"),
+    limit: int = Query(25, ge=1, le=500),
+    current_admin: dict = Depends(require_operator)
+):
+    """
+    Largest allocation growth between two snapshots, by file and line
+    """
+    try:
+        if target is None:
+            target = await asyncio.to_thread(take_snapshot)
+        entries = await asyncio.to_thread(diff_snapshots, base, target, group_by, limit)
+    except TracemallocNotRunningError as e:
+        return error_response(code="TRACEMALLOC_NOT_RUNNING", message=str(e), status_code=409)
+    except SnapshotNotFoundError as e:
+        return error_response(code="NOT_FOUND", message=str(e), status_code=404)
+    return success_response(data={"base": base, "target": target, "entries": entries})
+
+
+@router.get("/memory/gc", response_model=APIResponse)
+async def gc_objects(
+    types: bool = Query(True, description="Include live object counts by type"),
+    limit: int = Query(25, ge=1, le=500),
+    current_admin: dict = Depends(require_operator)
+):
+    """
+    Garbage collector generation counts and the most common live object types
+    """
+    data = gc_stats()
+    if types:
+        data["types"] = await asyncio.to_thread(object_type_counts, limit)
+    return success_response(data=data)
+
+
+@router.get("/loop", response_model=APIResponse)
+async def event_loop(current_admin: dict = Depends(require_operator)):
+    """
+    Event loop lag, recent stalls and the adaptive concurrency limit
+
+    Each stall carries the loop thread's collapsed stack at the moment it
+    was overdue, pointing at the blocking code.
+    """
+    return success_response(data={
+        "lag_ms": round(loop_monitor.lag * 1000, 2),
+        "stall_threshold_ms": loop_monitor.stall_threshold * 1000,
+        "stalls": list(loop_monitor.stalls),
+        "concurrency": {
+            "enabled": ADAPTIVE_CONCURRENCY_ENABLED,
+            "limit": int(concurrency_limit.limit),
+            "in_flight": concurrency_limit.in_flight,
+        },
+    })
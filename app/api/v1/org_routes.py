@@ -1,16 +1,20 @@
 from fastapi import APIRouter, Depends, Query
-from uuid import uuid4
 from app.models.org import OrgCreateRequest, OrgUpdateRequest, OrgDeleteRequest
 from app.models.response import APIResponse
 from app.services.org_service import (
     create_organization,
     get_organization_by_name,
+    get_all_organizations,
+    get_stale_organization,
     update_organization_by_name,
     delete_organization_by_name,
 )
+from app.utils.metrics import CACHE_LOOKUPS
 from app.utils.responses import success_response, error_response
+from app.utils.tracing import current_trace_id
+from app.db.circuit_breaker import DATABASE_UNAVAILABLE_ERRORS
 from app.db.client import get_database
-from app.auth.dependencies import get_current_admin
+from app.auth.dependencies import get_current_admin, require_operator
 
 router = APIRouter(prefix="/org", tags=["organization"])
 
@@ -26,7 +30,7 @@ async def create_org(payload: OrgCreateRequest):
 
     Returns created organization data
     """
-    trace_id = str(uuid4())
+    trace_id = current_trace_id()
     master_db = get_database()
 
     try:
@@ -51,6 +55,8 @@ async def create_org(payload: OrgCreateRequest):
             trace_id=trace_id,
             status_code=400
         )
+    except DATABASE_UNAVAILABLE_ERRORS:
+        raise
     except Exception as e:
         return error_response(
             code="ORG_CREATE_FAILED",
@@ -70,9 +76,9 @@ async def get_org(organization_name: str = Query(..., description="Organization
 
     Returns organization data
     """
-    trace_id = str(uuid4())
+    trace_id = current_trace_id()
     try:
-        org = await get_organization_by_name(organization_name)
+        org = await get_organization_by_name(organization_name, allow_secondary=True)
         if not org:
             return error_response(
                 code="NOT_FOUND",
@@ -82,6 +88,17 @@ async def get_org(organization_name: str = Query(..., description="Organization
             )
         return success_response(data=org, trace_id=trace_id)
 
+    except DATABASE_UNAVAILABLE_ERRORS:
+        # Serve the last copy we read, marked stale, while the database is down
+        stale = get_stale_organization(organization_name)
+        CACHE_LOOKUPS.labels("org_stale", "miss" if stale is None else "hit").inc()
+        if stale is None:
+            raise
+        org, age = stale
+        response = success_response(data=org, trace_id=trace_id)
+        response.headers["X-Data-Stale"] = "true"
+        response.headers["Age"] = str(int(age))
+        return response
     except Exception as e:
         return error_response(
             code="INTERNAL_ERROR",
@@ -92,6 +109,35 @@ async def get_org(organization_name: str = Query(..., description="Organization
         )
 
 
+@router.get("/list", response_model=APIResponse)
+async def list_orgs(
+    skip: int = Query(0, ge=0, description="Number of organizations to skip"),
+    limit: int = Query(50, ge=1, le=500, description="Maximum number of organizations"),
+    current_admin: dict = Depends(require_operator)
+):
+    """
+    List active organizations
+
+    Read from secondaries, so newly created organizations may take up to the
+    configured staleness bound to appear. Lists every tenant, so it requires
+    an operator token.
+    """
+    trace_id = current_trace_id()
+    try:
+        orgs = await get_all_organizations(skip=skip, limit=limit, allow_secondary=True)
+        return success_response(data=orgs, trace_id=trace_id)
+    except DATABASE_UNAVAILABLE_ERRORS:
+        raise
+    except Exception as e:
+        return error_response(
+            code="INTERNAL_ERROR",
+            message="Failed to list organizations",
+            details={"error": str(e)},
+            trace_id=trace_id,
+            status_code=500
+        )
+
+
 @router.put("/update", response_model=APIResponse)
 async def update_org(payload: OrgUpdateRequest):
     """
@@ -104,7 +150,7 @@ async def update_org(payload: OrgUpdateRequest):
 
     Returns updated organization data
     """
-    trace_id = str(uuid4())
+    trace_id = current_trace_id()
     try:
         # Check if organization exists
         existing_org = await get_organization_by_name(payload.current_organization_name)
@@ -148,6 +194,8 @@ async def update_org(payload: OrgUpdateRequest):
             trace_id=trace_id,
             status_code=400
         )
+    except DATABASE_UNAVAILABLE_ERRORS:
+        raise
     except Exception as e:
         return error_response(
             code="INTERNAL_ERROR",
@@ -168,7 +216,7 @@ async def delete_org(
     Deletes organization identified by query param `organization_name`.
     Requires OAuth2 bearer token authentication.
     """
-    trace_id = str(uuid4())
+    trace_id = current_trace_id()
     master_db = get_database()
 
     try:
@@ -177,6 +225,8 @@ async def delete_org(
         # The service function doesn't require admin_email, but we extract it for logging/audit
         deleted = await delete_organization_by_name(organization_name)
         return success_response(data={"deleted": deleted}, trace_id=trace_id)
+    except DATABASE_UNAVAILABLE_ERRORS:
+        raise
     except Exception as e:
         return error_response(
             code="ORG_DELETE_FAILED",
@@ -0,0 +1,263 @@
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
+from app.models.tenant import TenantRecordRequest
+from app.models.response import APIResponse
+from app.services.tenant_router import TenantNotFoundError, TenantWriteFencedError
+from app.services.tenant_service import (
+    create_record,
+    list_records,
+    export_records,
+    get_record,
+    update_record,
+    delete_record,
+)
+from app.db.circuit_breaker import DATABASE_UNAVAILABLE_ERRORS
+from app.utils.responses import dumps, success_response, error_response
+from app.utils.tracing import current_trace_id
+from app.auth.dependencies import get_current_admin
+
+router = APIRouter(prefix="/tenant", tags=["tenant"])
+
+
+def _tenant_id(current_admin: dict):
+    """Organization the caller is scoped to; never taken from the request"""
+    return current_admin.get("organization_id")
+
+
+def _no_tenant_response(trace_id: str):
+    return error_response(
+        code="TENANT_REQUIRED",
+        message="Token is not bound to an organization",
+        trace_id=trace_id,
+        status_code=403
+    )
+
+
+def _tenant_not_found_response(e: TenantNotFoundError, trace_id: str):
+    return error_response(
+        code="TENANT_NOT_FOUND",
+        message=str(e),
+        trace_id=trace_id,
+        status_code=404
+    )
+
+
+def _tenant_fenced_response(e: TenantWriteFencedError, trace_id: str):
+    response = error_response(
+        code="TENANT_MIGRATING",
+        message=str(e),
+        trace_id=trace_id,
+        status_code=503
+    )
+    response.headers["Retry-After"] = "5"
+    return response
+
+
+def _record_not_found_response(record_id: str, trace_id: str):
+    return error_response(
+        code="NOT_FOUND",
+        message=f"Record '{record_id}' not found",
+        trace_id=trace_id,
+        status_code=404
+    )
+
+
+@router.post("/records", response_model=APIResponse)
+async def create_tenant_record(
+    payload: TenantRecordRequest,
+    current_admin: dict = Depends(get_current_admin)
+):
+    """
+    Create a record in the caller's organization
+
+    - **data**: Arbitrary record payload
+    """
+    trace_id = current_trace_id()
+    organization_id = _tenant_id(current_admin)
+    if not organization_id:
+        return _no_tenant_response(trace_id)
+
+    try:
+        record = await create_record(organization_id, payload.data)
+        return success_response(data=record, trace_id=trace_id, status_code=201)
+    except TenantWriteFencedError as e:
+        return _tenant_fenced_response(e, trace_id)
+    except TenantNotFoundError as e:
+        return _tenant_not_found_response(e, trace_id)
+    except DATABASE_UNAVAILABLE_ERRORS:
+        raise
+    except Exception as e:
+        return error_response(
+            code="INTERNAL_ERROR",
+            message="Failed to create record",
+            details={"error": str(e)},
+            trace_id=trace_id,
+            status_code=500
+        )
+
+
+@router.get("/records", response_model=APIResponse)
+async def list_tenant_records(
+    skip: int = Query(0, ge=0, description="Number of records to skip"),
+    limit: int = Query(50, ge=1, le=500, description="Maximum number of records"),
+    current_admin: dict = Depends(get_current_admin)
+):
+    """
+    List records of the caller's organization, newest first
+    """
+    trace_id = current_trace_id()
+    organization_id = _tenant_id(current_admin)
+    if not organization_id:
+        return _no_tenant_response(trace_id)
+
+    try:
+        records = await list_records(organization_id, skip=skip, limit=limit)
+        return success_response(data=records, trace_id=trace_id)
+    except TenantNotFoundError as e:
+        return _tenant_not_found_response(e, trace_id)
+    except DATABASE_UNAVAILABLE_ERRORS:
+        raise
+    except Exception as e:
+        return error_response(
+            code="INTERNAL_ERROR",
+            message="Failed to list records",
+            details={"error": str(e)},
+            trace_id=trace_id,
+            status_code=500
+        )
+
+
+@router.get("/records/export")
+async def export_tenant_records(current_admin: dict = Depends(get_current_admin)):
+    """
+    Export all records of the caller's organization as NDJSON
+
+    Served from secondaries, so the export may trail recent writes by up to
+    the configured staleness bound.
+    """
+    trace_id = current_trace_id()
+    organization_id = _tenant_id(current_admin)
+    if not organization_id:
+        return _no_tenant_response(trace_id)
+
+    try:
+        records = await export_records(organization_id)
+    except TenantNotFoundError as e:
+        return _tenant_not_found_response(e, trace_id)
+    except DATABASE_UNAVAILABLE_ERRORS:
+        raise
+    except Exception as e:
+        return error_response(
+            code="INTERNAL_ERROR",
+            message="Failed to export records",
+            details={"error": str(e)},
+            trace_id=trace_id,
+            status_code=500
+        )
+
+    async def lines():
+        async for record in records:
+            yield dumps(record) + b"\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+@router.get("/records/{record_id}", response_model=APIResponse)
+async def get_tenant_record(
+    record_id: str,
+    current_admin: dict = Depends(get_current_admin)
+):
+    """
+    Get a record of the caller's organization
+    """
+    trace_id = current_trace_id()
+    organization_id = _tenant_id(current_admin)
+    if not organization_id:
+        return _no_tenant_response(trace_id)
+
+    try:
+        record = await get_record(organization_id, record_id)
+        if not record:
+            return _record_not_found_response(record_id, trace_id)
+        return success_response(data=record, trace_id=trace_id)
+    except TenantNotFoundError as e:
+        return _tenant_not_found_response(e, trace_id)
+    except DATABASE_UNAVAILABLE_ERRORS:
+        raise
+    except Exception as e:
+        return error_response(
+            code="INTERNAL_ERROR",
+            message="Failed to retrieve record",
+            details={"error": str(e)},
+            trace_id=trace_id,
+            status_code=500
+        )
+
+
+@router.put("/records/{record_id}", response_model=APIResponse)
+async def update_tenant_record(
+    record_id: str,
+    payload: TenantRecordRequest,
+    current_admin: dict = Depends(get_current_admin)
+):
+    """
+    Replace the payload of a record of the caller's organization
+
+    - **data**: New record payload
+    """
+    trace_id = current_trace_id()
+    organization_id = _tenant_id(current_admin)
+    if not organization_id:
+        return _no_tenant_response(trace_id)
+
+    try:
+        record = await update_record(organization_id, record_id, payload.data)
+        if not record:
+            return _record_not_found_response(record_id, trace_id)
+        return success_response(data=record, trace_id=trace_id)
+    except TenantWriteFencedError as e:
+        return _tenant_fenced_response(e, trace_id)
+    except TenantNotFoundError as e:
+        return _tenant_not_found_response(e, trace_id)
+    except DATABASE_UNAVAILABLE_ERRORS:
+        raise
+    except Exception as e:
+        return error_response(
+            code="INTERNAL_ERROR",
+            message="Failed to update record",
+            details={"error": str(e)},
+            trace_id=trace_id,
+            status_code=500
+        )
+
+
+@router.delete("/records/{record_id}", response_model=APIResponse)
+async def delete_tenant_record(
+    record_id: str,
+    current_admin: dict = Depends(get_current_admin)
+):
+    """
+    Delete a record of the caller's organization
+    """
+    trace_id = current_trace_id()
+    organization_id = _tenant_id(current_admin)
+    if not organization_id:
+        return _no_tenant_response(trace_id)
+
+    try:
+        deleted = await delete_record(organization_id, record_id)
+        return success_response(data={"deleted": deleted}, trace_id=trace_id)
+    except TenantWriteFencedError as e:
+        return _tenant_fenced_response(e, trace_id)
+    except TenantNotFoundError as e:
+        return _tenant_not_found_response(e, trace_id)
+    except DATABASE_UNAVAILABLE_ERRORS:
+        raise
+    except Exception as e:
+        return error_response(
+            code="INTERNAL_ERROR",
+            message="Failed to delete record",
+            details={"error": str(e)},
+            trace_id=trace_id,
+            status_code=500
+        )
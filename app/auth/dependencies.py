@@ -2,6 +2,8 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
+from bson import ObjectId
+from app.services.auth_service import get_admin_by_id
 import os
 from typing import Dict
 
@@ -26,3 +28,32 @@ async def get_current_admin(token: str = Depends(oauth2_scheme)) -> Dict:
             detail="Invalid authentication credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
+
+
+# Role, stored on the admin document, that grants the operator endpoints
+# such as diagnostics. The API never sets it; an operator is promoted
+# directly in the admins collection.
+OPERATOR_ROLE = "operator"
+
+
+async def require_operator(current_admin: Dict = Depends(get_current_admin)) -> Dict:
+    """
+    Allows only admins whose stored admin document has the operator role.
+    Raises 403 for everyone else.
+
+    The role is read from the admins collection rather than from the token:
+    the token's email is chosen by whoever creates an organization, and
+    emails aren't unique.
+    """
+    admin_id = (current_admin or {}).get("sub")
+    admin_doc = await get_admin_by_id(admin_id) if ObjectId.is_valid(admin_id) else None
+    if (
+        not admin_doc
+        or not admin_doc.get("is_active", True)
+        or admin_doc.get("role") != OPERATOR_ROLE
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Operator access required",
+        )
+    return current_admin
@@ -0,0 +1,191 @@
+import functools
+import logging
+import os
+import time
+from contextvars import ContextVar
+from typing import Callable, Optional
+
+from pymongo.errors import ConnectionFailure, ExecutionTimeout
+
+from app.utils.metrics import DB_CALL_DURATION
+
+logger = logging.getLogger(__name__)
+
+# Consecutive failed or slow calls that open the breaker
+DB_BREAKER_FAILURE_THRESHOLD = int(os.getenv("DB_BREAKER_FAILURE_THRESHOLD", "5"))
+# Calls slower than this count as failures
+DB_BREAKER_SLOW_CALL_SECONDS = float(os.getenv("DB_BREAKER_SLOW_CALL_SECONDS", "2"))
+# How long the breaker stays open before letting probes through
+DB_BREAKER_OPEN_SECONDS = float(os.getenv("DB_BREAKER_OPEN_SECONDS", "10"))
+# Concurrent probe calls allowed while half-open
+DB_BREAKER_HALF_OPEN_PROBES = int(os.getenv("DB_BREAKER_HALF_OPEN_PROBES", "1"))
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the database while the breaker is open"""
+
+    def __init__(self, retry_after: float):
+        super().__init__("Database unavailable, circuit breaker is open")
+        self.retry_after = retry_after
+
+
+# Errors meaning the database could not serve the call, as opposed to a call
+# that reached it and failed. Services must not swallow these.
+DATABASE_UNAVAILABLE_ERRORS = (ConnectionFailure, ExecutionTimeout, CircuitOpenError)
+
+# Set while inside a guarded call, so nested guarded calls are counted once
+_in_guarded_call: ContextVar[bool] = ContextVar("in_guarded_call", default=False)
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker for database calls
+
+    Closed: calls pass through; consecutive failures or slow calls are
+    counted. Open: calls fail fast with CircuitOpenError. Half-open: after
+    ``open_seconds`` a limited number of probe calls go through; a successful
+    probe closes the breaker, a failed one opens it again.
+
+    Only touched from the event loop, so no locking is needed.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = DB_BREAKER_FAILURE_THRESHOLD,
+        slow_call_seconds: float = DB_BREAKER_SLOW_CALL_SECONDS,
+        open_seconds: float = DB_BREAKER_OPEN_SECONDS,
+        half_open_probes: int = DB_BREAKER_HALF_OPEN_PROBES,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.failure_threshold = failure_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+        self._clock = clock
+        self._state = STATE_CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+
+    @property
+    def state(self) -> str:
+        if self._state == STATE_OPEN and self._clock() - self._opened_at >= self.open_seconds:
+            return STATE_HALF_OPEN
+        return self._state
+
+    def before_call(self) -> bool:
+        """
+        Admit a call or fail fast
+
+        Returns:
+            True if the call is a half-open probe
+
+        Raises:
+            CircuitOpenError: If the breaker is open or all probe slots are taken
+        """
+        if self._state == STATE_OPEN:
+            waited = self._clock() - self._opened_at
+            if waited < self.open_seconds:
+                raise CircuitOpenError(self.open_seconds - waited)
+            self._state = STATE_HALF_OPEN
+            self._probes_in_flight = 0
+            logger.info("Database circuit breaker half-open")
+
+        if self._state == STATE_HALF_OPEN:
+            if self._probes_in_flight >= self.half_open_probes:
+                raise CircuitOpenError(self.open_seconds)
+            self._probes_in_flight += 1
+            return True
+        return False
+
+    def after_call(self, probe: bool, failed: Optional[bool]) -> None:
+        """
+        Record the outcome of an admitted call
+
+        Args:
+            probe: Whether the call was a half-open probe
+            failed: True for a failed or slow call, False for a healthy one,
+                None when the outcome says nothing about the database
+        """
+        if probe:
+            self._probes_in_flight -= 1
+            if failed:
+                self._open()
+            elif failed is False:
+                self._close()
+            return
+
+        if failed:
+            self._failures += 1
+            if self._state == STATE_CLOSED and self._failures >= self.failure_threshold:
+                self._open()
+        elif failed is False and self._state == STATE_CLOSED:
+            self._failures = 0
+
+    def _open(self) -> None:
+        if self._state != STATE_OPEN:
+            logger.warning("Database circuit breaker open after %d failures", self._failures)
+        self._state = STATE_OPEN
+        self._opened_at = self._clock()
+        self._probes_in_flight = 0
+
+    def _close(self) -> None:
+        if self._state != STATE_CLOSED:
+            logger.info("Database circuit breaker closed")
+        self._state = STATE_CLOSED
+        self._failures = 0
+
+    def guard(self, func):
+        """
+        Decorate an async function making a database call the breaker protects
+
+        Wrap the database calls themselves, such as repository methods, not
+        services: their time would include bcrypt, tenant provisioning and
+        event loop queueing, and count as database slowness.
+
+        Database unavailability errors and calls slower than
+        ``slow_call_seconds`` count as failures. Other exceptions mean the
+        database answered, so they count as healthy calls. Call durations
+        are exported as ``db_call_duration_seconds``.
+        """
+        duration = DB_CALL_DURATION.labels(func.__qualname__)
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            if _in_guarded_call.get():
+                return await func(*args, **kwargs)
+
+            probe = self.before_call()
+            token = _in_guarded_call.set(True)
+            started = self._clock()
+            failed = None
+            try:
+                result = await func(*args, **kwargs)
+                failed = self._clock() - started > self.slow_call_seconds
+                return result
+            except DATABASE_UNAVAILABLE_ERRORS:
+                failed = True
+                raise
+            except Exception:
+                failed = self._clock() - started > self.slow_call_seconds
+                raise
+            except BaseException:
+                # Cancelled, e.g. by the request deadline; only a slow call
+                # says something about the database
+                if self._clock() - started > self.slow_call_seconds:
+                    failed = True
+                raise
+            finally:
+                _in_guarded_call.reset(token)
+                duration.observe(self._clock() - started)
+                self.after_call(probe, failed)
+
+        return wrapper
+
+
+# Breaker for the master database (organizations and admins)
+db_breaker = CircuitBreaker()
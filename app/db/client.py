@@ -1,24 +1,90 @@
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING
 from typing import Optional
 import os
+from app.db.monitoring import CommandMetricsListener, command_tracing, pool_metrics
 
 # MongoDB connection settings
 MONGODB_URL = os.getenv("MONGO_URI", "mongodb://localhost:27017")
 DATABASE_NAME = os.getenv("MONGO_DB_NAME", "org_master_db")
+# Fail fast when no server is selectable; the circuit breaker handles the rest
+SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+# Connections per server in this worker's pool; app.server derives it from
+# MONGO_CONNECTION_BUDGET when several workers share a deployment
+MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "100"))
 
 # Global database client
 client: Optional[AsyncIOMotorClient] = None
 database = None
+command_metrics: Optional[CommandMetricsListener] = None
 _db_initialized = False
 
 
-async def init_db():
-    """Initialize MongoDB connection"""
-    global client, database, _db_initialized
-    client = AsyncIOMotorClient(MONGODB_URL)
+async def init_db(create_indexes: bool = True):
+    """
+    Initialize MongoDB connection
+
+    The client connects lazily, so this returns without waiting on the
+    server unless indexes are created here.
+
+    Args:
+        create_indexes: Create the master database indexes before
+            returning; the app's lifespan does it in the background instead
+    """
+    global client, database, command_metrics, _db_initialized
+    command_metrics = CommandMetricsListener(MONGODB_URL)
+    client = AsyncIOMotorClient(
+        MONGODB_URL,
+        serverSelectionTimeoutMS=SERVER_SELECTION_TIMEOUT_MS,
+        maxPoolSize=MAX_POOL_SIZE,
+        event_listeners=[pool_metrics, command_metrics, command_tracing],
+    )
     database = client[DATABASE_NAME]
     _db_initialized = True
     print(f"Connected to MongoDB: {DATABASE_NAME}")
+    if create_indexes:
+        await ensure_indexes()
+
+
+async def ensure_indexes():
+    """
+    Create the indexes used by the master database read paths.
+
+    Every organization lookup filters on ``deleted_at`` so soft-deleted
+    organizations are skipped, hence the compound indexes lead with the
+    lookup key and end with ``deleted_at``.
+    """
+    if database is None:
+        return
+
+    try:
+        org_collection = database["organizations"]
+        await org_collection.create_index(
+            [("organization_name", ASCENDING), ("deleted_at", ASCENDING)],
+            name="organization_name_deleted_at",
+        )
+        # Pooled tenants share a collection, so uniqueness is enforced on
+        # the slug rather than on collection_name
+        await org_collection.create_index(
+            [("slug", ASCENDING)],
+            name="slug",
+            unique=True,
+            sparse=True,
+        )
+        await org_collection.create_index(
+            [("collection_name", ASCENDING)],
+            name="collection_name",
+        )
+        await org_collection.create_index(
+            [("deleted_at", ASCENDING)],
+            name="deleted_at",
+        )
+        await database["admins"].create_index(
+            [("email", ASCENDING)],
+            name="email",
+        )
+    except Exception as e:
+        print(f"Failed to create MongoDB indexes: {e}")
 
 
 async def close_db():
@@ -27,6 +93,8 @@ async def close_db():
     if client is not None:
         client.close()
         _db_initialized = False
+    if command_metrics is not None:
+        command_metrics.close()
         print("MongoDB connection closed")
 
 
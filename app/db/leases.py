@@ -0,0 +1,53 @@
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+from typing import Optional
+
+from pymongo.errors import DuplicateKeyError
+
+from app.db.client import get_database
+
+LEASE_COLLECTION = "leases"
+
+# Identifies this worker process as a lease holder
+LEASE_HOLDER = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+async def acquire_lease(
+    name: str,
+    holder: str,
+    ttl_seconds: float,
+    now: Optional[datetime] = None
+) -> bool:
+    """
+    Take or renew a named lease in the master database
+
+    Background jobs that must run once per deployment, not once per worker,
+    take a lease before each cycle.
+
+    Args:
+        name: Lease name
+        holder: Identity of the caller
+        ttl_seconds: How long the lease is held unless renewed
+        now: Current UTC time (defaults to now)
+
+    Returns:
+        True if the caller holds the lease, False if another holder does
+    """
+    db = get_database()
+    if db is None:
+        return False
+
+    now = now or datetime.utcnow()
+    try:
+        # Matches a lease we hold or an expired one; when another holder's
+        # lease is live, the upsert's insert hits the _id index instead
+        await db[LEASE_COLLECTION].update_one(
+            {"_id": name, "$or": [{"holder": holder}, {"expires_at": {"$lte": now}}]},
+            {"$set": {"holder": holder, "expires_at": now + timedelta(seconds=ttl_seconds)}},
+            upsert=True,
+        )
+    except DuplicateKeyError:
+        return False
+    return True
@@ -0,0 +1,387 @@
+import json
+import logging
+import os
+import random
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from pymongo import MongoClient, monitoring
+
+from app.services.tenancy import SHARED_COLLECTION_PREFIX
+from app.utils.metrics import (
+    MONGODB_COMMAND_DURATION,
+    MONGODB_COMMAND_FAILURES,
+    MONGODB_SLOW_COMMANDS,
+)
+from app.utils.tracing import KIND_CLIENT, begin_span
+
+# Commands slower than this are written to the slow-query log
+SLOW_QUERY_MS = float(os.getenv("MONGO_SLOW_QUERY_MS", "100"))
+# Fraction of slow queries whose plan is captured with explain (0 disables)
+EXPLAIN_SAMPLE_RATE = float(os.getenv("MONGO_EXPLAIN_SAMPLE_RATE", "0"))
+# Explain verbosity; executionStats re-runs the query, queryPlanner does not
+EXPLAIN_VERBOSITY = os.getenv("MONGO_EXPLAIN_VERBOSITY", "queryPlanner")
+
+slow_query_logger = logging.getLogger("app.db.slow_queries")
+
+
+class PoolMetricsListener(monitoring.ConnectionPoolListener, monitoring.ServerListener):
+    """
+    Connection pool metrics per replica set member
+
+    pymongo calls listeners from its own threads, so counters are guarded by
+    a lock. Checkout wait time is measured between the check-out-started and
+    checked-out events, which pymongo emits on the same thread.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._members: Dict[str, Dict[str, float]] = defaultdict(self._new_member)
+        self._roles: Dict[str, str] = {}
+
+    @staticmethod
+    def _new_member() -> Dict[str, float]:
+        return {
+            "open": 0,
+            "checked_out": 0,
+            "checkouts": 0,
+            "checkout_failures": 0,
+            "checkout_wait_seconds": 0.0,
+            "max_checkout_wait_seconds": 0.0,
+            "pool_clears": 0,
+        }
+
+    @staticmethod
+    def _address(event) -> str:
+        host, port = event.address
+        return f"{host}:{port}"
+
+    def _add(self, event, key: str, value: float = 1) -> None:
+        with self._lock:
+            self._members[self._address(event)][key] += value
+
+    # ConnectionPoolListener
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self._add(event, "pool_clears")
+
+    def pool_closed(self, event):
+        with self._lock:
+            self._members.pop(self._address(event), None)
+
+    def connection_created(self, event):
+        self._add(event, "open")
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self._add(event, "open", -1)
+
+    def connection_check_out_started(self, event):
+        self._local.checkout_started = time.perf_counter()
+
+    def connection_check_out_failed(self, event):
+        self._add(event, "checkout_failures")
+
+    def connection_checked_out(self, event):
+        started = getattr(self._local, "checkout_started", None)
+        waited = time.perf_counter() - started if started is not None else 0.0
+        with self._lock:
+            member = self._members[self._address(event)]
+            member["checked_out"] += 1
+            member["checkouts"] += 1
+            member["checkout_wait_seconds"] += waited
+            member["max_checkout_wait_seconds"] = max(member["max_checkout_wait_seconds"], waited)
+
+    def connection_checked_in(self, event):
+        self._add(event, "checked_out", -1)
+
+    # ServerListener
+
+    def opened(self, event):
+        pass
+
+    def description_changed(self, event):
+        with self._lock:
+            self._roles[f"{event.server_address[0]}:{event.server_address[1]}"] = (
+                event.new_description.server_type_name)
+
+    def closed(self, event):
+        with self._lock:
+            self._roles.pop(f"{event.server_address[0]}:{event.server_address[1]}", None)
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """
+        Current pool metrics keyed by member address
+
+        Returns:
+            Mapping of "host:port" to counters, including the member's role
+        """
+        with self._lock:
+            return {
+                address: {"role": self._roles.get(address, "Unknown"), **member}
+                for address, member in self._members.items()
+            }
+
+
+# Shared by every MongoClient the app creates
+pool_metrics = PoolMetricsListener()
+
+
+# Master collections keep their own label; tenant collections are collapsed
+# so the number of series doesn't grow with the number of tenants
+MASTER_COLLECTIONS = {"organizations", "admins", "tenant_usage"}
+# Commands whose first field names the collection they act on
+_COLLECTION_COMMANDS = {
+    "find", "insert", "update", "delete", "aggregate", "count", "distinct",
+    "findAndModify", "createIndexes", "listIndexes", "create", "drop", "collMod",
+}
+# Commands the server can explain
+_EXPLAINABLE_COMMANDS = {"find", "aggregate", "count", "distinct", "findAndModify", "update", "delete"}
+# Fields the driver adds to every command; not part of the query
+_DRIVER_FIELDS = {
+    "$db", "lsid", "$clusterTime", "$readPreference", "txnNumber", "readConcern",
+    "writeConcern", "maxTimeMS", "autocommit", "startTransaction", "$audit",
+}
+# Pending explains beyond this are dropped rather than queued
+_MAX_PENDING_EXPLAINS = 4
+
+
+def _collection_name(command_name: str, command: Dict[str, Any]) -> Optional[str]:
+    if command_name == "getMore":
+        name = command.get("collection")
+    elif command_name in _COLLECTION_COMMANDS:
+        name = command.get(command_name)
+    else:
+        name = None
+    return name if isinstance(name, str) else None
+
+
+def collection_label(command_name: str, command: Dict[str, Any]) -> str:
+    """
+    Bounded collection label for a command
+
+    Args:
+        command_name: Command name
+        command: Command document
+
+    Returns:
+        The collection name for master collections, a family name for tenant
+        collections, or "-" for commands without a collection
+    """
+    name = _collection_name(command_name, command)
+    if name is None:
+        return "-"
+    if name in MASTER_COLLECTIONS or name.startswith("system."):
+        return name
+    if name.startswith(SHARED_COLLECTION_PREFIX):
+        return "shared_tenants"
+    return "tenant"
+
+
+def query_shape(value: Any, depth: int = 0) -> Any:
+    """Replace literal values with "?" so logs carry the shape, not the data"""
+    if depth > 6:
+        return "..."
+    if isinstance(value, dict):
+        return {key: query_shape(item, depth + 1) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [query_shape(value[0], depth + 1)] if value else []
+    return "?"
+
+
+def _query_fields(command: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        key: value for key, value in command.items()
+        if key not in _DRIVER_FIELDS and key != "documents"
+    }
+
+
+def _plan_stages(plan: Dict[str, Any]):
+    """Stage names of a winning plan, outermost first"""
+    while plan:
+        yield plan.get("stage")
+        plan = plan.get("inputStage") or (plan.get("inputStages") or [None])[0]
+
+
+class CommandMetricsListener(monitoring.CommandListener):
+    """
+    Latency metrics and slow-query log for every MongoDB command
+
+    Latencies are recorded per command name and collection. Commands slower
+    than ``slow_query_ms`` are logged as JSON with literal values stripped;
+    a ``explain_sample_rate`` fraction of the explainable ones also gets its
+    query plan captured on a separate synchronous client, off the event loop
+    and off the driver's thread.
+    """
+
+    def __init__(
+        self,
+        uri: str,
+        slow_query_ms: float = SLOW_QUERY_MS,
+        explain_sample_rate: float = EXPLAIN_SAMPLE_RATE,
+        explain: Optional[Callable[[str, Dict[str, Any]], Dict[str, Any]]] = None,
+    ):
+        self._uri = uri
+        self.slow_query_ms = slow_query_ms
+        self.explain_sample_rate = explain_sample_rate
+        self._explain = explain or self._explain_with_client
+        self._lock = threading.Lock()
+        self._started: Dict[Tuple[int, Any], Tuple[str, str, Dict[str, Any]]] = {}
+        self._explain_client: Optional[MongoClient] = None
+        self._explain_executor: Optional[ThreadPoolExecutor] = None
+        self._pending_explains = 0
+
+    def started(self, event):
+        command = event.command
+        with self._lock:
+            self._started[(event.request_id, event.connection_id)] = (
+                event.database_name, collection_label(event.command_name, command), command)
+
+    def succeeded(self, event):
+        self._finished(event, failed=False)
+
+    def failed(self, event):
+        self._finished(event, failed=True)
+
+    def _finished(self, event, failed: bool) -> None:
+        with self._lock:
+            started = self._started.pop((event.request_id, event.connection_id), None)
+        if started is None:
+            return
+        database, collection, command = started
+        seconds = event.duration_micros / 1_000_000
+        MONGODB_COMMAND_DURATION.labels(event.command_name, collection).observe(seconds)
+        if failed:
+            MONGODB_COMMAND_FAILURES.labels(event.command_name, collection).inc()
+        if seconds * 1000 >= self.slow_query_ms:
+            MONGODB_SLOW_COMMANDS.labels(event.command_name, collection).inc()
+            self._log_slow_query(event, database, command, seconds, failed)
+
+    def _log_slow_query(self, event, database, command, seconds, failed) -> None:
+        record = {
+            "command": event.command_name,
+            "database": database,
+            "collection": _collection_name(event.command_name, command),
+            "duration_ms": round(seconds * 1000, 2),
+            "failed": failed,
+            "server": "%s:%s" % event.connection_id,
+            "operation_id": event.operation_id,
+            "shape": query_shape(_query_fields(command)),
+        }
+        slow_query_logger.warning("slow query %s", json.dumps(record, default=str))
+
+        if (event.command_name in _EXPLAINABLE_COMMANDS and not failed
+                and self.explain_sample_rate > 0
+                and random.random() < self.explain_sample_rate):
+            self._submit_explain(record, database, _query_fields(command))
+
+    def _submit_explain(self, record, database, command) -> None:
+        with self._lock:
+            if self._pending_explains >= _MAX_PENDING_EXPLAINS:
+                return
+            self._pending_explains += 1
+            if self._explain_executor is None:
+                self._explain_executor = ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix="mongo-explain")
+        self._explain_executor.submit(self._run_explain, record, database, command)
+
+    def _run_explain(self, record, database, command) -> None:
+        try:
+            result = self._explain(database, command)
+            planner = result.get("queryPlanner", {})
+            winning_plan = planner.get("winningPlan", {})
+            # Aggregations nest the plan of their $cursor stage
+            winning_plan = winning_plan.get("queryPlan", winning_plan)
+            stages = [stage for stage in _plan_stages(winning_plan) if stage]
+            slow_query_logger.warning("slow query plan %s", json.dumps({
+                "command": record["command"],
+                "database": record["database"],
+                "collection": record["collection"],
+                "operation_id": record["operation_id"],
+                "stages": stages,
+                "collscan": "COLLSCAN" in stages,
+                "winning_plan": winning_plan,
+            }, default=str))
+        except Exception as e:
+            slow_query_logger.info("explain failed for %s: %s", record["command"], e)
+        finally:
+            with self._lock:
+                self._pending_explains -= 1
+
+    def _explain_with_client(self, database: str, command: Dict[str, Any]) -> Dict[str, Any]:
+        if self._explain_client is None:
+            # No listeners on this client, so explains aren't measured or
+            # explained themselves
+            self._explain_client = MongoClient(self._uri, serverSelectionTimeoutMS=2000)
+        return self._explain_client[database].command(
+            {"explain": command, "verbosity": EXPLAIN_VERBOSITY})
+
+    def close(self) -> None:
+        """Stop the explain worker and close its client"""
+        if self._explain_executor is not None:
+            self._explain_executor.shutdown(wait=False, cancel_futures=True)
+            self._explain_executor = None
+        if self._explain_client is not None:
+            self._explain_client.close()
+            self._explain_client = None
+
+
+class CommandTracingListener(monitoring.CommandListener):
+    """
+    A client span per MongoDB command, as a child of the request's span
+
+    Motor runs driver calls with a copy of the caller's context, so the
+    started event sees the request's current span. The span is ended with
+    the driver-measured duration.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._spans: Dict[Tuple[int, Any], Any] = {}
+
+    def started(self, event):
+        span = begin_span(f"mongodb.{event.command_name}", KIND_CLIENT)
+        if span is None or not span.sampled:
+            return
+        span.set_attribute("db.system", "mongodb")
+        span.set_attribute("db.name", event.database_name)
+        span.set_attribute("db.operation", event.command_name)
+        collection = _collection_name(event.command_name, event.command)
+        if collection is not None:
+            span.set_attribute("db.mongodb.collection", collection)
+        host, port = event.connection_id
+        span.set_attribute("net.peer.name", host)
+        span.set_attribute("net.peer.port", port)
+        with self._lock:
+            self._spans[(event.request_id, event.connection_id)] = span
+
+    def succeeded(self, event):
+        self._finished(event, None)
+
+    def failed(self, event):
+        self._finished(event, event.failure)
+
+    def _finished(self, event, failure) -> None:
+        with self._lock:
+            span = self._spans.pop((event.request_id, event.connection_id), None)
+        if span is None:
+            return
+        if failure is not None:
+            span.record_error(failure)
+        span.end(span.start_ns + event.duration_micros * 1000)
+
+
+# Shared by every MongoClient the app creates
+command_tracing = CommandTracingListener()
@@ -0,0 +1,178 @@
+import bisect
+import hashlib
+import os
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from app.db.client import DATABASE_NAME, MAX_POOL_SIZE, SERVER_SELECTION_TIMEOUT_MS, get_database
+from app.db.monitoring import CommandMetricsListener, command_tracing, pool_metrics
+
+# Extra MongoDB deployments tenants can be placed on, as a comma-separated
+# list of name=uri pairs. The database name is taken from the URI path and
+# defaults to MONGO_DB_NAME, e.g.
+#   MONGO_CLUSTERS="east=mongodb://east:27017/tenants,west=mongodb://west:27017"
+MONGO_CLUSTERS = os.getenv("MONGO_CLUSTERS", "")
+# Virtual nodes per cluster on the hash ring; more means a smoother spread
+PLACEMENT_VIRTUAL_NODES = int(os.getenv("PLACEMENT_VIRTUAL_NODES", "128"))
+
+# The master deployment (MONGO_URI) is always available as this cluster
+DEFAULT_CLUSTER = "default"
+
+
+class HashRing:
+    """
+    Consistent hash ring mapping keys to cluster names
+
+    Adding or removing a cluster only moves the keys adjacent to its
+    virtual nodes, roughly 1/N of all tenants.
+    """
+
+    def __init__(self, nodes: Iterable[str], virtual_nodes: int = PLACEMENT_VIRTUAL_NODES):
+        self.nodes = sorted(set(nodes))
+        self._ring: List[Tuple[int, str]] = sorted(
+            (self._hash(f"{node}#{i}"), node)
+            for node in self.nodes
+            for i in range(virtual_nodes)
+        )
+        self._hashes = [h for h, _ in self._ring]
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        return int.from_bytes(hashlib.md5(key.encode("utf-8")).digest()[:8], "big")
+
+    def get_node(self, key: str) -> str:
+        """Cluster owning a key"""
+        if not self._ring:
+            raise ValueError("Hash ring is empty")
+        index = bisect.bisect(self._hashes, self._hash(key)) % len(self._ring)
+        return self._ring[index][1]
+
+
+def parse_clusters(spec: str) -> Dict[str, str]:
+    """
+    Parse a MONGO_CLUSTERS specification
+
+    Args:
+        spec: Comma-separated name=uri pairs
+
+    Returns:
+        Mapping of cluster name to MongoDB URI
+    """
+    clusters = {}
+    for entry in filter(None, (part.strip() for part in spec.split(","))):
+        name, sep, uri = entry.partition("=")
+        name = name.strip()
+        if not sep or not name or not uri.strip():
+            raise ValueError(f"Invalid MONGO_CLUSTERS entry '{entry}'")
+        if name == DEFAULT_CLUSTER:
+            raise ValueError(f"'{DEFAULT_CLUSTER}' is reserved for MONGO_URI")
+        clusters[name] = uri.strip()
+    return clusters
+
+
+_cluster_uris: Dict[str, str] = {}
+_ring: Optional[HashRing] = None
+# Lazily created client per extra cluster
+_clients: Dict[str, AsyncIOMotorClient] = {}
+_command_listeners: Dict[str, CommandMetricsListener] = {}
+
+
+def configure_clusters(spec: str) -> None:
+    """
+    (Re)configure the extra clusters and rebuild the hash ring
+
+    Args:
+        spec: Comma-separated name=uri pairs
+    """
+    global _cluster_uris, _ring
+    close_cluster_clients()
+    _cluster_uris = parse_clusters(spec)
+    _ring = HashRing([DEFAULT_CLUSTER, *_cluster_uris])
+
+
+def get_cluster_names() -> List[str]:
+    """Names of every cluster tenants can be placed on"""
+    return [DEFAULT_CLUSTER, *_cluster_uris]
+
+
+def place_tenant(key: str) -> str:
+    """
+    Cluster the hash ring assigns a tenant to
+
+    Args:
+        key: Stable tenant key (the organization ID)
+    """
+    return _ring.get_node(key)
+
+
+def get_org_cluster(org_doc: dict) -> str:
+    """Cluster an organization's data currently lives on"""
+    return org_doc.get("cluster") or DEFAULT_CLUSTER
+
+
+def get_target_cluster(org_doc: dict) -> str:
+    """
+    Cluster an organization should live on
+
+    An explicit ``pinned_cluster`` on the organization overrides the ring.
+    """
+    return org_doc.get("pinned_cluster") or place_tenant(str(org_doc["_id"]))
+
+
+def get_cluster_client(cluster: str = DEFAULT_CLUSTER) -> Optional[AsyncIOMotorClient]:
+    """
+    Get the client of a cluster, connecting on first use
+
+    Args:
+        cluster: Cluster name
+
+    Returns:
+        Motor client, or None if the master database isn't initialized
+    """
+    if cluster == DEFAULT_CLUSTER:
+        db = get_database()
+        return db.client if db is not None else None
+
+    client = _clients.get(cluster)
+    if client is None:
+        uri = _cluster_uris.get(cluster)
+        if uri is None:
+            raise ValueError(f"Unknown cluster '{cluster}'")
+        command_metrics = _command_listeners[cluster] = CommandMetricsListener(uri)
+        client = AsyncIOMotorClient(
+            uri,
+            serverSelectionTimeoutMS=SERVER_SELECTION_TIMEOUT_MS,
+            maxPoolSize=MAX_POOL_SIZE,
+            event_listeners=[pool_metrics, command_metrics, command_tracing],
+        )
+        _clients[cluster] = client
+    return client
+
+
+def get_cluster_database(cluster: str = DEFAULT_CLUSTER):
+    """
+    Get the tenant database of a cluster, connecting on first use
+
+    Args:
+        cluster: Cluster name
+
+    Returns:
+        Motor database, or None if the master database isn't initialized
+    """
+    if cluster == DEFAULT_CLUSTER:
+        return get_database()
+    return get_cluster_client(cluster).get_default_database(default=DATABASE_NAME)
+
+
+def close_cluster_clients() -> None:
+    """Close every extra cluster client"""
+    for client in _clients.values():
+        client.close()
+    _clients.clear()
+    for command_metrics in _command_listeners.values():
+        command_metrics.close()
+    _command_listeners.clear()
+
+
+configure_clusters(MONGO_CLUSTERS)
@@ -0,0 +1,58 @@
+import os
+
+from pymongo.read_preferences import (
+    Nearest,
+    Primary,
+    PrimaryPreferred,
+    Secondary,
+    SecondaryPreferred,
+)
+
+# Read preference used by read-only endpoints (get, list, export). Writes and
+# the reads that follow them always use the primary.
+SECONDARY_READ_PREFERENCE = os.getenv("MONGO_SECONDARY_READ_PREFERENCE", "secondaryPreferred")
+# How stale a secondary may be before it's skipped; MongoDB requires at
+# least 90 seconds, -1 disables the bound
+READ_MAX_STALENESS_SECONDS = int(os.getenv("MONGO_READ_MAX_STALENESS_SECONDS", "90"))
+
+_READ_PREFERENCES = {
+    "primary": Primary,
+    "primaryPreferred": PrimaryPreferred,
+    "secondary": Secondary,
+    "secondaryPreferred": SecondaryPreferred,
+    "nearest": Nearest,
+}
+
+
+def build_read_preference(mode: str, max_staleness: int = READ_MAX_STALENESS_SECONDS):
+    """
+    Build a read preference from its mode name
+
+    Args:
+        mode: Read preference mode name, e.g. "secondaryPreferred"
+        max_staleness: Staleness bound in seconds (-1 for none)
+
+    Returns:
+        pymongo read preference
+    """
+    if mode not in _READ_PREFERENCES:
+        raise ValueError(f"Unsupported read preference '{mode}'")
+    if mode == "primary":
+        return Primary()
+    return _READ_PREFERENCES[mode](max_staleness=max_staleness)
+
+
+secondary_reads = build_read_preference(SECONDARY_READ_PREFERENCE)
+
+
+def for_secondary_reads(collection):
+    """
+    View of a collection that reads from secondaries within the staleness bound
+
+    Args:
+        collection: Motor collection
+
+    Returns:
+        Motor collection using the secondary read preference
+    """
+    return collection.with_options(read_preference=secondary_reads)
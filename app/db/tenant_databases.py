@@ -0,0 +1,74 @@
+import os
+from collections import OrderedDict
+from typing import Dict, Tuple
+
+from app.db.placement import DEFAULT_CLUSTER, get_cluster_client
+
+# Maximum number of tenant database handles kept per worker
+TENANT_DB_CACHE_SIZE = int(os.getenv("TENANT_DB_CACHE_SIZE", "1024"))
+
+
+class TenantDatabaseCache:
+    """
+    Bounded LRU of Motor database handles for database-per-tenant mode
+
+    Handles are cheap views over the cluster's shared client and connection
+    pool, but at thousands of tenants creating one per request adds up and
+    an unbounded dict grows forever, so the least recently used are evicted.
+    """
+
+    def __init__(self, maxsize: int = TENANT_DB_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._handles: "OrderedDict[Tuple[str, str], object]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, database_name: str, cluster: str = DEFAULT_CLUSTER):
+        """
+        Get the handle of a tenant database
+
+        Args:
+            database_name: Tenant database name
+            cluster: Cluster the tenant lives on
+
+        Returns:
+            Motor database, or None if the cluster isn't initialized
+        """
+        key = (cluster, database_name)
+        handle = self._handles.get(key)
+        if handle is not None:
+            self._handles.move_to_end(key)
+            self.hits += 1
+            return handle
+
+        client = get_cluster_client(cluster)
+        if client is None:
+            return None
+
+        self.misses += 1
+        handle = client[database_name]
+        self._handles[key] = handle
+        if len(self._handles) > self.maxsize:
+            self._handles.popitem(last=False)
+            self.evictions += 1
+        return handle
+
+    def discard(self, database_name: str, cluster: str = DEFAULT_CLUSTER) -> None:
+        """Forget the handle of a dropped or moved tenant database"""
+        self._handles.pop((cluster, database_name), None)
+
+    def clear(self) -> None:
+        self._handles.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": len(self._handles),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+tenant_databases = TenantDatabaseCache()
@@ -1,22 +1,102 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import OAuth2PasswordBearer
 from dotenv import load_dotenv
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 from app.api.v1.admin_routes import router as admin_router
 from app.api.v1.org_routes import router as org_router
-from app.db.client import init_db, close_db
+from app.api.v1.tenant_routes import router as tenant_router
+from app.api.v1.diagnostics_routes import router as diagnostics_router
+from app.db.circuit_breaker import DATABASE_UNAVAILABLE_ERRORS
+from app.db.client import init_db, close_db, ensure_indexes
+from app.db.placement import close_cluster_clients
+from app.middleware.compression import CompressionMiddleware
+from app.middleware.concurrency import ConcurrencyLimitMiddleware
+from app.middleware.content_negotiation import ContentNegotiationMiddleware
+from app.middleware.deadline import DeadlineMiddleware
+from app.middleware.metrics import MetricsMiddleware
+from app.middleware.profiling import RequestProfilingMiddleware
+from app.middleware.tracing import TracingMiddleware
+from app.openapi import OPENAPI_SCHEMA_FILE, load_openapi_schema
+from app.repositories import provider as repositories
+from app.services.purge_service import run_purge_scheduler
+from app.services.tenant_provisioning import run_pool_replenisher
+from app.services.tenant_usage import run_usage_flusher
+from app.services.tenant_promotion import TENANT_PROMOTION_ENABLED, run_promotion_policy
+from app.utils.background import start_background_task, stop_background_tasks
+from app.utils.compression import COMPRESSION_ENABLED
+from app.utils.concurrency import ADAPTIVE_CONCURRENCY_ENABLED, concurrency_limit
+from app.utils.loop_lag import loop_monitor
+from app.utils.readiness import readiness_monitor
+from app.utils.responses import DefaultJSONResponse, database_unavailable_handler
+from app.utils.tracing import flush_spans
 
 # Load environment variables from .env file
 load_dotenv()
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/admin/login")
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Start the database client and background jobs, and stop them on shutdown
+
+    Nothing here waits on MongoDB: the client connects lazily and the
+    master indexes are created by a background job, so the worker starts
+    serving right away.
+    """
+    # The in-memory backend runs without MongoDB; tenant record endpoints
+    # and the MongoDB background jobs then have nothing to work on
+    if repositories.STORAGE_BACKEND != "memory":
+        await init_db(create_indexes=False)
+        start_background_task("ensure_indexes", ensure_indexes)
+    if ADAPTIVE_CONCURRENCY_ENABLED:
+        loop_monitor.add_listener(concurrency_limit.on_lag)
+    start_background_task("loop_lag", loop_monitor.run)
+    start_background_task("readiness", readiness_monitor.run)
+    start_background_task("org_purge", run_purge_scheduler)
+    start_background_task("tenant_pool", run_pool_replenisher)
+    start_background_task("tenant_usage", run_usage_flusher)
+    if TENANT_PROMOTION_ENABLED:
+        start_background_task("tenant_promotion", run_promotion_policy)
+
+    yield
+
+    await stop_background_tasks()
+    close_cluster_clients()
+    await close_db()
+    flush_spans()
+
+
 app = FastAPI(
     title="Organization Management API",
     description="API for managing organizations and admin authentication",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=DefaultJSONResponse,
+    lifespan=lifespan
 )
 
+# Database outages and deadline expiry, re-raised by the route handlers
+for error in DATABASE_UNAVAILABLE_ERRORS:
+    app.add_exception_handler(error, database_unavailable_handler)
+
+# Request profiling; innermost so the handler runs in the profiled task
+app.add_middleware(RequestProfilingMiddleware)
+
+# Request deadlines; added early so CORS headers wrap the 504 responses
+app.add_middleware(DeadlineMiddleware)
+
+# Load shedding; inside CORS so browsers can read the 503
+if ADAPTIVE_CONCURRENCY_ENABLED:
+    app.add_middleware(ConcurrencyLimitMiddleware)
+
+# MessagePack/CBOR negotiation; outside deadlines and load shedding so
+# their error envelopes come back in the negotiated format too
+app.add_middleware(ContentNegotiationMiddleware)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -26,21 +106,22 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Include routers
-app.include_router(admin_router)
-app.include_router(org_router)
-
+# Response compression; inside metrics and tracing so their latencies
+# include it
+if COMPRESSION_ENABLED:
+    app.add_middleware(CompressionMiddleware)
 
-@app.on_event("startup")
-async def startup_event():
-    """Initialize database connection on startup"""
-    await init_db()
+# Request metrics; added after the others so it sees every response
+app.add_middleware(MetricsMiddleware)
 
+# Tracing; outermost so every other layer runs inside the request's span
+app.add_middleware(TracingMiddleware)
 
-@app.on_event("shutdown")
-async def shutdown_event():
-    """Close database connection on shutdown"""
-    await close_db()
+# Include routers
+app.include_router(admin_router)
+app.include_router(org_router)
+app.include_router(tenant_router)
+app.include_router(diagnostics_router)
 
 
 @app.get("/")
@@ -51,3 +132,32 @@ async def root():
 @app.get("/health")
 async def health_check():
     return {"status": "healthy"}
+
+
+@app.get("/livez")
+async def liveness():
+    """Liveness: the worker's event loop is serving requests. Checks no dependencies."""
+    return {"status": "alive"}
+
+
+@app.get("/readyz")
+async def readiness():
+    """
+    Readiness: 200 when the worker can serve traffic, 503 otherwise
+
+    Reports the status cached by the background readiness monitor, so
+    probes never touch MongoDB themselves.
+    """
+    status = readiness_monitor.status()
+    return DefaultJSONResponse(status, status_code=200 if status["ready"] else 503)
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus metrics in the text exposition format"""
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
+# Serve a prebuilt OpenAPI schema instead of generating it on first request
+if OPENAPI_SCHEMA_FILE:
+    load_openapi_schema(app, OPENAPI_SCHEMA_FILE)
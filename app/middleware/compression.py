@@ -0,0 +1,125 @@
+import asyncio
+
+from starlette.datastructures import Headers, MutableHeaders
+
+from app.utils.compression import (
+    COMPRESSION_MIN_SIZE,
+    COMPRESSION_THREAD_THRESHOLD,
+    compress,
+    create_compressor,
+    is_compressible,
+    negotiate_encoding,
+)
+from app.utils.metrics import HTTP_RESPONSE_BYTES
+
+
+async def _run(func, data: bytes, thread_threshold: int):
+    """Call a compression function, on a worker thread for large inputs"""
+    if len(data) >= thread_threshold:
+        return await asyncio.to_thread(func, data)
+    return func(data)
+
+
+class CompressionMiddleware:
+    """
+    Compress responses with the best encoding the client accepts
+
+    zstd, br or gzip is negotiated from Accept-Encoding. Complete bodies
+    below the size threshold, media types that don't compress and responses
+    that are already encoded are sent as they are. Streaming responses are
+    compressed chunk by chunk. Bodies and chunks above the thread threshold
+    are compressed on a worker thread so the event loop keeps serving other
+    requests.
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_SIZE,
+                 thread_threshold: int = COMPRESSION_THREAD_THRESHOLD):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.thread_threshold = thread_threshold
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        compressor = None
+        passthrough = False
+        bytes_in = bytes_out = 0
+
+        async def send_compressed(message):
+            nonlocal start_message, compressor, passthrough, bytes_in, bytes_out
+            if passthrough:
+                await send(message)
+                return
+
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                if "content-encoding" in headers or not is_compressible(headers.get("content-type")):
+                    passthrough = True
+                    await send(message)
+                else:
+                    # Held back until the first body chunk shows whether to compress
+                    start_message = message
+                return
+
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if compressor is None:
+                headers = MutableHeaders(raw=start_message["headers"])
+                declared = headers.get("content-length")
+                small = (len(body) < self.minimum_size if not more_body
+                         else declared is not None and int(declared) < self.minimum_size)
+                if small:
+                    passthrough = True
+                    await send(start_message)
+                    await send(message)
+                    return
+
+                if not more_body:
+                    compressed = await _run(lambda data: compress(encoding, data), body,
+                                            self.thread_threshold)
+                    if len(compressed) >= len(body):
+                        passthrough = True
+                        await send(start_message)
+                        await send(message)
+                        return
+                    HTTP_RESPONSE_BYTES.labels(encoding, "in").inc(len(body))
+                    HTTP_RESPONSE_BYTES.labels(encoding, "out").inc(len(compressed))
+                    headers["Content-Encoding"] = encoding
+                    headers["Content-Length"] = str(len(compressed))
+                    headers.add_vary_header("Accept-Encoding")
+                    await send(start_message)
+                    await send({"type": "http.response.body", "body": compressed})
+                    return
+
+                compressor = create_compressor(encoding)
+                headers["Content-Encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+                if "content-length" in headers:
+                    del headers["content-length"]
+                await send(start_message)
+
+            chunk = await _run(compressor.compress, body, self.thread_threshold) if body else b""
+            if not more_body:
+                chunk += compressor.finish()
+            bytes_in += len(body)
+            bytes_out += len(chunk)
+            if chunk or not more_body:
+                await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+            if not more_body:
+                HTTP_RESPONSE_BYTES.labels(encoding, "in").inc(bytes_in)
+                HTTP_RESPONSE_BYTES.labels(encoding, "out").inc(bytes_out)
+
+        await self.app(scope, receive, send_compressed)
@@ -0,0 +1,79 @@
+from app.utils.responses import (
+    body_format,
+    decode_body,
+    dumps,
+    error_response,
+    negotiate_format,
+    response_format_scope,
+)
+
+
+async def _read_body(receive) -> bytes:
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] != "http.request":
+            break
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body", False):
+            break
+    return b"".join(chunks)
+
+
+class ContentNegotiationMiddleware:
+    """
+    Serve and accept MessagePack and CBOR besides JSON
+
+    The Accept header picks the format every envelope built by
+    create_response is encoded in. MessagePack and CBOR request bodies are
+    decoded and handed on as JSON, so routes and their request models work
+    unchanged.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept = content_type = None
+        for key, value in scope["headers"]:
+            if key == b"accept":
+                accept = value.decode("latin-1")
+            elif key == b"content-type":
+                content_type = value.decode("latin-1")
+
+        with response_format_scope(negotiate_format(accept)):
+            name = body_format(content_type)
+            if name is None:
+                await self.app(scope, receive, send)
+                return
+
+            try:
+                body = dumps(decode_body(name, await _read_body(receive)))
+            except (ValueError, TypeError) as e:
+                response = error_response(
+                    code="INVALID_BODY",
+                    message=f"Request body is not valid {name}",
+                    details={"error": str(e)},
+                    status_code=400
+                )
+                await response(scope, receive, send)
+                return
+
+            headers = [(key, value) for key, value in scope["headers"]
+                       if key not in (b"content-type", b"content-length")]
+            headers += [(b"content-type", b"application/json"),
+                        (b"content-length", str(len(body)).encode("latin-1"))]
+            replayed = False
+
+            async def replay():
+                nonlocal replayed
+                if replayed:
+                    return await receive()
+                replayed = True
+                return {"type": "http.request", "body": body, "more_body": False}
+
+            await self.app(dict(scope, headers=headers), replay, send)
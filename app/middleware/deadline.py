@@ -0,0 +1,54 @@
+import asyncio
+import logging
+
+from app.utils.deadline import budget_for_path, deadline_scope
+from app.utils.responses import error_response
+
+logger = logging.getLogger(__name__)
+
+
+class DeadlineMiddleware:
+    """
+    Give every HTTP request a time budget
+
+    The budget comes from REQUEST_DEADLINE_SECONDS or a ROUTE_DEADLINES
+    override. It is carried in a context variable, sent to MongoDB as
+    maxTimeMS, and enforced by cancelling the handler once it is spent.
+    A request cancelled before it started responding gets a 504 envelope.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        budget = budget_for_path(scope["path"])
+        if budget is None:
+            await self.app(scope, receive, send)
+            return
+
+        response_started = False
+
+        async def send_wrapper(message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        with deadline_scope(budget):
+            try:
+                await asyncio.wait_for(self.app(scope, receive, send_wrapper), budget)
+            except asyncio.TimeoutError:
+                if response_started:
+                    logger.warning("Deadline of %.1fs exceeded mid-response on %s", budget, scope["path"])
+                    return
+                response = error_response(
+                    code="DEADLINE_EXCEEDED",
+                    message="Request deadline exceeded",
+                    details={"budget_seconds": budget},
+                    status_code=504
+                )
+                await response(scope, receive, send)
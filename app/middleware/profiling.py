@@ -0,0 +1,32 @@
+import time
+
+from app.middleware.routes import RouteTemplates
+from app.utils.profiler import RequestProfiler, request_profiler
+from app.utils.tracing import current_trace_id
+
+
+class RequestProfilingMiddleware:
+    """
+    Profile a sampled fraction of requests
+
+    Must be the innermost middleware so the handler runs in the task that is
+    registered with the profiler. Unsampled requests pay one random() call.
+    """
+
+    def __init__(self, app, profiler: RequestProfiler = request_profiler):
+        self.app = app
+        self.profiler = profiler
+        self._routes = RouteTemplates()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.profiler.should_sample():
+            await self.app(scope, receive, send)
+            return
+
+        task = self.profiler.begin()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            route = f"{scope['method']} {self._routes.resolve(scope)}"
+            self.profiler.end(task, route, current_trace_id(), time.perf_counter() - started)
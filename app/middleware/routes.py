@@ -0,0 +1,48 @@
+# Label for requests that match no route, so scanners can't add series
+UNMATCHED_ROUTE = "unmatched"
+
+
+class RouteTemplates:
+    """
+    Resolve a request to its route template before routing runs
+
+    Uses the routes' compiled path regexes directly, which is much cheaper
+    than ``Route.matches``. The table is rebuilt if routes are added.
+    """
+
+    def __init__(self):
+        self._routes = None
+        self._route_count = 0
+
+    def _table(self, app):
+        routes = app.routes
+        if self._routes is None or len(routes) != self._route_count:
+            self._routes = [
+                (route.path_regex, getattr(route, "methods", None), route.path)
+                for route in routes
+                if hasattr(route, "path_regex")
+            ]
+            self._route_count = len(routes)
+        return self._routes
+
+    def resolve(self, scope) -> str:
+        """
+        Route template of an HTTP request
+
+        Args:
+            scope: ASGI scope; ``scope["app"]`` is the application
+
+        Returns:
+            The template, e.g. ``/tenant/records/{record_id}``, or
+            UNMATCHED_ROUTE
+        """
+        path = scope["path"]
+        method = scope["method"]
+        partial = None
+        for regex, methods, template in self._table(scope["app"]):
+            if regex.match(path):
+                if methods is None or method in methods:
+                    return template
+                if partial is None:
+                    partial = template
+        return partial or UNMATCHED_ROUTE
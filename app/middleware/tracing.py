@@ -0,0 +1,51 @@
+from app.middleware.routes import RouteTemplates
+from app.utils.tracing import start_trace
+
+
+class TracingMiddleware:
+    """
+    Continue or start a W3C trace for every HTTP request
+
+    The incoming ``traceparent`` is honoured; otherwise a new trace is
+    started. The server span is current for the whole request, so
+    ``create_response`` uses its trace ID and MongoDB, bcrypt and
+    serialization spans become its children. The trace ID is returned in
+    ``X-Trace-Id`` and the server span in ``traceparent``.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._routes = RouteTemplates()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        traceparent = None
+        for name, value in scope["headers"]:
+            if name == b"traceparent":
+                traceparent = value.decode("latin-1")
+                break
+
+        method = scope["method"]
+        route = self._routes.resolve(scope)
+        with start_trace(f"{method} {route}", traceparent) as span:
+            span.set_attribute("http.method", method)
+            span.set_attribute("http.route", route)
+            span.set_attribute("http.target", scope["path"])
+
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start":
+                    status = message["status"]
+                    span.set_attribute("http.status_code", status)
+                    if status >= 500:
+                        span.record_error(f"HTTP {status}")
+                    headers = [(k, v) for k, v in message.get("headers", []) if k != b"traceparent"]
+                    if not any(k == b"x-trace-id" for k, _ in headers):
+                        headers.append((b"x-trace-id", span.trace_id.encode("latin-1")))
+                    headers.append((b"traceparent", span.traceparent.encode("latin-1")))
+                    message = {**message, "headers": headers}
+                await send(message)
+
+            await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,6 @@
+from pydantic import BaseModel
+from typing import Any, Dict
+
+
+class TenantRecordRequest(BaseModel):
+    data: Dict[str, Any]
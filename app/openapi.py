@@ -0,0 +1,89 @@
+"""
+Generate or check the prebuilt OpenAPI schema
+
+FastAPI builds the schema on the first /openapi.json request by walking
+every route and model, which costs each new worker tens of milliseconds.
+Setting OPENAPI_SCHEMA_FILE serves the schema from a file generated ahead
+of time instead.
+
+Usage:
+    python -m app.openapi            # rewrite openapi.json
+    python -m app.openapi --check    # exit 1 if openapi.json is stale
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+
+logger = logging.getLogger(__name__)
+
+# Prebuilt schema served at /openapi.json; empty to generate it on demand
+OPENAPI_SCHEMA_FILE = os.getenv("OPENAPI_SCHEMA_FILE", "")
+
+DEFAULT_OUTPUT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "openapi.json")
+
+
+def render_schema(schema: dict) -> str:
+    """Schema as written to the file"""
+    return json.dumps(schema, indent=2) + "\n"
+
+
+def load_openapi_schema(app, path: str) -> bool:
+    """
+    Serve a prebuilt schema instead of generating it
+
+    A schema for a different API version is ignored, so a stale file left
+    behind by a deploy can't describe the wrong API.
+
+    Args:
+        app: FastAPI application
+        path: Schema file
+
+    Returns:
+        Whether the prebuilt schema is used
+    """
+    try:
+        with open(path, encoding="utf-8") as f:
+            schema = json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning("Can't load OpenAPI schema from %s, generating it instead: %s", path, e)
+        return False
+    version = schema.get("info", {}).get("version")
+    if version != app.version:
+        logger.warning("OpenAPI schema in %s is for version %s, not %s; generating it instead",
+                       path, version, app.version)
+        return False
+    # FastAPI returns app.openapi_schema as is once it is set
+    app.openapi_schema = schema
+    return True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    parser.add_argument("--check", action="store_true", help="Only check that the file is up to date")
+    args = parser.parse_args(argv)
+
+    from app.main import app
+
+    # Generate from the routes, never from a file the environment points at
+    app.openapi_schema = None
+    rendered = render_schema(app.openapi())
+    if args.check:
+        try:
+            with open(args.output, encoding="utf-8") as f:
+                current = f.read()
+        except FileNotFoundError:
+            current = None
+        if current != rendered:
+            print(f"{args.output} is out of date; run python -m app.openapi", file=sys.stderr)
+            return 1
+        return 0
+    with open(args.output, "w", encoding="utf-8") as f:
+        f.write(rendered)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
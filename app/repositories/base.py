@@ -0,0 +1,163 @@
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from bson import ObjectId
+
+# Organization fields the tenant router needs to resolve a tenant
+ROUTE_FIELDS = (
+    "collection_name",
+    "database_name",
+    "tenancy",
+    "cluster",
+    "write_fenced",
+    "migration_started_at",
+)
+
+
+class OrganizationRepository:
+    """
+    Storage of organization metadata
+
+    Documents are returned as fresh dicts the caller may modify, the way
+    the driver hands them out. "Active" means not soft-deleted.
+    """
+
+    async def insert(self, org_doc: dict) -> ObjectId:
+        """Store a new organization, assigning ``_id`` if missing"""
+        raise NotImplementedError
+
+    async def find_by_slug(self, slug: str, exclude_id: Optional[ObjectId] = None) -> Optional[dict]:
+        """
+        Organization, active or pending deletion, whose slug or collection
+        name is ``slug``
+        """
+        raise NotImplementedError
+
+    async def find_by_collection_name(
+        self,
+        collection_name: str,
+        exclude_id: Optional[ObjectId] = None
+    ) -> Optional[dict]:
+        """Organization, active or pending deletion, using a collection name"""
+        raise NotImplementedError
+
+    async def get_active(self, org_id: ObjectId) -> Optional[dict]:
+        raise NotImplementedError
+
+    async def get_active_by_name(self, organization_name: str, allow_secondary: bool = False) -> Optional[dict]:
+        """
+        Active organization by name
+
+        Args:
+            organization_name: Organization name
+            allow_secondary: Backends with replicas may serve a slightly stale copy
+        """
+        raise NotImplementedError
+
+    async def list_active(self, skip: int = 0, limit: int = 0, allow_secondary: bool = False) -> List[dict]:
+        """Active organizations in ID (creation) order; a limit of 0 means all"""
+        raise NotImplementedError
+
+    async def update_active(self, org_id: ObjectId, fields: dict) -> Optional[dict]:
+        """Set fields on an active organization and return the updated document"""
+        raise NotImplementedError
+
+    async def soft_delete(self, org_id: ObjectId, deleted_at: datetime) -> bool:
+        """Mark an active organization deleted; False if there was none"""
+        raise NotImplementedError
+
+    async def soft_delete_by_name(self, organization_name: str, deleted_at: datetime) -> Optional[ObjectId]:
+        """Mark an active organization deleted by name and return its ID"""
+        raise NotImplementedError
+
+    async def get_active_route(self, org_id: ObjectId) -> Optional[dict]:
+        """``_id`` and ``ROUTE_FIELDS`` of an active organization"""
+        raise NotImplementedError
+
+    async def pooled_collections(self) -> List[dict]:
+        """Distinct ``cluster``/``collection_name`` pairs of active pooled organizations"""
+        raise NotImplementedError
+
+    async def filter_pooled(self, org_ids: List[ObjectId]) -> List[ObjectId]:
+        """The given organizations that are active and still pooled"""
+        raise NotImplementedError
+
+    async def claim_purge(self, cutoff: datetime, claim_expiry: datetime, now: datetime) -> Optional[dict]:
+        """
+        Claim the longest-deleted organization due for purging
+
+        Args:
+            cutoff: Only organizations deleted at or before this are due
+            claim_expiry: Claims taken at or before this are abandoned
+            now: Claim time stored on the organization
+
+        Returns:
+            The organization as it was before the claim, or None
+        """
+        raise NotImplementedError
+
+    async def delete_purged(self, org_id: ObjectId) -> bool:
+        """Remove a soft-deleted organization for good"""
+        raise NotImplementedError
+
+    async def claim_migration(
+        self,
+        org_id: ObjectId,
+        claim_expiry: datetime,
+        now: datetime,
+        tenancy: Optional[str] = None
+    ) -> Optional[dict]:
+        """
+        Set ``migration_started_at`` on an active organization nobody is migrating
+
+        Args:
+            org_id: Organization ID
+            claim_expiry: Claims taken at or before this are abandoned
+            now: Claim time
+            tenancy: Only claim an organization with this tenancy
+
+        Returns:
+            The organization as it was before the claim, or None
+        """
+        raise NotImplementedError
+
+    async def fence_writes(self, org_id: ObjectId) -> None:
+        """Set ``write_fenced`` on an organization"""
+        raise NotImplementedError
+
+    async def release_migration(self, org_id: ObjectId) -> None:
+        """Clear the write fence and migration claim of an organization"""
+        raise NotImplementedError
+
+    async def complete_migration(self, org_id: ObjectId, expected: Dict[str, object], fields: dict) -> bool:
+        """
+        Switch a migrated organization over and release its claim in one update
+
+        Args:
+            org_id: Organization ID
+            expected: Values the organization must still have; a list
+                matches any of its values, and None a missing field
+            fields: Fields to set
+
+        Returns:
+            False if the organization no longer matches ``expected``
+        """
+        raise NotImplementedError
+
+
+class AdminRepository:
+    """Storage of organization admin accounts"""
+
+    async def insert(self, admin_doc: dict) -> ObjectId:
+        """Store a new admin, assigning ``_id`` if missing"""
+        raise NotImplementedError
+
+    async def find_by_email(self, email: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    async def get(self, admin_id: ObjectId) -> Optional[dict]:
+        raise NotImplementedError
+
+    async def delete_by_organization(self, organization_id: str) -> int:
+        """Remove every admin of an organization and return how many there were"""
+        raise NotImplementedError
@@ -0,0 +1,256 @@
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set
+
+from bson import ObjectId
+
+from app.repositories.base import ROUTE_FIELDS, AdminRepository, OrganizationRepository
+from app.services.tenancy import TENANCY_POOLED
+
+# Fields a finished or abandoned migration clears
+_MIGRATION_FIELDS = ("write_fenced", "migration_started_at")
+
+
+def _unclaimed(doc: dict, field: str, claim_expiry: datetime) -> bool:
+    claimed_at = doc.get(field)
+    return claimed_at is None or claimed_at <= claim_expiry
+
+
+def _matches(doc: dict, expected: Dict[str, object]) -> bool:
+    for field, value in expected.items():
+        accepted = value if isinstance(value, list) else [value]
+        if doc.get(field) not in accepted:
+            return False
+    return True
+
+
+class _Index:
+    """Secondary index from a field value to the IDs of documents holding it"""
+
+    def __init__(self, field: str):
+        self.field = field
+        self._ids: Dict[object, Set[ObjectId]] = defaultdict(set)
+
+    def add(self, doc: dict) -> None:
+        value = doc.get(self.field)
+        if value is not None:
+            self._ids[value].add(doc["_id"])
+
+    def remove(self, doc: dict) -> None:
+        value = doc.get(self.field)
+        ids = self._ids.get(value)
+        if ids is not None:
+            ids.discard(doc["_id"])
+            if not ids:
+                del self._ids[value]
+
+    def get(self, value) -> Set[ObjectId]:
+        return self._ids.get(value, set())
+
+
+class MemoryOrganizationRepository(OrganizationRepository):
+    """
+    Organizations held in process memory
+
+    Documents are kept by ID with indexes on name, slug and collection
+    name, so every lookup is a dict access. Nothing is awaited, so each
+    call is atomic on the event loop. Data lives as long as the process.
+    """
+
+    def __init__(self):
+        self._docs: Dict[ObjectId, dict] = {}
+        self._by_name = _Index("organization_name")
+        self._by_slug = _Index("slug")
+        self._by_collection = _Index("collection_name")
+
+    def _index(self, doc: dict) -> None:
+        for index in (self._by_name, self._by_slug, self._by_collection):
+            index.add(doc)
+
+    def _unindex(self, doc: dict) -> None:
+        for index in (self._by_name, self._by_slug, self._by_collection):
+            index.remove(doc)
+
+    def _first(self, ids, exclude_id: Optional[ObjectId] = None, active: bool = False) -> Optional[dict]:
+        # Oldest match first, like a natural-order scan
+        for org_id in sorted(ids):
+            doc = self._docs[org_id]
+            if org_id == exclude_id or (active and doc.get("deleted_at") is not None):
+                continue
+            return doc
+        return None
+
+    @staticmethod
+    def _copy(doc: Optional[dict]) -> Optional[dict]:
+        return dict(doc) if doc is not None else None
+
+    async def insert(self, org_doc: dict) -> ObjectId:
+        org_id = org_doc.setdefault("_id", ObjectId())
+        if org_id in self._docs:
+            raise ValueError(f"Organization {org_id} already exists")
+        doc = self._docs[org_id] = dict(org_doc)
+        self._index(doc)
+        return org_id
+
+    async def find_by_slug(self, slug: str, exclude_id: Optional[ObjectId] = None) -> Optional[dict]:
+        ids = self._by_slug.get(slug) | self._by_collection.get(slug)
+        return self._copy(self._first(ids, exclude_id))
+
+    async def find_by_collection_name(
+        self,
+        collection_name: str,
+        exclude_id: Optional[ObjectId] = None
+    ) -> Optional[dict]:
+        return self._copy(self._first(self._by_collection.get(collection_name), exclude_id))
+
+    def _get_active(self, org_id: ObjectId) -> Optional[dict]:
+        doc = self._docs.get(org_id)
+        return doc if doc is not None and doc.get("deleted_at") is None else None
+
+    async def get_active(self, org_id: ObjectId) -> Optional[dict]:
+        return self._copy(self._get_active(org_id))
+
+    async def get_active_by_name(self, organization_name: str, allow_secondary: bool = False) -> Optional[dict]:
+        return self._copy(self._first(self._by_name.get(organization_name), active=True))
+
+    async def list_active(self, skip: int = 0, limit: int = 0, allow_secondary: bool = False) -> List[dict]:
+        active = [self._docs[org_id] for org_id in sorted(self._docs)
+                  if self._docs[org_id].get("deleted_at") is None]
+        active = active[skip:skip + limit] if limit else active[skip:]
+        return [dict(doc) for doc in active]
+
+    def _update(self, doc: dict, fields: dict, unset: Iterable[str] = ()) -> dict:
+        self._unindex(doc)
+        updated = {**doc, **fields}
+        for field in unset:
+            updated.pop(field, None)
+        self._docs[doc["_id"]] = updated
+        self._index(updated)
+        return updated
+
+    async def update_active(self, org_id: ObjectId, fields: dict) -> Optional[dict]:
+        doc = self._get_active(org_id)
+        return dict(self._update(doc, fields)) if doc is not None else None
+
+    async def soft_delete(self, org_id: ObjectId, deleted_at: datetime) -> bool:
+        doc = self._get_active(org_id)
+        if doc is None:
+            return False
+        self._update(doc, {"deleted_at": deleted_at, "updated_at": deleted_at})
+        return True
+
+    async def soft_delete_by_name(self, organization_name: str, deleted_at: datetime) -> Optional[ObjectId]:
+        doc = self._first(self._by_name.get(organization_name), active=True)
+        if doc is None:
+            return None
+        self._update(doc, {"deleted_at": deleted_at, "updated_at": deleted_at})
+        return doc["_id"]
+
+    async def get_active_route(self, org_id: ObjectId) -> Optional[dict]:
+        doc = self._get_active(org_id)
+        if doc is None:
+            return None
+        return {"_id": org_id, **{field: doc[field] for field in ROUTE_FIELDS if field in doc}}
+
+    async def pooled_collections(self) -> List[dict]:
+        shared = {}
+        for doc in self._docs.values():
+            if doc.get("tenancy") == TENANCY_POOLED and doc.get("deleted_at") is None:
+                key = (doc.get("cluster"), doc.get("collection_name"))
+                # Like $group, a missing cluster stays missing
+                shared[key] = {field: doc[field] for field in ("cluster", "collection_name") if field in doc}
+        return list(shared.values())
+
+    async def filter_pooled(self, org_ids: List[ObjectId]) -> List[ObjectId]:
+        pooled = []
+        for org_id in dict.fromkeys(org_ids):
+            doc = self._get_active(org_id)
+            if doc is not None and doc.get("tenancy") == TENANCY_POOLED:
+                pooled.append(org_id)
+        return pooled
+
+    async def claim_purge(self, cutoff: datetime, claim_expiry: datetime, now: datetime) -> Optional[dict]:
+        due = [doc for doc in self._docs.values()
+               if doc.get("deleted_at") is not None and doc["deleted_at"] <= cutoff
+               and _unclaimed(doc, "purge_claimed_at", claim_expiry)]
+        if not due:
+            return None
+        doc = min(due, key=lambda doc: doc["deleted_at"])
+        self._update(doc, {"purge_claimed_at": now})
+        return dict(doc)
+
+    async def delete_purged(self, org_id: ObjectId) -> bool:
+        doc = self._docs.get(org_id)
+        if doc is None or doc.get("deleted_at") is None:
+            return False
+        self._unindex(doc)
+        del self._docs[org_id]
+        return True
+
+    async def claim_migration(
+        self,
+        org_id: ObjectId,
+        claim_expiry: datetime,
+        now: datetime,
+        tenancy: Optional[str] = None
+    ) -> Optional[dict]:
+        doc = self._get_active(org_id)
+        if doc is None or not _unclaimed(doc, "migration_started_at", claim_expiry):
+            return None
+        if tenancy is not None and doc.get("tenancy") != tenancy:
+            return None
+        self._update(doc, {"migration_started_at": now})
+        return dict(doc)
+
+    async def fence_writes(self, org_id: ObjectId) -> None:
+        doc = self._docs.get(org_id)
+        if doc is not None:
+            self._update(doc, {"write_fenced": True})
+
+    async def release_migration(self, org_id: ObjectId) -> None:
+        doc = self._docs.get(org_id)
+        if doc is not None:
+            self._update(doc, {}, unset=_MIGRATION_FIELDS)
+
+    async def complete_migration(self, org_id: ObjectId, expected: Dict[str, object], fields: dict) -> bool:
+        doc = self._docs.get(org_id)
+        if doc is None or not _matches(doc, expected):
+            return False
+        self._update(doc, fields, unset=_MIGRATION_FIELDS)
+        return True
+
+
+class MemoryAdminRepository(AdminRepository):
+    """Admins held in process memory, indexed by email"""
+
+    def __init__(self):
+        self._docs: Dict[ObjectId, dict] = {}
+        self._by_email: Dict[str, ObjectId] = {}
+
+    async def insert(self, admin_doc: dict) -> ObjectId:
+        admin_id = admin_doc.setdefault("_id", ObjectId())
+        if admin_id in self._docs:
+            raise ValueError(f"Admin {admin_id} already exists")
+        self._docs[admin_id] = dict(admin_doc)
+        # The first account with an email wins, like a natural-order find_one
+        self._by_email.setdefault(admin_doc["email"], admin_id)
+        return admin_id
+
+    async def find_by_email(self, email: str) -> Optional[dict]:
+        admin_id = self._by_email.get(email)
+        return dict(self._docs[admin_id]) if admin_id is not None else None
+
+    async def get(self, admin_id: ObjectId) -> Optional[dict]:
+        doc = self._docs.get(admin_id)
+        return dict(doc) if doc is not None else None
+
+    async def delete_by_organization(self, organization_id: str) -> int:
+        removed = [doc for doc in self._docs.values() if doc.get("organization_id") == organization_id]
+        for doc in removed:
+            del self._docs[doc["_id"]]
+            if self._by_email.get(doc["email"]) == doc["_id"]:
+                del self._by_email[doc["email"]]
+        # Another account with a removed email now comes first
+        for admin_id, doc in self._docs.items():
+            self._by_email.setdefault(doc["email"], admin_id)
+        return len(removed)
@@ -0,0 +1,187 @@
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+
+from app.db.circuit_breaker import db_breaker
+from app.db.read_routing import for_secondary_reads
+from app.repositories.base import ROUTE_FIELDS, AdminRepository, OrganizationRepository
+from app.services.tenancy import TENANCY_POOLED
+
+# Filter matching organizations that have not been soft-deleted. ``None``
+# matches both a missing field and an explicit null.
+ACTIVE_ORG_FILTER = {"deleted_at": None}
+
+
+def _excluding(query: dict, exclude_id: Optional[ObjectId]) -> dict:
+    if exclude_id is not None:
+        query["_id"] = {"$ne": exclude_id}
+    return query
+
+
+def _unclaimed(field: str, claim_expiry: datetime) -> dict:
+    # No claim, or one abandoned by a crashed worker
+    return {"$or": [{field: None}, {field: {"$lte": claim_expiry}}]}
+
+
+def _matching(expected: Dict[str, object]) -> dict:
+    return {field: {"$in": value} if isinstance(value, list) else value
+            for field, value in expected.items()}
+
+
+class MongoOrganizationRepository(OrganizationRepository):
+    """
+    Organizations in the master database's ``organizations`` collection
+
+    Every method is one guarded call, so the circuit breaker sees database
+    latency and errors only, not the work services do around them.
+    """
+
+    def __init__(self, db):
+        self.collection = db["organizations"]
+
+    @db_breaker.guard
+    async def insert(self, org_doc: dict) -> ObjectId:
+        result = await self.collection.insert_one(org_doc)
+        return result.inserted_id
+
+    @db_breaker.guard
+    async def find_by_slug(self, slug: str, exclude_id: Optional[ObjectId] = None) -> Optional[dict]:
+        # Legacy documents have no slug field, only a collection name
+        return await self.collection.find_one(_excluding(
+            {"$or": [{"slug": slug}, {"collection_name": slug}]}, exclude_id))
+
+    @db_breaker.guard
+    async def find_by_collection_name(
+        self,
+        collection_name: str,
+        exclude_id: Optional[ObjectId] = None
+    ) -> Optional[dict]:
+        return await self.collection.find_one(_excluding({"collection_name": collection_name}, exclude_id))
+
+    @db_breaker.guard
+    async def get_active(self, org_id: ObjectId) -> Optional[dict]:
+        return await self.collection.find_one({"_id": org_id, **ACTIVE_ORG_FILTER})
+
+    @db_breaker.guard
+    async def get_active_by_name(self, organization_name: str, allow_secondary: bool = False) -> Optional[dict]:
+        collection = for_secondary_reads(self.collection) if allow_secondary else self.collection
+        return await collection.find_one({"organization_name": organization_name, **ACTIVE_ORG_FILTER})
+
+    @db_breaker.guard
+    async def list_active(self, skip: int = 0, limit: int = 0, allow_secondary: bool = False) -> List[dict]:
+        collection = for_secondary_reads(self.collection) if allow_secondary else self.collection
+        cursor = collection.find(ACTIVE_ORG_FILTER).sort("_id", 1).skip(skip).limit(limit)
+        return [org_doc async for org_doc in cursor]
+
+    @db_breaker.guard
+    async def update_active(self, org_id: ObjectId, fields: dict) -> Optional[dict]:
+        return await self.collection.find_one_and_update(
+            {"_id": org_id, **ACTIVE_ORG_FILTER},
+            {"$set": fields},
+            return_document=ReturnDocument.AFTER
+        )
+
+    @db_breaker.guard
+    async def soft_delete(self, org_id: ObjectId, deleted_at: datetime) -> bool:
+        result = await self.collection.update_one(
+            {"_id": org_id, **ACTIVE_ORG_FILTER},
+            {"$set": {"deleted_at": deleted_at, "updated_at": deleted_at}}
+        )
+        return result.modified_count > 0
+
+    @db_breaker.guard
+    async def soft_delete_by_name(self, organization_name: str, deleted_at: datetime) -> Optional[ObjectId]:
+        org_doc = await self.collection.find_one_and_update(
+            {"organization_name": organization_name, **ACTIVE_ORG_FILTER},
+            {"$set": {"deleted_at": deleted_at, "updated_at": deleted_at}},
+            projection={"_id": 1}
+        )
+        return org_doc["_id"] if org_doc is not None else None
+
+    @db_breaker.guard
+    async def get_active_route(self, org_id: ObjectId) -> Optional[dict]:
+        return await self.collection.find_one({"_id": org_id, **ACTIVE_ORG_FILTER}, dict.fromkeys(ROUTE_FIELDS, 1))
+
+    @db_breaker.guard
+    async def pooled_collections(self) -> List[dict]:
+        cursor = self.collection.aggregate([
+            {"$match": {"tenancy": TENANCY_POOLED, **ACTIVE_ORG_FILTER}},
+            {"$group": {"_id": {"cluster": "$cluster", "collection_name": "$collection_name"}}},
+        ])
+        return [row["_id"] async for row in cursor]
+
+    @db_breaker.guard
+    async def filter_pooled(self, org_ids: List[ObjectId]) -> List[ObjectId]:
+        return await self.collection.distinct(
+            "_id", {"_id": {"$in": org_ids}, "tenancy": TENANCY_POOLED, **ACTIVE_ORG_FILTER})
+
+    @db_breaker.guard
+    async def claim_purge(self, cutoff: datetime, claim_expiry: datetime, now: datetime) -> Optional[dict]:
+        return await self.collection.find_one_and_update(
+            {"deleted_at": {"$ne": None, "$lte": cutoff}, **_unclaimed("purge_claimed_at", claim_expiry)},
+            {"$set": {"purge_claimed_at": now}},
+            sort=[("deleted_at", 1)],
+        )
+
+    @db_breaker.guard
+    async def delete_purged(self, org_id: ObjectId) -> bool:
+        result = await self.collection.delete_one({"_id": org_id, "deleted_at": {"$ne": None}})
+        return result.deleted_count > 0
+
+    @db_breaker.guard
+    async def claim_migration(
+        self,
+        org_id: ObjectId,
+        claim_expiry: datetime,
+        now: datetime,
+        tenancy: Optional[str] = None
+    ) -> Optional[dict]:
+        query = {"_id": org_id, **ACTIVE_ORG_FILTER, **_unclaimed("migration_started_at", claim_expiry)}
+        if tenancy is not None:
+            query["tenancy"] = tenancy
+        return await self.collection.find_one_and_update(query, {"$set": {"migration_started_at": now}})
+
+    @db_breaker.guard
+    async def fence_writes(self, org_id: ObjectId) -> None:
+        await self.collection.update_one({"_id": org_id}, {"$set": {"write_fenced": True}})
+
+    @db_breaker.guard
+    async def release_migration(self, org_id: ObjectId) -> None:
+        await self.collection.update_one(
+            {"_id": org_id}, {"$unset": {"write_fenced": "", "migration_started_at": ""}})
+
+    @db_breaker.guard
+    async def complete_migration(self, org_id: ObjectId, expected: Dict[str, object], fields: dict) -> bool:
+        org_doc = await self.collection.find_one_and_update(
+            {"_id": org_id, **_matching(expected)},
+            {"$set": fields, "$unset": {"write_fenced": "", "migration_started_at": ""}},
+            projection={"_id": 1},
+        )
+        return org_doc is not None
+
+
+class MongoAdminRepository(AdminRepository):
+    """Admins in the master database's ``admins`` collection"""
+
+    def __init__(self, db):
+        self.collection = db["admins"]
+
+    @db_breaker.guard
+    async def insert(self, admin_doc: dict) -> ObjectId:
+        result = await self.collection.insert_one(admin_doc)
+        return result.inserted_id
+
+    @db_breaker.guard
+    async def find_by_email(self, email: str) -> Optional[dict]:
+        return await self.collection.find_one({"email": email})
+
+    @db_breaker.guard
+    async def get(self, admin_id: ObjectId) -> Optional[dict]:
+        return await self.collection.find_one({"_id": admin_id})
+
+    @db_breaker.guard
+    async def delete_by_organization(self, organization_id: str) -> int:
+        result = await self.collection.delete_many({"organization_id": organization_id})
+        return result.deleted_count
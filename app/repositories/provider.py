@@ -0,0 +1,75 @@
+import os
+from typing import Optional
+
+from app.db.client import get_database
+from app.repositories.base import AdminRepository, OrganizationRepository
+from app.repositories.memory import MemoryAdminRepository, MemoryOrganizationRepository
+from app.repositories.mongo import MongoAdminRepository, MongoOrganizationRepository
+
+# Where organizations and admins are stored: mongodb | memory. The memory
+# backend needs no server; it's for local runs, tests and CPU profiling.
+# Tenant records always need MongoDB.
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "mongodb")
+
+_memory_organizations: Optional[MemoryOrganizationRepository] = None
+_memory_admins: Optional[MemoryAdminRepository] = None
+# Mongo repositories wrap the current master database handle
+_mongo_db = None
+_mongo_organizations: Optional[MongoOrganizationRepository] = None
+_mongo_admins: Optional[MongoAdminRepository] = None
+
+
+def use_memory_storage() -> None:
+    """Switch to fresh, empty in-memory repositories"""
+    global STORAGE_BACKEND, _memory_organizations, _memory_admins
+    STORAGE_BACKEND = "memory"
+    _memory_organizations = MemoryOrganizationRepository()
+    _memory_admins = MemoryAdminRepository()
+
+
+def use_mongo_storage() -> None:
+    """Switch back to the master database"""
+    global STORAGE_BACKEND
+    STORAGE_BACKEND = "mongodb"
+
+
+def _refresh_mongo_repositories() -> None:
+    global _mongo_db, _mongo_organizations, _mongo_admins
+    db = get_database()
+    if db is _mongo_db:
+        return
+    _mongo_db = db
+    _mongo_organizations = MongoOrganizationRepository(db) if db is not None else None
+    _mongo_admins = MongoAdminRepository(db) if db is not None else None
+
+
+def get_organization_repository() -> Optional[OrganizationRepository]:
+    """
+    Organization repository of the configured backend
+
+    Returns:
+        The repository, or None if the master database isn't initialized
+    """
+    if STORAGE_BACKEND == "memory":
+        return _memory_organizations
+    _refresh_mongo_repositories()
+    return _mongo_organizations
+
+
+def get_admin_repository() -> Optional[AdminRepository]:
+    """
+    Admin repository of the configured backend
+
+    Returns:
+        The repository, or None if the master database isn't initialized
+    """
+    if STORAGE_BACKEND == "memory":
+        return _memory_admins
+    _refresh_mongo_repositories()
+    return _mongo_admins
+
+
+if STORAGE_BACKEND == "memory":
+    use_memory_storage()
+elif STORAGE_BACKEND != "mongodb":
+    raise ValueError(f"Unsupported STORAGE_BACKEND '{STORAGE_BACKEND}', expected mongodb or memory")
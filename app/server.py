@@ -0,0 +1,126 @@
+"""
+Production server entry point
+
+Runs uvicorn with one worker per available CPU, uvloop and httptools when
+installed, a MongoDB pool per worker sized from a total connection budget,
+and a graceful drain on SIGTERM.
+
+Usage:
+    python -m app.server
+    WEB_CONCURRENCY=4 MONGO_CONNECTION_BUDGET=200 python -m app.server
+"""
+import logging
+import math
+import os
+import sys
+from importlib.util import find_spec
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+HOST = os.getenv("HOST", "0.0.0.0")
+PORT = int(os.getenv("PORT", "8000"))
+# Worker processes; defaults to the CPUs this container may use
+WEB_CONCURRENCY = os.getenv("WEB_CONCURRENCY", "")
+# Connections all workers together may open to each MongoDB server
+MONGO_CONNECTION_BUDGET = int(os.getenv("MONGO_CONNECTION_BUDGET", "200"))
+# Per-worker pool; when set it wins over the budget
+MONGO_MAX_POOL_SIZE = os.getenv("MONGO_MAX_POOL_SIZE", "")
+# Idle keep-alive connections are kept this long; above the usual 60s load
+# balancer idle timeout so the balancer, not the app, closes them
+KEEPALIVE_TIMEOUT_SECONDS = int(os.getenv("KEEPALIVE_TIMEOUT_SECONDS", "75"))
+# On SIGTERM, how long in-flight requests get before connections are closed
+GRACEFUL_SHUTDOWN_SECONDS = int(os.getenv("GRACEFUL_SHUTDOWN_SECONDS", "30"))
+# Pending connections queued by the kernel per worker
+BACKLOG = int(os.getenv("BACKLOG", "2048"))
+ACCESS_LOG = os.getenv("ACCESS_LOG", "true").lower() == "true"
+
+
+def _cgroup_cpu_limit() -> Optional[float]:
+    """CPU quota of the container's cgroup, if one is set"""
+    try:
+        # cgroup v2: "max 100000" or "<quota> <period>"
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()[:2]
+        if quota != "max":
+            return int(quota) / int(period)
+        return None
+    except (OSError, ValueError):
+        pass
+    try:
+        # cgroup v1: quota is -1 when unlimited
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as f:
+            quota = int(f.read())
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as f:
+            period = int(f.read())
+        return quota / period if quota > 0 else None
+    except (OSError, ValueError):
+        return None
+
+
+def available_cpus() -> int:
+    """CPUs this process may run on, honouring affinity and container quotas"""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:  # not available on macOS or Windows
+        cpus = os.cpu_count() or 1
+    limit = _cgroup_cpu_limit()
+    if limit is not None:
+        cpus = min(cpus, max(1, math.ceil(limit)))
+    return max(1, cpus)
+
+
+def pool_size_per_worker(budget: int, workers: int) -> int:
+    """Split a connection budget evenly across workers, at least one each"""
+    return max(1, budget // workers)
+
+
+def build_config() -> dict:
+    """
+    uvicorn settings for this machine
+
+    Returns:
+        Keyword arguments for uvicorn.run, plus "pool_size", the per-worker
+        MongoDB pool
+    """
+    workers = int(WEB_CONCURRENCY) if WEB_CONCURRENCY else available_cpus()
+    if MONGO_MAX_POOL_SIZE:
+        pool_size = int(MONGO_MAX_POOL_SIZE)
+    else:
+        pool_size = pool_size_per_worker(MONGO_CONNECTION_BUDGET, workers)
+    return {
+        "host": HOST,
+        "port": PORT,
+        "workers": workers,
+        "loop": "uvloop" if find_spec("uvloop") else "asyncio",
+        "http": "httptools" if find_spec("httptools") else "h11",
+        "timeout_keep_alive": KEEPALIVE_TIMEOUT_SECONDS,
+        "timeout_graceful_shutdown": GRACEFUL_SHUTDOWN_SECONDS,
+        "backlog": BACKLOG,
+        "access_log": ACCESS_LOG,
+        "lifespan": "on",
+        "pool_size": pool_size,
+    }
+
+
+def main():
+    import uvicorn
+
+    config = build_config()
+    # Workers are spawned processes and read their pool size from the environment
+    os.environ["MONGO_MAX_POOL_SIZE"] = str(config.pop("pool_size"))
+    logging.basicConfig(level=logging.INFO)
+    logger.info(
+        "Starting %d workers on %s:%d (loop=%s, http=%s, MongoDB pool=%s per worker)",
+        config["workers"], config["host"], config["port"], config["loop"], config["http"],
+        os.environ["MONGO_MAX_POOL_SIZE"],
+    )
+    # uvicorn handles SIGTERM: it stops accepting, lets in-flight requests
+    # finish within timeout_graceful_shutdown, and only then runs the
+    # lifespan shutdown that stops background jobs and closes MongoDB
+    uvicorn.run("app.main:app", **config)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,14 +1,23 @@
+import asyncio
+from functools import lru_cache
 from typing import Optional
-from passlib.context import CryptContext
 import bcrypt
-from app.db.client import get_database
-from app.models.admin import Admin
+from app.repositories.provider import get_admin_repository, get_organization_repository
+from app.utils.metrics import AUTH_BCRYPT_DURATION, AUTH_LOGINS
+from app.utils.tracing import start_span
 from bson import ObjectId
 
-# Password hashing context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+@lru_cache(maxsize=None)
+def _pwd_context():
+    """Passlib hashing context, only needed by the fallbacks; built on first use"""
+    from passlib.context import CryptContext
 
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+@AUTH_BCRYPT_DURATION.labels("verify").time()
+@start_span("bcrypt.verify")
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against a hash"""
     try:
@@ -21,11 +30,13 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
         try:
             if len(plain_password.encode('utf-8')) > 72:
                 plain_password = plain_password[:72]
-            return pwd_context.verify(plain_password, hashed_password)
+            return _pwd_context().verify(plain_password, hashed_password)
         except Exception:
             return False
 
 
+@AUTH_BCRYPT_DURATION.labels("hash").time()
+@start_span("bcrypt.hash")
 def get_password_hash(password: str) -> str:
     """Hash a password"""
     # Use bcrypt directly to avoid passlib bug detection issues
@@ -37,7 +48,7 @@ def get_password_hash(password: str) -> str:
         # Fallback to passlib if bcrypt fails
         if len(password.encode('utf-8')) > 72:
             password = password[:72]
-        return pwd_context.hash(password)
+        return _pwd_context().hash(password)
 
 
 async def authenticate_admin(email: str, password: str) -> Optional[dict]:
@@ -50,23 +61,35 @@ async def authenticate_admin(email: str, password: str) -> Optional[dict]:
 
     Returns:
         Admin document if authentication successful, None otherwise
+        (also when the admin's organization has been deleted)
     """
-    db = get_database()
-    if db is None:
+    admins = get_admin_repository()
+    if admins is None:
         return None
 
-    admin_collection = db["admins"]
-    admin_doc = await admin_collection.find_one({"email": email})
+    admin_doc = await admins.find_by_email(email)
 
     if not admin_doc:
+        AUTH_LOGINS.labels("unknown_user").inc()
         return None
 
     if not admin_doc.get("is_active", True):
+        AUTH_LOGINS.labels("inactive").inc()
         return None
 
-    if not verify_password(password, admin_doc["hashed_password"]):
+    # bcrypt takes ~100ms of CPU; keep it off the event loop
+    if not await asyncio.to_thread(verify_password, password, admin_doc["hashed_password"]):
+        AUTH_LOGINS.labels("bad_password").inc()
         return None
 
+    # Admins of a soft-deleted organization lose access with it
+    organization_id = admin_doc.get("organization_id")
+    if organization_id and await get_organization_repository().get_active(ObjectId(str(organization_id))) is None:
+        AUTH_LOGINS.labels("org_deleted").inc()
+        return None
+
+    AUTH_LOGINS.labels("success").inc()
+
     # Convert ObjectId to string for JSON serialization
     admin_doc["id"] = str(admin_doc["_id"])
     if admin_doc.get("organization_id"):
@@ -77,12 +100,11 @@ async def authenticate_admin(email: str, password: str) -> Optional[dict]:
 
 async def get_admin_by_id(admin_id: str) -> Optional[dict]:
     """Get admin by ID"""
-    db = get_database()
-    if db is None:
+    admins = get_admin_repository()
+    if admins is None:
         return None
 
-    admin_collection = db["admins"]
-    admin_doc = await admin_collection.find_one({"_id": ObjectId(admin_id)})
+    admin_doc = await admins.get(ObjectId(admin_id))
 
     if admin_doc:
         admin_doc["id"] = str(admin_doc["_id"])
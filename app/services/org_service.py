@@ -1,10 +1,91 @@
-from typing import Optional, List
+import asyncio
+from typing import Optional, List, Tuple
+from collections import OrderedDict
 from datetime import datetime
+from app.db.circuit_breaker import DATABASE_UNAVAILABLE_ERRORS, db_breaker
 from app.db.client import get_database
-from app.models.organization import Organization, OrganizationCreate, OrganizationUpdate
+from app.db.placement import get_org_cluster, place_tenant
+from app.models.organization import OrganizationCreate, OrganizationUpdate
+from app.repositories.provider import get_admin_repository, get_organization_repository
 from app.services.auth_service import get_password_hash
+from app.services.tenancy import (
+    TENANCY_COLLECTION,
+    TENANCY_DATABASE,
+    TENANCY_MODE,
+    TENANCY_POOLED,
+    TENANT_DATABASE_COLLECTION,
+    get_tenancy,
+    shared_collection_name,
+    tenant_database_name,
+)
+from app.services.tenant_provisioning import (
+    create_tenant_collection,
+    create_tenant_database,
+    ensure_shared_collection,
+    release_tenant_collection,
+    release_tenant_database,
+    rename_tenant_collection,
+)
+from app.services.tenant_router import invalidate_tenant
 from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
+import logging
+import os
 import re
+import time
+
+logger = logging.getLogger(__name__)
+
+# Organizations last read by name, kept to serve stale reads while the
+# database circuit breaker is open
+ORG_STALE_CACHE_SIZE = int(os.getenv("ORG_STALE_CACHE_SIZE", "1024"))
+_stale_orgs: "OrderedDict[str, Tuple[dict, float]]" = OrderedDict()
+
+
+def _remember_organization(organization_name: str, org_doc: Optional[dict]) -> None:
+    """Keep the latest read of an organization for stale reads"""
+    if org_doc is None:
+        _stale_orgs.pop(organization_name, None)
+        return
+    _stale_orgs[organization_name] = (dict(org_doc), time.monotonic())
+    _stale_orgs.move_to_end(organization_name)
+    while len(_stale_orgs) > ORG_STALE_CACHE_SIZE:
+        _stale_orgs.popitem(last=False)
+
+
+def get_stale_organization(organization_name: str) -> Optional[Tuple[dict, float]]:
+    """
+    Last known copy of an organization, for when the database is unavailable
+
+    Args:
+        organization_name: Organization name
+
+    Returns:
+        Tuple of the organization document and its age in seconds, or None
+    """
+    entry = _stale_orgs.get(organization_name)
+    if entry is None:
+        return None
+    org_doc, fetched_at = entry
+    return dict(org_doc), time.monotonic() - fetched_at
+
+
+def serialize_org(org_doc: dict) -> dict:
+    """
+    Shape an organization document for responses, in place
+
+    Replaces ``_id`` with a string ``id``. Timestamps stay datetimes; the
+    response classes in app.utils.responses encode them.
+
+    Args:
+        org_doc: Organization document as read from MongoDB
+
+    Returns:
+        The same document
+    """
+    if "_id" in org_doc:
+        org_doc["id"] = str(org_doc.pop("_id"))
+    return org_doc
 
 
 def slugify(text: str) -> str:
@@ -15,6 +96,31 @@ def slugify(text: str) -> str:
     return f"org_{slug}"
 
 
+def _tenant_storage_available() -> bool:
+    # The in-memory repositories hold organization metadata only; tenant
+    # collections always live in MongoDB
+    return get_database() is not None
+
+
+async def _release_tenant_storage(org_doc: dict) -> None:
+    """
+    Undo the tenant provisioning of an organization whose record wasn't stored
+
+    Failures are logged rather than raised so the caller's error surfaces.
+    """
+    try:
+        # A concurrent create of the same slug that stored its record first
+        # may have adopted the storage; it is theirs then
+        if await get_organization_repository().find_by_slug(org_doc["slug"]) is not None:
+            return
+        if org_doc["tenancy"] == TENANCY_DATABASE:
+            await release_tenant_database(org_doc["database_name"], org_doc["cluster"])
+        else:
+            await release_tenant_collection(org_doc["collection_name"], org_doc["cluster"])
+    except Exception:
+        logger.exception("Failed to release the tenant storage of %s", org_doc["slug"])
+
+
 async def create_organization(org_data: OrganizationCreate) -> dict:
     """
     Create a new organization
@@ -25,56 +131,90 @@ async def create_organization(org_data: OrganizationCreate) -> dict:
     Returns:
         Created organization document
     """
-    db = get_database()
-    if db is None:
+    organizations = get_organization_repository()
+    if organizations is None:
         raise Exception("Database not initialized")
 
-    org_collection = db["organizations"]
+    # Generate slug (the dedicated collection name) if not provided
+    slug = org_data.collection_name
+    if not slug:
+        slug = slugify(org_data.organization_name)
 
-    # Generate collection name if not provided
-    collection_name = org_data.collection_name
-    if not collection_name:
-        collection_name = slugify(org_data.organization_name)
-
-    # Check if collection name already exists
-    existing = await org_collection.find_one({"collection_name": collection_name})
+    # Check if slug already exists (soft-deleted organizations keep their
+    # slug until they are purged; legacy documents have no slug field)
+    existing = await organizations.find_by_slug(slug)
     if existing is not None:
+        if existing.get("deleted_at") is not None:
+            raise ValueError(
+                f"Organization with collection name '{slug}' is pending deletion")
         raise ValueError(
-            f"Organization with collection name '{collection_name}' already exists")
+            f"Organization with collection name '{slug}' already exists")
+
+    # Provision the tenant collection, its indexes and validator up front so
+    # the first tenant request doesn't pay for it. Pooled tenants share an
+    # existing collection instead.
+    # The ID is generated up front because it's the tenant's placement key
+    org_id = ObjectId()
+    cluster = place_tenant(str(org_id))
+    tenancy = TENANCY_MODE
+    database_name = None
+    # Whether this call created tenant storage that must go if the
+    # organization record can't be stored
+    provisioned = False
+    if tenancy == TENANCY_POOLED:
+        collection_name = shared_collection_name(slug)
+        if _tenant_storage_available():
+            await ensure_shared_collection(collection_name, cluster)
+    elif tenancy == TENANCY_DATABASE:
+        database_name = tenant_database_name(str(org_id))
+        collection_name = TENANT_DATABASE_COLLECTION
+        if _tenant_storage_available():
+            provisioned = await create_tenant_database(database_name, cluster)
+    else:
+        collection_name = slug
+        if _tenant_storage_available():
+            provisioned = await create_tenant_collection(collection_name, cluster)
 
     # Create organization document
     org_doc = {
+        "_id": org_id,
         "organization_name": org_data.organization_name,
+        "slug": slug,
         "collection_name": collection_name,
+        "tenancy": tenancy,
+        "cluster": cluster,
         "created_at": datetime.utcnow(),
         "updated_at": datetime.utcnow()
     }
 
-    result = await org_collection.insert_one(org_doc)
-    org_doc["id"] = str(result.inserted_id)
-    org_id = str(result.inserted_id)
+    if database_name is not None:
+        org_doc["database_name"] = database_name
+
+    try:
+        org_id = str(await organizations.insert(org_doc))
+    except Exception as e:
+        if provisioned:
+            await _release_tenant_storage(org_doc)
+        if isinstance(e, DuplicateKeyError):
+            # Another request created an organization with this slug first
+            raise ValueError(
+                f"Organization with collection name '{slug}' already exists") from e
+        raise
 
     # Create admin account if admin_email and admin_password are provided
     if org_data.admin_email and org_data.admin_password:
-        admin_collection = db["admins"]
+        hashed_password = await asyncio.to_thread(get_password_hash, org_data.admin_password)
         admin_doc = {
             "email": org_data.admin_email,
             "organization_id": org_id,
-            "hashed_password": get_password_hash(org_data.admin_password),
+            "hashed_password": hashed_password,
             "is_active": True,
             "created_at": datetime.utcnow(),
             "updated_at": datetime.utcnow()
         }
-        await admin_collection.insert_one(admin_doc)
-
-    # Remove _id and convert datetime objects to ISO format strings for JSON serialization
-    org_doc.pop("_id", None)
-    if "created_at" in org_doc and isinstance(org_doc["created_at"], datetime):
-        org_doc["created_at"] = org_doc["created_at"].isoformat()
-    if "updated_at" in org_doc and isinstance(org_doc["updated_at"], datetime):
-        org_doc["updated_at"] = org_doc["updated_at"].isoformat()
+        await get_admin_repository().insert(admin_doc)
 
-    return org_doc
+    return serialize_org(org_doc)
 
 
 async def get_organization(org_id: str) -> Optional[dict]:
@@ -87,81 +227,73 @@ async def get_organization(org_id: str) -> Optional[dict]:
     Returns:
         Organization document or None
     """
-    db = get_database()
-    if db is None:
+    organizations = get_organization_repository()
+    if organizations is None:
         return None
 
-    org_collection = db["organizations"]
-
     try:
-        org_doc = await org_collection.find_one({"_id": ObjectId(org_id)})
+        org_doc = await organizations.get_active(ObjectId(org_id))
         if org_doc:
-            org_doc["id"] = str(org_doc["_id"])
-            # Remove _id and convert datetime objects to ISO format strings
-            org_doc.pop("_id", None)
-            if "created_at" in org_doc and isinstance(org_doc["created_at"], datetime):
-                org_doc["created_at"] = org_doc["created_at"].isoformat()
-            if "updated_at" in org_doc and isinstance(org_doc["updated_at"], datetime):
-                org_doc["updated_at"] = org_doc["updated_at"].isoformat()
+            serialize_org(org_doc)
         return org_doc
+    except DATABASE_UNAVAILABLE_ERRORS:
+        # Let outages reach the breaker instead of reading as "not found"
+        raise
     except Exception:
         return None
 
 
-async def get_organization_by_name(organization_name: str) -> Optional[dict]:
+async def get_organization_by_name(organization_name: str, allow_secondary: bool = False) -> Optional[dict]:
     """
     Get organization by name
-    
+
     Args:
         organization_name: Organization name
-    
+        allow_secondary: Read from a secondary within the staleness bound;
+            leave off when the result feeds a write
+
     Returns:
         Organization document or None
     """
-    db = get_database()
-    if db is None:
+    organizations = get_organization_repository()
+    if organizations is None:
         return None
-    
-    org_collection = db["organizations"]
-    
+
     try:
-        org_doc = await org_collection.find_one({"organization_name": organization_name})
+        org_doc = await organizations.get_active_by_name(organization_name, allow_secondary)
         if org_doc:
-            org_doc["id"] = str(org_doc["_id"])
-            # Remove _id and convert datetime objects to ISO format strings
-            org_doc.pop("_id", None)
-            if "created_at" in org_doc and isinstance(org_doc["created_at"], datetime):
-                org_doc["created_at"] = org_doc["created_at"].isoformat()
-            if "updated_at" in org_doc and isinstance(org_doc["updated_at"], datetime):
-                org_doc["updated_at"] = org_doc["updated_at"].isoformat()
+            serialize_org(org_doc)
+        _remember_organization(organization_name, org_doc)
         return org_doc
+    except DATABASE_UNAVAILABLE_ERRORS:
+        raise
     except Exception:
         return None
 
 
-async def get_all_organizations() -> List[dict]:
+async def get_all_organizations(
+    skip: int = 0,
+    limit: int = 0,
+    allow_secondary: bool = False
+) -> List[dict]:
     """
     Get all organizations
 
+    Args:
+        skip: Number of organizations to skip
+        limit: Maximum number of organizations (0 for no limit)
+        allow_secondary: Read from a secondary within the staleness bound
+
     Returns:
         List of organization documents
     """
-    db = get_database()
-    if db is None:
+    organizations = get_organization_repository()
+    if organizations is None:
         return []
 
-    org_collection = db["organizations"]
-    orgs = []
-
-    async for org_doc in org_collection.find():
-        org_doc["id"] = str(org_doc["_id"])
-        # Remove _id and convert datetime objects to ISO format strings
-        org_doc.pop("_id", None)
-        if "created_at" in org_doc and isinstance(org_doc["created_at"], datetime):
-            org_doc["created_at"] = org_doc["created_at"].isoformat()
-        if "updated_at" in org_doc and isinstance(org_doc["updated_at"], datetime):
-            org_doc["updated_at"] = org_doc["updated_at"].isoformat()
-        orgs.append(org_doc)
+    orgs = await organizations.list_active(skip, limit, allow_secondary)
+    for org_doc in orgs:
+        serialize_org(org_doc)
 
     return orgs
 
@@ -177,11 +309,14 @@ async def update_organization(org_id: str, org_data: OrganizationUpdate) -> Opti
     Returns:
         Updated organization document or None
     """
-    db = get_database()
-    if db is None:
+    organizations = get_organization_repository()
+    if organizations is None:
         return None
 
-    org_collection = db["organizations"]
+    try:
+        org_id = ObjectId(org_id)
+    except Exception:
+        return None
 
     # Build update document
     update_doc = {"updated_at": datetime.utcnow()}
@@ -191,56 +326,52 @@ async def update_organization(org_id: str, org_data: OrganizationUpdate) -> Opti
 
     if org_data.collection_name is not None:
         # Check if new collection name already exists
-        existing = await org_collection.find_one({
-            "collection_name": org_data.collection_name,
-            "_id": {"$ne": org_id}
-        })
+        existing = await organizations.find_by_collection_name(
+            org_data.collection_name, exclude_id=org_id)
         if existing is not None:
             raise ValueError(
                 f"Organization with collection name '{org_data.collection_name}' already exists")
-        
+
         update_doc["collection_name"] = org_data.collection_name
-    
+
     try:
-        result = await org_collection.find_one_and_update(
-            {"_id": org_id},
-            {"$set": update_doc},
-            return_document=True
-        )
+        result = await organizations.update_active(org_id, update_doc)
 
         if result is not None:
-            result["id"] = str(result["_id"])
-            # Remove _id and convert datetime objects to ISO format strings
-            result.pop("_id", None)
-            if "created_at" in result and isinstance(result["created_at"], datetime):
-                result["created_at"] = result["created_at"].isoformat()
-            if "updated_at" in result and isinstance(result["updated_at"], datetime):
-                result["updated_at"] = result["updated_at"].isoformat()
+            invalidate_tenant(str(result["_id"]))
+            serialize_org(result)
 
         return result
+    except DATABASE_UNAVAILABLE_ERRORS:
+        raise
     except Exception:
         return None
 
 
 async def delete_organization(org_id: str) -> bool:
     """
-    Delete an organization
-    
+    Soft-delete an organization
+
+    The organization is marked with ``deleted_at`` and is purged, together
+    with its tenant collection, by the purge sweeper once the retention
+    period has passed.
+
     Args:
         org_id: Organization ID
-    
+
     Returns:
         True if deleted, False otherwise
     """
-    db = get_database()
-    if db is None:
+    organizations = get_organization_repository()
+    if organizations is None:
         return False
-    
-    org_collection = db["organizations"]
-    
+
     try:
-        result = await org_collection.delete_one({"_id": ObjectId(org_id)})
-        return result.deleted_count > 0
+        deleted = await organizations.soft_delete(ObjectId(org_id), datetime.utcnow())
+        invalidate_tenant(org_id)
+        return deleted
+    except DATABASE_UNAVAILABLE_ERRORS:
+        raise
     except Exception:
         return False
 
@@ -248,94 +379,112 @@ async def delete_organization(org_id: str) -> bool:
 async def update_organization_by_name(current_name: str, org_data: OrganizationUpdate) -> Optional[dict]:
     """
     Update an organization by name
-    
+
     Args:
         current_name: Current organization name
         org_data: Organization update data
-    
+
     Returns:
         Updated organization document or None
     """
-    db = get_database()
-    if db is None:
+    organizations = get_organization_repository()
+    if organizations is None:
         return None
-    
-    org_collection = db["organizations"]
-    
+
     # Find organization by current name
-    existing_org = await org_collection.find_one({"organization_name": current_name})
+    existing_org = await organizations.get_active_by_name(current_name)
     if not existing_org:
         return None
-    
+
     org_id = existing_org["_id"]
-    
+
     # Build update document
     update_doc = {"updated_at": datetime.utcnow()}
-    
+
     if org_data.new_organization_name is not None:
         update_doc["organization_name"] = org_data.new_organization_name
-        # Update collection name if organization name changes
-        if not org_data.collection_name:
-            update_doc["collection_name"] = slugify(org_data.new_organization_name)
-    
-    if org_data.collection_name is not None:
-        # Check if new collection name already exists
-        existing = await org_collection.find_one({
-            "collection_name": org_data.collection_name,
-            "_id": {"$ne": org_id}
-        })
+
+    # Update slug if organization name changes
+    new_slug = org_data.collection_name
+    if new_slug is None and org_data.new_organization_name is not None:
+        new_slug = slugify(org_data.new_organization_name)
+
+    if new_slug is not None:
+        # Check if new slug already exists
+        existing = await organizations.find_by_slug(new_slug, exclude_id=org_id)
         if existing is not None:
             raise ValueError(
-                f"Organization with collection name '{org_data.collection_name}' already exists")
-        update_doc["collection_name"] = org_data.collection_name
-    
+                f"Organization with collection name '{new_slug}' already exists")
+        update_doc["slug"] = new_slug
+        # Pooled tenants stay in their shared collection and databases
+        # can't be renamed, so only dedicated collections follow the slug
+        if get_tenancy(existing_org) == TENANCY_COLLECTION:
+            update_doc["collection_name"] = new_slug
+
+    # Move the tenant collection along with the organization record
+    old_collection_name = existing_org["collection_name"]
+    new_collection_name = update_doc.get("collection_name", old_collection_name)
+    cluster = get_org_cluster(existing_org)
+    if _tenant_storage_available():
+        await rename_tenant_collection(old_collection_name, new_collection_name, cluster)
+
     try:
-        result = await org_collection.find_one_and_update(
-            {"_id": org_id},
-            {"$set": update_doc},
-            return_document=True
-        )
-        
-        if result is not None:
-            result["id"] = str(result["_id"])
-            # Remove _id and convert datetime objects to ISO format strings
-            result.pop("_id", None)
-            if "created_at" in result and isinstance(result["created_at"], datetime):
-                result["created_at"] = result["created_at"].isoformat()
-            if "updated_at" in result and isinstance(result["updated_at"], datetime):
-                result["updated_at"] = result["updated_at"].isoformat()
-        
-        return result
+        result = await organizations.update_active(org_id, update_doc)
     except Exception:
+        result = None
+
+    if result is None:
+        if _tenant_storage_available():
+            await rename_tenant_collection(new_collection_name, old_collection_name, cluster)
         return None
 
+    invalidate_tenant(str(org_id))
+    _remember_organization(current_name, None)
+
+    return serialize_org(result)
+
 
 async def delete_organization_by_name(organization_name: str) -> bool:
     """
-    Delete an organization by name
-    
+    Soft-delete an organization by name
+
+    See ``delete_organization`` for how soft-deleted organizations are purged.
+
     Args:
         organization_name: Organization name
-    
+
     Returns:
         True if deleted, False otherwise
     """
-    db = get_database()
-    if db is None:
+    organizations = get_organization_repository()
+    if organizations is None:
         return False
-    
-    org_collection = db["organizations"]
-    
+
     try:
-        org_doc = await org_collection.find_one({"organization_name": organization_name})
-        if not org_doc:
+        org_id = await organizations.soft_delete_by_name(organization_name, datetime.utcnow())
+        if org_id is None:
             return False
-        result = await org_collection.delete_one({"_id": org_doc["_id"]})
-        return result.deleted_count > 0
+        invalidate_tenant(str(org_id))
+        _remember_organization(organization_name, None)
+        return True
+    except DATABASE_UNAVAILABLE_ERRORS:
+        raise
     except Exception:
         return False
 
 
+# Only the database calls go through the breaker, so a long copy isn't
+# counted as one slow call
+@db_breaker.guard
+async def _list_collection_names(db) -> List[str]:
+    return await db.list_collection_names()
+
+
+@db_breaker.guard
+async def _insert_document(collection, doc: dict) -> None:
+    await collection.insert_one(doc)
+
+
 async def migrate_collection(old_collection_name: str, new_collection_name: str) -> bool:
     """
     Migrate data from old collection to new collection
@@ -353,7 +502,7 @@ async def migrate_collection(old_collection_name: str, new_collection_name: str)
 
     try:
         # Check if collections exist
-        collections = await db.list_collection_names()
+        collections = await _list_collection_names(db)
 
         if old_collection_name not in collections:
             return False
@@ -363,8 +512,10 @@ async def migrate_collection(old_collection_name: str, new_collection_name: str)
         new_collection = db[new_collection_name]
 
         async for doc in old_collection.find():
-            await new_collection.insert_one(doc)
+            await _insert_document(new_collection, doc)
 
         return True
+    except DATABASE_UNAVAILABLE_ERRORS:
+        raise
     except Exception:
         return False
@@ -0,0 +1,129 @@
+import asyncio
+import logging
+import os
+from datetime import datetime, time, timedelta
+from typing import Optional, Tuple
+
+from app.db.client import get_database
+from app.repositories.provider import get_admin_repository, get_organization_repository
+from app.services.tenant_provisioning import drop_tenant_storage
+from app.services.tenant_router import invalidate_tenant
+from app.utils.background import run_to_completion
+
+logger = logging.getLogger(__name__)
+
+# Soft-deleted organizations are kept this long before they are purged
+PURGE_RETENTION_DAYS = float(os.getenv("ORG_PURGE_RETENTION_DAYS", "30"))
+# Maximum number of organizations purged per batch
+PURGE_BATCH_SIZE = int(os.getenv("ORG_PURGE_BATCH_SIZE", "20"))
+# Pause between two batches, to rate-limit the load put on MongoDB
+PURGE_BATCH_INTERVAL_SECONDS = float(os.getenv("ORG_PURGE_BATCH_INTERVAL_SECONDS", "5"))
+# Off-peak window (UTC, "HH:MM-HH:MM") in which the sweeper is allowed to run
+PURGE_WINDOW = os.getenv("ORG_PURGE_WINDOW", "02:00-05:00")
+# How often the sweeper wakes up to check whether it is inside the window
+PURGE_CHECK_INTERVAL_SECONDS = float(os.getenv("ORG_PURGE_CHECK_INTERVAL_SECONDS", "300"))
+# A claim older than this is considered abandoned by a crashed worker
+PURGE_CLAIM_TIMEOUT_SECONDS = float(os.getenv("ORG_PURGE_CLAIM_TIMEOUT_SECONDS", "600"))
+
+
+def parse_window(window: str) -> Tuple[time, time]:
+    """
+    Parse an "HH:MM-HH:MM" window
+
+    Args:
+        window: Window specification
+
+    Returns:
+        Tuple of (start, end) times
+    """
+    start, end = window.split("-")
+    return time.fromisoformat(start.strip()), time.fromisoformat(end.strip())
+
+
+def in_purge_window(now: Optional[datetime] = None, window: str = PURGE_WINDOW) -> bool:
+    """
+    Check whether the given UTC time falls inside the purge window
+
+    Windows that wrap around midnight (e.g. "22:00-04:00") are supported.
+    """
+    now = now or datetime.utcnow()
+    start, end = parse_window(window)
+    current = now.time()
+    if start <= end:
+        return start <= current < end
+    return current >= start or current < end
+
+
+async def purge_deleted_organizations(
+    batch_size: int = PURGE_BATCH_SIZE,
+    now: Optional[datetime] = None
+) -> int:
+    """
+    Purge one batch of soft-deleted organizations past their retention period
+
+    For each organization the tenant data is removed first (its collection
+    or database is dropped, or its documents deleted from a shared collection), then its
+    admins and finally the organization record itself, so an interrupted
+    purge is simply picked up again on the next run.
+
+    Args:
+        batch_size: Maximum number of organizations to purge
+        now: Current UTC time (defaults to now)
+
+    Returns:
+        Number of organizations purged
+    """
+    organizations = get_organization_repository()
+    if organizations is None:
+        return 0
+
+    now = now or datetime.utcnow()
+    cutoff = now - timedelta(days=PURGE_RETENTION_DAYS)
+    claim_expiry = now - timedelta(seconds=PURGE_CLAIM_TIMEOUT_SECONDS)
+    purged = 0
+
+    while purged < batch_size:
+        # Claimed atomically so workers don't race
+        org_doc = await organizations.claim_purge(cutoff, claim_expiry, now)
+        if org_doc is None:
+            break
+
+        try:
+            # Organizations stored in memory have no tenant storage in MongoDB
+            if get_database() is not None:
+                await drop_tenant_storage(org_doc)
+        except ValueError as e:
+            # Left claimed, so it's skipped until the claim times out, for
+            # an operator to look at
+            logger.error("Not purging organization %s: %s", org_doc["_id"], e)
+            continue
+        await get_admin_repository().delete_by_organization(str(org_doc["_id"]))
+        await organizations.delete_purged(org_doc["_id"])
+        invalidate_tenant(str(org_doc["_id"]))
+        purged += 1
+
+    return purged
+
+
+async def run_purge_scheduler() -> None:
+    """
+    Background loop purging soft-deleted organizations during off-peak hours
+
+    Batches are separated by ``PURGE_BATCH_INTERVAL_SECONDS`` and the loop
+    stops as soon as the window closes or nothing is left to purge.
+    """
+    while True:
+        try:
+            while in_purge_window():
+                purged = await run_to_completion(purge_deleted_organizations())
+                if purged:
+                    logger.info("Purged %d soft-deleted organizations", purged)
+                if purged < PURGE_BATCH_SIZE:
+                    break
+                await asyncio.sleep(PURGE_BATCH_INTERVAL_SECONDS)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Organization purge failed")
+
+        await asyncio.sleep(PURGE_CHECK_INTERVAL_SECONDS)
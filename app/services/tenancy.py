@@ -0,0 +1,51 @@
+import os
+import zlib
+
+# Tenancy modes, recorded per organization in the `tenancy` field
+TENANCY_COLLECTION = "collection"  # dedicated org_{slug} collection
+TENANCY_POOLED = "pooled"  # shared collection, documents keyed by tenant_id
+TENANCY_DATABASE = "database"  # dedicated database named after the slug
+
+# Tenancy mode given to newly created organizations. Existing organizations
+# keep the mode recorded on their document.
+TENANCY_MODE = os.getenv("TENANCY_MODE", TENANCY_COLLECTION)
+# Number of shared collections pooled tenants are spread across
+TENANT_SHARED_COLLECTIONS = int(os.getenv("TENANT_SHARED_COLLECTIONS", "16"))
+
+# Collection holding a tenant's data in database-per-tenant mode
+TENANT_DATABASE_COLLECTION = "records"
+# Tenant databases are named after the organization ID, never after user
+# input, so a tenant can't claim the master or a system database
+TENANT_DATABASE_PREFIX = "tenant_"
+
+# Shared collections are named "shared_tenants_NNN"; slugified tenant
+# collections always start with "org_" so the two can't clash
+SHARED_COLLECTION_PREFIX = "shared_tenants_"
+
+if TENANCY_MODE not in (TENANCY_COLLECTION, TENANCY_POOLED, TENANCY_DATABASE):
+    raise ValueError(f"Unsupported TENANCY_MODE '{TENANCY_MODE}'")
+
+
+def get_tenancy(org_doc: dict) -> str:
+    """Tenancy mode of an organization document (legacy documents are dedicated)"""
+    return org_doc.get("tenancy") or TENANCY_COLLECTION
+
+
+def shared_collection_name(slug: str, shared_collections: int = TENANT_SHARED_COLLECTIONS) -> str:
+    """
+    Pick the shared collection a pooled tenant lives in
+
+    Args:
+        slug: Organization slug
+        shared_collections: Number of shared collections
+
+    Returns:
+        Shared collection name
+    """
+    index = zlib.crc32(slug.encode("utf-8")) % shared_collections
+    return f"{SHARED_COLLECTION_PREFIX}{index:03d}"
+
+
+def tenant_database_name(organization_id: str) -> str:
+    """Database of an organization in database-per-tenant mode"""
+    return f"{TENANT_DATABASE_PREFIX}{organization_id}"
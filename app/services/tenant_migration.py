@@ -0,0 +1,257 @@
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+
+from app.db.placement import (
+    DEFAULT_CLUSTER,
+    get_cluster_names,
+    get_org_cluster,
+    get_target_cluster,
+)
+from app.repositories.provider import get_organization_repository
+from app.services.tenancy import TENANCY_DATABASE, TENANCY_POOLED, get_tenancy
+from app.services.tenant_provisioning import (
+    create_tenant_collection,
+    create_tenant_database,
+    drop_tenant_storage,
+    ensure_shared_collection,
+)
+from app.services.tenant_router import (
+    TENANT_POOLED_ROUTE_TTL_SECONDS,
+    TENANT_ROUTE_TTL_SECONDS,
+    get_tenant_database,
+    invalidate_tenant,
+)
+
+logger = logging.getLogger(__name__)
+
+# Documents copied per batch during an online copy
+MIGRATION_COPY_BATCH_SIZE = int(os.getenv("TENANT_MIGRATION_COPY_BATCH_SIZE", "1000"))
+# A migration claim older than this is considered abandoned
+MIGRATION_CLAIM_TIMEOUT_SECONDS = float(os.getenv("TENANT_MIGRATION_CLAIM_TIMEOUT_SECONDS", "1800"))
+
+
+async def claim_migration(organization_id: str, tenancy: Optional[str] = None) -> Optional[dict]:
+    """
+    Claim an organization for a migration so only one worker moves it
+
+    While ``migration_started_at`` is set the tenant router caches the
+    organization's route only briefly, which keeps the later write fence short.
+
+    Args:
+        organization_id: Organization to claim
+        tenancy: Only claim the organization if it has this tenancy
+
+    Returns:
+        The organization document, or None if it can't be claimed
+    """
+    organizations = get_organization_repository()
+    if organizations is None:
+        return None
+
+    now = datetime.utcnow()
+    claim_expiry = now - timedelta(seconds=MIGRATION_CLAIM_TIMEOUT_SECONDS)
+    org_doc = await organizations.claim_migration(ObjectId(organization_id), claim_expiry, now, tenancy)
+    if org_doc is not None:
+        org_doc["migration_started_at"] = now
+    return org_doc
+
+
+async def release_migration(organization_id: str) -> None:
+    """Lift the write fence and migration claim of an organization"""
+    organizations = get_organization_repository()
+    if organizations is not None:
+        await organizations.release_migration(ObjectId(organization_id))
+    invalidate_tenant(organization_id)
+
+
+async def fence_writes(org_doc: dict) -> None:
+    """
+    Fence writes to a tenant and wait until every worker has seen the fence
+
+    Routes cached before the migration was claimed may live for the full
+    route TTL; routes cached since then only for the short pooled TTL. The
+    old routes are waited out before the fence is set, while writes still
+    succeed and are picked up by the sync that follows, so writes are only
+    refused for ``TENANT_POOLED_ROUTE_TTL_SECONDS``.
+    """
+    ttl = TENANT_POOLED_ROUTE_TTL_SECONDS
+    if get_tenancy(org_doc) != TENANCY_POOLED:
+        ttl = TENANT_ROUTE_TTL_SECONDS
+    claimed_for = (datetime.utcnow() - org_doc["migration_started_at"]).total_seconds()
+    unfenced_wait = ttl - TENANT_POOLED_ROUTE_TTL_SECONDS - claimed_for
+    if unfenced_wait > 0:
+        await asyncio.sleep(unfenced_wait)
+
+    await get_organization_repository().fence_writes(org_doc["_id"])
+    invalidate_tenant(str(org_doc["_id"]))
+    await asyncio.sleep(TENANT_POOLED_ROUTE_TTL_SECONDS)
+
+
+async def copy_tenant_documents(source, target, source_filter: dict, strip_tenant_id: bool) -> int:
+    """
+    Copy a tenant's documents in batches
+
+    Args:
+        source: Source Motor collection
+        target: Target Motor collection
+        source_filter: Filter selecting the tenant's documents in the source
+        strip_tenant_id: Drop the tenant_id key (when moving to a dedicated collection)
+
+    Returns:
+        Number of documents copied
+    """
+    copied = 0
+    batch = []
+
+    async def flush():
+        try:
+            await target.insert_many(batch, ordered=False)
+        except BulkWriteError as e:
+            # Duplicates are documents a previous attempt already copied
+            if any(err.get("code") != 11000 for err in e.details.get("writeErrors", [])):
+                raise
+
+    async for doc in source.find(source_filter):
+        if strip_tenant_id:
+            doc.pop("tenant_id", None)
+        batch.append(doc)
+        if len(batch) >= MIGRATION_COPY_BATCH_SIZE:
+            await flush()
+            copied += len(batch)
+            batch = []
+    if batch:
+        await flush()
+        copied += len(batch)
+    return copied
+
+
+async def sync_tenant_changes(
+    source,
+    target,
+    source_filter: dict,
+    target_filter: dict,
+    since: datetime,
+    strip_tenant_id: bool
+) -> None:
+    """Apply the writes and deletes that happened during an online copy"""
+    async for doc in source.find({**source_filter, "updated_at": {"$gte": since}}):
+        if strip_tenant_id:
+            doc.pop("tenant_id", None)
+        await target.replace_one({"_id": doc["_id"]}, doc, upsert=True)
+
+    source_ids = set(await source.distinct("_id", source_filter))
+    target_ids = set(await target.distinct("_id", target_filter))
+    deleted = list(target_ids - source_ids)
+    if deleted:
+        await target.delete_many({"_id": {"$in": deleted}})
+
+
+def _cluster_filter(cluster: str) -> dict:
+    # Organizations created before placement existed have no cluster field
+    if cluster == DEFAULT_CLUSTER:
+        return {"cluster": [None, DEFAULT_CLUSTER]}
+    return {"cluster": cluster}
+
+
+async def migrate_tenant_cluster(organization_id: str, target_cluster: str) -> bool:
+    """
+    Move a tenant's data to another cluster
+
+    The data is copied online, writes are fenced while the remaining changes
+    are applied, and the organization's ``cluster`` is switched atomically.
+
+    Args:
+        organization_id: Organization to move
+        target_cluster: Cluster to move it to
+
+    Returns:
+        True if the tenant was moved, False if it was not eligible
+    """
+    if target_cluster not in get_cluster_names():
+        raise ValueError(f"Unknown cluster '{target_cluster}'")
+
+    org_doc = await claim_migration(organization_id)
+    if org_doc is None:
+        return False
+
+    source_cluster = get_org_cluster(org_doc)
+    if source_cluster == target_cluster:
+        await release_migration(organization_id)
+        return False
+
+    collection_name = org_doc["collection_name"]
+    pooled = get_tenancy(org_doc) == TENANCY_POOLED
+    source = get_tenant_database(org_doc, source_cluster)[collection_name]
+    target = get_tenant_database(org_doc, target_cluster)[collection_name]
+    tenant_filter = {"tenant_id": organization_id} if pooled else {}
+
+    try:
+        if pooled:
+            await ensure_shared_collection(collection_name, target_cluster)
+        elif get_tenancy(org_doc) == TENANCY_DATABASE:
+            await create_tenant_database(org_doc["database_name"], target_cluster)
+        else:
+            await create_tenant_collection(collection_name, target_cluster)
+
+        copy_started = datetime.utcnow()
+        copied = await copy_tenant_documents(source, target, tenant_filter, strip_tenant_id=False)
+
+        await fence_writes(org_doc)
+        await sync_tenant_changes(
+            source, target, tenant_filter, tenant_filter, copy_started, strip_tenant_id=False)
+
+        switched = await get_organization_repository().complete_migration(
+            org_doc["_id"],
+            {"collection_name": collection_name, **_cluster_filter(source_cluster)},
+            {"cluster": target_cluster, "updated_at": datetime.utcnow()},
+        )
+        if not switched:
+            raise RuntimeError("Organization changed during migration")
+    except BaseException:
+        # Also undo the fence when the migration is cancelled on shutdown
+        await release_migration(organization_id)
+        # The whole copy goes, including a database-per-tenant database
+        await drop_tenant_storage({**org_doc, "cluster": target_cluster})
+        raise
+
+    invalidate_tenant(organization_id)
+    await drop_tenant_storage({**org_doc, "cluster": source_cluster})
+    logger.info(
+        "Moved tenant %s from %s to %s (%d documents)",
+        organization_id, source_cluster, target_cluster, copied)
+    return True
+
+
+async def rebalance_tenants(dry_run: bool = False, limit: Optional[int] = None) -> List[Tuple[str, str, str]]:
+    """
+    Move every tenant that isn't on the cluster the ring (or its pin) assigns
+
+    Args:
+        dry_run: Only report the moves
+        limit: Maximum number of tenants to move
+
+    Returns:
+        List of (organization_id, source cluster, target cluster) moves
+    """
+    organizations = get_organization_repository()
+    if organizations is None:
+        return []
+
+    moves = []
+    for org_doc in await organizations.list_active():
+        source, target = get_org_cluster(org_doc), get_target_cluster(org_doc)
+        if source != target:
+            moves.append((str(org_doc["_id"]), source, target))
+            if limit is not None and len(moves) >= limit:
+                break
+
+    if not dry_run:
+        for organization_id, _, target in moves:
+            await migrate_tenant_cluster(organization_id, target)
+    return moves
@@ -0,0 +1,151 @@
+import asyncio
+import logging
+import os
+from datetime import datetime
+from typing import List
+
+from bson import ObjectId
+
+from app.db.leases import LEASE_HOLDER, acquire_lease
+from app.db.placement import get_cluster_database, get_org_cluster
+from app.repositories.provider import get_organization_repository
+from app.services.tenancy import TENANCY_COLLECTION, TENANCY_POOLED
+from app.services.tenant_migration import (
+    claim_migration,
+    copy_tenant_documents,
+    fence_writes,
+    release_migration,
+    sync_tenant_changes,
+)
+from app.services.tenant_provisioning import create_tenant_collection
+from app.services.tenant_router import invalidate_tenant
+from app.services.tenant_usage import get_ops_per_minute, get_pooled_tenant_sizes
+from app.utils.background import run_to_completion
+
+logger = logging.getLogger(__name__)
+
+# Whether this worker takes part in the promotion policy. Off by default:
+# sizing every shared collection is a full scan. Where it's on, the workers
+# elect one runner through a lease, so each cycle runs once per deployment.
+TENANT_PROMOTION_ENABLED = os.getenv("TENANT_PROMOTION_ENABLED", "false").lower() in ("1", "true", "yes")
+# A pooled tenant crossing any of these thresholds is promoted
+PROMOTION_MAX_DOCS = int(os.getenv("TENANT_PROMOTION_MAX_DOCS", "100000"))
+PROMOTION_MAX_BYTES = int(os.getenv("TENANT_PROMOTION_MAX_BYTES", str(256 * 1024 * 1024)))
+PROMOTION_MAX_OPS_PER_MINUTE = float(os.getenv("TENANT_PROMOTION_MAX_OPS_PER_MINUTE", "6000"))
+# Window the operations rate is averaged over
+PROMOTION_RATE_WINDOW_MINUTES = int(os.getenv("TENANT_PROMOTION_RATE_WINDOW_MINUTES", "5"))
+# How often the policy is evaluated
+PROMOTION_CHECK_INTERVAL_SECONDS = float(os.getenv("TENANT_PROMOTION_CHECK_INTERVAL_SECONDS", "300"))
+# The elected runner holds its lease this long; another worker takes over
+# once a crashed runner's lease has expired
+PROMOTION_LEASE_SECONDS = float(os.getenv("TENANT_PROMOTION_LEASE_SECONDS", "900"))
+
+PROMOTION_LEASE = "tenant_promotion"
+
+
+async def find_promotion_candidates() -> List[str]:
+    """
+    Pooled tenants whose size or operations rate crosses a threshold
+
+    Returns:
+        List of organization IDs to promote
+    """
+    organizations = get_organization_repository()
+    if organizations is None:
+        return []
+
+    candidates = set()
+    for shared in await organizations.pooled_collections():
+        sizes = await get_pooled_tenant_sizes(shared["collection_name"], get_org_cluster(shared))
+        for tenant_id, size in sizes.items():
+            if size["docs"] > PROMOTION_MAX_DOCS or size["bytes"] > PROMOTION_MAX_BYTES:
+                candidates.add(tenant_id)
+
+    rates = await get_ops_per_minute(PROMOTION_RATE_WINDOW_MINUTES)
+    candidates.update(
+        tenant_id for tenant_id, rate in rates.items() if rate > PROMOTION_MAX_OPS_PER_MINUTE)
+
+    if not candidates:
+        return []
+
+    # Only keep tenants that are still pooled
+    pooled = await organizations.filter_pooled(
+        [ObjectId(c) for c in candidates if ObjectId.is_valid(c)])
+    return [str(org_id) for org_id in pooled]
+
+
+async def promote_tenant(organization_id: str) -> bool:
+    """
+    Move a pooled tenant to its own dedicated collection
+
+    The tenant's documents are first copied while it keeps serving traffic.
+    Writes are then fenced for a short moment while the remaining changes
+    are applied, and `collection_name`/`tenancy` are switched in a single
+    atomic update of the organization record.
+
+    Args:
+        organization_id: Organization to promote
+
+    Returns:
+        True if the tenant was promoted, False if it was not eligible
+    """
+    org_doc = await claim_migration(organization_id, TENANCY_POOLED)
+    if org_doc is None:
+        return False
+
+    cluster = get_org_cluster(org_doc)
+    tenant_db = get_cluster_database(cluster)
+    shared_name = org_doc["collection_name"]
+    target_name = org_doc["slug"]
+    source = tenant_db[shared_name]
+    target = tenant_db[target_name]
+    tenant_filter = {"tenant_id": organization_id}
+
+    try:
+        await create_tenant_collection(target_name, cluster)
+
+        copy_started = datetime.utcnow()
+        copied = await copy_tenant_documents(source, target, tenant_filter, strip_tenant_id=True)
+
+        await fence_writes(org_doc)
+        await sync_tenant_changes(source, target, tenant_filter, {}, copy_started, strip_tenant_id=True)
+
+        switched = await get_organization_repository().complete_migration(
+            org_doc["_id"],
+            {"collection_name": shared_name, "tenancy": TENANCY_POOLED},
+            {"collection_name": target_name, "tenancy": TENANCY_COLLECTION, "updated_at": datetime.utcnow()},
+        )
+        if not switched:
+            raise RuntimeError("Organization changed during promotion")
+    except BaseException:
+        # Also undo the fence when the promotion is cancelled on shutdown
+        await release_migration(organization_id)
+        await target.drop()
+        raise
+
+    invalidate_tenant(organization_id)
+    await source.delete_many(tenant_filter)
+    logger.info(
+        "Promoted tenant %s from %s to %s (%d documents)",
+        organization_id, shared_name, target_name, copied)
+    return True
+
+
+async def run_promotion_policy() -> None:
+    """
+    Background loop promoting hot pooled tenants to dedicated collections
+
+    Only the worker holding the promotion lease evaluates the policy; the
+    others keep checking whether the lease has been given up.
+    """
+    while True:
+        await asyncio.sleep(PROMOTION_CHECK_INTERVAL_SECONDS)
+        try:
+            if not await acquire_lease(PROMOTION_LEASE, LEASE_HOLDER, PROMOTION_LEASE_SECONDS):
+                continue
+            for organization_id in await find_promotion_candidates():
+                await run_to_completion(promote_tenant(organization_id))
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Tenant promotion failed")
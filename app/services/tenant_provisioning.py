@@ -0,0 +1,420 @@
+import asyncio
+import logging
+import os
+import uuid
+
+from pymongo import ASCENDING, IndexModel
+from pymongo.errors import CollectionInvalid, OperationFailure
+
+from app.db.client import DATABASE_NAME
+from app.db.leases import LEASE_HOLDER, acquire_lease
+from app.db.placement import (
+    DEFAULT_CLUSTER,
+    get_cluster_client,
+    get_cluster_database,
+    get_cluster_names,
+    get_org_cluster,
+)
+from app.db.tenant_databases import tenant_databases
+from app.services.tenancy import TENANCY_DATABASE, TENANCY_POOLED, TENANT_DATABASE_COLLECTION, get_tenancy
+from app.utils.background import run_to_completion
+
+logger = logging.getLogger(__name__)
+
+# Number of pre-created, pre-indexed spare tenant collections to keep around
+TENANT_POOL_SIZE = int(os.getenv("TENANT_POOL_SIZE", "5"))
+# How often the replenisher checks the size of the spare pool
+TENANT_POOL_REFILL_INTERVAL_SECONDS = float(
+    os.getenv("TENANT_POOL_REFILL_INTERVAL_SECONDS", "30"))
+# Only the worker holding this lease refills the pools, so N workers don't
+# each top them up; another worker takes over once a crashed holder's lease
+# has expired
+TENANT_POOL_LEASE_SECONDS = float(os.getenv("TENANT_POOL_LEASE_SECONDS", "90"))
+
+POOL_LEASE = "tenant_pool"
+
+# Spare collections are named "_spare_<hex>" so they can never clash with
+# slugified "org_*" tenant collections
+SPARE_COLLECTION_PREFIX = "_spare_"
+
+# Databases MongoDB keeps for itself
+RESERVED_DATABASE_NAMES = {"admin", "local", "config"}
+# MongoDB database names are under 64 bytes and can't contain these
+MAX_DATABASE_NAME_BYTES = 63
+INVALID_DATABASE_NAME_CHARS = set('/\\. "$*<>:|?\x00')
+
+# Server error codes returned by renameCollection
+NAMESPACE_NOT_FOUND = 26
+NAMESPACE_EXISTS = 48
+
+# Schema validator applied to every tenant collection
+TENANT_COLLECTION_VALIDATOR = {
+    "$jsonSchema": {
+        "bsonType": "object",
+        "required": ["created_at", "updated_at"],
+        "properties": {
+            "created_at": {"bsonType": "date"},
+            "updated_at": {"bsonType": "date"},
+        },
+    }
+}
+
+# Standard indexes built on every tenant collection
+TENANT_COLLECTION_INDEXES = [
+    IndexModel([("created_at", ASCENDING)], name="created_at"),
+    IndexModel([("updated_at", ASCENDING)], name="updated_at"),
+]
+
+# Shared collections hold many tenants: every document carries a tenant_id
+# and every index is prefixed by it so queries never scan other tenants
+SHARED_COLLECTION_VALIDATOR = {
+    "$jsonSchema": {
+        "bsonType": "object",
+        "required": ["tenant_id", "created_at", "updated_at"],
+        "properties": {
+            "tenant_id": {"bsonType": "string"},
+            "created_at": {"bsonType": "date"},
+            "updated_at": {"bsonType": "date"},
+        },
+    }
+}
+
+SHARED_COLLECTION_INDEXES = [
+    IndexModel([("tenant_id", ASCENDING), ("created_at", ASCENDING)], name="tenant_id_created_at"),
+    IndexModel([("tenant_id", ASCENDING), ("updated_at", ASCENDING)], name="tenant_id_updated_at"),
+]
+
+# (cluster, shared collection) pairs already provisioned by this worker
+_provisioned_shared_collections = set()
+
+
+async def provision_collection(db, collection_name: str, shared: bool = False) -> bool:
+    """
+    Create a collection with the tenant validator and standard indexes
+
+    An existing collection is adopted: its indexes are (re)built and the
+    validator is applied with collMod.
+
+    Args:
+        db: Motor database
+        collection_name: Name of the collection to create
+        shared: Whether the collection is shared by pooled tenants
+
+    Returns:
+        True if the collection was created, False if it was adopted
+    """
+    validator = SHARED_COLLECTION_VALIDATOR if shared else TENANT_COLLECTION_VALIDATOR
+    indexes = SHARED_COLLECTION_INDEXES if shared else TENANT_COLLECTION_INDEXES
+    created = True
+    try:
+        await db.create_collection(
+            collection_name,
+            validator=validator,
+            validationLevel="moderate",
+        )
+    except CollectionInvalid:
+        created = False
+        await db.command(
+            "collMod",
+            collection_name,
+            validator=validator,
+            validationLevel="moderate",
+        )
+    await db[collection_name].create_indexes(indexes)
+    return created
+
+
+async def _collection_exists(db, collection_name: str) -> bool:
+    names = await db.list_collection_names(filter={"name": collection_name})
+    return bool(names)
+
+
+async def claim_spare_collection(db, collection_name: str) -> bool:
+    """
+    Rename a spare collection from the pool into place
+
+    Several workers may race for the same spare; a spare that disappears
+    under us is skipped and the next one is tried.
+
+    Args:
+        db: Motor database
+        collection_name: Target tenant collection name
+
+    Returns:
+        True if a spare was claimed, False if the pool is empty
+    """
+    spares = await db.list_collection_names(
+        filter={"name": {"$regex": f"^{SPARE_COLLECTION_PREFIX}"}})
+    for spare in spares:
+        try:
+            await db[spare].rename(collection_name)
+            return True
+        except OperationFailure as e:
+            if e.code == NAMESPACE_NOT_FOUND:
+                continue
+            if e.code == NAMESPACE_EXISTS:
+                raise ValueError(f"Collection '{collection_name}' already exists")
+            raise
+    return False
+
+
+async def create_tenant_collection(collection_name: str, cluster: str = DEFAULT_CLUSTER) -> bool:
+    """
+    Provision the tenant collection of a new organization
+
+    A pre-warmed spare is claimed when one is available, otherwise the
+    collection, its validator and its indexes are built inline.
+
+    Args:
+        collection_name: Tenant collection name
+        cluster: Cluster the tenant is placed on
+
+    Returns:
+        True if the collection was claimed or created by this call, False if
+        an existing collection was adopted
+    """
+    db = get_cluster_database(cluster)
+    if db is None:
+        raise Exception("Database not initialized")
+
+    if await _collection_exists(db, collection_name):
+        await provision_collection(db, collection_name)
+        return False
+
+    if await claim_spare_collection(db, collection_name):
+        return True
+    return await provision_collection(db, collection_name)
+
+
+def check_tenant_database_name(database_name: str, cluster: str = DEFAULT_CLUSTER) -> None:
+    """
+    Refuse a database name a tenant must never be given
+
+    Checked before a tenant database is created or dropped, which also
+    covers organizations whose database was named before names were
+    derived from the organization ID.
+
+    Args:
+        database_name: Tenant database name
+        cluster: Cluster the tenant is placed on
+
+    Raises:
+        ValueError: For names MongoDB would reject, system databases, the
+            master database and the cluster's shared database
+    """
+    if (
+        not database_name
+        or len(database_name.encode("utf-8")) > MAX_DATABASE_NAME_BYTES
+        or INVALID_DATABASE_NAME_CHARS & set(database_name)
+    ):
+        raise ValueError(f"Invalid tenant database name '{database_name}'")
+
+    protected = RESERVED_DATABASE_NAMES | {DATABASE_NAME}
+    shared_db = get_cluster_database(cluster)
+    if shared_db is not None:
+        protected.add(shared_db.name)
+    # Database names that differ only in case can't coexist in MongoDB
+    if database_name.lower() in {name.lower() for name in protected}:
+        raise ValueError(f"Database '{database_name}' can't be used as a tenant database")
+
+
+async def create_tenant_database(database_name: str, cluster: str = DEFAULT_CLUSTER) -> bool:
+    """
+    Provision the database of a new organization in database-per-tenant mode
+
+    Args:
+        database_name: Tenant database name
+        cluster: Cluster the tenant is placed on
+
+    Returns:
+        True if the tenant collection was created by this call, False if it
+        already existed
+    """
+    check_tenant_database_name(database_name, cluster)
+    db = tenant_databases.get(database_name, cluster)
+    if db is None:
+        raise Exception("Database not initialized")
+
+    return await provision_collection(db, TENANT_DATABASE_COLLECTION)
+
+
+async def release_tenant_collection(collection_name: str, cluster: str = DEFAULT_CLUSTER) -> bool:
+    """
+    Return an unused tenant collection to the spare pool
+
+    Undoes ``create_tenant_collection`` when the organization record could
+    not be stored. The collection keeps its validator and indexes, so it is
+    renamed back into the pool rather than dropped. A collection holding
+    documents is in use and left alone.
+
+    Args:
+        collection_name: Tenant collection name
+        cluster: Cluster the tenant collection lives on
+
+    Returns:
+        True if the collection was returned to the pool
+    """
+    db = get_cluster_database(cluster)
+    if db is None:
+        return False
+
+    if await db[collection_name].count_documents({}, limit=1):
+        logger.warning("Not releasing tenant collection %s on %s: it holds documents", collection_name, cluster)
+        return False
+    try:
+        await db[collection_name].rename(f"{SPARE_COLLECTION_PREFIX}{uuid.uuid4().hex}")
+    except OperationFailure as e:
+        if e.code == NAMESPACE_NOT_FOUND:
+            return False
+        raise
+    return True
+
+
+async def release_tenant_database(database_name: str, cluster: str = DEFAULT_CLUSTER) -> bool:
+    """
+    Drop an unused tenant database
+
+    Undoes ``create_tenant_database`` when the organization record could not
+    be stored. A database whose tenant collection holds documents is in use
+    and left alone.
+
+    Args:
+        database_name: Tenant database name
+        cluster: Cluster the tenant is placed on
+
+    Returns:
+        True if the database was dropped
+    """
+    client = get_cluster_client(cluster)
+    if client is None:
+        return False
+
+    check_tenant_database_name(database_name, cluster)
+    if await client[database_name][TENANT_DATABASE_COLLECTION].count_documents({}, limit=1):
+        logger.warning("Not releasing tenant database %s on %s: it holds documents", database_name, cluster)
+        return False
+    await client.drop_database(database_name)
+    tenant_databases.discard(database_name, cluster)
+    return True
+
+
+async def drop_tenant_storage(org_doc: dict) -> None:
+    """
+    Remove an organization's tenant data for good
+
+    The tenant's database or dedicated collection is dropped, and a pooled
+    tenant's documents are deleted from its shared collection. Dropping
+    storage that is already gone is a no-op, so an interrupted purge can
+    run it again.
+
+    Args:
+        org_doc: Organization document
+
+    Raises:
+        ValueError: If the tenant's database is one no tenant may use
+    """
+    collection_name = org_doc.get("collection_name")
+    cluster = get_org_cluster(org_doc)
+    tenancy = get_tenancy(org_doc)
+    if tenancy == TENANCY_DATABASE:
+        check_tenant_database_name(org_doc["database_name"], cluster)
+        await get_cluster_client(cluster).drop_database(org_doc["database_name"])
+        tenant_databases.discard(org_doc["database_name"], cluster)
+    elif collection_name and tenancy == TENANCY_POOLED:
+        tenant_db = get_cluster_database(cluster)
+        await tenant_db[collection_name].delete_many({"tenant_id": str(org_doc["_id"])})
+    elif collection_name:
+        await get_cluster_database(cluster)[collection_name].drop()
+
+
+async def ensure_shared_collection(collection_name: str, cluster: str = DEFAULT_CLUSTER) -> None:
+    """
+    Make sure a shared collection for pooled tenants exists
+
+    Args:
+        collection_name: Shared collection name
+        cluster: Cluster the shared collection lives on
+    """
+    if (cluster, collection_name) in _provisioned_shared_collections:
+        return
+
+    db = get_cluster_database(cluster)
+    if db is None:
+        raise Exception("Database not initialized")
+
+    await provision_collection(db, collection_name, shared=True)
+    _provisioned_shared_collections.add((cluster, collection_name))
+
+
+async def rename_tenant_collection(
+    old_collection_name: str,
+    new_collection_name: str,
+    cluster: str = DEFAULT_CLUSTER
+) -> None:
+    """
+    Move a tenant collection to a new name, keeping its indexes and validator
+
+    Args:
+        old_collection_name: Current tenant collection name
+        new_collection_name: New tenant collection name
+        cluster: Cluster the tenant collection lives on
+    """
+    db = get_cluster_database(cluster)
+    if db is None:
+        raise Exception("Database not initialized")
+
+    if old_collection_name == new_collection_name:
+        return
+
+    try:
+        await db[old_collection_name].rename(new_collection_name)
+    except OperationFailure as e:
+        if e.code == NAMESPACE_NOT_FOUND:
+            # Organizations created before eager provisioning have no collection yet
+            await create_tenant_collection(new_collection_name, cluster)
+            return
+        if e.code == NAMESPACE_EXISTS:
+            raise ValueError(f"Collection '{new_collection_name}' already exists")
+        raise
+
+
+async def replenish_spare_pool(pool_size: int = TENANT_POOL_SIZE, cluster: str = DEFAULT_CLUSTER) -> int:
+    """
+    Top a cluster's spare collection pool back up to ``pool_size``
+
+    Returns:
+        Number of spare collections created
+    """
+    db = get_cluster_database(cluster)
+    if db is None:
+        return 0
+
+    spares = await db.list_collection_names(
+        filter={"name": {"$regex": f"^{SPARE_COLLECTION_PREFIX}"}})
+    missing = max(pool_size - len(spares), 0)
+    for _ in range(missing):
+        await provision_collection(db, f"{SPARE_COLLECTION_PREFIX}{uuid.uuid4().hex}")
+    return missing
+
+
+async def run_pool_replenisher() -> None:
+    """
+    Background loop keeping the spare tenant collection pool full
+
+    Only the worker holding the pool lease refills; the others keep
+    checking whether the lease has been given up.
+    """
+    while True:
+        try:
+            if await acquire_lease(POOL_LEASE, LEASE_HOLDER, TENANT_POOL_LEASE_SECONDS):
+                for cluster in get_cluster_names():
+                    created = await run_to_completion(replenish_spare_pool(cluster=cluster))
+                    if created:
+                        logger.info(
+                            "Provisioned %d spare tenant collections on %s", created, cluster)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Spare tenant collection replenishment failed")
+
+        await asyncio.sleep(TENANT_POOL_REFILL_INTERVAL_SECONDS)
@@ -0,0 +1,206 @@
+import os
+import time
+from typing import Dict, Optional, Tuple
+
+from bson import ObjectId
+from bson.errors import InvalidId
+
+from app.db.placement import get_cluster_database, get_org_cluster
+from app.db.tenant_databases import tenant_databases
+from app.repositories.provider import get_organization_repository
+from app.services.tenancy import TENANCY_DATABASE, TENANCY_POOLED, get_tenancy
+from app.services.tenant_usage import (
+    begin_tenant_operation,
+    end_tenant_operation,
+    record_tenant_operation,
+)
+from app.utils.metrics import CACHE_LOOKUPS
+
+# Upper bound on how long a cached route may be used. Invalidation is
+# in-process only, so this bounds staleness across workers.
+TENANT_ROUTE_TTL_SECONDS = float(os.getenv("TENANT_ROUTE_TTL_SECONDS", "60"))
+# Pooled tenants may be promoted to a dedicated collection at any time, and
+# migrating tenants are about to move, so their routes are kept briefly; this
+# also bounds the migration write fence.
+TENANT_POOLED_ROUTE_TTL_SECONDS = float(os.getenv("TENANT_POOLED_ROUTE_TTL_SECONDS", "5"))
+
+# organization_id -> (tenant collection, expiry on the monotonic clock)
+_routes: Dict[str, Tuple["TenantCollection", float]] = {}
+
+
+class TenantNotFoundError(LookupError):
+    """Raised when an organization_id doesn't resolve to an active organization"""
+
+
+class TenantWriteFencedError(Exception):
+    """Raised on writes while a tenant is being migrated to another collection"""
+
+
+class TenantCollection:
+    """
+    Tenant-scoped view over a Motor collection
+
+    For pooled tenants every filter is scoped to the tenant's ``tenant_id``
+    and every inserted document is stamped with it, so callers use the same
+    code for dedicated and shared collections. Every operation is counted
+    for per-tenant usage accounting, and writes are refused while the
+    tenant is write-fenced for a migration.
+    """
+
+    def __init__(
+        self,
+        collection,
+        organization_id: str,
+        pooled: bool = False,
+        write_fenced: bool = False
+    ):
+        self.collection = collection
+        self.organization_id = organization_id
+        self.pooled = pooled
+        self.write_fenced = write_fenced
+
+    @property
+    def name(self) -> str:
+        return self.collection.name
+
+    def with_read_preference(self, read_preference) -> "TenantCollection":
+        """Same tenant view, reading with another read preference"""
+        return TenantCollection(
+            self.collection.with_options(read_preference=read_preference),
+            self.organization_id,
+            pooled=self.pooled,
+            write_fenced=self.write_fenced,
+        )
+
+    @property
+    def tenant_id(self) -> Optional[str]:
+        return self.organization_id if self.pooled else None
+
+    def _scoped(self, filter: Optional[dict] = None) -> dict:
+        filter = dict(filter or {})
+        if self.pooled:
+            filter["tenant_id"] = self.organization_id
+        return filter
+
+    def _check_writable(self) -> None:
+        if self.write_fenced:
+            raise TenantWriteFencedError(
+                f"Organization '{self.organization_id}' is being migrated, retry shortly")
+
+    async def _call(self, method: str, *args, **kwargs):
+        """Run a collection method, accounting for the connection it holds"""
+        begin_tenant_operation(self.organization_id)
+        try:
+            return await getattr(self.collection, method)(*args, **kwargs)
+        finally:
+            end_tenant_operation(self.organization_id)
+
+    async def insert_one(self, document: dict, **kwargs):
+        self._check_writable()
+        if self.pooled:
+            document["tenant_id"] = self.organization_id
+        return await self._call("insert_one", document, **kwargs)
+
+    def find(self, filter: Optional[dict] = None, *args, **kwargs):
+        record_tenant_operation(self.organization_id)
+        return self.collection.find(self._scoped(filter), *args, **kwargs)
+
+    async def find_one(self, filter: Optional[dict] = None, *args, **kwargs):
+        return await self._call("find_one", self._scoped(filter), *args, **kwargs)
+
+    async def find_one_and_update(self, filter: dict, update: dict, **kwargs):
+        self._check_writable()
+        return await self._call("find_one_and_update", self._scoped(filter), update, **kwargs)
+
+    async def update_one(self, filter: dict, update: dict, **kwargs):
+        self._check_writable()
+        return await self._call("update_one", self._scoped(filter), update, **kwargs)
+
+    async def delete_one(self, filter: dict, **kwargs):
+        self._check_writable()
+        return await self._call("delete_one", self._scoped(filter), **kwargs)
+
+    async def delete_many(self, filter: dict, **kwargs):
+        self._check_writable()
+        return await self._call("delete_many", self._scoped(filter), **kwargs)
+
+    async def count_documents(self, filter: Optional[dict] = None, **kwargs):
+        return await self._call("count_documents", self._scoped(filter), **kwargs)
+
+
+def get_tenant_database(org_doc: dict, cluster: Optional[str] = None):
+    """
+    Database holding an organization's tenant collection
+
+    Args:
+        org_doc: Organization document
+        cluster: Cluster to look on (defaults to the organization's cluster)
+
+    Returns:
+        Motor database
+    """
+    cluster = cluster or get_org_cluster(org_doc)
+    if get_tenancy(org_doc) == TENANCY_DATABASE:
+        return tenant_databases.get(org_doc["database_name"], cluster)
+    return get_cluster_database(cluster)
+
+
+async def get_tenant_collection(organization_id: str) -> TenantCollection:
+    """
+    Resolve an organization_id to its tenant collection
+
+    Resolved Motor collection handles are cached per organization so the
+    `organizations` lookup only happens on a cache miss.
+
+    Args:
+        organization_id: Organization ID taken from the JWT
+
+    Returns:
+        Tenant-scoped collection holding the organization's data
+    """
+    entry = _routes.get(organization_id)
+    if entry is not None and entry[1] > time.monotonic():
+        CACHE_LOOKUPS.labels("tenant_route", "hit").inc()
+        return entry[0]
+    CACHE_LOOKUPS.labels("tenant_route", "miss").inc()
+
+    organizations = get_organization_repository()
+    if organizations is None:
+        raise Exception("Database not initialized")
+
+    try:
+        org_id = ObjectId(organization_id)
+    except (InvalidId, TypeError):
+        raise TenantNotFoundError(f"Organization '{organization_id}' not found")
+
+    org_doc = await organizations.get_active_route(org_id)
+    if org_doc is None:
+        _routes.pop(organization_id, None)
+        raise TenantNotFoundError(f"Organization '{organization_id}' not found")
+
+    pooled = get_tenancy(org_doc) == TENANCY_POOLED
+    tenant_db = get_tenant_database(org_doc)
+    collection = TenantCollection(
+        tenant_db[org_doc["collection_name"]],
+        organization_id,
+        pooled=pooled,
+        write_fenced=bool(org_doc.get("write_fenced")),
+    )
+    # Tenants that may move soon (pooled or mid-migration) are cached briefly
+    short_lived = pooled or org_doc.get("migration_started_at") is not None
+    ttl = TENANT_POOLED_ROUTE_TTL_SECONDS if short_lived else TENANT_ROUTE_TTL_SECONDS
+    _routes[organization_id] = (collection, time.monotonic() + ttl)
+    return collection
+
+
+def invalidate_tenant(organization_id: Optional[str] = None) -> None:
+    """
+    Drop cached routes
+
+    Args:
+        organization_id: Organization to invalidate, or None to clear all routes
+    """
+    if organization_id is None:
+        _routes.clear()
+    else:
+        _routes.pop(organization_id, None)
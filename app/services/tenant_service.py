@@ -0,0 +1,136 @@
+from typing import Any, AsyncIterator, Dict, List, Optional
+from datetime import datetime
+from bson import ObjectId
+from bson.errors import InvalidId
+from app.db.read_routing import secondary_reads
+from app.services.tenant_router import get_tenant_collection
+
+
+def _serialize_record(record: dict) -> dict:
+    """Shape a tenant record for responses; datetimes are left to the encoder"""
+    record["id"] = str(record.pop("_id"))
+    record.pop("tenant_id", None)
+    return record
+
+
+def _record_id(record_id: str) -> Optional[ObjectId]:
+    try:
+        return ObjectId(record_id)
+    except (InvalidId, TypeError):
+        return None
+
+
+async def create_record(organization_id: str, data: Dict[str, Any]) -> dict:
+    """
+    Create a record in the organization's tenant collection
+
+    Args:
+        organization_id: Organization ID from the JWT
+        data: Record payload
+
+    Returns:
+        Created record
+    """
+    collection = await get_tenant_collection(organization_id)
+
+    now = datetime.utcnow()
+    record = {"data": data, "created_at": now, "updated_at": now}
+    await collection.insert_one(record)
+    return _serialize_record(record)
+
+
+async def list_records(organization_id: str, skip: int = 0, limit: int = 50) -> List[dict]:
+    """
+    List records of the organization's tenant collection, newest first
+
+    Args:
+        organization_id: Organization ID from the JWT
+        skip: Number of records to skip
+        limit: Maximum number of records to return
+
+    Returns:
+        List of records
+    """
+    collection = await get_tenant_collection(organization_id)
+
+    cursor = collection.find().sort("created_at", -1).skip(skip).limit(limit)
+    return [_serialize_record(record) async for record in cursor]
+
+
+async def export_records(organization_id: str) -> AsyncIterator[dict]:
+    """
+    Stream every record of the organization's tenant collection
+
+    The tenant is resolved before returning, so routing errors surface
+    before a response starts streaming. Exports read from secondaries
+    within the configured staleness bound.
+
+    Args:
+        organization_id: Organization ID from the JWT
+
+    Returns:
+        Async iterator over records, oldest first
+    """
+    collection = await get_tenant_collection(organization_id)
+    collection = collection.with_read_preference(secondary_reads)
+
+    async def records():
+        async for record in collection.find().sort("created_at", 1):
+            yield _serialize_record(record)
+
+    return records()
+
+
+async def get_record(organization_id: str, record_id: str) -> Optional[dict]:
+    """
+    Get a record of the organization's tenant collection
+
+    Returns:
+        Record or None
+    """
+    collection = await get_tenant_collection(organization_id)
+
+    oid = _record_id(record_id)
+    if oid is None:
+        return None
+
+    record = await collection.find_one({"_id": oid})
+    return _serialize_record(record) if record else None
+
+
+async def update_record(organization_id: str, record_id: str, data: Dict[str, Any]) -> Optional[dict]:
+    """
+    Replace the payload of a record in the organization's tenant collection
+
+    Returns:
+        Updated record or None
+    """
+    collection = await get_tenant_collection(organization_id)
+
+    oid = _record_id(record_id)
+    if oid is None:
+        return None
+
+    record = await collection.find_one_and_update(
+        {"_id": oid},
+        {"$set": {"data": data, "updated_at": datetime.utcnow()}},
+        return_document=True
+    )
+    return _serialize_record(record) if record else None
+
+
+async def delete_record(organization_id: str, record_id: str) -> bool:
+    """
+    Delete a record from the organization's tenant collection
+
+    Returns:
+        True if deleted, False otherwise
+    """
+    collection = await get_tenant_collection(organization_id)
+
+    oid = _record_id(record_id)
+    if oid is None:
+        return False
+
+    result = await collection.delete_one({"_id": oid})
+    return result.deleted_count > 0
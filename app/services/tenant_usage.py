@@ -0,0 +1,197 @@
+import asyncio
+import logging
+import os
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+from pymongo import ASCENDING, UpdateOne
+
+from app.db.client import get_database
+from app.db.placement import DEFAULT_CLUSTER, get_cluster_database
+
+logger = logging.getLogger(__name__)
+
+# How often per-worker operation counters are flushed to MongoDB
+TENANT_USAGE_FLUSH_INTERVAL_SECONDS = float(
+    os.getenv("TENANT_USAGE_FLUSH_INTERVAL_SECONDS", "15"))
+# Per-minute usage buckets are expired by a TTL index after this long
+TENANT_USAGE_RETENTION_MINUTES = int(os.getenv("TENANT_USAGE_RETENTION_MINUTES", "60"))
+
+USAGE_COLLECTION = "tenant_usage"
+
+# organization_id -> operations since the last flush, for this worker only
+_pending_ops: Counter = Counter()
+# organization_id -> [in-flight, peak in-flight since last flush] operations.
+# Every in-flight operation holds one pooled connection of the shared client.
+_connections: Dict[str, List[int]] = {}
+
+
+def record_tenant_operation(organization_id: str, count: int = 1) -> None:
+    """Count a tenant data operation; flushed to MongoDB in the background"""
+    _pending_ops[organization_id] += count
+
+
+def begin_tenant_operation(organization_id: str) -> None:
+    """Count a tenant operation and the connection it holds until it ends"""
+    _pending_ops[organization_id] += 1
+    stats = _connections.get(organization_id)
+    if stats is None:
+        stats = _connections[organization_id] = [0, 0]
+    stats[0] += 1
+    if stats[0] > stats[1]:
+        stats[1] = stats[0]
+
+
+def end_tenant_operation(organization_id: str) -> None:
+    """Release the connection held by a tenant operation"""
+    _connections[organization_id][0] -= 1
+
+
+def get_tenant_connection_stats() -> Dict[str, Dict[str, int]]:
+    """
+    Connections currently held per tenant by this worker
+
+    Returns:
+        Mapping of organization_id to {"in_flight": ..., "peak_in_flight": ...}
+    """
+    return {
+        organization_id: {"in_flight": stats[0], "peak_in_flight": stats[1]}
+        for organization_id, stats in _connections.items()
+    }
+
+
+def _reset_connection_peaks() -> None:
+    """Start a new peak window and forget idle tenants"""
+    for organization_id, stats in list(_connections.items()):
+        if stats[0] == 0:
+            del _connections[organization_id]
+        else:
+            stats[1] = stats[0]
+
+
+async def flush_tenant_usage() -> int:
+    """
+    Flush the per-worker operation counters into per-minute usage buckets
+
+    Returns:
+        Number of tenants flushed
+    """
+    db = get_database()
+    if db is None or not _pending_ops:
+        return 0
+
+    pending = dict(_pending_ops)
+    _pending_ops.clear()
+
+    minute = datetime.utcnow().replace(second=0, microsecond=0)
+    requests = [
+        UpdateOne(
+            {"tenant_id": organization_id, "minute": minute},
+            {"$inc": {"ops": ops}},
+            upsert=True,
+        )
+        for organization_id, ops in pending.items()
+    ]
+    try:
+        await db[USAGE_COLLECTION].bulk_write(requests, ordered=False)
+    except Exception:
+        # Put the counts back so they're retried on the next flush
+        _pending_ops.update(pending)
+        raise
+    return len(pending)
+
+
+async def ensure_usage_indexes() -> None:
+    """Create the usage bucket indexes, including the TTL that expires them"""
+    db = get_database()
+    if db is None:
+        return
+
+    usage = db[USAGE_COLLECTION]
+    await usage.create_index(
+        [("tenant_id", ASCENDING), ("minute", ASCENDING)], name="tenant_id_minute", unique=True)
+    await usage.create_index(
+        [("minute", ASCENDING)],
+        name="minute_ttl",
+        expireAfterSeconds=TENANT_USAGE_RETENTION_MINUTES * 60,
+    )
+
+
+async def get_ops_per_minute(window_minutes: int = 5) -> Dict[str, float]:
+    """
+    Average operations per minute of every tenant over a recent window
+
+    Args:
+        window_minutes: Size of the window
+
+    Returns:
+        Mapping of organization_id to operations per minute
+    """
+    db = get_database()
+    if db is None:
+        return {}
+
+    since = datetime.utcnow() - timedelta(minutes=window_minutes)
+    pipeline = [
+        {"$match": {"minute": {"$gte": since}}},
+        {"$group": {"_id": "$tenant_id", "ops": {"$sum": "$ops"}}},
+    ]
+    rates = {}
+    async for row in db[USAGE_COLLECTION].aggregate(pipeline):
+        rates[row["_id"]] = row["ops"] / window_minutes
+    return rates
+
+
+async def get_pooled_tenant_sizes(
+    collection_name: str,
+    cluster: str = DEFAULT_CLUSTER
+) -> Dict[str, Dict[str, int]]:
+    """
+    Document count and BSON size of every tenant in a shared collection
+
+    Args:
+        collection_name: Shared collection name
+        cluster: Cluster the shared collection lives on
+
+    Returns:
+        Mapping of tenant_id to {"docs": ..., "bytes": ...}
+    """
+    db = get_cluster_database(cluster)
+    if db is None:
+        return {}
+
+    pipeline = [
+        {"$group": {
+            "_id": "$tenant_id",
+            "docs": {"$sum": 1},
+            "bytes": {"$sum": {"$bsonSize": "$$ROOT"}},
+        }},
+    ]
+    sizes = {}
+    async for row in db[collection_name].aggregate(pipeline):
+        sizes[row["_id"]] = {"docs": row["docs"], "bytes": row["bytes"]}
+    return sizes
+
+
+async def run_usage_flusher() -> None:
+    """Background loop flushing tenant operation counters"""
+    try:
+        await ensure_usage_indexes()
+    except Exception:
+        logger.exception("Failed to create tenant usage indexes")
+
+    while True:
+        try:
+            await asyncio.sleep(TENANT_USAGE_FLUSH_INTERVAL_SECONDS)
+            await flush_tenant_usage()
+            _reset_connection_peaks()
+        except asyncio.CancelledError:
+            # Don't lose the last interval's counts on shutdown
+            try:
+                await flush_tenant_usage()
+            except Exception:
+                logger.exception("Tenant usage flush failed")
+            raise
+        except Exception:
+            logger.exception("Tenant usage flush failed")
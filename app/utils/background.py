@@ -0,0 +1,95 @@
+import asyncio
+import logging
+import os
+from typing import Awaitable, Callable, Dict, Set, TypeVar
+
+logger = logging.getLogger(__name__)
+
+# How long shutdown waits for background work that is under way
+BACKGROUND_SHUTDOWN_GRACE_SECONDS = float(os.getenv("BACKGROUND_SHUTDOWN_GRACE_SECONDS", "20"))
+
+T = TypeVar("T")
+
+# Long-running background jobs owned by this worker, keyed by name
+_tasks: Dict[str, asyncio.Task] = {}
+# Units of job work that shutdown lets finish
+_in_progress: Set[asyncio.Task] = set()
+
+
+def start_background_task(name: str, job: Callable[[], Awaitable[None]]) -> asyncio.Task:
+    """
+    Start a named background job on the running event loop
+
+    Args:
+        name: Unique job name
+        job: Coroutine function implementing the job loop
+
+    Returns:
+        The asyncio task running the job
+    """
+    existing = _tasks.get(name)
+    if existing is not None and not existing.done():
+        return existing
+
+    task = asyncio.create_task(job(), name=name)
+    task.add_done_callback(_log_task_exit)
+    _tasks[name] = task
+    return task
+
+
+def _log_task_exit(task: asyncio.Task) -> None:
+    if task.cancelled():
+        return
+    exc = task.exception()
+    if exc is not None:
+        logger.error("Background task %s crashed", task.get_name(), exc_info=exc)
+
+
+def get_background_tasks() -> Dict[str, asyncio.Task]:
+    """Get the background jobs started by this worker"""
+    return dict(_tasks)
+
+
+async def run_to_completion(work: Awaitable[T]) -> T:
+    """
+    Run one unit of a background job's work so that shutdown lets it finish
+
+    Cancelling the job while the work runs only interrupts the job's wait.
+    The work itself carries on, and stop_background_tasks waits for it, so
+    a purge batch or tenant promotion isn't abandoned half done.
+
+    Args:
+        work: Awaitable doing one unit of work
+
+    Returns:
+        The work's result
+    """
+    task = asyncio.ensure_future(work)
+    _in_progress.add(task)
+    task.add_done_callback(_in_progress.discard)
+    return await asyncio.shield(task)
+
+
+async def stop_background_tasks(grace: float = BACKGROUND_SHUTDOWN_GRACE_SECONDS) -> None:
+    """
+    Cancel all background jobs and wait for them to exit
+
+    Work started through run_to_completion gets up to ``grace`` seconds to
+    finish before it is cancelled too.
+    """
+    tasks = list(_tasks.values())
+    _tasks.clear()
+    for task in tasks:
+        task.cancel()
+    if tasks:
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    pending = set(_in_progress)
+    if pending:
+        logger.info("Waiting for %d background operations to finish", len(pending))
+        _, pending = await asyncio.wait(pending, timeout=grace)
+    for task in pending:
+        logger.warning("Background operation %r still running after %.0fs; cancelling it", task, grace)
+        task.cancel()
+    if pending:
+        await asyncio.gather(*pending, return_exceptions=True)
@@ -0,0 +1,173 @@
+import gzip
+import os
+import zlib
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:  # optional; br isn't offered without it
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # optional; zstd isn't offered without it
+    zstandard = None
+
+COMPRESSION_ENABLED = os.getenv("COMPRESSION_ENABLED", "true").lower() == "true"
+# Encodings offered, in the server's order of preference
+COMPRESSION_ENCODINGS = os.getenv("COMPRESSION_ENCODINGS", "zstd,br,gzip")
+# Bodies smaller than this are sent as they are
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+# Bodies and stream chunks at least this large are compressed on a worker
+# thread instead of the event loop
+COMPRESSION_THREAD_THRESHOLD = int(os.getenv("COMPRESSION_THREAD_THRESHOLD", "262144"))
+# Levels favour speed; responses are compressed on every request
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+COMPRESSION_ZSTD_LEVEL = int(os.getenv("COMPRESSION_ZSTD_LEVEL", "3"))
+
+# Media types worth compressing; anything else (images, archives) is passed through
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/x-ndjson",
+    "application/msgpack",
+    "application/cbor",
+    "application/xml",
+    "application/javascript",
+)
+
+
+class Compressor:
+    """Incremental compressor for one response body"""
+
+    def compress(self, data: bytes) -> bytes:
+        """Compress a chunk; may return nothing until enough input is buffered"""
+        raise NotImplementedError
+
+    def finish(self) -> bytes:
+        """End the stream and return what is still buffered"""
+        raise NotImplementedError
+
+
+class GzipCompressor(Compressor):
+    def __init__(self, level: int = COMPRESSION_GZIP_LEVEL):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+class BrotliCompressor(Compressor):
+    def __init__(self, quality: int = COMPRESSION_BROTLI_QUALITY):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+class ZstdCompressor(Compressor):
+    def __init__(self, level: int = COMPRESSION_ZSTD_LEVEL):
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+# Encoding name -> (library, compressor class); gzip needs nothing extra
+_COMPRESSORS = {
+    "zstd": (zstandard, ZstdCompressor),
+    "br": (brotli, BrotliCompressor),
+    "gzip": (gzip, GzipCompressor),
+}
+
+
+def parse_encodings(spec: str) -> Dict[str, type]:
+    """
+    Encodings to offer
+
+    Args:
+        spec: Comma-separated encodings in order of preference
+
+    Returns:
+        Ordered mapping of encoding to compressor class, for the encodings
+        whose library is installed
+    """
+    encodings = {}
+    for name in filter(None, (part.strip() for part in spec.split(","))):
+        if name not in _COMPRESSORS:
+            raise ValueError(f"Unknown encoding '{name}', expected zstd, br or gzip")
+        library, compressor = _COMPRESSORS[name]
+        if library is not None:
+            encodings[name] = compressor
+    return encodings
+
+
+_encodings = parse_encodings(COMPRESSION_ENCODINGS)
+
+
+@lru_cache(maxsize=256)
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """
+    Content coding for an Accept-Encoding header
+
+    The offered encoding with the highest quality wins; ties go to the
+    server's preference. ``*`` covers encodings not listed, and q=0 rules
+    an encoding out.
+
+    Args:
+        accept_encoding: Accept-Encoding header value
+
+    Returns:
+        "zstd", "br", "gzip", or None to send the body uncompressed
+    """
+    if not accept_encoding:
+        return None
+    qualities: Dict[str, float] = {}
+    for coding in accept_encoding.split(","):
+        name, _, params = coding.partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[name.strip().lower()] = quality
+    wildcard = qualities.get("*", 0.0)
+    best: Tuple[Optional[str], float] = (None, 0.0)
+    for name in _encodings:
+        quality = qualities.get(name, wildcard)
+        if quality > best[1]:
+            best = (name, quality)
+    return best[0]
+
+
+def is_compressible(content_type: Optional[str]) -> bool:
+    """Whether a media type is worth compressing"""
+    if not content_type:
+        return False
+    media_type = content_type.partition(";")[0].strip().lower()
+    return media_type.startswith(COMPRESSIBLE_TYPES) or media_type.endswith("+json")
+
+
+def create_compressor(encoding: str) -> Compressor:
+    """New compressor for an encoding returned by negotiate_encoding"""
+    return _encodings[encoding]()
+
+
+def compress(encoding: str, data: bytes) -> bytes:
+    """Compress a whole body"""
+    compressor = create_compressor(encoding)
+    return compressor.compress(data) + compressor.finish()
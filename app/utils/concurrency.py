@@ -0,0 +1,73 @@
+import os
+
+from app.utils.metrics import CONCURRENCY_LIMIT
+
+ADAPTIVE_CONCURRENCY_ENABLED = os.getenv("ADAPTIVE_CONCURRENCY_ENABLED", "true").lower() == "true"
+CONCURRENCY_INITIAL_LIMIT = int(os.getenv("CONCURRENCY_INITIAL_LIMIT", "100"))
+CONCURRENCY_MIN_LIMIT = int(os.getenv("CONCURRENCY_MIN_LIMIT", "4"))
+CONCURRENCY_MAX_LIMIT = int(os.getenv("CONCURRENCY_MAX_LIMIT", "1000"))
+# Event loop lag above which the limit is cut
+CONCURRENCY_TARGET_LAG_SECONDS = float(os.getenv("CONCURRENCY_TARGET_LAG_SECONDS", "0.05"))
+# Multiplicative decrease applied when lag is over target
+CONCURRENCY_BACKOFF = float(os.getenv("CONCURRENCY_BACKOFF", "0.75"))
+# Paths never shed, so operators can still see what's going on
+CONCURRENCY_EXEMPT_PATHS = tuple(
+    path.strip() for path in
+    os.getenv("CONCURRENCY_EXEMPT_PATHS", "/health,/livez,/readyz,/metrics,/admin/diagnostics").split(",")
+    if path.strip()
+)
+
+
+class AdaptiveConcurrencyLimit:
+    """
+    AIMD limit on requests served at once by this worker
+
+    Fed by the loop lag monitor: lag over target means the worker is doing
+    more than it can keep up with, so the limit is cut multiplicatively.
+    Otherwise it grows by one per measurement, but only while requests are
+    actually hitting it, so an idle worker doesn't drift to the maximum.
+
+    Only touched from the event loop, so no locking is needed.
+    """
+
+    def __init__(
+        self,
+        initial: int = CONCURRENCY_INITIAL_LIMIT,
+        minimum: int = CONCURRENCY_MIN_LIMIT,
+        maximum: int = CONCURRENCY_MAX_LIMIT,
+        target_lag: float = CONCURRENCY_TARGET_LAG_SECONDS,
+        backoff: float = CONCURRENCY_BACKOFF,
+    ):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.target_lag = target_lag
+        self.backoff = backoff
+        self.limit = float(min(max(initial, minimum), maximum))
+        self.in_flight = 0
+        self._saturated = False
+        CONCURRENCY_LIMIT.set(self.limit)
+
+    def try_acquire(self) -> bool:
+        """Take a slot, or return False if the worker is at its limit"""
+        if self.in_flight >= int(self.limit):
+            self._saturated = True
+            return False
+        self.in_flight += 1
+        if self.in_flight >= int(self.limit):
+            self._saturated = True
+        return True
+
+    def release(self) -> None:
+        self.in_flight -= 1
+
+    def on_lag(self, lag: float) -> None:
+        """Adjust the limit after a lag measurement"""
+        if lag > self.target_lag:
+            self.limit = max(self.minimum, self.limit * self.backoff)
+        elif self._saturated:
+            self.limit = min(self.maximum, self.limit + 1)
+        self._saturated = False
+        CONCURRENCY_LIMIT.set(self.limit)
+
+
+concurrency_limit = AdaptiveConcurrencyLimit()
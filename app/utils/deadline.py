@@ -0,0 +1,126 @@
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional
+
+import pymongo
+from pymongo.errors import PyMongoError
+
+# Default time budget of a request, in seconds (0 disables it)
+REQUEST_DEADLINE_SECONDS = float(os.getenv("REQUEST_DEADLINE_SECONDS", "10"))
+# Per-route overrides as "path=seconds,...", matched by longest path prefix.
+# Streaming exports and diagnostics have no deadline by default.
+ROUTE_DEADLINES = os.getenv("ROUTE_DEADLINES", "/tenant/records/export=0,/admin/diagnostics=0")
+
+# Monotonic time at which the current request must be finished
+_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+
+def parse_route_deadlines(spec: str) -> Dict[str, float]:
+    """
+    Parse per-route deadline overrides
+
+    Args:
+        spec: Comma-separated "path=seconds" pairs
+
+    Returns:
+        Mapping of path prefix to budget in seconds
+    """
+    budgets = {}
+    for entry in filter(None, (part.strip() for part in spec.split(","))):
+        path, sep, seconds = entry.partition("=")
+        if not sep or not path.startswith("/"):
+            raise ValueError(f"Invalid route deadline '{entry}', expected /path=seconds")
+        budgets[path.rstrip("/") or "/"] = float(seconds)
+    return budgets
+
+
+_route_budgets = parse_route_deadlines(ROUTE_DEADLINES)
+
+
+def budget_for_path(
+    path: str,
+    default: float = REQUEST_DEADLINE_SECONDS,
+    budgets: Optional[Dict[str, float]] = None
+) -> Optional[float]:
+    """
+    Time budget for a request path
+
+    Args:
+        path: Request path
+        default: Budget when no override matches
+        budgets: Per-route overrides (defaults to ROUTE_DEADLINES)
+
+    Returns:
+        Budget in seconds, or None when the route has no deadline
+    """
+    if budgets is None:
+        budgets = _route_budgets
+    best = None
+    for prefix in budgets:
+        if path == prefix or path.startswith(prefix.rstrip("/") + "/"):
+            if best is None or len(prefix) > len(best):
+                best = prefix
+    budget = budgets[best] if best is not None else default
+    return budget if budget > 0 else None
+
+
+@contextmanager
+def deadline_scope(seconds: Optional[float]) -> Iterator[None]:
+    """
+    Run the enclosed work under a deadline
+
+    Every MongoDB operation started inside the scope, including those Motor
+    runs on its executor threads, is sent with the remaining budget as
+    maxTimeMS.
+
+    Args:
+        seconds: Budget in seconds, or None for no deadline
+    """
+    if seconds is None:
+        yield
+        return
+    token = _deadline.set(time.monotonic() + seconds)
+    try:
+        with pymongo.timeout(seconds):
+            yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left before the current request's deadline, or None"""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def max_time_ms() -> Optional[int]:
+    """Remaining budget in milliseconds, for calls made outside the scope"""
+    left = remaining()
+    if left is None:
+        return None
+    return max(1, int(left * 1000))
+
+
+def is_timeout_error(exc: Optional[BaseException]) -> bool:
+    """Whether an exception is a client- or server-side timeout"""
+    if isinstance(exc, TimeoutError):
+        return True
+    return isinstance(exc, PyMongoError) and exc.timeout
+
+
+def deadline_exceeded(exc: Optional[BaseException]) -> bool:
+    """
+    Whether the current request failed with ``exc`` because it ran out of time
+
+    True once the deadline has passed, or when ``exc`` is a timeout raised
+    under a deadline. MongoDB aborts an operation a round trip before the
+    deadline, so its error can arrive just ahead of it.
+    """
+    left = remaining()
+    if left is None:
+        return False
+    return left <= 0 or is_timeout_error(exc)
@@ -0,0 +1,109 @@
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional
+
+from app.utils.metrics import EVENT_LOOP_LAG, EVENT_LOOP_STALLS
+from app.utils.profiler import collapse_stack
+
+logger = logging.getLogger(__name__)
+
+# How often the monitor checks the loop
+LOOP_LAG_INTERVAL_SECONDS = float(os.getenv("LOOP_LAG_INTERVAL_SECONDS", "0.25"))
+# Blocking longer than this captures the loop thread's stack
+LOOP_STALL_THRESHOLD_SECONDS = float(os.getenv("LOOP_STALL_THRESHOLD_SECONDS", "0.1"))
+# Stalls kept per worker for the diagnostics endpoint
+LOOP_STALLS_KEPT = int(os.getenv("LOOP_STALLS_KEPT", "20"))
+
+
+class LoopLagMonitor:
+    """
+    Measure how late the event loop runs scheduled callbacks
+
+    A task sleeps for a fixed interval and records how much later than
+    requested it woke up. Anything blocking the loop, e.g. bcrypt or a big
+    serialization loop, shows up as lag.
+
+    By the time the task wakes the blocking code has finished, so a
+    watchdog thread samples the loop thread's stack while it is still
+    overdue. Each stall is captured once.
+    """
+
+    def __init__(
+        self,
+        interval: float = LOOP_LAG_INTERVAL_SECONDS,
+        stall_threshold: float = LOOP_STALL_THRESHOLD_SECONDS,
+        stalls_kept: int = LOOP_STALLS_KEPT,
+    ):
+        self.interval = interval
+        self.stall_threshold = stall_threshold
+        self.lag = 0.0
+        self.stalls: Deque[Dict] = deque(maxlen=stalls_kept)
+        self._listeners: List[Callable[[float], None]] = []
+        self._wake_at: Optional[float] = None
+        self._captured_wake: Optional[float] = None
+        self._loop_thread_id: Optional[int] = None
+        self._running = False
+
+    def add_listener(self, listener: Callable[[float], None]) -> None:
+        """Call ``listener(lag)`` on the event loop after every measurement"""
+        if listener not in self._listeners:
+            self._listeners.append(listener)
+
+    async def run(self) -> None:
+        """Measure lag until cancelled"""
+        self._loop_thread_id = threading.get_ident()
+        self._running = True
+        watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        watchdog.start()
+        try:
+            while True:
+                started = time.monotonic()
+                self._wake_at = started + self.interval
+                await asyncio.sleep(self.interval)
+                self.record(max(0.0, time.monotonic() - self._wake_at))
+        finally:
+            self._running = False
+            self._wake_at = None
+
+    def record(self, lag: float) -> None:
+        self.lag = lag
+        EVENT_LOOP_LAG.observe(lag)
+        for listener in self._listeners:
+            listener(lag)
+
+    def _watch(self) -> None:
+        poll = max(self.stall_threshold / 2, 0.005)
+        while self._running:
+            time.sleep(poll)
+            wake_at = self._wake_at
+            if wake_at is None or wake_at == self._captured_wake:
+                continue
+            overdue = time.monotonic() - wake_at
+            if overdue < self.stall_threshold:
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            self._captured_wake = wake_at
+            try:
+                stack = collapse_stack(frame)
+            except Exception:
+                # Keep watching: one bad capture must not end stall detection
+                logger.exception("Failed to capture the event loop stack")
+                continue
+            self.stalls.append({
+                "at": time.time(),
+                "overdue_ms": round(overdue * 1000, 1),
+                "stack": stack,
+            })
+            EVENT_LOOP_STALLS.inc()
+            logger.warning("Event loop blocked for %.0fms in %s", overdue * 1000,
+                           stack.rsplit(";", 1)[-1])
+
+
+loop_monitor = LoopLagMonitor()
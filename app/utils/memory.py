@@ -0,0 +1,199 @@
+import gc
+import itertools
+import os
+import tracemalloc
+from collections import Counter, OrderedDict
+from typing import Dict, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Snapshots kept per worker; older ones are dropped
+MAX_SNAPSHOTS = int(os.getenv("TRACEMALLOC_MAX_SNAPSHOTS", "10"))
+
+_GROUP_BY = ("lineno", "filename", "traceback")
+
+# tracemalloc's own allocations and import machinery are noise in diffs
+_NOISE_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+_snapshots: "OrderedDict[int, tracemalloc.Snapshot]" = OrderedDict()
+_snapshot_ids = itertools.count(1)
+
+
+class TracemallocNotRunningError(Exception):
+    """Raised when a snapshot is requested while tracemalloc is stopped"""
+
+
+class SnapshotNotFoundError(LookupError):
+    """Raised for unknown or expired snapshot IDs"""
+
+
+def _rss_bytes() -> Optional[int]:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def memory_status() -> dict:
+    """
+    Process memory and tracemalloc state
+
+    Returns:
+        RSS, peak RSS, whether tracemalloc is tracing and its traced memory
+    """
+    status = {
+        "rss_bytes": _rss_bytes(),
+        # ru_maxrss is in kilobytes on Linux
+        "max_rss_bytes": (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+                          if resource is not None else None),
+        "tracing": tracemalloc.is_tracing(),
+        "snapshots": list(_snapshots),
+    }
+    if tracemalloc.is_tracing():
+        current, peak = tracemalloc.get_traced_memory()
+        status.update({
+            "traceback_limit": tracemalloc.get_traceback_limit(),
+            "traced_bytes": current,
+            "traced_peak_bytes": peak,
+            "tracemalloc_overhead_bytes": tracemalloc.get_tracemalloc_memory(),
+        })
+    return status
+
+
+def start_tracing(frames: int = 1) -> dict:
+    """
+    Start tracing allocations
+
+    Tracing slows allocations down noticeably and costs memory per traced
+    block, so it stays off until started here.
+
+    Args:
+        frames: Frames stored per allocation traceback
+
+    Returns:
+        Memory status after starting
+    """
+    if tracemalloc.is_tracing() and tracemalloc.get_traceback_limit() != frames:
+        tracemalloc.stop()
+        _snapshots.clear()
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+    return memory_status()
+
+
+def stop_tracing() -> dict:
+    """
+    Stop tracing and drop every snapshot
+
+    Returns:
+        Memory status after stopping
+    """
+    tracemalloc.stop()
+    _snapshots.clear()
+    return memory_status()
+
+
+def take_snapshot() -> int:
+    """
+    Take a tracemalloc snapshot
+
+    Returns:
+        Snapshot ID
+
+    Raises:
+        TracemallocNotRunningError: If tracemalloc isn't tracing
+    """
+    if not tracemalloc.is_tracing():
+        raise TracemallocNotRunningError("tracemalloc is not running")
+    snapshot = tracemalloc.take_snapshot().filter_traces(_NOISE_FILTERS)
+    snapshot_id = next(_snapshot_ids)
+    _snapshots[snapshot_id] = snapshot
+    while len(_snapshots) > MAX_SNAPSHOTS:
+        _snapshots.popitem(last=False)
+    return snapshot_id
+
+
+def _get_snapshot(snapshot_id: int) -> tracemalloc.Snapshot:
+    snapshot = _snapshots.get(snapshot_id)
+    if snapshot is None:
+        raise SnapshotNotFoundError(f"Snapshot {snapshot_id} not found")
+    return snapshot
+
+
+def diff_snapshots(
+    base_id: int,
+    target_id: int,
+    group_by: str = "lineno",
+    limit: int = 25
+) -> List[Dict]:
+    """
+    Largest allocation changes between two snapshots
+
+    Args:
+        base_id: Earlier snapshot
+        target_id: Later snapshot
+        group_by: "lineno", "filename" or "traceback"
+        limit: Number of entries returned
+
+    Returns:
+        Entries sorted by absolute size change, largest first
+
+    Raises:
+        SnapshotNotFoundError: If either snapshot is unknown
+    """
+    if group_by not in _GROUP_BY:
+        raise ValueError(f"group_by must be one of {', '.join(_GROUP_BY)}")
+    base = _get_snapshot(base_id)
+    target = _get_snapshot(target_id)
+
+    entries = []
+    for stat in target.compare_to(base, group_by)[:limit]:
+        frame = stat.traceback[0]
+        entry = {
+            "file": frame.filename,
+            "line": frame.lineno if group_by != "filename" else None,
+            "size_diff_bytes": stat.size_diff,
+            "size_bytes": stat.size,
+            "count_diff": stat.count_diff,
+            "count": stat.count,
+        }
+        if group_by == "traceback":
+            entry["traceback"] = [f"{f.filename}:{f.lineno}" for f in stat.traceback]
+        entries.append(entry)
+    return entries
+
+
+def gc_stats() -> dict:
+    """Garbage collector state: pending counts, thresholds and per-generation stats"""
+    return {
+        "enabled": gc.isenabled(),
+        "counts": gc.get_count(),
+        "thresholds": gc.get_threshold(),
+        "generations": gc.get_stats(),
+        "garbage": len(gc.garbage),
+    }
+
+
+def object_type_counts(limit: int = 25) -> List[Dict]:
+    """
+    Most common live object types tracked by the garbage collector
+
+    Walks every tracked object, so it takes a while on large heaps.
+
+    Args:
+        limit: Number of types returned
+
+    Returns:
+        Type names and counts, most common first
+    """
+    counts = Counter(type(obj).__qualname__ for obj in gc.get_objects())
+    return [{"type": name, "count": count} for name, count in counts.most_common(limit)]
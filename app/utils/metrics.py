@@ -0,0 +1,106 @@
+from prometheus_client import Counter, Gauge, Histogram
+
+# Latency buckets in seconds, from cache hits up to the default deadline
+LATENCY_BUCKETS = (0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# HTTP, labelled by route template rather than raw path to bound cardinality
+
+HTTP_REQUESTS = Counter(
+    "http_requests_total",
+    "HTTP requests by route template and status code",
+    ["method", "route", "status"],
+)
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template and status code",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "HTTP requests currently being served",
+    ["method", "route"],
+)
+
+# Auth
+
+AUTH_BCRYPT_DURATION = Histogram(
+    "auth_bcrypt_seconds",
+    "Time spent hashing and verifying passwords",
+    ["operation"],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.2, 0.4, 0.8, 1.6),
+)
+AUTH_LOGINS = Counter(
+    "auth_logins_total",
+    "Admin login attempts by result",
+    ["result"],
+)
+
+# Organization and tenant lookups
+
+CACHE_LOOKUPS = Counter(
+    "org_cache_lookups_total",
+    "Organization cache lookups by cache and result",
+    ["cache", "result"],
+)
+DB_CALL_DURATION = Histogram(
+    "db_call_duration_seconds",
+    "Time spent in guarded master database calls",
+    ["operation"],
+    buckets=LATENCY_BUCKETS,
+)
+
+# MongoDB commands, from the driver's command listener
+
+MONGODB_COMMAND_DURATION = Histogram(
+    "mongodb_command_duration_seconds",
+    "MongoDB command latency by command name and collection",
+    ["command", "collection"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+MONGODB_COMMAND_FAILURES = Counter(
+    "mongodb_command_failures_total",
+    "Failed MongoDB commands by command name and collection",
+    ["command", "collection"],
+)
+MONGODB_SLOW_COMMANDS = Counter(
+    "mongodb_slow_commands_total",
+    "MongoDB commands slower than the slow-query threshold",
+    ["command", "collection"],
+)
+
+# Event loop health and load shedding
+
+EVENT_LOOP_LAG = Histogram(
+    "event_loop_lag_seconds",
+    "How late the event loop woke the lag monitor",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+EVENT_LOOP_STALLS = Counter(
+    "event_loop_stalls_total",
+    "Event loop stalls longer than the stall threshold",
+)
+CONCURRENCY_LIMIT = Gauge(
+    "http_concurrency_limit",
+    "Current adaptive limit on concurrently served requests",
+)
+HTTP_REQUESTS_SHED = Counter(
+    "http_requests_shed_total",
+    "Requests rejected by the adaptive concurrency limit",
+)
+
+# Response compression
+
+HTTP_RESPONSE_BYTES = Counter(
+    "http_response_compression_bytes_total",
+    "Response body bytes before and after compression, by encoding",
+    ["encoding", "stage"],
+)
+
+# Readiness
+
+READINESS_CHECKS = Gauge(
+    "readiness_check_ok",
+    "Whether each readiness check passed at the last refresh",
+    ["check"],
+)
@@ -0,0 +1,225 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Fraction of requests profiled by the request profiler (0 disables it)
+PROFILE_REQUEST_SAMPLE_RATE = float(os.getenv("PROFILE_REQUEST_SAMPLE_RATE", "0"))
+# Number of slowest profiled requests kept per worker
+PROFILE_KEEP_SLOWEST = int(os.getenv("PROFILE_KEEP_SLOWEST", "20"))
+# Sampling interval of the request profiler
+PROFILE_REQUEST_INTERVAL_SECONDS = float(os.getenv("PROFILE_REQUEST_INTERVAL_SECONDS", "0.005"))
+
+# Project root, stripped from file names in stack labels
+_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) + os.sep
+
+# Stack labels per code object; code objects live as long as their module
+_labels: Dict[object, str] = {}
+
+
+def _frame_label(code) -> str:
+    label = _labels.get(code)
+    if label is None:
+        filename = code.co_filename
+        if filename.startswith(_ROOT):
+            filename = filename[len(_ROOT):]
+        elif "site-packages" + os.sep in filename:
+            filename = filename.split("site-packages" + os.sep, 1)[1]
+        # co_qualname is new in Python 3.11
+        name = getattr(code, "co_qualname", code.co_name)
+        label = f"{name} ({filename}:{code.co_firstlineno})"
+        _labels[code] = label
+    return label
+
+
+def collapse_stack(frame, thread_name: Optional[str] = None) -> str:
+    """
+    Collapse a stack into the flamegraph "root;...;leaf" form
+
+    Args:
+        frame: Innermost frame
+        thread_name: Optional thread name prepended as the root
+
+    Returns:
+        Semicolon-separated stack, outermost frame first
+    """
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame.f_code))
+        frame = frame.f_back
+    if thread_name:
+        labels.append(thread_name)
+    labels.reverse()
+    return ";".join(labels)
+
+
+def format_collapsed(samples: Counter) -> str:
+    """Render sampled stacks as collapsed-stack lines ("stack count")"""
+    return "".join(f"{stack} {count}\n" for stack, count in samples.most_common())
+
+
+def sample_threads(
+    seconds: float,
+    interval: float,
+    thread_ids: Optional[List[int]] = None
+) -> Counter:
+    """
+    Sample the stacks of running threads
+
+    Runs on its own thread; the sampled threads are not paused beyond the
+    GIL hand-off each sample needs.
+
+    Args:
+        seconds: How long to sample
+        interval: Seconds between samples
+        thread_ids: Threads to sample, or None for all but the sampler
+
+    Returns:
+        Counter of collapsed stacks
+    """
+    samples: Counter = Counter()
+    own_id = threading.get_ident()
+    names = {thread.ident: thread.name for thread in threading.enumerate()}
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id or (thread_ids is not None and thread_id not in thread_ids):
+                continue
+            samples[collapse_stack(frame, names.get(thread_id, str(thread_id)))] += 1
+        time.sleep(interval)
+    return samples
+
+
+_profile_lock = asyncio.Lock()
+
+
+class ProfileInProgressError(Exception):
+    """Raised when the worker is already being profiled"""
+
+
+async def profile_worker(seconds: float, interval: float, all_threads: bool = False) -> str:
+    """
+    Profile this worker for a while
+
+    Args:
+        seconds: How long to sample
+        interval: Seconds between samples
+        all_threads: Sample every thread rather than just the event loop's
+
+    Returns:
+        Collapsed stacks, ready for flamegraph.pl or speedscope
+
+    Raises:
+        ProfileInProgressError: If a profile is already running
+    """
+    if _profile_lock.locked():
+        raise ProfileInProgressError("A profile is already running on this worker")
+    async with _profile_lock:
+        thread_ids = None if all_threads else [threading.get_ident()]
+        samples = await asyncio.to_thread(sample_threads, seconds, interval, thread_ids)
+    return format_collapsed(samples)
+
+
+class RequestProfiler:
+    """
+    Profile a sampled fraction of requests and keep the slowest
+
+    One sampler thread runs while any sampled request is in flight. Each
+    sample of the event loop thread is attributed to the task the loop is
+    running at that moment, so concurrent requests don't pollute each
+    other's profiles.
+    """
+
+    def __init__(
+        self,
+        sample_rate: float = PROFILE_REQUEST_SAMPLE_RATE,
+        keep: int = PROFILE_KEEP_SLOWEST,
+        interval: float = PROFILE_REQUEST_INTERVAL_SECONDS,
+    ):
+        self.sample_rate = sample_rate
+        self.keep = keep
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._active: Dict[asyncio.Task, Counter] = {}
+        self._slowest: List[tuple] = []
+        self._sequence = itertools.count()
+        self._thread: Optional[threading.Thread] = None
+        self._loop = None
+        self._loop_thread_id: Optional[int] = None
+
+    def should_sample(self) -> bool:
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def begin(self) -> asyncio.Task:
+        """Start profiling the current task"""
+        task = asyncio.current_task()
+        with self._lock:
+            self._loop = asyncio.get_running_loop()
+            self._loop_thread_id = threading.get_ident()
+            self._active[task] = Counter()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+                self._thread.start()
+        return task
+
+    def end(self, task: asyncio.Task, route: str, trace_id: Optional[str], duration: float) -> None:
+        """Stop profiling a task and keep its profile if it is among the slowest"""
+        with self._lock:
+            samples = self._active.pop(task, None)
+            if samples is None:
+                return
+            entry = {
+                "route": route,
+                "trace_id": trace_id,
+                "duration_ms": round(duration * 1000, 2),
+                "samples": sum(samples.values()),
+                "collapsed": format_collapsed(samples),
+            }
+            item = (duration, next(self._sequence), entry)
+            if len(self._slowest) < self.keep:
+                heapq.heappush(self._slowest, item)
+            elif duration > self._slowest[0][0]:
+                heapq.heapreplace(self._slowest, item)
+
+    def slowest(self) -> List[dict]:
+        """Kept profiles, slowest first"""
+        with self._lock:
+            return [entry for _, _, entry in sorted(self._slowest, reverse=True)]
+
+    def _run(self) -> None:
+        try:
+            self._sample_until_idle()
+        except Exception:
+            logger.exception("Request profiler failed")
+            # Let the next sampled request start a fresh sampler thread
+            with self._lock:
+                self._thread = None
+
+    def _sample_until_idle(self) -> None:
+        while True:
+            with self._lock:
+                if not self._active:
+                    self._thread = None
+                    return
+                loop, thread_id = self._loop, self._loop_thread_id
+            frame = sys._current_frames().get(thread_id)
+            task = asyncio.current_task(loop)
+            if frame is not None and task is not None:
+                stack = collapse_stack(frame)
+                with self._lock:
+                    samples = self._active.get(task)
+                    if samples is not None:
+                        samples[stack] += 1
+            time.sleep(self.interval)
+
+
+request_profiler = RequestProfiler()
@@ -0,0 +1,146 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Dict, Optional
+
+from app.db.circuit_breaker import db_breaker
+from app.db.client import MAX_POOL_SIZE, get_database
+from app.db.monitoring import pool_metrics
+from app.repositories import provider
+from app.utils.background import get_background_tasks
+from app.utils.loop_lag import loop_monitor
+from app.utils.metrics import READINESS_CHECKS
+
+logger = logging.getLogger(__name__)
+
+# How often the cached readiness status is refreshed
+READINESS_INTERVAL_SECONDS = float(os.getenv("READINESS_INTERVAL_SECONDS", "2"))
+# A status older than this counts as not ready: the refresher itself is stuck
+READINESS_MAX_AGE_SECONDS = float(os.getenv("READINESS_MAX_AGE_SECONDS", "10"))
+# MongoDB ping slower than this, or failing, makes the worker not ready
+READINESS_PING_TIMEOUT_SECONDS = float(os.getenv("READINESS_PING_TIMEOUT_SECONDS", "1"))
+# Share of a member's connection pool checked out above which the worker is not ready
+READINESS_MAX_POOL_SATURATION = float(os.getenv("READINESS_MAX_POOL_SATURATION", "0.95"))
+# Event loop lag above which the worker is not ready
+READINESS_MAX_LOOP_LAG_SECONDS = float(os.getenv("READINESS_MAX_LOOP_LAG_SECONDS", "0.5"))
+# Work items queued for the default thread pool above which the worker is not ready
+READINESS_MAX_QUEUED_JOBS = int(os.getenv("READINESS_MAX_QUEUED_JOBS", "100"))
+
+
+def _queued_thread_jobs() -> int:
+    """Work waiting for a thread in the loop's default executor (asyncio.to_thread)"""
+    executor = getattr(asyncio.get_running_loop(), "_default_executor", None)
+    queue = getattr(executor, "_work_queue", None)
+    return queue.qsize() if queue is not None else 0
+
+
+class ReadinessMonitor:
+    """
+    Cached readiness of this worker, refreshed in the background
+
+    Probes read the last status instead of checking dependencies, so
+    orchestrators can probe as often as they like without adding load on
+    MongoDB. The status covers MongoDB ping latency, connection pool
+    saturation, event loop lag and the thread pool backlog.
+    """
+
+    def __init__(
+        self,
+        interval: float = READINESS_INTERVAL_SECONDS,
+        max_age: float = READINESS_MAX_AGE_SECONDS,
+    ):
+        self.interval = interval
+        self.max_age = max_age
+        self._status: Optional[Dict] = None
+        self._checked_at: Optional[float] = None
+
+    async def run(self) -> None:
+        """Refresh the status until cancelled"""
+        while True:
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Readiness refresh failed")
+            await asyncio.sleep(self.interval)
+
+    async def refresh(self) -> Dict:
+        """Run every check and cache the result"""
+        checks = {
+            "mongodb": await self._check_mongodb(),
+            "connection_pool": self._check_pool(),
+            "event_loop": self._check_loop(),
+            "job_queue": self._check_jobs(),
+        }
+        for name, check in checks.items():
+            READINESS_CHECKS.labels(name).set(1 if check["ok"] else 0)
+        self._status = {"ready": all(check["ok"] for check in checks.values()), "checks": checks}
+        self._checked_at = time.monotonic()
+        return self._status
+
+    def status(self) -> Dict:
+        """
+        Last cached status
+
+        Returns:
+            "ready", the checks and the status age in seconds; not ready
+            before the first refresh or when the status is older than
+            max_age
+        """
+        if self._status is None:
+            return {"ready": False, "reason": "starting", "checks": {}}
+        age = time.monotonic() - self._checked_at
+        status = {**self._status, "age_seconds": round(age, 3)}
+        if age > self.max_age:
+            status.update({"ready": False, "reason": "stale"})
+        return status
+
+    async def _check_mongodb(self) -> Dict:
+        if provider.STORAGE_BACKEND == "memory":
+            return {"ok": True, "skipped": "memory storage backend"}
+        db = get_database()
+        if db is None:
+            return {"ok": False, "error": "not initialized", "circuit": db_breaker.state}
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(db.command("ping"), READINESS_PING_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            return {"ok": False, "error": f"ping timed out after {READINESS_PING_TIMEOUT_SECONDS}s",
+                    "circuit": db_breaker.state}
+        except Exception as e:
+            return {"ok": False, "error": str(e), "circuit": db_breaker.state}
+        return {
+            "ok": True,
+            "ping_ms": round((time.perf_counter() - started) * 1000, 2),
+            "circuit": db_breaker.state,
+        }
+
+    def _check_pool(self) -> Dict:
+        members = {
+            address: round(member["checked_out"] / MAX_POOL_SIZE, 3)
+            for address, member in pool_metrics.snapshot().items()
+        }
+        saturation = max(members.values(), default=0.0)
+        return {
+            "ok": saturation < READINESS_MAX_POOL_SATURATION,
+            "saturation": saturation,
+            "members": members,
+        }
+
+    def _check_loop(self) -> Dict:
+        lag = loop_monitor.lag
+        return {"ok": lag <= READINESS_MAX_LOOP_LAG_SECONDS, "lag_seconds": round(lag, 4)}
+
+    def _check_jobs(self) -> Dict:
+        queued = _queued_thread_jobs()
+        # Crashed jobs are reported but don't stop the worker serving requests
+        crashed = sorted(
+            name for name, task in get_background_tasks().items()
+            if task.done() and not task.cancelled() and task.exception() is not None
+        )
+        return {"ok": queued <= READINESS_MAX_QUEUED_JOBS, "queued_thread_jobs": queued, "crashed_jobs": crashed}
+
+
+readiness_monitor = ReadinessMonitor()
@@ -1,7 +1,271 @@
-from typing import Any, Optional, Dict
-from fastapi import Response
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Any, Optional, Dict, Iterator
+from bson import ObjectId
+from fastapi import Request, Response
 from fastapi.responses import JSONResponse
+import json
+import logging
+import math
+import os
 import uuid
+from app.db.circuit_breaker import CircuitOpenError
+from app.utils.deadline import deadline_exceeded
+from app.utils.tracing import current_trace_id, start_span
+
+try:
+    import orjson
+except ImportError:  # optional; the stdlib encoder is used instead
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # optional; MessagePack isn't offered without it
+    msgpack = None
+
+try:
+    import cbor2
+except ImportError:  # optional; CBOR isn't offered without it
+    cbor2 = None
+
+logger = logging.getLogger(__name__)
+
+# JSON encoder behind every response: "orjson" (when installed) or "stdlib"
+JSON_ENCODER = os.getenv("JSON_ENCODER", "orjson")
+# Wire formats negotiated from Accept and Content-Type; JSON is always offered
+RESPONSE_FORMATS = os.getenv("RESPONSE_FORMATS", "json,msgpack,cbor")
+
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+CBOR_MEDIA_TYPE = "application/cbor"
+
+# Format of the current request's envelope, set by ContentNegotiationMiddleware
+_response_format: ContextVar[str] = ContextVar("response_format", default="json")
+
+
+def _default(obj: Any) -> Any:
+    """Encode the BSON and datetime values documents carry as read from MongoDB"""
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _stdlib_dumps(content: Any) -> bytes:
+    return json.dumps(
+        content,
+        ensure_ascii=False,
+        allow_nan=False,
+        separators=(",", ":"),
+        default=_default,
+    ).encode("utf-8")
+
+
+def _orjson_dumps(content: Any) -> bytes:
+    return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+class StdlibJSONResponse(JSONResponse):
+    """
+    JSON response encoded with the standard library
+
+    Unlike Starlette's JSONResponse, ObjectIds and datetimes are encoded
+    natively, so documents need no conversion pass before being returned.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return _stdlib_dumps(content)
+
+
+class ORJSONResponse(JSONResponse):
+    """
+    JSON response encoded with orjson
+
+    orjson encodes datetimes itself, in the same ISO 8601 form as
+    ``datetime.isoformat()``; ObjectIds go through the shared default.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return _orjson_dumps(content)
+
+
+class MsgPackResponse(Response):
+    """MessagePack response; values are encoded as in JSON responses"""
+
+    media_type = MSGPACK_MEDIA_TYPE
+
+    def render(self, content: Any) -> bytes:
+        return _msgpack_dumps(content)
+
+
+class CBORResponse(Response):
+    """CBOR response; values are encoded as in JSON responses"""
+
+    media_type = CBOR_MEDIA_TYPE
+
+    def render(self, content: Any) -> bytes:
+        return _cbor_dumps(content)
+
+
+def _msgpack_dumps(content: Any) -> bytes:
+    return msgpack.packb(content, default=_default)
+
+
+def _cbor_encode_string(encoder, value: Any) -> None:
+    encoder.encode(_default(value))
+
+
+# cbor2 has native datetime tags; strings keep CBOR values identical to JSON's
+_CBOR_ENCODERS = {ObjectId: _cbor_encode_string, datetime: _cbor_encode_string, date: _cbor_encode_string}
+
+
+def _cbor_dumps(content: Any) -> bytes:
+    return cbor2.dumps(content, encoders=_CBOR_ENCODERS)
+
+
+def _msgpack_loads(body: bytes) -> Any:
+    try:
+        return msgpack.unpackb(body)
+    except Exception as e:  # msgpack raises several unrelated types
+        raise ValueError(f"Invalid MessagePack body: {e}") from e
+
+
+def _cbor_loads(body: bytes) -> Any:
+    try:
+        return cbor2.loads(body)
+    except cbor2.CBORDecodeError as e:
+        raise ValueError(f"Invalid CBOR body: {e}") from e
+
+
+def _select_encoder() -> str:
+    if JSON_ENCODER == "orjson":
+        if orjson is not None:
+            return "orjson"
+        logger.warning("JSON_ENCODER is orjson but orjson is not installed; using the stdlib encoder")
+    elif JSON_ENCODER != "stdlib":
+        raise ValueError(f"Unknown JSON_ENCODER '{JSON_ENCODER}', expected orjson or stdlib")
+    return "stdlib"
+
+
+_ENCODERS = {
+    "orjson": (ORJSONResponse, _orjson_dumps),
+    "stdlib": (StdlibJSONResponse, _stdlib_dumps),
+}
+
+# Response class used by create_response and as the app's default, and
+# the matching encoder for bodies built outside a response, e.g. streams
+DefaultJSONResponse, dumps = _ENCODERS[_select_encoder()]
+
+# Binary formats: (library, response class, decoder)
+_BINARY_FORMATS = {
+    "msgpack": (msgpack, MsgPackResponse, _msgpack_loads),
+    "cbor": (cbor2, CBORResponse, _cbor_loads),
+}
+
+# Media types accepted for each format; wildcards resolve to JSON
+_MEDIA_TYPES = {
+    "*/*": "json",
+    "application/*": "json",
+    "application/json": "json",
+    MSGPACK_MEDIA_TYPE: "msgpack",
+    "application/x-msgpack": "msgpack",
+    "application/vnd.msgpack": "msgpack",
+    CBOR_MEDIA_TYPE: "cbor",
+}
+
+
+def parse_formats(spec: str) -> Dict[str, tuple]:
+    """
+    Binary formats to offer
+
+    Args:
+        spec: Comma-separated format names; "json" is implied
+
+    Returns:
+        Mapping of format name to (response class, decoder) for the formats
+        whose library is installed
+    """
+    formats = {}
+    for name in filter(None, (part.strip() for part in spec.split(","))):
+        if name == "json":
+            continue
+        if name not in _BINARY_FORMATS:
+            raise ValueError(f"Unknown response format '{name}', expected json, msgpack or cbor")
+        library, response_class, loads = _BINARY_FORMATS[name]
+        if library is None:
+            logger.warning("Response format %s is enabled but its library is not installed", name)
+            continue
+        formats[name] = (response_class, loads)
+    return formats
+
+
+_formats = parse_formats(RESPONSE_FORMATS)
+
+
+@lru_cache(maxsize=256)
+def negotiate_format(accept: Optional[str]) -> str:
+    """
+    Response format for an Accept header
+
+    The enabled format with the highest quality wins, the earliest listed on
+    ties. JSON is used without a header, for wildcards and when nothing
+    listed is offered, rather than answering 406.
+
+    Args:
+        accept: Accept header value
+
+    Returns:
+        "json", "msgpack" or "cbor"
+    """
+    if not accept:
+        return "json"
+    best, best_quality = "json", 0.0
+    for media_range in accept.split(","):
+        media_type, _, params = media_range.partition(";")
+        name = _MEDIA_TYPES.get(media_type.strip().lower())
+        if name is None or (name != "json" and name not in _formats):
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if quality > best_quality:
+            best, best_quality = name, quality
+    return best
+
+
+def body_format(content_type: Optional[str]) -> Optional[str]:
+    """Binary format of a request body, or None for JSON and anything else"""
+    if not content_type:
+        return None
+    name = _MEDIA_TYPES.get(content_type.partition(";")[0].strip().lower())
+    return name if name in _formats else None
+
+
+def decode_body(name: str, body: bytes) -> Any:
+    """
+    Decode a binary request body
+
+    Raises:
+        ValueError: If the body is malformed
+    """
+    return _formats[name][1](body)
+
+
+@contextmanager
+def response_format_scope(name: str) -> Iterator[None]:
+    """Encode every envelope created inside the scope in the given format"""
+    token = _response_format.set(name)
+    try:
+        yield
+    finally:
+        _response_format.reset(token)
 
 
 def create_response(
@@ -10,38 +274,46 @@ def create_response(
     error: Optional[Dict[str, Any]] = None,
     trace_id: Optional[str] = None,
     status_code: int = 200
-) -> JSONResponse:
+) -> Response:
     """
     Create a standardized API response
-    
+
     Args:
         success: Whether the operation was successful
         data: Response data
         error: Error information with code, message, and details
-        trace_id: Unique trace ID for request tracking
+        trace_id: Trace ID for request tracking; defaults to the current
+            request's trace
         status_code: HTTP status code
-    
+
     Returns:
-        JSONResponse with standardized format
+        Response with standardized format, in the format negotiated for
+        the current request (the configured JSON class by default)
     """
     if trace_id is None:
-        trace_id = str(uuid.uuid4())
-    
+        trace_id = current_trace_id() or str(uuid.uuid4())
+
     response_data = {
         "success": success,
         "data": data,
         "error": error or {},
         "trace_id": trace_id
     }
-    
-    return JSONResponse(content=response_data, status_code=status_code)
+
+    name = _response_format.get()
+    response_class = DefaultJSONResponse if name == "json" else _formats[name][0]
+    with start_span("serialize"):
+        response = response_class(content=response_data, status_code=status_code)
+    if _formats:
+        response.headers.add_vary_header("Accept")
+    return response
 
 
 def success_response(
     data: Any = None,
     trace_id: Optional[str] = None,
     status_code: int = 200
-) -> JSONResponse:
+) -> Response:
     """Create a success response"""
     return create_response(
         success=True,
@@ -57,7 +329,7 @@ def error_response(
     details: Optional[Dict[str, Any]] = None,
     trace_id: Optional[str] = None,
     status_code: int = 400
-) -> JSONResponse:
+) -> Response:
     """Create an error response"""
     error = {
         "code": code,
@@ -71,3 +343,38 @@ def error_response(
         status_code=status_code
     )
 
+
+async def database_unavailable_handler(request: Request, exc: Exception) -> Response:
+    """
+    Exception handler for DATABASE_UNAVAILABLE_ERRORS
+
+    Route handlers re-raise these rather than report them as their own
+    errors. A driver timeout raised under the request deadline, or any of
+    them raised once it has passed, is reported as 504 DEADLINE_EXCEEDED. An
+    open circuit breaker and other connection failures are reported as
+    503 DATABASE_UNAVAILABLE.
+    """
+    trace_id = current_trace_id()
+    if deadline_exceeded(exc):
+        return error_response(
+            code="DEADLINE_EXCEEDED",
+            message="Request deadline exceeded",
+            trace_id=trace_id,
+            status_code=504
+        )
+    if isinstance(exc, CircuitOpenError):
+        response = error_response(
+            code="DATABASE_UNAVAILABLE",
+            message=str(exc),
+            trace_id=trace_id,
+            status_code=503
+        )
+        response.headers["Retry-After"] = str(max(1, math.ceil(exc.retry_after)))
+        return response
+    return error_response(
+        code="DATABASE_UNAVAILABLE",
+        message="Database unavailable",
+        details={"error": str(exc)},
+        trace_id=trace_id,
+        status_code=503
+    )
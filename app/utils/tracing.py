@@ -0,0 +1,356 @@
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Where finished spans go: none | file | otlp. Trace IDs are propagated and
+# returned to clients either way; "none" only skips recording spans.
+TRACE_EXPORTER = os.getenv("TRACE_EXPORTER", "none")
+# JSON lines file written by the file exporter
+TRACE_FILE_PATH = os.getenv("TRACE_FILE_PATH", "traces.jsonl")
+# OTLP/HTTP traces endpoint, JSON encoding
+OTLP_TRACES_ENDPOINT = os.getenv("OTLP_TRACES_ENDPOINT", "http://localhost:4318/v1/traces")
+TRACE_SERVICE_NAME = os.getenv("TRACE_SERVICE_NAME", "org-management-service")
+# Fraction of new traces recorded; incoming traceparent sampling is honoured
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "1.0"))
+TRACE_EXPORT_INTERVAL_SECONDS = float(os.getenv("TRACE_EXPORT_INTERVAL_SECONDS", "5"))
+# Spans buffered between exports; spans beyond this are dropped
+TRACE_MAX_QUEUE_SIZE = int(os.getenv("TRACE_MAX_QUEUE_SIZE", "10000"))
+
+# OTLP span kinds
+KIND_INTERNAL = 1
+KIND_SERVER = 2
+KIND_CLIENT = 3
+
+_TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+_INVALID_TRACE_ID = "0" * 32
+_INVALID_SPAN_ID = "0" * 16
+
+
+def _new_trace_id() -> str:
+    return f"{random.getrandbits(128):032x}"
+
+
+def _new_span_id() -> str:
+    return f"{random.getrandbits(64):016x}"
+
+
+def parse_traceparent(header: Optional[str]) -> Optional[Tuple[str, str, bool]]:
+    """
+    Parse a W3C traceparent header
+
+    Args:
+        header: Header value, e.g. "00-<trace-id>-<parent-id>-01"
+
+    Returns:
+        Tuple of trace ID, parent span ID and sampled flag, or None if the
+        header is missing or invalid
+    """
+    if not header:
+        return None
+    match = _TRACEPARENT.match(header.strip().lower())
+    if match is None:
+        return None
+    trace_id, span_id, flags = match.groups()
+    if trace_id == _INVALID_TRACE_ID or span_id == _INVALID_SPAN_ID:
+        return None
+    return trace_id, span_id, bool(int(flags, 16) & 1)
+
+
+class Span:
+    """
+    A timed operation within a trace
+
+    Unsampled spans carry the trace context but are never exported.
+    """
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "kind", "sampled",
+                 "start_ns", "end_ns", "attributes", "error")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], sampled: bool,
+                 kind: int = KIND_INTERNAL, attributes: Optional[Dict[str, Any]] = None,
+                 start_ns: Optional[int] = None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = _new_span_id()
+        self.parent_id = parent_id
+        self.kind = kind
+        self.sampled = sampled
+        self.start_ns = start_ns if start_ns is not None else time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes = attributes or {}
+        self.error: Optional[str] = None
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        if self.sampled:
+            self.attributes[key] = value
+
+    def record_error(self, error: Any) -> None:
+        self.error = str(error)
+
+    def end(self, end_ns: Optional[int] = None) -> None:
+        if self.end_ns is not None:
+            return
+        self.end_ns = end_ns if end_ns is not None else time.time_ns()
+        if self.sampled and _exporter is not None:
+            _exporter.add(self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "kind": self.kind,
+            "start_ns": self.start_ns,
+            "duration_ms": round((self.end_ns - self.start_ns) / 1e6, 3),
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+def current_span() -> Optional[Span]:
+    """The active span of the current request or task"""
+    return _current_span.get()
+
+
+def current_trace_id() -> Optional[str]:
+    """Trace ID of the current request, used as the response trace_id"""
+    span = _current_span.get()
+    return span.trace_id if span is not None else None
+
+
+def begin_span(name: str, kind: int = KIND_INTERNAL, attributes: Optional[Dict[str, Any]] = None,
+               start_ns: Optional[int] = None) -> Optional[Span]:
+    """
+    Start a child of the current span without making it current
+
+    Used where a span starts and ends in different callbacks, e.g. driver
+    command events. The caller must call ``end()``.
+
+    Returns:
+        The span, or None outside a trace
+    """
+    parent = _current_span.get()
+    if parent is None:
+        return None
+    return Span(name, parent.trace_id, parent.span_id, parent.sampled, kind,
+                attributes if parent.sampled else None, start_ns)
+
+
+@contextmanager
+def start_span(name: str, kind: int = KIND_INTERNAL,
+               attributes: Optional[Dict[str, Any]] = None) -> Iterator[Optional[Span]]:
+    """
+    Time the enclosed block as a child of the current span
+
+    Outside a trace this does nothing and yields None.
+    """
+    span = begin_span(name, kind, attributes)
+    if span is None:
+        yield None
+        return
+    token = _current_span.set(span)
+    try:
+        yield span
+    except BaseException as e:
+        span.record_error(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        span.end()
+
+
+@contextmanager
+def start_trace(name: str, traceparent: Optional[str] = None, kind: int = KIND_SERVER,
+                attributes: Optional[Dict[str, Any]] = None) -> Iterator[Span]:
+    """
+    Start the root span of this service's part of a trace
+
+    Continues the caller's trace when ``traceparent`` is valid, otherwise
+    starts a new one.
+    """
+    parent = parse_traceparent(traceparent)
+    if parent is not None:
+        trace_id, parent_id, sampled = parent
+    else:
+        trace_id, parent_id = _new_trace_id(), None
+        sampled = random.random() < TRACE_SAMPLE_RATE
+    sampled = sampled and _exporter is not None
+    span = Span(name, trace_id, parent_id, sampled, kind, attributes if sampled else None)
+    token = _current_span.set(span)
+    try:
+        yield span
+    except BaseException as e:
+        span.record_error(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        span.end()
+
+
+class SpanExporter:
+    """
+    Buffer finished spans and export them in batches from a daemon thread
+
+    Spans end on the event loop and on driver threads, so the buffer is
+    guarded by a lock. Export failures are logged and the batch dropped.
+    """
+
+    def __init__(self, interval: float = TRACE_EXPORT_INTERVAL_SECONDS,
+                 max_queue_size: int = TRACE_MAX_QUEUE_SIZE):
+        self.interval = interval
+        self.max_queue_size = max_queue_size
+        self._spans: List[Span] = []
+        self._dropped = 0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def add(self, span: Span) -> None:
+        with self._lock:
+            if len(self._spans) >= self.max_queue_size:
+                self._dropped += 1
+                return
+            self._spans.append(span)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            self.flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            spans, self._spans = self._spans, []
+            dropped, self._dropped = self._dropped, 0
+        if dropped:
+            logger.warning("Dropped %d spans, export queue full", dropped)
+        if not spans:
+            return
+        try:
+            self.export(spans)
+        except Exception as e:
+            logger.warning("Failed to export %d spans: %s", len(spans), e)
+
+    def export(self, spans: List[Span]) -> None:
+        raise NotImplementedError
+
+
+class FileSpanExporter(SpanExporter):
+    """Append spans to a JSON lines file"""
+
+    def __init__(self, path: str = TRACE_FILE_PATH, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+
+    def export(self, spans: List[Span]) -> None:
+        with open(self.path, "a", encoding="utf-8") as f:
+            for span in spans:
+                f.write(json.dumps(span.to_dict(), default=str) + "\n")
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [{"key": key, "value": _otlp_value(value)} for key, value in attributes.items()]
+
+
+class OTLPSpanExporter(SpanExporter):
+    """Send spans to an OpenTelemetry collector over OTLP/HTTP with JSON encoding"""
+
+    def __init__(self, endpoint: str = OTLP_TRACES_ENDPOINT,
+                 service_name: str = TRACE_SERVICE_NAME, **kwargs):
+        super().__init__(**kwargs)
+        self.endpoint = endpoint
+        self.service_name = service_name
+
+    def encode(self, spans: List[Span]) -> Dict[str, Any]:
+        return {"resourceSpans": [{
+            "resource": {"attributes": _otlp_attributes({"service.name": self.service_name})},
+            "scopeSpans": [{
+                "scope": {"name": "app"},
+                "spans": [{
+                    "traceId": span.trace_id,
+                    "spanId": span.span_id,
+                    **({"parentSpanId": span.parent_id} if span.parent_id else {}),
+                    "name": span.name,
+                    "kind": span.kind,
+                    "startTimeUnixNano": str(span.start_ns),
+                    "endTimeUnixNano": str(span.end_ns),
+                    "attributes": _otlp_attributes(span.attributes),
+                    "status": {"code": 2, "message": span.error} if span.error else {},
+                } for span in spans],
+            }],
+        }]}
+
+    def export(self, spans: List[Span]) -> None:
+        request = urllib.request.Request(
+            self.endpoint,
+            data=json.dumps(self.encode(spans), default=str).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        with urllib.request.urlopen(request, timeout=10):
+            pass
+
+
+def build_exporter(kind: str) -> Optional[SpanExporter]:
+    """
+    Build the span exporter named by TRACE_EXPORTER
+
+    Args:
+        kind: "none", "file" or "otlp"
+
+    Returns:
+        The exporter, or None when spans aren't recorded
+    """
+    if kind == "none":
+        return None
+    if kind == "file":
+        return FileSpanExporter()
+    if kind == "otlp":
+        return OTLPSpanExporter()
+    raise ValueError(f"Unsupported TRACE_EXPORTER '{kind}', expected none, file or otlp")
+
+
+_exporter: Optional[SpanExporter] = build_exporter(TRACE_EXPORTER)
+
+
+def set_exporter(exporter: Optional[SpanExporter]) -> None:
+    """Replace the span exporter, e.g. in tests"""
+    global _exporter
+    _exporter = exporter
+
+
+def flush_spans() -> None:
+    """Export buffered spans now, e.g. on shutdown"""
+    if _exporter is not None:
+        _exporter.flush()
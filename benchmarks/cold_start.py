@@ -0,0 +1,130 @@
+"""
+Cold start of a worker
+
+Each run is a fresh interpreter, the way a new worker or replica starts.
+Two things are measured:
+
+- imports: ``python -X importtime -c "import app.main"``, reported as the
+  total and the modules with the most self time (median over runs);
+- startup: the time to import app.main, run the lifespan startup, answer
+  the first request and serve the first /openapi.json. It is measured once
+  with the schema generated on demand and once with the prebuilt
+  openapi.json (OPENAPI_SCHEMA_FILE).
+
+Startup runs on the in-memory storage backend, so no MongoDB is needed.
+
+Usage:
+    python -m benchmarks.cold_start
+    python -m benchmarks.cold_start --runs 10 --top 30
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_STARTUP_SCRIPT = """
+import asyncio, json, time
+import httpx
+started = time.perf_counter()
+from app.main import app
+imported = time.perf_counter()
+
+async def main():
+    async with app.router.lifespan_context(app):
+        ready = time.perf_counter()
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://cold-start") as client:
+            await client.get("/health")
+            first_request = time.perf_counter()
+            await client.get("/openapi.json")
+            openapi = time.perf_counter()
+    return ready, first_request, openapi
+
+ready, first_request, openapi = asyncio.run(main())
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "lifespan_startup_ms": (ready - imported) * 1000,
+    "first_request_ms": (first_request - ready) * 1000,
+    "first_openapi_ms": (openapi - first_request) * 1000,
+}))
+"""
+
+
+def _environment(**overrides):
+    env = dict(os.environ, STORAGE_BACKEND="memory", PYTHONPATH=ROOT, **overrides)
+    # Bytecode is cached after the first run, as it is in an image
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    return env
+
+
+def parse_importtime(stderr):
+    """
+    Parse ``-X importtime`` output
+
+    Returns:
+        Mapping of module to (self microseconds, cumulative microseconds)
+    """
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = (int(self_us), int(cumulative_us))
+    return modules
+
+
+def profile_imports(module, runs, top):
+    """Median import time of a module and its most expensive imports"""
+    totals = []
+    self_times = defaultdict(list)
+    for _ in range(runs):
+        completed = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                                   capture_output=True, text=True, cwd=ROOT, env=_environment(), check=True)
+        modules = parse_importtime(completed.stderr)
+        totals.append(modules[module][1])
+        for name, (self_us, _) in modules.items():
+            self_times[name].append(self_us)
+    slowest = sorted(self_times.items(), key=lambda item: statistics.median(item[1]), reverse=True)[:top]
+    return {
+        "module": module,
+        "total_ms": round(statistics.median(totals) / 1000, 1),
+        "slowest_self_ms": {name: round(statistics.median(times) / 1000, 2) for name, times in slowest},
+    }
+
+
+def profile_startup(runs, schema_file=""):
+    """Median startup phases, in milliseconds"""
+    samples = defaultdict(list)
+    for _ in range(runs):
+        completed = subprocess.run([sys.executable, "-c", _STARTUP_SCRIPT], capture_output=True, text=True,
+                                   cwd=ROOT, env=_environment(OPENAPI_SCHEMA_FILE=schema_file), check=True)
+        for phase, value in json.loads(completed.stdout.strip().splitlines()[-1]).items():
+            samples[phase].append(value)
+    return {phase: round(statistics.median(values), 1) for phase, values in samples.items()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=20, help="Slowest modules listed")
+    parser.add_argument("--module", default="app.main")
+    args = parser.parse_args(argv)
+
+    report = {
+        "imports": profile_imports(args.module, args.runs, args.top),
+        "startup": {
+            "generated_schema": profile_startup(args.runs),
+            "prebuilt_schema": profile_startup(args.runs, os.path.join(ROOT, "openapi.json")),
+        },
+    }
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,533 @@
+"""
+In-memory, in-process stand-in for the Motor client
+
+Implements the subset of the Motor API the organization, auth, tenant
+provisioning and tenant migration services use, so the app can be load tested without a
+MongoDB server. It is not a MongoDB: queries support top-level fields and
+the common comparison operators, updates support $set, $unset and $inc,
+aggregations support $match and grouping without accumulators, and unique
+indexes are enforced. Documents are copied shallowly on the
+way in and out, like the driver hands out fresh dicts.
+
+An optional per-operation latency makes the event loop yield like a
+network round trip would, so concurrency behaves realistically.
+
+Usage:
+    from benchmarks.fake_mongo import FakeMotorClient, install
+
+    install(FakeMotorClient(latency=0.001))
+"""
+import asyncio
+import re
+from typing import Any, Dict, List, Optional
+
+from bson import ObjectId
+from pymongo.errors import BulkWriteError, CollectionInvalid, DuplicateKeyError, OperationFailure
+
+from app.db import client as db_client
+
+NAMESPACE_NOT_FOUND = 26
+NAMESPACE_EXISTS = 48
+
+_MISSING = object()
+
+
+def _get(doc: dict, path: str) -> Any:
+    value = doc
+    for part in path.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return _MISSING
+        value = value[part]
+    return value
+
+
+def _equals(value: Any, expected: Any) -> bool:
+    if expected is None:
+        return value is _MISSING or value is None
+    if isinstance(value, list) and not isinstance(expected, list):
+        return expected in value
+    return value is not _MISSING and value == expected
+
+
+def _compare(value: Any, operator: str, operand: Any) -> bool:
+    if operator == "$eq":
+        return _equals(value, operand)
+    if operator == "$ne":
+        return not _equals(value, operand)
+    if operator == "$in":
+        return any(_equals(value, item) for item in operand)
+    if operator == "$nin":
+        return not any(_equals(value, item) for item in operand)
+    if operator == "$exists":
+        return (value is not _MISSING) == bool(operand)
+    if operator == "$regex":
+        return isinstance(value, str) and re.search(operand, value) is not None
+    if value is _MISSING or value is None:
+        return False
+    if operator == "$gt":
+        return value > operand
+    if operator == "$gte":
+        return value >= operand
+    if operator == "$lt":
+        return value < operand
+    if operator == "$lte":
+        return value <= operand
+    raise NotImplementedError(f"Query operator {operator} is not supported")
+
+
+def matches(doc: dict, query: Optional[dict]) -> bool:
+    """Whether a document matches a query filter"""
+    for key, condition in (query or {}).items():
+        if key == "$or":
+            if not any(matches(doc, clause) for clause in condition):
+                return False
+        elif key == "$and":
+            if not all(matches(doc, clause) for clause in condition):
+                return False
+        elif isinstance(condition, dict) and condition and next(iter(condition)).startswith("$"):
+            value = _get(doc, key)
+            if not all(_compare(value, op, operand) for op, operand in condition.items()):
+                return False
+        elif not _equals(_get(doc, key), condition):
+            return False
+    return True
+
+
+def apply_update(doc: dict, update: dict) -> None:
+    """Apply an update document in place"""
+    for operator, fields in update.items():
+        if operator == "$set":
+            doc.update(fields)
+        elif operator == "$unset":
+            for field in fields:
+                doc.pop(field, None)
+        elif operator == "$inc":
+            for field, amount in fields.items():
+                doc[field] = doc.get(field, 0) + amount
+        elif operator == "$setOnInsert":
+            continue
+        else:
+            raise NotImplementedError(f"Update operator {operator} is not supported")
+
+
+def _project(doc: dict, projection: Optional[dict]) -> dict:
+    if not projection:
+        return dict(doc)
+    included = [field for field, flag in projection.items() if flag]
+    if included:
+        projected = {field: doc[field] for field in included if field in doc}
+        if projection.get("_id", 1) and "_id" in doc:
+            projected["_id"] = doc["_id"]
+        return projected
+    return {field: value for field, value in doc.items() if field not in projection}
+
+
+def _evaluate(doc: dict, expression: Any) -> Any:
+    if isinstance(expression, dict):
+        fields = {name: _evaluate(doc, value) for name, value in expression.items()}
+        return {name: value for name, value in fields.items() if value is not _MISSING}
+    if isinstance(expression, str) and expression.startswith("$"):
+        return _get(doc, expression[1:])
+    return expression
+
+
+def _group(docs: List[dict], key: Any) -> List[dict]:
+    groups = []
+    for doc in docs:
+        group_id = _evaluate(doc, key)
+        if group_id is _MISSING:
+            group_id = None
+        if group_id not in groups:
+            groups.append(group_id)
+    return [{"_id": group_id} for group_id in groups]
+
+
+class _Result:
+    def __init__(self, **fields):
+        self.__dict__.update(fields)
+        self.acknowledged = True
+
+
+class FakeCursor:
+    """Async cursor over a snapshot of matching documents"""
+
+    def __init__(self, collection: "FakeCollection", query: Optional[dict], projection: Optional[dict]):
+        self._collection = collection
+        self._query = query
+        self._projection = projection
+        self._sort: List[tuple] = []
+        self._skip = 0
+        self._limit = 0
+        self._results: Optional[List[dict]] = None
+
+    def sort(self, key, direction: int = 1) -> "FakeCursor":
+        self._sort = [(key, direction)] if isinstance(key, str) else list(key)
+        return self
+
+    def skip(self, count: int) -> "FakeCursor":
+        self._skip = count
+        return self
+
+    def limit(self, count: int) -> "FakeCursor":
+        self._limit = count
+        return self
+
+    def _materialize(self) -> List[dict]:
+        docs = [doc for doc in self._collection._docs.values() if matches(doc, self._query)]
+        for key, direction in reversed(self._sort):
+            docs.sort(key=lambda doc: (_get(doc, key) is _MISSING, str(_get(doc, key))),
+                      reverse=direction < 0)
+        docs = docs[self._skip:]
+        if self._limit:
+            docs = docs[:self._limit]
+        return [_project(doc, self._projection) for doc in docs]
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> dict:
+        if self._results is None:
+            await self._collection._database.client._round_trip()
+            self._results = self._materialize()
+        if not self._results:
+            raise StopAsyncIteration
+        return self._results.pop(0)
+
+    async def to_list(self, length: Optional[int] = None) -> List[dict]:
+        await self._collection._database.client._round_trip()
+        results = self._materialize()
+        return results[:length] if length else results
+
+
+class FakeCollection:
+    """Collection holding documents keyed by _id"""
+
+    def __init__(self, database: "FakeDatabase", name: str):
+        self._database = database
+        self.name = name
+        self._reset()
+
+    def _reset(self) -> None:
+        self._docs: Dict[Any, dict] = {}
+        self._indexes: Dict[str, dict] = {"_id_": {"keys": [("_id", 1)], "unique": True}}
+        # Like MongoDB, a namespace exists once something is written to it
+        self.exists = False
+
+    @property
+    def database(self) -> "FakeDatabase":
+        return self._database
+
+    def with_options(self, **options) -> "FakeCollection":
+        # Read preferences and write concerns mean nothing in memory
+        return self
+
+    def _check_unique(self, doc: dict, ignore_id: Any = _MISSING) -> None:
+        for name, index in self._indexes.items():
+            if not index.get("unique") or name == "_id_":
+                continue
+            key = tuple(_get(doc, field) for field, _ in index["keys"])
+            if index.get("sparse") and all(value is _MISSING for value in key):
+                continue
+            for other_id, other in self._docs.items():
+                if other_id == ignore_id:
+                    continue
+                if tuple(_get(other, field) for field, _ in index["keys"]) == key:
+                    raise DuplicateKeyError(f"E11000 duplicate key error index: {name}", 11000)
+
+    def _find(self, query: Optional[dict]) -> Optional[dict]:
+        _id = (query or {}).get("_id", _MISSING)
+        if _id is not _MISSING and not isinstance(_id, dict):
+            doc = self._docs.get(_id)
+            return doc if doc is not None and matches(doc, query) else None
+        for doc in self._docs.values():
+            if matches(doc, query):
+                return doc
+        return None
+
+    async def insert_one(self, document: dict, **kwargs) -> _Result:
+        await self._database.client._round_trip()
+        document.setdefault("_id", ObjectId())
+        if document["_id"] in self._docs:
+            raise DuplicateKeyError("E11000 duplicate key error index: _id_", 11000)
+        self._check_unique(document)
+        self._docs[document["_id"]] = dict(document)
+        self.exists = True
+        return _Result(inserted_id=document["_id"])
+
+    async def insert_many(self, documents: List[dict], ordered: bool = True, **kwargs) -> _Result:
+        await self._database.client._round_trip()
+        inserted, errors = [], []
+        for index, document in enumerate(documents):
+            document.setdefault("_id", ObjectId())
+            try:
+                if document["_id"] in self._docs:
+                    raise DuplicateKeyError("E11000 duplicate key error index: _id_", 11000)
+                self._check_unique(document)
+            except DuplicateKeyError as e:
+                errors.append({"index": index, "code": e.code, "errmsg": str(e)})
+                if ordered:
+                    break
+                continue
+            self._docs[document["_id"]] = dict(document)
+            inserted.append(document["_id"])
+            self.exists = True
+        if errors:
+            raise BulkWriteError({"writeErrors": errors, "nInserted": len(inserted)})
+        return _Result(inserted_ids=inserted)
+
+    async def find_one(self, filter: Optional[dict] = None, projection: Optional[dict] = None,
+                       **kwargs) -> Optional[dict]:
+        await self._database.client._round_trip()
+        doc = self._find(filter)
+        return _project(doc, projection) if doc is not None else None
+
+    def find(self, filter: Optional[dict] = None, projection: Optional[dict] = None, **kwargs) -> FakeCursor:
+        return FakeCursor(self, filter, projection)
+
+    async def count_documents(self, filter: Optional[dict] = None, **kwargs) -> int:
+        await self._database.client._round_trip()
+        return sum(1 for doc in self._docs.values() if matches(doc, filter))
+
+    def _update(self, doc: dict, update: dict) -> dict:
+        updated = dict(doc)
+        apply_update(updated, update)
+        self._check_unique(updated, ignore_id=doc["_id"])
+        self._docs[doc["_id"]] = updated
+        return updated
+
+    async def update_one(self, filter: dict, update: dict, upsert: bool = False, **kwargs) -> _Result:
+        await self._database.client._round_trip()
+        doc = self._find(filter)
+        if doc is None:
+            if not upsert:
+                return _Result(matched_count=0, modified_count=0, upserted_id=None)
+            doc = {k: v for k, v in filter.items() if not k.startswith("$") and not isinstance(v, dict)}
+            doc.setdefault("_id", ObjectId())
+            if doc["_id"] in self._docs:
+                raise DuplicateKeyError("E11000 duplicate key error index: _id_", 11000)
+            apply_update(doc, update)
+            apply_update(doc, {"$set": update.get("$setOnInsert", {})})
+            self._check_unique(doc)
+            self._docs[doc["_id"]] = doc
+            return _Result(matched_count=0, modified_count=0, upserted_id=doc["_id"])
+        updated = self._update(doc, update)
+        return _Result(matched_count=1, modified_count=int(updated != doc), upserted_id=None)
+
+    async def replace_one(self, filter: dict, replacement: dict, upsert: bool = False, **kwargs) -> _Result:
+        await self._database.client._round_trip()
+        doc = self._find(filter)
+        if doc is None:
+            if not upsert:
+                return _Result(matched_count=0, modified_count=0, upserted_id=None)
+            replacement = dict(replacement)
+            replacement.setdefault("_id", filter.get("_id", ObjectId()))
+            self._check_unique(replacement)
+            self._docs[replacement["_id"]] = replacement
+            self.exists = True
+            return _Result(matched_count=0, modified_count=0, upserted_id=replacement["_id"])
+        replaced = {**replacement, "_id": doc["_id"]}
+        self._check_unique(replaced, ignore_id=doc["_id"])
+        self._docs[doc["_id"]] = replaced
+        return _Result(matched_count=1, modified_count=int(replaced != doc), upserted_id=None)
+
+    async def distinct(self, key: str, filter: Optional[dict] = None, **kwargs) -> List[Any]:
+        await self._database.client._round_trip()
+        values = []
+        for doc in self._docs.values():
+            value = _get(doc, key)
+            if value is not _MISSING and matches(doc, filter) and value not in values:
+                values.append(value)
+        return values
+
+    async def update_many(self, filter: dict, update: dict, **kwargs) -> _Result:
+        await self._database.client._round_trip()
+        targets = [doc for doc in self._docs.values() if matches(doc, filter)]
+        modified = sum(int(self._update(doc, update) != doc) for doc in targets)
+        return _Result(matched_count=len(targets), modified_count=modified, upserted_id=None)
+
+    async def find_one_and_update(self, filter: dict, update: dict, projection: Optional[dict] = None,
+                                  return_document: bool = False, sort: Optional[list] = None,
+                                  **kwargs) -> Optional[dict]:
+        await self._database.client._round_trip()
+        if sort:
+            cursor = FakeCursor(self, filter, None).sort(sort)
+            first = cursor._materialize()[:1]
+            doc = self._docs[first[0]["_id"]] if first else None
+        else:
+            doc = self._find(filter)
+        if doc is None:
+            return None
+        updated = self._update(doc, update)
+        return _project(updated if return_document else doc, projection)
+
+    def aggregate(self, pipeline: List[dict], **kwargs) -> FakeCursor:
+        """Only $match stages and a $group on field paths, without accumulators"""
+        docs = list(self._docs.values())
+        for stage in pipeline:
+            if "$match" in stage:
+                docs = [doc for doc in docs if matches(doc, stage["$match"])]
+            elif "$group" in stage:
+                docs = _group(docs, stage["$group"]["_id"])
+            else:
+                raise NotImplementedError(f"Unsupported aggregation stage {stage}")
+        collection = FakeCollection(self._database, self.name)
+        collection._docs = {i: doc for i, doc in enumerate(docs)}
+        return FakeCursor(collection, None, None)
+
+    async def delete_one(self, filter: dict, **kwargs) -> _Result:
+        await self._database.client._round_trip()
+        doc = self._find(filter)
+        if doc is not None:
+            del self._docs[doc["_id"]]
+        return _Result(deleted_count=int(doc is not None))
+
+    async def delete_many(self, filter: dict, **kwargs) -> _Result:
+        await self._database.client._round_trip()
+        ids = [doc_id for doc_id, doc in self._docs.items() if matches(doc, filter)]
+        for doc_id in ids:
+            del self._docs[doc_id]
+        return _Result(deleted_count=len(ids))
+
+    async def create_index(self, keys, name: Optional[str] = None, unique: bool = False,
+                           sparse: bool = False, **kwargs) -> str:
+        await self._database.client._round_trip()
+        if isinstance(keys, str):
+            keys = [(keys, 1)]
+        name = name or "_".join(f"{field}_{direction}" for field, direction in keys)
+        self._indexes[name] = {"keys": list(keys), "unique": unique, "sparse": sparse}
+        self.exists = True
+        return name
+
+    async def create_indexes(self, indexes, **kwargs) -> List[str]:
+        names = []
+        for index in indexes:
+            document = index.document
+            names.append(await self.create_index(
+                list(document["key"].items()),
+                name=document.get("name"),
+                unique=document.get("unique", False),
+                sparse=document.get("sparse", False),
+            ))
+        return names
+
+    async def index_information(self) -> Dict[str, dict]:
+        await self._database.client._round_trip()
+        return {name: {"key": index["keys"], "unique": index["unique"]}
+                for name, index in self._indexes.items()}
+
+    async def rename(self, new_name: str, **kwargs) -> None:
+        await self._database.client._round_trip()
+        target = self._database[new_name]
+        if not self.exists:
+            raise OperationFailure("source namespace does not exist", NAMESPACE_NOT_FOUND)
+        if target.exists:
+            raise OperationFailure("target namespace exists", NAMESPACE_EXISTS)
+        target._docs, target._indexes, target.exists = self._docs, self._indexes, True
+        self._reset()
+
+    async def drop(self, **kwargs) -> None:
+        await self._database.client._round_trip()
+        self._reset()
+
+
+class FakeDatabase:
+    """Database holding named collections"""
+
+    def __init__(self, client: "FakeMotorClient", name: str):
+        self.client = client
+        self.name = name
+        self._collections: Dict[str, FakeCollection] = {}
+
+    def __getitem__(self, name: str) -> FakeCollection:
+        # One object per name, so every handle sees the same documents
+        collection = self._collections.get(name)
+        if collection is None:
+            collection = self._collections[name] = FakeCollection(self, name)
+        return collection
+
+    def get_collection(self, name: str, **options) -> FakeCollection:
+        return self[name]
+
+    def with_options(self, **options) -> "FakeDatabase":
+        return self
+
+    async def create_collection(self, name: str, **options) -> FakeCollection:
+        await self.client._round_trip()
+        collection = self[name]
+        if collection.exists:
+            raise CollectionInvalid(f"collection {name} already exists")
+        collection.exists = True
+        return collection
+
+    async def list_collection_names(self, filter: Optional[dict] = None, **kwargs) -> List[str]:
+        await self.client._round_trip()
+        return [name for name, collection in self._collections.items()
+                if collection.exists and matches({"name": name}, filter)]
+
+    async def drop_collection(self, name: str, **kwargs) -> None:
+        await self.client._round_trip()
+        self[name]._reset()
+
+    async def command(self, command, value=None, **kwargs) -> dict:
+        await self.client._round_trip()
+        if command == "collMod":
+            if not self[value].exists:
+                raise OperationFailure("ns does not exist", NAMESPACE_NOT_FOUND)
+            return {"ok": 1.0}
+        if command == "ping":
+            return {"ok": 1.0}
+        raise NotImplementedError(f"Command {command} is not supported")
+
+
+class FakeMotorClient:
+    """
+    Client holding named databases
+
+    Args:
+        latency: Seconds each operation waits, standing in for a round trip.
+            Zero still yields to the event loop once.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self._databases: Dict[str, FakeDatabase] = {}
+        # Operations served so far
+        self.operations = 0
+
+    async def _round_trip(self) -> None:
+        self.operations += 1
+        await asyncio.sleep(self.latency)
+
+    def __getitem__(self, name: str) -> FakeDatabase:
+        database = self._databases.get(name)
+        if database is None:
+            database = self._databases[name] = FakeDatabase(self, name)
+        return database
+
+    def get_database(self, name: str, **options) -> FakeDatabase:
+        return self[name]
+
+    def get_default_database(self, default: Optional[str] = None, **options) -> FakeDatabase:
+        return self[default]
+
+    async def drop_database(self, name: str, **kwargs) -> None:
+        await self._round_trip()
+        self._databases.pop(name, None)
+
+    def close(self) -> None:
+        pass
+
+
+def install(client: FakeMotorClient) -> FakeDatabase:
+    """
+    Point the app's master database at an in-memory client
+
+    Replaces what ``init_db`` sets up, without connecting anywhere.
+
+    Returns:
+        The master database
+    """
+    db_client.client = client
+    db_client.database = client[db_client.DATABASE_NAME]
+    db_client._db_initialized = True
+    return db_client.database
@@ -0,0 +1,291 @@
+"""
+Micro-benchmarks of the per-request primitives
+
+Times the functions every request goes through: slugify, organization
+document serialization, create_response, JWT creation and verification,
+get_current_admin and pydantic validation of OrgCreateRequest, plus the
+encoding of a large organization list by each response class (the
+list_response_* benchmarks; "starlette_prepass" is Starlette's JSONResponse
+after the per-document ISO conversion the services used to do). Each
+benchmark is calibrated to run for at least --min-time per round and
+reports nanoseconds per call over --rounds rounds, plus the peak and
+retained memory one call allocates (measured separately under
+tracemalloc, so tracing doesn't skew the timings).
+
+Results are appended to a JSON lines history file, tagged with the git
+commit, and compared against the previous entry. No MongoDB is needed.
+
+Usage:
+    python -m benchmarks.hot_paths
+    python -m benchmarks.hot_paths --filter jwt --rounds 10
+    python -m benchmarks.hot_paths --check --tolerance 0.25
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+from bson import ObjectId
+from fastapi.responses import JSONResponse
+
+from app.auth.dependencies import get_current_admin
+from app.models.org import OrgCreateRequest
+from app.services.org_service import serialize_org, slugify
+from app.utils.jwt import create_access_token, verify_token
+from app.utils.responses import ORJSONResponse, StdlibJSONResponse, create_response, orjson
+
+DEFAULT_HISTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "history", "hot_paths.jsonl")
+
+
+class Benchmark:
+    """
+    A function to time
+
+    Args:
+        name: Benchmark name
+        func: Function under test
+        make_args: Builds fresh arguments for one call, for functions that
+            mutate their input; built before timing starts
+    """
+
+    def __init__(self, name: str, func: Callable, make_args: Optional[Callable[[], tuple]] = None):
+        self.name = name
+        self.func = func
+        self.make_args = make_args
+
+    def batch(self, calls: int) -> float:
+        """Seconds taken by ``calls`` calls"""
+        func = self.func
+        if self.make_args is None:
+            started = time.perf_counter()
+            for _ in range(calls):
+                func()
+            return time.perf_counter() - started
+        args = self.arguments(calls)
+        started = time.perf_counter()
+        for call_args in args:
+            func(*call_args)
+        return time.perf_counter() - started
+
+    def arguments(self, calls: int) -> List[tuple]:
+        """Arguments for ``calls`` calls"""
+        if self.make_args is None:
+            return [()] * calls
+        return [self.make_args() for _ in range(calls)]
+
+
+def run_coroutine(coro):
+    """
+    Run a coroutine that never suspends, without an event loop
+
+    Keeps event loop overhead out of the numbers for async functions such
+    as FastAPI dependencies that don't actually await I/O.
+    """
+    try:
+        coro.send(None)
+    except StopIteration as done:
+        return done.value
+    coro.close()
+    raise RuntimeError("Benchmarked coroutine suspended; it needs an event loop")
+
+
+def calibrate(benchmark: Benchmark, min_time: float) -> int:
+    """Number of calls per round so that a round lasts at least ``min_time``"""
+    calls = 1
+    while True:
+        elapsed = benchmark.batch(calls)
+        if elapsed >= min_time:
+            return calls
+        calls = calls * 10 if elapsed < min_time / 10 else int(calls * min_time / elapsed * 1.2) + 1
+
+
+def allocations(benchmark: Benchmark, calls: int = 100) -> Dict[str, float]:
+    """
+    Memory allocated by calls, excluding their arguments
+
+    Peak is the most one call has live at once; retained is what stays
+    allocated per call once the result is dropped, e.g. caches or leaks.
+    """
+    func = benchmark.func
+    warmup, first, *rest = benchmark.arguments(calls + 2)
+    func(*warmup)
+    tracemalloc.start()
+    try:
+        baseline, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        func(*first)
+        _, peak = tracemalloc.get_traced_memory()
+        before, _ = tracemalloc.get_traced_memory()
+        for call_args in rest:
+            func(*call_args)
+        after, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        "peak_bytes_per_call": peak - baseline,
+        "retained_bytes_per_call": round((after - before) / calls, 1),
+    }
+
+
+def measure(benchmark: Benchmark, rounds: int, min_time: float) -> Dict:
+    """Time a benchmark and measure its allocations"""
+    calls = calibrate(benchmark, min_time)
+    per_call_ns = [benchmark.batch(calls) / calls * 1e9 for _ in range(rounds)]
+    return {
+        "name": benchmark.name,
+        "calls_per_round": calls,
+        "rounds": rounds,
+        "min_ns": round(min(per_call_ns), 1),
+        "median_ns": round(statistics.median(per_call_ns), 1),
+        "mean_ns": round(statistics.fmean(per_call_ns), 1),
+        "stdev_ns": round(statistics.stdev(per_call_ns), 1) if rounds > 1 else 0.0,
+        "ops_per_second": round(1e9 / statistics.median(per_call_ns)),
+        **allocations(benchmark),
+    }
+
+
+def _org_document() -> dict:
+    now = datetime.utcnow()
+    return {
+        "_id": ObjectId(),
+        "organization_name": "Acme Corporation",
+        "slug": "org_acme_corporation",
+        "collection_name": "org_acme_corporation",
+        "tenancy": "collection",
+        "cluster": "default",
+        "created_at": now,
+        "updated_at": now,
+    }
+
+
+_CLAIMS = {
+    "sub": "65a1f0c2e4b0a1b2c3d4e5f6",
+    "email": "admin@acme.example.com",
+    "organization_id": "65a1f0c2e4b0a1b2c3d4e5f7",
+    "type": "admin",
+}
+_TOKEN = create_access_token(_CLAIMS)
+_ORG_CREATE_PAYLOAD = {
+    "organization_name": "Acme Corporation",
+    "admin_email": "admin@acme.example.com",
+    "admin_password": "S3cure-Passw0rd!",
+}
+_RESPONSE_DATA = serialize_org(_org_document())
+_TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+# Organizations per list response
+_LIST_SIZE = 1000
+_ORG_LIST = [serialize_org(_org_document()) for _ in range(_LIST_SIZE)]
+
+
+def _prepass_list_response(docs: List[dict]) -> JSONResponse:
+    """The list path before native datetime encoding: ISO strings first"""
+    for doc in docs:
+        for field in ("created_at", "updated_at"):
+            doc[field] = doc[field].isoformat()
+    return JSONResponse(content=docs)
+
+
+BENCHMARKS: List[Benchmark] = [
+    Benchmark("slugify", lambda: slugify("Acme Corporation (EMEA) - R&D")),
+    Benchmark("serialize_org", serialize_org, lambda: (_org_document(),)),
+    Benchmark("create_response", lambda: create_response(data=_RESPONSE_DATA, trace_id=_TRACE_ID)),
+    Benchmark("create_access_token", lambda: create_access_token(_CLAIMS)),
+    Benchmark("verify_token", lambda: verify_token(_TOKEN)),
+    Benchmark("get_current_admin", lambda: run_coroutine(get_current_admin(_TOKEN))),
+    Benchmark("validate_org_create", lambda: OrgCreateRequest.model_validate(_ORG_CREATE_PAYLOAD)),
+    Benchmark("list_response_starlette_prepass", _prepass_list_response,
+              lambda: ([dict(doc) for doc in _ORG_LIST],)),
+    Benchmark("list_response_stdlib", lambda: StdlibJSONResponse(content=_ORG_LIST)),
+]
+if orjson is not None:
+    BENCHMARKS.append(Benchmark("list_response_orjson", lambda: ORJSONResponse(content=_ORG_LIST)))
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def last_run(history_path: str) -> Optional[Dict]:
+    """Most recent entry of a history file"""
+    try:
+        with open(history_path, encoding="utf-8") as f:
+            lines = [line for line in f if line.strip()]
+    except FileNotFoundError:
+        return None
+    return json.loads(lines[-1]) if lines else None
+
+
+def compare(results: List[Dict], previous: Dict, tolerance: float) -> List[str]:
+    """
+    Benchmarks whose median or peak allocation grew by more than ``tolerance``
+
+    Returns:
+        Human-readable regressions
+    """
+    before = {result["name"]: result for result in previous["results"]}
+    regressions = []
+    for result in results:
+        old = before.get(result["name"])
+        if old is None:
+            continue
+        if result["median_ns"] > old["median_ns"] * (1 + tolerance):
+            regressions.append(
+                f"{result['name']}: median {old['median_ns']}ns -> {result['median_ns']}ns")
+        if result["peak_bytes_per_call"] > old["peak_bytes_per_call"] * (1 + tolerance):
+            regressions.append(
+                f"{result['name']}: peak allocation {old['peak_bytes_per_call']}B -> "
+                f"{result['peak_bytes_per_call']}B")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--filter", help="Only run benchmarks whose name contains this")
+    parser.add_argument("--rounds", type=int, default=7)
+    parser.add_argument("--min-time", type=float, default=0.1, help="Minimum seconds per round")
+    parser.add_argument("--history", default=DEFAULT_HISTORY, help="JSON lines file of past runs")
+    parser.add_argument("--no-save", action="store_true", help="Don't append this run to the history")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed relative slowdown against the previous run")
+    parser.add_argument("--check", action="store_true", help="Exit 1 on regressions")
+    args = parser.parse_args(argv)
+
+    selected = [b for b in BENCHMARKS if not args.filter or args.filter in b.name]
+    results = []
+    for benchmark in selected:
+        result = measure(benchmark, args.rounds, args.min_time)
+        results.append(result)
+        print(json.dumps(result), flush=True)
+
+    previous = last_run(args.history)
+    regressions = compare(results, previous, args.tolerance) if previous else []
+    for regression in regressions:
+        print(f"REGRESSION {regression}", file=sys.stderr)
+
+    if not args.no_save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.history)), exist_ok=True)
+        with open(args.history, "a", encoding="utf-8") as f:
+            f.write(json.dumps({
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+                "commit": git_commit(),
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "results": results,
+            }) + "\n")
+
+    return 1 if args.check and regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,356 @@
+"""
+Load test the organization API
+
+Drives /admin/login, /org/create, /org/get, /org/update and /org/delete
+with a weighted request mix at a fixed concurrency, then reports
+throughput and p50/p95/p99 latency per operation as JSON.
+
+By default the app runs in-process against the in-memory Motor stand-in in
+benchmarks/fake_mongo.py, so no server or database is needed and runs are
+reproducible for a given seed. --storage memory uses the in-memory
+repositories instead, taking the driver out of the picture. Pass --target
+to load a running deployment instead.
+
+Each run seeds --orgs organizations (with admins) before measuring. Creates
+add new organizations; updates and deletes check an organization out of the
+shared pool first, so concurrent workers never race on the same one.
+
+Usage:
+    python -m benchmarks.load_test --concurrency 32 --duration 30
+    python -m benchmarks.load_test --mix get=20,login=1,create=1,update=1,delete=1
+    python -m benchmarks.load_test --target http://localhost:8000 --output run.json
+    python -m benchmarks.load_test --save-baseline benchmarks/baseline.json
+    python -m benchmarks.load_test --baseline benchmarks/baseline.json --tolerance 0.2
+
+With --baseline the exit status is 1 when an operation's p95 latency grew,
+or the throughput fell, by more than the tolerance.
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import sys
+import time
+import uuid
+from collections import defaultdict
+
+import httpx
+
+from benchmarks.tenancy_modes import percentile
+
+OPERATIONS = ("login", "create", "get", "update", "delete")
+DEFAULT_MIX = "get=20,login=2,create=1,update=1,delete=1"
+PASSWORD = "LoadTest123!"
+
+
+def parse_mix(spec):
+    """
+    Parse a request mix such as "get=20,create=1"
+
+    Returns:
+        Mapping of operation to relative weight
+    """
+    mix = {}
+    for entry in filter(None, (part.strip() for part in spec.split(","))):
+        name, sep, weight = entry.partition("=")
+        if not sep or name not in OPERATIONS:
+            raise ValueError(f"Invalid mix entry '{entry}', expected one of {', '.join(OPERATIONS)}")
+        mix[name] = float(weight)
+    if not any(mix.values()):
+        raise ValueError("The request mix is empty")
+    return mix
+
+
+class Workload:
+    """Organizations in play and the requests that act on them"""
+
+    def __init__(self, client, rng, run_id):
+        self.client = client
+        self.rng = rng
+        self.run_id = run_id
+        self._sequence = 0
+        # Organizations no worker is currently updating or deleting
+        self.idle = []
+        self.tokens = {}
+
+    def _new_name(self):
+        self._sequence += 1
+        return f"lt_{self.run_id}_{self._sequence}"
+
+    def _checkout(self):
+        if not self.idle:
+            return None
+        return self.idle.pop(self.rng.randrange(len(self.idle)))
+
+    async def create(self):
+        name = self._new_name()
+        response = await self.client.post("/org/create", json={
+            "organization_name": name,
+            "admin_email": f"{name}@loadtest.example.com",
+            "admin_password": PASSWORD,
+        })
+        if response.status_code == 201:
+            self.idle.append({"name": name, "email": f"{name}@loadtest.example.com"})
+        return response, 201
+
+    async def login(self):
+        if not self.idle:
+            return None, 200
+        return await self._login_as(self.rng.choice(self.idle))
+
+    async def get(self):
+        org = self.rng.choice(self.idle) if self.idle else None
+        if org is None:
+            return None, 200
+        return await self.client.get("/org/get", params={"organization_name": org["name"]}), 200
+
+    async def update(self):
+        org = self._checkout()
+        if org is None:
+            return None, 200
+        new_name = self._new_name()
+        try:
+            response = await self.client.put("/org/update", json={
+                "current_organization_name": org["name"],
+                "new_organization_name": new_name,
+                "admin_email": org["email"],
+                "admin_password": PASSWORD,
+            })
+            if response.status_code == 200:
+                org["name"] = new_name
+        finally:
+            self.idle.append(org)
+        return response, 200
+
+    async def delete(self):
+        # Keep the pool from draining; deletes are skipped near empty
+        if len(self.idle) < 2:
+            return None, 200
+        org = self._checkout()
+        token = self.tokens.get(org["email"])
+        if token is None:
+            response, _ = await self._login_as(org)
+            token = self.tokens.get(org["email"])
+            if token is None:
+                self.idle.append(org)
+                return response, 200
+        response = await self.client.delete(
+            "/org/delete", params={"organization_name": org["name"]},
+            headers={"Authorization": f"Bearer {token}"})
+        if response.status_code != 200:
+            self.idle.append(org)
+        return response, 200
+
+    async def _login_as(self, org):
+        response = await self.client.post("/admin/login", json={"email": org["email"], "password": PASSWORD})
+        if response.status_code == 200:
+            self.tokens[org["email"]] = response.json()["data"]["access_token"]
+        return response, 200
+
+
+async def seed(workload, orgs, concurrency):
+    """Create the initial organizations and their admins"""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def create_one():
+        async with semaphore:
+            await workload.create()
+
+    await asyncio.gather(*(create_one() for _ in range(orgs)))
+    if not workload.idle:
+        raise RuntimeError("Seeding failed: no organization could be created")
+
+
+async def run_workers(workload, mix, concurrency, duration, requests):
+    """
+    Run the request mix until the duration or request count is reached
+
+    Returns:
+        Latencies in seconds, error counts and status codes per operation,
+        and the elapsed time
+    """
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    statuses = defaultdict(lambda: defaultdict(int))
+    issued = 0
+    deadline = time.perf_counter() + duration if duration else None
+
+    async def worker():
+        nonlocal issued
+        while True:
+            if requests and issued >= requests:
+                return
+            if deadline is not None and time.perf_counter() >= deadline:
+                return
+            issued += 1
+            name = workload.rng.choices(names, weights)[0]
+            started = time.perf_counter()
+            try:
+                response, expected = await getattr(workload, name)()
+            except httpx.HTTPError:
+                errors[name] += 1
+                continue
+            if response is None:
+                # Nothing to act on yet; let other workers make progress
+                issued -= 1
+                await asyncio.sleep(0)
+                continue
+            latencies[name].append(time.perf_counter() - started)
+            statuses[name][response.status_code] += 1
+            if response.status_code != expected:
+                errors[name] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, errors, statuses, time.perf_counter() - started
+
+
+def summarize(samples, errors, elapsed, statuses=None):
+    """Throughput and latency percentiles in milliseconds"""
+    summary = {
+        "requests": len(samples),
+        "errors": errors,
+        "throughput_rps": round(len(samples) / elapsed, 1) if elapsed else 0.0,
+    }
+    if samples:
+        summary.update({
+            "mean_ms": round(statistics.fmean(samples) * 1000, 2),
+            "p50_ms": round(percentile(samples, 50) * 1000, 2),
+            "p95_ms": round(percentile(samples, 95) * 1000, 2),
+            "p99_ms": round(percentile(samples, 99) * 1000, 2),
+            "max_ms": round(max(samples) * 1000, 2),
+        })
+    if statuses is not None:
+        summary["status_codes"] = {str(code): count for code, count in sorted(statuses.items())}
+    return summary
+
+
+def compare(report, baseline, tolerance):
+    """
+    Compare a report against a baseline
+
+    Returns:
+        Human-readable regressions; empty when within tolerance
+    """
+    regressions = []
+    for name, current in {"overall": report["overall"], **report["operations"]}.items():
+        previous = baseline["overall"] if name == "overall" else baseline["operations"].get(name)
+        if not previous or "p95_ms" not in previous or "p95_ms" not in current:
+            continue
+        if current["p95_ms"] > previous["p95_ms"] * (1 + tolerance):
+            regressions.append(
+                f"{name}: p95 {previous['p95_ms']}ms -> {current['p95_ms']}ms")
+        if current["throughput_rps"] < previous["throughput_rps"] * (1 - tolerance):
+            regressions.append(
+                f"{name}: throughput {previous['throughput_rps']} -> {current['throughput_rps']} rps")
+    return regressions
+
+
+async def run(args):
+    """Run one load test and return the report"""
+    mix = parse_mix(args.mix)
+    if args.target:
+        client = httpx.AsyncClient(base_url=args.target, timeout=args.timeout)
+        target = args.target
+    else:
+        from benchmarks.fake_mongo import FakeMotorClient, install
+        from app.db.client import ensure_indexes
+        from app.main import app
+        from app.repositories import provider
+
+        if args.storage == "memory":
+            provider.use_memory_storage()
+        else:
+            install(FakeMotorClient(latency=args.db_latency_ms / 1000))
+            await ensure_indexes()
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://load-test",
+                                   timeout=args.timeout)
+        target = f"in-process ({args.storage})"
+
+    rng = random.Random(args.seed)
+    # Names must not collide with earlier runs against a real deployment
+    run_id = uuid.uuid4().hex[:8] if args.target else f"{args.seed:08x}"
+    async with client:
+        workload = Workload(client, rng, run_id)
+        await seed(workload, args.orgs, args.concurrency)
+        latencies, errors, statuses, elapsed = await run_workers(
+            workload, mix, args.concurrency, args.duration, args.requests)
+
+    all_samples = [sample for samples in latencies.values() for sample in samples]
+    return {
+        "config": {
+            "target": target,
+            "storage": None if args.target else args.storage,
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "requests": args.requests,
+            "mix": mix,
+            "orgs": args.orgs,
+            "seed": args.seed,
+            "db_latency_ms": None if args.target or args.storage == "memory" else args.db_latency_ms,
+        },
+        "elapsed_seconds": round(elapsed, 3),
+        "overall": summarize(all_samples, sum(errors.values()), elapsed),
+        "operations": {
+            name: summarize(latencies[name], errors[name], elapsed, statuses[name])
+            for name in mix if latencies[name] or errors[name]
+        },
+    }
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--target", help="Base URL of a running deployment; in-process if omitted")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds to run (0 to use --requests)")
+    parser.add_argument("--requests", type=int, default=0, help="Stop after this many requests")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Weighted request mix")
+    parser.add_argument("--orgs", type=int, default=20, help="Organizations seeded before measuring")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--storage", choices=["fake-mongo", "memory"], default="fake-mongo",
+                        help="In-process storage: the Motor stand-in, or the in-memory repositories "
+                             "(no driver code at all, for pure CPU profiles)")
+    parser.add_argument("--db-latency-ms", type=float, default=0.5,
+                        help="Simulated round trip of the in-memory database")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    parser.add_argument("--baseline", help="Compare against this stored report")
+    parser.add_argument("--save-baseline", help="Store the report as a baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Allowed relative regression against the baseline")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if not args.duration and not args.requests:
+        raise SystemExit("Set --duration or --requests")
+
+    report = asyncio.run(run(args))
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        report["regressions"] = regressions
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+
+    for regression in regressions:
+        print(f"REGRESSION {regression}", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,144 @@
+"""
+Compare dedicated (collection-per-tenant) and pooled tenancy at scale
+
+For each tenant count the benchmark provisions tenants in a scratch database,
+writes a few records per tenant, then measures random-tenant read latency.
+It also reports the server-side footprint: collections, indexes, storage
+and the WiredTiger data handles that collection-per-tenant multiplies.
+
+Usage:
+    python -m benchmarks.tenancy_modes --tenants 1000 10000 100000
+
+Requires a MongoDB you can create and drop scratch databases on. 100k
+dedicated tenants means 300k WiredTiger files; size the server accordingly.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import time
+from datetime import datetime
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from app.services.tenancy import TENANCY_COLLECTION, TENANCY_POOLED, shared_collection_name
+from app.services.tenant_provisioning import provision_collection
+from app.services.tenant_router import TenantCollection
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of samples"""
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+async def gather_limited(coros, concurrency):
+    """Run coroutines with bounded concurrency"""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(coro):
+        async with semaphore:
+            return await coro
+
+    return await asyncio.gather(*(run(c) for c in coros))
+
+
+async def provision_tenants(db, mode, tenants, shared_collections, concurrency):
+    """Provision tenants and return their tenant-scoped collections"""
+    if mode == TENANCY_POOLED:
+        names = {shared_collection_name(f"org_t{i}", shared_collections) for i in range(tenants)}
+        await gather_limited(
+            [provision_collection(db, name, shared=True) for name in names], concurrency)
+        return [
+            TenantCollection(
+                db[shared_collection_name(f"org_t{i}", shared_collections)], f"t{i}", pooled=True)
+            for i in range(tenants)
+        ]
+
+    await gather_limited(
+        [provision_collection(db, f"org_t{i}") for i in range(tenants)], concurrency)
+    return [TenantCollection(db[f"org_t{i}"], f"t{i}") for i in range(tenants)]
+
+
+async def run_case(client, mode, tenants, args):
+    """Benchmark one tenancy mode at one tenant count"""
+    db = client[f"bench_tenancy_{mode}_{tenants}"]
+    await client.drop_database(db.name)
+
+    started = time.perf_counter()
+    collections = await provision_tenants(db, mode, tenants, args.shared_collections, args.concurrency)
+    provision_seconds = time.perf_counter() - started
+
+    now = datetime.utcnow()
+    started = time.perf_counter()
+    await gather_limited(
+        [
+            collection.insert_one({"data": {"n": n}, "created_at": now, "updated_at": now})
+            for collection in collections
+            for n in range(args.docs_per_tenant)
+        ],
+        args.concurrency,
+    )
+    insert_seconds = time.perf_counter() - started
+
+    async def timed_read(collection):
+        t0 = time.perf_counter()
+        cursor = collection.find().sort("created_at", -1).limit(10)
+        await cursor.to_list(length=10)
+        return (time.perf_counter() - t0) * 1000
+
+    latencies = await gather_limited(
+        [timed_read(random.choice(collections)) for _ in range(args.reads)], args.concurrency)
+
+    db_stats = await db.command("dbStats")
+    server_status = await client.admin.command("serverStatus")
+    wired_tiger = server_status.get("wiredTiger", {})
+    data_handles = wired_tiger.get("data-handle", {})
+    cache = wired_tiger.get("cache", {})
+
+    result = {
+        "mode": mode,
+        "tenants": tenants,
+        "provision_seconds": round(provision_seconds, 3),
+        "insert_docs_per_second": round(tenants * args.docs_per_tenant / insert_seconds, 1),
+        "read_p50_ms": round(statistics.median(latencies), 3),
+        "read_p99_ms": round(percentile(latencies, 99), 3),
+        "collections": db_stats.get("collections"),
+        "indexes": db_stats.get("indexes"),
+        "storage_bytes": db_stats.get("storageSize"),
+        "index_bytes": db_stats.get("indexSize"),
+        "wt_data_handles": data_handles.get("connection data handles currently active"),
+        "wt_cache_bytes": cache.get("bytes currently in the cache"),
+    }
+
+    if not args.keep:
+        await client.drop_database(db.name)
+    return result
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--mongo-uri", default=os.getenv("MONGO_URI", "mongodb://localhost:27017"))
+    parser.add_argument("--tenants", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--modes", nargs="+", default=[TENANCY_COLLECTION, TENANCY_POOLED])
+    parser.add_argument("--docs-per-tenant", type=int, default=5)
+    parser.add_argument("--reads", type=int, default=5000)
+    parser.add_argument("--shared-collections", type=int, default=16)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch databases")
+    args = parser.parse_args()
+
+    client = AsyncIOMotorClient(args.mongo_uri)
+    try:
+        for tenants in args.tenants:
+            for mode in args.modes:
+                print(json.dumps(await run_case(client, mode, tenants, args)), flush=True)
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,102 @@
+"""
+Cost of tenant database handles in database-per-tenant mode
+
+Measures creating a Motor database handle per request against the bounded
+LRU in app/db/tenant_databases.py, at thousands of active tenants, for a
+uniform and a skewed (Zipf) access pattern. Handle creation doesn't touch
+the server, so no MongoDB is needed.
+
+Usage:
+    python -m benchmarks.tenant_db_handles --tenants 1000 5000 20000 --cache-sizes 256 1024 4096
+"""
+import argparse
+import bisect
+import itertools
+import json
+import random
+import time
+import tracemalloc
+
+from app.db import placement
+from app.db.tenant_databases import TenantDatabaseCache
+
+BENCH_CLUSTER = "bench"
+
+
+def access_pattern(tenants, requests, skew, seed=42):
+    """Tenant indexes to look up, uniform (skew=0) or Zipf-distributed"""
+    rng = random.Random(seed)
+    if skew <= 0:
+        return [rng.randrange(tenants) for _ in range(requests)]
+    weights = [1 / (rank ** skew) for rank in range(1, tenants + 1)]
+    cumulative = list(itertools.accumulate(weights))
+    total = cumulative[-1]
+    return [bisect.bisect(cumulative, rng.random() * total) for _ in range(requests)]
+
+
+def bench_uncached(client, names, pattern):
+    """Create a fresh handle on every lookup"""
+    started = time.perf_counter()
+    for index in pattern:
+        client[names[index]]
+    return (time.perf_counter() - started) / len(pattern) * 1e9
+
+
+def bench_cached(cache_size, names, pattern):
+    """Look handles up through the LRU"""
+    cache = TenantDatabaseCache(cache_size)
+    started = time.perf_counter()
+    for index in pattern:
+        cache.get(names[index], BENCH_CLUSTER)
+    ns_per_lookup = (time.perf_counter() - started) / len(pattern) * 1e9
+    return ns_per_lookup, cache.stats()
+
+
+def bytes_per_handle(cache_size, names):
+    """Retained memory of a full cache, per handle"""
+    cache = TenantDatabaseCache(cache_size)
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    for name in names[:cache_size]:
+        cache.get(name, BENCH_CLUSTER)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    retained = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    return retained / min(cache_size, len(names))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--mongo-uri", default="mongodb://localhost:27017")
+    parser.add_argument("--tenants", type=int, nargs="+", default=[1000, 5000, 20000])
+    parser.add_argument("--cache-sizes", type=int, nargs="+", default=[256, 1024, 4096])
+    parser.add_argument("--requests", type=int, default=200000)
+    parser.add_argument("--skews", type=float, nargs="+", default=[0.0, 1.1])
+    args = parser.parse_args()
+
+    placement.configure_clusters(f"{BENCH_CLUSTER}={args.mongo_uri}")
+    client = placement.get_cluster_client(BENCH_CLUSTER)
+    try:
+        for tenants in args.tenants:
+            names = [f"org_tenant_{i}" for i in range(tenants)]
+            for skew in args.skews:
+                pattern = access_pattern(tenants, args.requests, skew)
+                uncached_ns = bench_uncached(client, names, pattern)
+                for cache_size in args.cache_sizes:
+                    cached_ns, stats = bench_cached(cache_size, names, pattern)
+                    print(json.dumps({
+                        "tenants": tenants,
+                        "skew": skew,
+                        "cache_size": cache_size,
+                        "uncached_ns_per_lookup": round(uncached_ns),
+                        "cached_ns_per_lookup": round(cached_ns),
+                        "hit_rate": round(stats["hits"] / args.requests, 4),
+                        "evictions": stats["evictions"],
+                        "bytes_per_handle": round(bytes_per_handle(cache_size, names)),
+                    }), flush=True)
+    finally:
+        placement.close_cluster_clients()
+
+
+if __name__ == "__main__":
+    main()
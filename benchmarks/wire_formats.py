@@ -0,0 +1,72 @@
+"""
+Encode and decode cost of the negotiated wire formats
+
+Compares JSON (stdlib and orjson), MessagePack and CBOR on the standard
+response envelope, for one organization and for a list of organizations.
+Encoding goes through the render method of the response class the server
+would use; decoding uses each format's Python library, standing in for an
+internal client. Reports nanoseconds per call and the body size. No
+MongoDB is needed.
+
+Usage:
+    python -m benchmarks.wire_formats
+    python -m benchmarks.wire_formats --list-size 5000 --rounds 10
+"""
+import argparse
+import json
+import sys
+
+from benchmarks.hot_paths import Benchmark, _org_document, measure
+from app.services.org_service import serialize_org
+from app.utils import responses
+
+
+def envelope(data):
+    return {"success": True, "data": data, "error": {}, "trace_id": "4bf92f3577b34da6a3ce929d0e0e4736"}
+
+
+def codecs():
+    """Available formats as name -> (encode, decode)"""
+    available = {"json_stdlib": (responses._stdlib_dumps, json.loads)}
+    if responses.orjson is not None:
+        available["json_orjson"] = (responses._orjson_dumps, responses.orjson.loads)
+    if responses.msgpack is not None:
+        available["msgpack"] = (responses._msgpack_dumps, responses.msgpack.unpackb)
+    if responses.cbor2 is not None:
+        available["cbor"] = (responses._cbor_dumps, responses.cbor2.loads)
+    return available
+
+
+def run(list_size, rounds, min_time):
+    """Measure every format on both payloads"""
+    payloads = {
+        "org": envelope(serialize_org(_org_document())),
+        f"list_{list_size}": envelope([serialize_org(_org_document()) for _ in range(list_size)]),
+    }
+    results = []
+    for payload_name, payload in payloads.items():
+        for codec_name, (encode, decode) in codecs().items():
+            body = encode(payload)
+            for operation, benchmark in (
+                ("encode", Benchmark(f"{payload_name}/{codec_name}/encode", lambda: encode(payload))),
+                ("decode", Benchmark(f"{payload_name}/{codec_name}/decode", lambda: decode(body))),
+            ):
+                result = measure(benchmark, rounds, min_time)
+                result["body_bytes"] = len(body)
+                results.append(result)
+                print(json.dumps(result), flush=True)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--list-size", type=int, default=1000, help="Organizations in the list payload")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.1, help="Minimum seconds per round")
+    args = parser.parse_args(argv)
+    run(args.list_size, args.rounds, args.min_time)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
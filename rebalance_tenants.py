@@ -0,0 +1,53 @@
+"""
+Script to move tenants onto the clusters the placement ring assigns them
+
+Usage:
+    python rebalance_tenants.py            # show planned moves
+    python rebalance_tenants.py --apply    # perform them
+    python rebalance_tenants.py --pin <organization_id> <cluster>
+"""
+import argparse
+import asyncio
+from bson import ObjectId
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from app.db.client import init_db, close_db, get_database  # noqa: E402
+from app.db.placement import close_cluster_clients, get_cluster_names  # noqa: E402
+from app.services.tenant_migration import rebalance_tenants  # noqa: E402
+
+
+async def pin_tenant(organization_id: str, cluster: str):
+    """Pin an organization to a cluster, overriding the hash ring"""
+    if cluster not in get_cluster_names():
+        print(f"Unknown cluster '{cluster}', configured: {', '.join(get_cluster_names())}")
+        return
+    result = await get_database()["organizations"].update_one(
+        {"_id": ObjectId(organization_id)}, {"$set": {"pinned_cluster": cluster}})
+    print(f"Pinned {organization_id} to {cluster}" if result.matched_count else "Organization not found")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Rebalance tenants across clusters")
+    parser.add_argument("--apply", action="store_true", help="Perform the moves")
+    parser.add_argument("--limit", type=int, default=None, help="Maximum number of moves")
+    parser.add_argument("--pin", nargs=2, metavar=("ORGANIZATION_ID", "CLUSTER"))
+    args = parser.parse_args()
+
+    await init_db()
+    try:
+        if args.pin:
+            await pin_tenant(*args.pin)
+
+        moves = await rebalance_tenants(dry_run=not args.apply, limit=args.limit)
+        for organization_id, source, target in moves:
+            print(f"  {organization_id}: {source} -> {target}")
+        print(f"\n{len(moves)} tenant(s) {'moved' if args.apply else 'to move'}")
+    finally:
+        close_cluster_clients()
+        await close_db()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,264 @@
+"""
+Tests for the database circuit breaker and stale organization reads
+"""
+import asyncio
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from pymongo.errors import AutoReconnect, ServerSelectionTimeoutError
+
+from app.api.v1 import org_routes
+from app.auth.dependencies import require_operator
+from app.db import client as db_client
+from app.db.circuit_breaker import (
+    STATE_CLOSED,
+    STATE_HALF_OPEN,
+    STATE_OPEN,
+    CircuitBreaker,
+    CircuitOpenError,
+    db_breaker,
+)
+from app.main import app
+from app.models.organization import OrganizationCreate
+from app.repositories import provider
+from app.services import auth_service, org_service, purge_service, tenant_router
+from app.utils.jwt import create_access_token
+from benchmarks.fake_mongo import FakeMotorClient, install
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _breaker(clock, **kwargs):
+    options = dict(failure_threshold=2, slow_call_seconds=1, open_seconds=10, half_open_probes=1)
+    options.update(kwargs)
+    return CircuitBreaker(clock=clock, **options)
+
+
+class TestCircuitBreaker:
+    """State transitions"""
+
+    def test_opens_after_consecutive_failures(self):
+        """Test that the breaker trips and then fails fast"""
+        clock = FakeClock()
+        breaker = _breaker(clock)
+
+        @breaker.guard
+        async def unavailable():
+            raise ServerSelectionTimeoutError("no servers")
+
+        for _ in range(2):
+            with pytest.raises(ServerSelectionTimeoutError):
+                asyncio.run(unavailable())
+        assert breaker.state == STATE_OPEN
+        with pytest.raises(CircuitOpenError):
+            asyncio.run(unavailable())
+
+    def test_slow_calls_count_as_failures(self):
+        """Test the latency threshold"""
+        clock = FakeClock()
+        breaker = _breaker(clock)
+
+        @breaker.guard
+        async def slow():
+            clock.now += 5
+            return "ok"
+
+        asyncio.run(slow())
+        asyncio.run(slow())
+        assert breaker.state == STATE_OPEN
+
+    def test_success_resets_failures(self):
+        """Test that only consecutive failures trip the breaker"""
+        clock = FakeClock()
+        breaker = _breaker(clock)
+        breaker.after_call(False, True)
+        breaker.after_call(False, False)
+        breaker.after_call(False, True)
+        assert breaker.state == STATE_CLOSED
+
+    def test_application_errors_are_healthy(self):
+        """Test that errors from a responsive database don't trip it"""
+        clock = FakeClock()
+        breaker = _breaker(clock, failure_threshold=1)
+
+        @breaker.guard
+        async def duplicate():
+            raise ValueError("already exists")
+
+        with pytest.raises(ValueError):
+            asyncio.run(duplicate())
+        assert breaker.state == STATE_CLOSED
+
+    def test_half_open_probe(self):
+        """Test that a probe closes or reopens the breaker"""
+        clock = FakeClock()
+        breaker = _breaker(clock)
+        breaker.after_call(False, True)
+        breaker.after_call(False, True)
+
+        clock.now = 10
+        assert breaker.state == STATE_HALF_OPEN
+        assert breaker.before_call() is True
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call()
+        breaker.after_call(True, True)
+        assert breaker.state == STATE_OPEN
+
+        clock.now = 20
+        assert breaker.before_call() is True
+        breaker.after_call(True, False)
+        assert breaker.state == STATE_CLOSED
+
+    def test_nested_calls_counted_once(self):
+        """Test that guarded services calling each other are one call"""
+        clock = FakeClock()
+        breaker = _breaker(clock)
+        breaker.after_call(False, True)
+
+        @breaker.guard
+        async def inner():
+            raise ServerSelectionTimeoutError("no servers")
+
+        @breaker.guard
+        async def outer():
+            await inner()
+
+        with pytest.raises(ServerSelectionTimeoutError):
+            asyncio.run(outer())
+        # One more failure on top of the recorded one trips a threshold of 2
+        assert breaker.state == STATE_OPEN
+
+
+@pytest.fixture
+def strict_breaker(monkeypatch):
+    """The master database breaker, tripped by a single call over 50ms"""
+    for name in ("client", "database", "_db_initialized"):
+        monkeypatch.setattr(db_client, name, getattr(db_client, name))
+    monkeypatch.setattr(provider, "STORAGE_BACKEND", "mongodb")
+    monkeypatch.setattr(db_breaker, "failure_threshold", 1)
+    monkeypatch.setattr(db_breaker, "slow_call_seconds", 0.05)
+    monkeypatch.setattr(db_breaker, "_state", STATE_CLOSED)
+    monkeypatch.setattr(db_breaker, "_failures", 0)
+    return db_breaker
+
+
+class TestGuardedDatabaseCalls:
+    """Only database latency counts, not the services' own work"""
+
+    def test_slow_bcrypt_does_not_trip(self, strict_breaker, monkeypatch):
+        """Test that a slow password check isn't taken for a slow database"""
+        def slow_verify(plain_password, hashed_password):
+            time.sleep(0.1)
+            return True
+
+        db = install(FakeMotorClient())
+        asyncio.run(db["admins"].insert_one({"email": "a@example.com", "hashed_password": "x"}))
+        monkeypatch.setattr(auth_service, "verify_password", slow_verify)
+
+        assert asyncio.run(auth_service.authenticate_admin("a@example.com", "secret")) is not None
+        assert strict_breaker.state == STATE_CLOSED
+
+    def test_slow_provisioning_does_not_trip(self, strict_breaker, monkeypatch):
+        """Test that creating the tenant collection isn't counted as a master database call"""
+        async def slow_provisioning(*args):
+            await asyncio.sleep(0.1)
+
+        install(FakeMotorClient())
+        monkeypatch.setattr(org_service, "create_tenant_collection", slow_provisioning)
+
+        asyncio.run(org_service.create_organization(OrganizationCreate(organization_name="Slow Index Corp")))
+        assert strict_breaker.state == STATE_CLOSED
+
+    def test_slow_database_trips(self, strict_breaker):
+        """Test that a slow repository call still opens the breaker"""
+        install(FakeMotorClient(latency=0.1))
+
+        asyncio.run(org_service.get_organization_by_name("Anyone"))
+        assert strict_breaker.state == STATE_OPEN
+        with pytest.raises(CircuitOpenError):
+            asyncio.run(org_service.get_organization_by_name("Anyone"))
+
+    def test_tenant_lookups_fail_fast(self, strict_breaker):
+        """Test that routing and background organization lookups go through the breaker"""
+        install(FakeMotorClient(latency=0.1))
+        tenant_router.invalidate_tenant()
+
+        asyncio.run(org_service.get_organization_by_name("Anyone"))
+        assert strict_breaker.state == STATE_OPEN
+        with pytest.raises(CircuitOpenError):
+            asyncio.run(tenant_router.get_tenant_collection("65f000000000000000000001"))
+        with pytest.raises(CircuitOpenError):
+            asyncio.run(purge_service.purge_deleted_organizations())
+
+
+class TestStaleOrganizationReads:
+    """/org/get while the database is unavailable"""
+
+    def test_serves_stale_copy(self, monkeypatch):
+        """Test that the last read is served with a stale marker"""
+        async def unavailable(*args, **kwargs):
+            raise CircuitOpenError(5)
+
+        monkeypatch.setattr(org_routes, "get_organization_by_name", unavailable)
+        org_service._remember_organization("Stale Corp", {"id": "1", "organization_name": "Stale Corp"})
+        try:
+            response = TestClient(app).get("/org/get", params={"organization_name": "Stale Corp"})
+        finally:
+            org_service._remember_organization("Stale Corp", None)
+
+        assert response.status_code == 200
+        assert response.headers["X-Data-Stale"] == "true"
+        assert response.json()["data"]["organization_name"] == "Stale Corp"
+
+    def test_unavailable_without_cached_copy(self, monkeypatch):
+        """Test that a miss fails fast with 503"""
+        async def unavailable(*args, **kwargs):
+            raise CircuitOpenError(5)
+
+        monkeypatch.setattr(org_routes, "get_organization_by_name", unavailable)
+        response = TestClient(app).get("/org/get", params={"organization_name": "Unknown Corp"})
+
+        assert response.status_code == 503
+        assert response.json()["error"]["code"] == "DATABASE_UNAVAILABLE"
+        assert response.headers["Retry-After"] == "5"
+
+
+def _auth_headers():
+    token = create_access_token({"sub": "1", "email": "admin@acme.com", "type": "admin"})
+    return {"Authorization": f"Bearer {token}"}
+
+
+class TestUnavailableResponses:
+    """Database outages reported by handlers that catch Exception"""
+
+    def test_delete_reports_503_not_400(self, monkeypatch):
+        """Test that an open breaker during delete is not reported as a bad request"""
+        async def unavailable(*args, **kwargs):
+            raise CircuitOpenError(2.5)
+
+        monkeypatch.setattr(org_routes, "delete_organization_by_name", unavailable)
+        response = TestClient(app).delete(
+            "/org/delete", params={"organization_name": "Acme"}, headers=_auth_headers())
+
+        assert response.status_code == 503
+        assert response.json()["error"]["code"] == "DATABASE_UNAVAILABLE"
+        assert response.headers["Retry-After"] == "3"
+
+    def test_connection_failure_reports_503(self, monkeypatch):
+        """Test that a driver connection error is not reported as an internal error"""
+        async def unreachable(*args, **kwargs):
+            raise AutoReconnect("connection reset by peer")
+
+        monkeypatch.setattr(org_routes, "get_all_organizations", unreachable)
+        monkeypatch.setitem(app.dependency_overrides, require_operator, lambda: {"sub": "1"})
+        response = TestClient(app).get("/org/list", headers=_auth_headers())
+
+        assert response.status_code == 503
+        assert response.json()["error"]["code"] == "DATABASE_UNAVAILABLE"
@@ -0,0 +1,89 @@
+"""
+Tests for MongoDB command metrics, the slow-query log and explain sampling
+"""
+import json
+import logging
+from types import SimpleNamespace
+
+from prometheus_client import REGISTRY
+
+from app.db.monitoring import CommandMetricsListener, collection_label, query_shape
+
+SERVER = ("db1", 27017)
+
+
+def _run_command(listener, name, command, duration_ms, request_id=1, failed=False):
+    listener.started(SimpleNamespace(
+        command=command, command_name=name, database_name="org_master_db",
+        request_id=request_id, connection_id=SERVER, operation_id=request_id))
+    finished = SimpleNamespace(
+        command_name=name, request_id=request_id, connection_id=SERVER,
+        operation_id=request_id, duration_micros=int(duration_ms * 1000))
+    (listener.failed if failed else listener.succeeded)(finished)
+
+
+def _sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+class TestLabels:
+    """Bounded labels and redacted shapes"""
+
+    def test_collection_labels(self):
+        """Test that tenant collections collapse into families"""
+        assert collection_label("find", {"find": "organizations"}) == "organizations"
+        assert collection_label("getMore", {"getMore": 1, "collection": "admins"}) == "admins"
+        assert collection_label("insert", {"insert": "org_acme"}) == "tenant"
+        assert collection_label("find", {"find": "shared_tenants_3"}) == "shared_tenants"
+        assert collection_label("ping", {"ping": 1}) == "-"
+
+    def test_query_shape_strips_values(self):
+        """Test that literal values are not logged"""
+        shape = query_shape({"organization_name": "Acme", "deleted_at": None, "tags": ["a", "b"]})
+        assert shape == {"organization_name": "?", "deleted_at": "?", "tags": ["?"]}
+
+
+class TestCommandMetricsListener:
+    """Latency histograms and the slow-query log"""
+
+    def test_records_latency(self):
+        """Test the per-command, per-collection histogram"""
+        listener = CommandMetricsListener("mongodb://unused", slow_query_ms=1000)
+        before = _sample("mongodb_command_duration_seconds_count", command="find", collection="admins")
+        _run_command(listener, "find", {"find": "admins", "filter": {"email": "a@b.c"}}, 3)
+        assert _sample("mongodb_command_duration_seconds_count",
+                       command="find", collection="admins") == before + 1
+
+    def test_slow_query_logged(self, caplog):
+        """Test that slow commands are logged with their shape only"""
+        listener = CommandMetricsListener("mongodb://unused", slow_query_ms=50)
+        with caplog.at_level(logging.WARNING, logger="app.db.slow_queries"):
+            _run_command(listener, "find", {"find": "organizations", "filter": {"organization_name": "Acme"},
+                                            "lsid": {"id": "x"}, "$db": "org_master_db"}, 120)
+            _run_command(listener, "find", {"find": "organizations"}, 5, request_id=2)
+
+        assert len(caplog.records) == 1
+        record = json.loads(caplog.records[0].getMessage().split(" ", 2)[2])
+        assert record["collection"] == "organizations"
+        assert record["duration_ms"] == 120
+        assert record["shape"] == {"find": "?", "filter": {"organization_name": "?"}}
+
+    def test_explain_sampling(self, caplog):
+        """Test that sampled slow queries get their plan logged"""
+        explained = []
+
+        def explain(database, command):
+            explained.append((database, command))
+            return {"queryPlanner": {"winningPlan": {"stage": "PROJECTION", "inputStage": {"stage": "COLLSCAN"}}}}
+
+        listener = CommandMetricsListener("mongodb://unused", slow_query_ms=50,
+                                          explain_sample_rate=1.0, explain=explain)
+        with caplog.at_level(logging.WARNING, logger="app.db.slow_queries"):
+            _run_command(listener, "find", {"find": "organizations", "filter": {"slug": "acme"},
+                                            "lsid": {"id": "x"}}, 200)
+            listener._explain_executor.shutdown(wait=True)
+
+        assert explained == [("org_master_db", {"find": "organizations", "filter": {"slug": "acme"}})]
+        plan = json.loads(caplog.records[-1].getMessage().split(" ", 3)[3])
+        assert plan["stages"] == ["PROJECTION", "COLLSCAN"]
+        assert plan["collscan"] is True
@@ -0,0 +1,153 @@
+"""
+Tests for negotiated response compression
+"""
+import asyncio
+import gzip
+import json
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import Response, StreamingResponse
+
+from app.middleware import compression as compression_middleware
+from app.middleware.compression import CompressionMiddleware
+from app.utils.compression import compress, is_compressible, negotiate_encoding
+
+brotli = pytest.importorskip("brotli")
+zstandard = pytest.importorskip("zstandard")
+
+LARGE = [{"organization_name": f"org {n}", "slug": f"org_{n}"} for n in range(500)]
+CHUNKS = [json.dumps(item).encode() + b"\n" for item in LARGE]
+
+
+def decompress(encoding, body):
+    if encoding == "gzip":
+        return gzip.decompress(body)
+    if encoding == "br":
+        return brotli.decompress(body)
+    return zstandard.ZstdDecompressor().decompressobj().decompress(body)
+
+
+def build_app(**options):
+    demo = FastAPI()
+    demo.add_middleware(CompressionMiddleware, **options)
+
+    @demo.get("/small")
+    async def small():
+        return {"ok": True}
+
+    @demo.get("/large")
+    async def large():
+        return LARGE
+
+    @demo.get("/image")
+    async def image():
+        return Response(b"\x89PNG" + bytes(4096), media_type="image/png")
+
+    @demo.get("/encoded")
+    async def encoded():
+        return Response(gzip.compress(bytes(4096)), media_type="application/json",
+                        headers={"Content-Encoding": "gzip"})
+
+    @demo.get("/stream")
+    async def stream():
+        async def lines():
+            for chunk in CHUNKS:
+                yield chunk
+
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    return demo
+
+
+def get(path, accept_encoding, **options):
+    async def scenario():
+        transport = httpx.ASGITransport(app=build_app(**options))
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            # Read the raw body; httpx would otherwise decode gzip/br itself
+            async with client.stream("GET", path, headers={"Accept-Encoding": accept_encoding}) as response:
+                return response, b"".join([chunk async for chunk in response.aiter_raw()])
+
+    return asyncio.run(scenario())
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, None),
+    ("identity", None),
+    ("gzip, deflate, br, zstd", "zstd"),
+    ("gzip, br", "br"),
+    ("gzip;q=1.0, br;q=0.5", "gzip"),
+    ("*", "zstd"),
+    ("*;q=0.5, zstd;q=0", "br"),
+    ("gzip;q=0", None),
+])
+def test_negotiate_encoding(header, expected):
+    """Test encoding selection by client quality, then server preference"""
+    assert negotiate_encoding(header) == expected
+
+
+def test_compressible_media_types():
+    """Test which media types get compressed"""
+    assert is_compressible("application/json")
+    assert is_compressible("application/x-ndjson; charset=utf-8")
+    assert is_compressible("application/problem+json")
+    assert is_compressible("text/plain; version=0.0.4")
+    assert not is_compressible("image/png")
+    assert not is_compressible(None)
+
+
+@pytest.mark.parametrize("encoding", ["gzip", "br", "zstd"])
+def test_large_body_is_compressed(encoding):
+    """Test that large bodies come back in the negotiated encoding"""
+    response, body = get("/large", encoding)
+
+    assert response.headers["content-encoding"] == encoding
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert int(response.headers["content-length"]) == len(body)
+    assert json.loads(decompress(encoding, body)) == LARGE
+
+
+@pytest.mark.parametrize("path", ["/small", "/image", "/encoded"])
+def test_bodies_left_alone(path):
+    """Test that small bodies, binary media and encoded responses pass through"""
+    plain, plain_body = get(path, "identity")
+    response, body = get(path, "gzip, br, zstd")
+
+    assert response.headers.get("content-encoding") == plain.headers.get("content-encoding")
+    assert body == plain_body
+
+
+@pytest.mark.parametrize("encoding", ["gzip", "br", "zstd"])
+def test_streaming_response_is_compressed_incrementally(encoding):
+    """Test that streamed bodies are compressed as one stream without a length"""
+    response, body = get("/stream", encoding)
+
+    assert response.headers["content-encoding"] == encoding
+    assert "content-length" not in response.headers
+    assert decompress(encoding, body) == b"".join(CHUNKS)
+
+
+def test_large_bodies_are_compressed_off_the_event_loop(monkeypatch):
+    """Test that bodies over the thread threshold are compressed on a worker thread"""
+    offloaded = []
+    to_thread = asyncio.to_thread
+
+    async def recording_to_thread(func, *args):
+        offloaded.append(len(args[0]))
+        return await to_thread(func, *args)
+
+    monkeypatch.setattr(compression_middleware.asyncio, "to_thread", recording_to_thread)
+
+    _, body = get("/large", "gzip", thread_threshold=10_000)
+    get("/small", "gzip", thread_threshold=10_000, minimum_size=0)
+
+    assert json.loads(gzip.decompress(body)) == LARGE
+    assert len(offloaded) == 1 and offloaded[0] > 10_000
+
+
+def test_compress_round_trips():
+    """Test the one-shot helper for every encoding"""
+    data = b"organization " * 1000
+    for encoding in ("gzip", "br", "zstd"):
+        assert decompress(encoding, compress(encoding, data)) == data
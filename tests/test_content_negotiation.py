@@ -0,0 +1,121 @@
+"""
+Tests for MessagePack/CBOR content negotiation
+"""
+import asyncio
+import json
+from datetime import datetime
+
+import httpx
+import pytest
+from bson import ObjectId
+from fastapi import FastAPI
+from pydantic import BaseModel
+
+from app.middleware.content_negotiation import ContentNegotiationMiddleware
+from app.utils.responses import create_response, negotiate_format
+
+msgpack = pytest.importorskip("msgpack")
+cbor2 = pytest.importorskip("cbor2")
+
+ORG_ID = ObjectId()
+CREATED = datetime(2024, 1, 2, 3, 4, 5)
+
+
+class Echo(BaseModel):
+    name: str
+    count: int
+
+
+def build_app():
+    demo = FastAPI()
+    demo.add_middleware(ContentNegotiationMiddleware)
+
+    @demo.get("/org")
+    async def get_org():
+        return create_response(data={"id": ORG_ID, "created_at": CREATED}, trace_id="t")
+
+    @demo.post("/echo")
+    async def echo(payload: Echo):
+        return create_response(data=payload.model_dump(), trace_id="t")
+
+    return demo
+
+
+def request(method, path, **kwargs):
+    async def scenario():
+        transport = httpx.ASGITransport(app=build_app())
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.request(method, path, **kwargs)
+
+    return asyncio.run(scenario())
+
+
+@pytest.mark.parametrize("accept, expected", [
+    (None, "json"),
+    ("*/*", "json"),
+    ("application/msgpack", "msgpack"),
+    ("application/x-msgpack", "msgpack"),
+    ("application/cbor", "cbor"),
+    ("application/json;q=0.5, application/msgpack", "msgpack"),
+    ("application/msgpack;q=0.2, application/json", "json"),
+    ("application/cbor, application/msgpack", "cbor"),
+    ("text/html", "json"),
+    ("application/msgpack;q=0", "json"),
+])
+def test_negotiate_format(accept, expected):
+    """Test format selection from Accept headers, with JSON as the default"""
+    assert negotiate_format(accept) == expected
+
+
+@pytest.mark.parametrize("accept, loads", [
+    ("application/json", json.loads),
+    ("application/msgpack", msgpack.unpackb),
+    ("application/cbor", cbor2.loads),
+])
+def test_envelope_is_identical_in_every_format(accept, loads):
+    """Test that every format carries the same envelope and values"""
+    response = request("GET", "/org", headers={"Accept": accept})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith(accept)
+    assert "Accept" in response.headers["vary"]
+    assert loads(response.content) == {
+        "success": True,
+        "data": {"id": str(ORG_ID), "created_at": "2024-01-02T03:04:05"},
+        "error": {},
+        "trace_id": "t",
+    }
+
+
+@pytest.mark.parametrize("content_type, dumps", [
+    ("application/msgpack", msgpack.packb),
+    ("application/cbor", cbor2.dumps),
+])
+def test_binary_request_bodies_reach_request_models(content_type, dumps):
+    """Test that binary bodies are validated by the route's model like JSON"""
+    response = request("POST", "/echo", content=dumps({"name": "acme", "count": 3}),
+                       headers={"Content-Type": content_type, "Accept": content_type})
+
+    assert response.status_code == 200
+    body = msgpack.unpackb(response.content) if content_type == "application/msgpack" \
+        else cbor2.loads(response.content)
+    assert body["data"] == {"name": "acme", "count": 3}
+
+
+def test_malformed_binary_body_is_rejected():
+    """Test that undecodable bodies get a 400 envelope in the negotiated format"""
+    response = request("POST", "/echo", content=b"\xc1",
+                       headers={"Content-Type": "application/msgpack", "Accept": "application/msgpack"})
+
+    assert response.status_code == 400
+    assert msgpack.unpackb(response.content)["error"]["code"] == "INVALID_BODY"
+
+
+def test_wire_format_benchmark_runs(capsys):
+    """Test that the encode/decode benchmark still runs against the current code"""
+    from benchmarks import wire_formats
+
+    results = wire_formats.run(list_size=2, rounds=1, min_time=0.001)
+
+    assert {result["name"].split("/")[1] for result in results} >= {"json_stdlib", "msgpack", "cbor"}
+    assert all(result["body_bytes"] > 0 for result in results)
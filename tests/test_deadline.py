@@ -0,0 +1,109 @@
+"""
+Tests for per-request deadlines
+"""
+import asyncio
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from pymongo import _csot
+from pymongo.errors import ExecutionTimeout
+
+from app.middleware.deadline import DeadlineMiddleware
+from app.utils import deadline
+from app.utils.deadline import budget_for_path, parse_route_deadlines
+from app.utils.responses import database_unavailable_handler, error_response, success_response
+
+
+def _client(monkeypatch, budgets):
+    monkeypatch.setattr(deadline, "_route_budgets", parse_route_deadlines(budgets))
+    app = FastAPI()
+    app.add_middleware(DeadlineMiddleware)
+    app.add_exception_handler(ExecutionTimeout, database_unavailable_handler)
+
+    @app.get("/slow")
+    async def slow():
+        await asyncio.sleep(5)
+        return success_response()
+
+    @app.get("/budget")
+    async def budget():
+        return success_response(data={"max_time_ms": deadline.max_time_ms()})
+
+    @app.get("/mongo-timeout")
+    async def mongo_timeout():
+        raise ExecutionTimeout("operation exceeded time limit", 50)
+
+    @app.get("/failure")
+    async def failure():
+        try:
+            raise RuntimeError("boom")
+        except Exception as e:
+            return error_response(code="INTERNAL_ERROR", message=str(e), status_code=500)
+
+    return TestClient(app)
+
+
+class TestRouteBudgets:
+    """Resolving a path to its budget"""
+
+    def test_longest_prefix_wins(self):
+        """Test that the most specific override applies"""
+        budgets = parse_route_deadlines("/tenant=5,/tenant/records/export=0,/org/create=20")
+        assert budget_for_path("/tenant/records/abc", 10, budgets) == 5
+        assert budget_for_path("/tenant/records/export", 10, budgets) is None
+        assert budget_for_path("/org/create", 10, budgets) == 20
+        assert budget_for_path("/org/created", 10, budgets) == 10
+
+    def test_invalid_spec(self):
+        """Test that malformed overrides are rejected"""
+        try:
+            parse_route_deadlines("org=5")
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("expected ValueError")
+
+
+class TestDeadlineMiddleware:
+    """Enforcing the budget on requests"""
+
+    def test_slow_handler_gets_504(self, monkeypatch):
+        """Test that a handler running past its budget is cancelled"""
+        response = _client(monkeypatch, "/slow=0.05").get("/slow")
+        assert response.status_code == 504
+        assert response.json()["error"]["code"] == "DEADLINE_EXCEEDED"
+
+    def test_budget_visible_to_handler(self, monkeypatch):
+        """Test that handlers and MongoDB see the remaining budget"""
+        response = _client(monkeypatch, "/budget=2").get("/budget")
+        assert 0 < response.json()["data"]["max_time_ms"] <= 2000
+
+    def test_mongo_timeout_maps_to_504(self, monkeypatch):
+        """Test that a server-side maxTimeMS abort is reported as a timeout"""
+        response = _client(monkeypatch, "/mongo-timeout=2").get("/mongo-timeout")
+        assert response.status_code == 504
+        assert response.json()["error"]["code"] == "DEADLINE_EXCEEDED"
+
+    def test_mongo_timeout_without_deadline(self, monkeypatch):
+        """Test that a driver timeout outside any deadline means the database is unavailable"""
+        response = _client(monkeypatch, "/mongo-timeout=0").get("/mongo-timeout")
+        assert response.status_code == 503
+        assert response.json()["error"]["code"] == "DATABASE_UNAVAILABLE"
+
+    def test_other_failures_unchanged(self, monkeypatch):
+        """Test that ordinary errors keep their status"""
+        response = _client(monkeypatch, "/failure=2").get("/failure")
+        assert response.status_code == 500
+        assert response.json()["error"]["code"] == "INTERNAL_ERROR"
+
+    def test_no_deadline(self, monkeypatch):
+        """Test that a zero budget disables the deadline"""
+        response = _client(monkeypatch, "/budget=0").get("/budget")
+        assert response.json()["data"]["max_time_ms"] is None
+
+
+def test_scope_sets_pymongo_timeout():
+    """Test that the deadline is handed to pymongo's client-side timeout"""
+    with deadline.deadline_scope(3):
+        assert 0 < _csot.remaining() <= 3
+    assert deadline.remaining() is None
@@ -0,0 +1,49 @@
+"""
+Tests for the hot path micro-benchmarks
+"""
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+
+from app.services.org_service import serialize_org
+from benchmarks import hot_paths
+
+
+@pytest.mark.parametrize("benchmark", hot_paths.BENCHMARKS, ids=lambda b: b.name)
+def test_benchmark_runs(benchmark):
+    """Test that every benchmark still runs against the current code"""
+    assert benchmark.batch(3) > 0
+    memory = hot_paths.allocations(benchmark, calls=3)
+    assert memory["peak_bytes_per_call"] > 0
+
+
+def test_run_coroutine_rejects_suspension():
+    """Test that coroutines needing the event loop aren't silently mis-measured"""
+    import asyncio
+
+    async def sleeps():
+        await asyncio.sleep(0)
+
+    with pytest.raises(RuntimeError):
+        hot_paths.run_coroutine(sleeps())
+
+
+def test_compare_flags_slowdowns_and_allocation_growth():
+    """Test regressions against the previous run"""
+    previous = {"results": [{"name": "a", "median_ns": 100.0, "peak_bytes_per_call": 1000}]}
+    results = [{"name": "a", "median_ns": 130.0, "peak_bytes_per_call": 1100},
+               {"name": "new", "median_ns": 1.0, "peak_bytes_per_call": 1}]
+
+    assert hot_paths.compare(results, previous, tolerance=0.25) == ["a: median 100.0ns -> 130.0ns"]
+
+
+def test_serialize_org():
+    """Test the organization document shaping the benchmark covers; datetimes are left to the encoder"""
+    org_id = ObjectId()
+    created = datetime(2024, 1, 2, 3, 4, 5)
+    doc = {"_id": org_id, "organization_name": "Acme", "created_at": created, "updated_at": "kept"}
+
+    assert serialize_org(doc) is doc
+    assert doc == {"id": str(org_id), "organization_name": "Acme",
+                   "created_at": created, "updated_at": "kept"}
@@ -0,0 +1,98 @@
+"""
+Tests for the load test and its in-memory MongoDB stand-in
+"""
+import asyncio
+import random
+
+import httpx
+import pytest
+from pymongo.errors import DuplicateKeyError, OperationFailure
+
+from app.db import client as db_client
+from app.db.client import ensure_indexes
+from app.main import app
+from benchmarks import load_test
+from benchmarks.fake_mongo import FakeMotorClient, install
+
+
+@pytest.fixture
+def restore_database(monkeypatch):
+    """Undo the stand-in's installation so later tests see no database"""
+    for name in ("client", "database", "_db_initialized"):
+        monkeypatch.setattr(db_client, name, getattr(db_client, name))
+
+
+def test_fake_collection_semantics():
+    """Test the query, update, unique index and rename behaviour the services rely on"""
+    async def scenario():
+        db = FakeMotorClient()["test"]
+        orgs = db["organizations"]
+        await orgs.create_index([("slug", 1)], name="slug", unique=True, sparse=True)
+        await orgs.insert_one({"organization_name": "a", "slug": "org_a"})
+        await orgs.insert_one({"organization_name": "b", "slug": "org_b", "deleted_at": 1})
+        await orgs.insert_one({"organization_name": "legacy"})
+        with pytest.raises(DuplicateKeyError):
+            await orgs.insert_one({"organization_name": "c", "slug": "org_a"})
+
+        active = [doc["organization_name"] async for doc in orgs.find({"deleted_at": None})]
+        assert active == ["a", "legacy"]
+        found = await orgs.find_one({"$or": [{"slug": "org_b"}, {"collection_name": "org_b"}]})
+        assert found["organization_name"] == "b"
+
+        updated = await orgs.find_one_and_update(
+            {"organization_name": "a"}, {"$set": {"organization_name": "a2"}}, return_document=True)
+        assert updated["organization_name"] == "a2"
+
+        await db["tenant"].insert_one({"x": 1})
+        await db["tenant"].rename("renamed")
+        assert await db.list_collection_names() == ["organizations", "renamed"]
+        with pytest.raises(OperationFailure) as missing:
+            await db["tenant"].rename("other")
+        assert missing.value.code == 26
+
+    asyncio.run(scenario())
+
+
+def test_every_operation_succeeds_in_process(restore_database):
+    """Test each request of the mix against the app on the stand-in"""
+    async def scenario():
+        install(FakeMotorClient())
+        await ensure_indexes()
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            workload = load_test.Workload(client, random.Random(1), "test")
+            results = {}
+            for name in ("create", "create", "login", "get", "update", "delete"):
+                response, expected = await getattr(workload, name)()
+                results[name] = (response.status_code, expected)
+            return results, workload
+
+    results, workload = asyncio.run(scenario())
+    for name, (status, expected) in results.items():
+        assert status == expected, name
+    [remaining] = workload.idle
+    assert remaining["name"].startswith("lt_test_")
+
+
+def test_in_process_run(restore_database):
+    """Test a short in-process run end to end"""
+    args = load_test.build_parser().parse_args([
+        "--requests", "10", "--duration", "0", "--concurrency", "2", "--orgs", "3",
+        "--mix", "get=1,login=1,create=1,update=1,delete=1", "--db-latency-ms", "0",
+    ])
+    report = asyncio.run(load_test.run(args))
+
+    assert report["overall"]["requests"] == 10
+    assert report["overall"]["errors"] == 0
+    for summary in report["operations"].values():
+        assert summary["p50_ms"] <= summary["p95_ms"] <= summary["p99_ms"]
+
+
+def test_compare_flags_regressions():
+    """Test that p95 growth and throughput loss beyond tolerance are reported"""
+    baseline = {"overall": {"p95_ms": 10.0, "throughput_rps": 100.0},
+                "operations": {"get": {"p95_ms": 10.0, "throughput_rps": 80.0}}}
+    report = {"overall": {"p95_ms": 11.0, "throughput_rps": 95.0},
+              "operations": {"get": {"p95_ms": 13.0, "throughput_rps": 60.0}}}
+
+    regressions = load_test.compare(report, baseline, tolerance=0.2)
+    assert regressions == ["get: p95 10.0ms -> 13.0ms", "get: throughput 80.0 -> 60.0 rps"]
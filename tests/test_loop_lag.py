@@ -0,0 +1,164 @@
+"""
+Tests for the event loop lag monitor and adaptive concurrency limit
+"""
+import asyncio
+import threading
+import time
+
+import bcrypt
+import httpx
+from fastapi import FastAPI
+
+from app.models.organization import OrganizationCreate
+from app.repositories import provider
+from app.repositories.memory import MemoryAdminRepository, MemoryOrganizationRepository
+from app.services import auth_service, org_service
+from app.middleware.concurrency import ConcurrencyLimitMiddleware
+from app.utils import loop_lag
+from app.utils.concurrency import AdaptiveConcurrencyLimit
+from app.utils.loop_lag import LoopLagMonitor
+from app.utils.profiler import collapse_stack
+
+
+def _block(seconds):
+    time.sleep(seconds)
+
+
+def test_monitor_captures_blocking_stack():
+    """Test that a blocked loop is measured and the blocking function named"""
+    monitor = LoopLagMonitor(interval=0.01, stall_threshold=0.05)
+    lags = []
+    monitor.add_listener(lags.append)
+
+    async def scenario():
+        task = asyncio.create_task(monitor.run())
+        await asyncio.sleep(0.05)
+        _block(0.3)
+        await asyncio.sleep(0.05)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(scenario())
+
+    assert max(lags) >= 0.2
+    [stall] = monitor.stalls
+    assert stall["overdue_ms"] >= 50
+    assert "_block (tests/test_loop_lag.py:" in stall["stack"]
+
+
+def test_watchdog_survives_a_failed_capture(monkeypatch):
+    """Test that a stack capture error doesn't stop later stalls being captured"""
+    monitor = LoopLagMonitor(interval=0.01, stall_threshold=0.05)
+    attempts = []
+
+    def flaky_collapse(frame):
+        attempts.append(frame)
+        if len(attempts) == 1:
+            raise RuntimeError("capture failed")
+        return collapse_stack(frame)
+
+    monkeypatch.setattr(loop_lag, "collapse_stack", flaky_collapse)
+
+    async def scenario():
+        task = asyncio.create_task(monitor.run())
+        await asyncio.sleep(0.05)
+        _block(0.2)
+        await asyncio.sleep(0.05)
+        _block(0.2)
+        await asyncio.sleep(0.05)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(scenario())
+
+    assert len(attempts) == 2
+    [stall] = monitor.stalls
+    assert "_block (tests/test_loop_lag.py:" in stall["stack"]
+
+
+class TestAdaptiveConcurrencyLimit:
+    """AIMD behaviour"""
+
+    def test_decreases_multiplicatively_on_lag(self):
+        """Test that lag over target cuts the limit, down to the minimum"""
+        limit = AdaptiveConcurrencyLimit(initial=100, minimum=10, maximum=200, target_lag=0.05, backoff=0.5)
+        limit.on_lag(0.1)
+        assert limit.limit == 50
+        for _ in range(10):
+            limit.on_lag(0.1)
+        assert limit.limit == 10
+
+    def test_increases_additively_only_when_saturated(self):
+        """Test that an idle worker's limit doesn't creep up"""
+        limit = AdaptiveConcurrencyLimit(initial=2, minimum=1, maximum=3, target_lag=0.05)
+        limit.on_lag(0.0)
+        assert limit.limit == 2
+
+        assert limit.try_acquire() and limit.try_acquire()
+        assert not limit.try_acquire()
+        limit.on_lag(0.0)
+        assert limit.limit == 3
+        assert limit.try_acquire()
+        limit.on_lag(0.0)
+        assert limit.limit == 3
+
+
+def test_middleware_sheds_over_limit():
+    """Test that requests beyond the limit get 503 and exempt paths don't"""
+    limit = AdaptiveConcurrencyLimit(initial=1, minimum=1, maximum=1)
+    demo = FastAPI()
+    demo.add_middleware(ConcurrencyLimitMiddleware, limit=limit, exempt_paths=("/health",))
+    release = asyncio.Event()
+
+    @demo.get("/slow")
+    async def slow():
+        await release.wait()
+        return {}
+
+    @demo.get("/health")
+    async def health():
+        return {}
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=demo), base_url="http://test") as client:
+            first = asyncio.create_task(client.get("/slow"))
+            await asyncio.sleep(0.05)
+            shed = await client.get("/slow")
+            exempt = await client.get("/health")
+            release.set()
+            return await first, shed, exempt
+
+    first, shed, exempt = asyncio.run(scenario())
+    assert first.status_code == 200
+    assert shed.status_code == 503
+    assert shed.headers["Retry-After"] == "1"
+    assert shed.json()["error"]["code"] == "OVERLOADED"
+    assert exempt.status_code == 200
+    assert limit.in_flight == 0
+
+
+def test_bcrypt_runs_off_the_event_loop(monkeypatch):
+    """Test that hashing and verifying passwords doesn't block the loop thread"""
+    monkeypatch.setattr(provider, "STORAGE_BACKEND", "memory")
+    monkeypatch.setattr(provider, "_memory_organizations", MemoryOrganizationRepository())
+    monkeypatch.setattr(provider, "_memory_admins", MemoryAdminRepository())
+    threads = []
+    hashpw, checkpw = bcrypt.hashpw, bcrypt.checkpw
+
+    def recording(fn):
+        def wrapper(*args):
+            threads.append(threading.current_thread())
+            return fn(*args)
+        return wrapper
+
+    monkeypatch.setattr(bcrypt, "hashpw", recording(hashpw))
+    monkeypatch.setattr(bcrypt, "checkpw", recording(checkpw))
+
+    async def scenario():
+        await org_service.create_organization(OrganizationCreate(
+            organization_name="Hashing Corp", admin_email="a@example.com", admin_password="secret-pw"))
+        return await auth_service.authenticate_admin("a@example.com", "secret-pw")
+
+    assert asyncio.run(scenario()) is not None
+    assert len(threads) == 2
+    assert threading.main_thread() not in threads
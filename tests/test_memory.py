@@ -0,0 +1,138 @@
+"""
+Tests for the memory diagnostics
+"""
+import asyncio
+import tracemalloc
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.auth.dependencies import OPERATOR_ROLE
+from app.main import app
+from app.repositories import provider
+from app.repositories.memory import MemoryAdminRepository, MemoryOrganizationRepository
+from app.utils import memory
+from app.utils.jwt import create_access_token
+
+
+def _auth(admin_id, email="ops@example.com"):
+    token = create_access_token({"sub": str(admin_id), "email": email, "type": "admin"})
+    return {"Authorization": f"Bearer {token}"}
+
+
+class _Leak:
+    pass
+
+
+@pytest.fixture
+def tracing():
+    memory.start_tracing()
+    yield
+    memory.stop_tracing()
+
+
+def test_diff_points_at_allocating_line(tracing):
+    """Test that growth between snapshots is attributed to the allocating line"""
+    base = memory.take_snapshot()
+    leaked = [_Leak() for _ in range(5000)]  # allocation site
+    target = memory.take_snapshot()
+
+    entries = memory.diff_snapshots(base, target, limit=5)
+    top = entries[0]
+    assert top["file"].endswith("test_memory.py")
+    assert top["count_diff"] >= 5000
+    assert top["size_diff_bytes"] > 0
+    assert len(leaked) == 5000
+
+
+def test_unknown_snapshot(tracing):
+    """Test that unknown IDs raise SnapshotNotFoundError"""
+    base = memory.take_snapshot()
+    with pytest.raises(memory.SnapshotNotFoundError):
+        memory.diff_snapshots(base, 10 ** 9)
+
+
+def test_snapshot_requires_tracing():
+    """Test that snapshots aren't taken while tracemalloc is stopped"""
+    assert not tracemalloc.is_tracing()
+    with pytest.raises(memory.TracemallocNotRunningError):
+        memory.take_snapshot()
+
+
+def test_gc_stats_and_type_counts():
+    """Test generation stats and live object counts"""
+    stats = memory.gc_stats()
+    assert len(stats["counts"]) == len(stats["generations"]) == 3
+    keep = [_Leak() for _ in range(1000)]
+    types = {entry["type"]: entry["count"] for entry in memory.object_type_counts(limit=500)}
+    assert types.get("_Leak", 0) >= len(keep)
+
+
+class TestMemoryEndpoints:
+    """Access control and the tracemalloc lifecycle over HTTP"""
+
+    @pytest.fixture(autouse=True)
+    def operator(self, monkeypatch):
+        """In-memory storage holding one operator"""
+        monkeypatch.setattr(provider, "STORAGE_BACKEND", "memory")
+        monkeypatch.setattr(provider, "_memory_organizations", MemoryOrganizationRepository())
+        monkeypatch.setattr(provider, "_memory_admins", MemoryAdminRepository())
+        self.operator_id = asyncio.run(provider.get_admin_repository().insert(
+            {"email": "ops@example.com", "hashed_password": "x", "role": OPERATOR_ROLE}))
+        yield
+        memory.stop_tracing()
+
+    def test_requires_operator(self):
+        """Test that ordinary admins are refused"""
+        response = TestClient(app).get("/admin/diagnostics/memory", headers=_auth("1", "tenant@example.com"))
+        assert response.status_code == 403
+
+    def test_registered_admins_are_not_operators(self):
+        """Test that an admin created through the public API can't reach diagnostics"""
+        client = TestClient(app)
+        created = client.post("/org/create", json={
+            "organization_name": "Sneaky", "admin_email": "sneaky@example.com", "admin_password": "secret-pw"})
+        assert created.status_code == 201
+        login = client.post("/admin/login", json={"email": "sneaky@example.com", "password": "secret-pw"})
+        assert login.status_code == 200
+
+        token = login.json()["data"]["access_token"]
+        response = client.get("/admin/diagnostics/memory", headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 403
+
+    def test_snapshot_conflicts_when_stopped(self):
+        """Test the 409 while tracemalloc isn't running"""
+        response = TestClient(app).post("/admin/diagnostics/memory/snapshots",
+                                        headers=_auth(self.operator_id))
+        assert response.status_code == 409
+        assert response.json()["error"]["code"] == "TRACEMALLOC_NOT_RUNNING"
+
+    def test_start_snapshot_diff_stop(self):
+        """Test a full leak hunt"""
+        client = TestClient(app)
+        headers = _auth(self.operator_id)
+
+        started = client.post("/admin/diagnostics/memory/tracemalloc/start", headers=headers)
+        assert started.json()["data"]["tracing"] is True
+        base = client.post("/admin/diagnostics/memory/snapshots", headers=headers)
+        assert base.status_code == 201
+
+        diff = client.get("/admin/diagnostics/memory/diff", headers=headers,
+                          params={"base": base.json()["data"]["snapshot_id"], "group_by": "filename"})
+        assert diff.status_code == 200
+        assert isinstance(diff.json()["data"]["entries"], list)
+
+        missing = client.get("/admin/diagnostics/memory/diff", headers=headers, params={"base": 10 ** 9})
+        assert missing.status_code == 404
+
+        stopped = client.post("/admin/diagnostics/memory/tracemalloc/stop", headers=headers)
+        assert stopped.json()["data"]["tracing"] is False
+        assert stopped.json()["data"]["snapshots"] == []
+
+    def test_gc_endpoint(self):
+        """Test GC counts and type counts"""
+        response = TestClient(app).get("/admin/diagnostics/memory/gc", params={"limit": 5},
+                                       headers=_auth(self.operator_id))
+        data = response.json()["data"]
+        assert len(data["counts"]) == 3
+        assert len(data["types"]) == 5
@@ -0,0 +1,40 @@
+"""
+Tests for the Prometheus metrics endpoint and middleware
+"""
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+from app.main import app
+
+client = TestClient(app)
+
+
+def _requests(method, route, status):
+    labels = {"method": method, "route": route, "status": status}
+    return REGISTRY.get_sample_value("http_requests_total", labels) or 0
+
+
+def test_requests_labelled_by_route_template():
+    """Test that path parameters don't leak into labels"""
+    before = _requests("GET", "/tenant/records/{record_id}", "401")
+    client.get("/tenant/records/abc")
+    client.get("/tenant/records/def")
+    assert _requests("GET", "/tenant/records/{record_id}", "401") == before + 2
+
+
+def test_unmatched_paths_share_a_label():
+    """Test that unknown paths are collapsed into one series"""
+    before = _requests("GET", "unmatched", "404")
+    client.get("/no-such-path-1")
+    client.get("/no-such-path-2")
+    assert _requests("GET", "unmatched", "404") == before + 2
+
+
+def test_metrics_endpoint():
+    """Test the exposition format and the latency histogram"""
+    client.get("/health")
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'http_request_duration_seconds_bucket{le="0.005",method="GET",route="/health",status="200"}' in response.text
+    assert "http_requests_in_flight" in response.text
@@ -0,0 +1,126 @@
+"""
+Tests for multi-cluster tenant placement
+
+The migration test needs two MongoDB deployments, e.g.
+
+    mongod --port 27017 --dbpath /tmp/m1 & mongod --port 27018 --dbpath /tmp/m2 &
+    MONGO_TEST_CLUSTERS="second=mongodb://localhost:27018/org_test_tenants" pytest tests/test_placement.py
+"""
+import asyncio
+import os
+import uuid
+from collections import Counter
+
+import pytest
+
+from app.db import placement
+from app.db.placement import DEFAULT_CLUSTER, HashRing, parse_clusters
+
+MONGO_TEST_CLUSTERS = os.getenv("MONGO_TEST_CLUSTERS")
+
+
+class TestPlacement:
+    """Consistent hashing and cluster configuration"""
+
+    def test_parse_clusters(self):
+        """Test parsing name=uri pairs"""
+        clusters = parse_clusters("east=mongodb://a:27017/db, west=mongodb://b:27017")
+        assert clusters == {"east": "mongodb://a:27017/db", "west": "mongodb://b:27017"}
+
+    def test_parse_clusters_rejects_default(self):
+        """Test that the default cluster name is reserved"""
+        with pytest.raises(ValueError):
+            parse_clusters("default=mongodb://a:27017")
+
+    def test_ring_spreads_keys(self):
+        """Test that keys are spread over every cluster"""
+        ring = HashRing(["a", "b", "c"], virtual_nodes=128)
+        counts = Counter(ring.get_node(f"tenant-{i}") for i in range(3000))
+        assert set(counts) == {"a", "b", "c"}
+        assert min(counts.values()) > 600
+
+    def test_adding_a_cluster_moves_few_keys(self):
+        """Test that adding a cluster only moves keys onto the new cluster"""
+        before = HashRing(["a", "b", "c"])
+        after = HashRing(["a", "b", "c", "d"])
+        keys = [f"tenant-{i}" for i in range(3000)]
+        moved = [k for k in keys if before.get_node(k) != after.get_node(k)]
+        assert all(after.get_node(k) == "d" for k in moved)
+        assert len(moved) < len(keys) / 2
+
+
+@pytest.mark.skipif(not MONGO_TEST_CLUSTERS, reason="MONGO_TEST_CLUSTERS not set")
+def test_migrate_tenant_between_clusters(monkeypatch):
+    """Test moving a tenant's collection to another mongod"""
+    from app.services import tenant_migration
+    from app.db.client import init_db, close_db
+    from app.models.organization import OrganizationCreate
+    from app.services.org_service import create_organization
+    from app.services.tenant_migration import migrate_tenant_cluster
+    from app.services.tenant_service import create_record, list_records
+
+    # No other worker caches routes, so the write fence needn't wait
+    monkeypatch.setattr(tenant_migration, "TENANT_ROUTE_TTL_SECONDS", 0)
+    monkeypatch.setattr(tenant_migration, "TENANT_POOLED_ROUTE_TTL_SECONDS", 0)
+
+    async def run():
+        placement.configure_clusters(MONGO_TEST_CLUSTERS)
+        await init_db()
+        try:
+            org = await create_organization(
+                OrganizationCreate(organization_name=f"PlacementOrg_{uuid.uuid4().hex[:8]}"))
+            record = await create_record(org["id"], {"value": 1})
+
+            target = next(c for c in placement.get_cluster_names() if c != org["cluster"])
+            assert await migrate_tenant_cluster(org["id"], target)
+
+            records = await list_records(org["id"])
+            assert [r["id"] for r in records] == [record["id"]]
+            source_db = placement.get_cluster_database(org["cluster"])
+            assert org["collection_name"] not in await source_db.list_collection_names()
+        finally:
+            placement.close_cluster_clients()
+            await close_db()
+
+    asyncio.run(run())
+    placement.configure_clusters(placement.MONGO_CLUSTERS)
+    assert DEFAULT_CLUSTER in placement.get_cluster_names()
+
+
+def test_write_fence_lasts_only_the_short_route_ttl(monkeypatch):
+    """Test that routes cached before the claim are waited out before writes are fenced"""
+    from datetime import datetime
+
+    from app.db import client as db_client
+    from app.services import tenant_migration
+    from benchmarks.fake_mongo import FakeMotorClient, install
+
+    for name in ("client", "database", "_db_initialized"):
+        monkeypatch.setattr(db_client, name, getattr(db_client, name))
+    monkeypatch.setattr(tenant_migration, "TENANT_ROUTE_TTL_SECONDS", 0.3)
+    monkeypatch.setattr(tenant_migration, "TENANT_POOLED_ROUTE_TTL_SECONDS", 0.05)
+    db = install(FakeMotorClient())
+
+    async def run():
+        org_id = (await db["organizations"].insert_one({"tenancy": "collection"})).inserted_id
+        org_doc = {"_id": org_id, "tenancy": "collection", "migration_started_at": datetime.utcnow()}
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        fenced_at = None
+
+        async def watch():
+            nonlocal fenced_at
+            while fenced_at is None:
+                if (await db["organizations"].find_one({"_id": org_id})).get("write_fenced"):
+                    fenced_at = loop.time()
+                await asyncio.sleep(0.005)
+
+        watcher = asyncio.create_task(watch())
+        await tenant_migration.fence_writes(org_doc)
+        await watcher
+        return fenced_at - started, loop.time() - fenced_at
+
+    unfenced, fenced = asyncio.run(run())
+    # Old routes (0.3s) expire before the fence; the fence waits the short TTL
+    assert unfenced >= 0.2
+    assert 0.04 <= fenced < 0.15
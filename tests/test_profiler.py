@@ -0,0 +1,149 @@
+"""
+Tests for the sampling profiler and the diagnostics endpoints
+"""
+import asyncio
+import sys
+import threading
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.auth.dependencies import OPERATOR_ROLE
+from app.main import app
+from app.middleware.profiling import RequestProfilingMiddleware
+from app.repositories import provider
+from app.repositories.memory import MemoryAdminRepository
+from app.utils.jwt import create_access_token
+from app.utils import profiler as profiler_module
+from app.utils.profiler import RequestProfiler, collapse_stack, sample_threads
+
+
+def _spin(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def _auth(admin_id, email="ops@example.com"):
+    token = create_access_token({"sub": str(admin_id), "email": email, "type": "admin"})
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture
+def admins(monkeypatch):
+    """Tokens of an operator and of an organization admin with the same email"""
+    repository = MemoryAdminRepository()
+    monkeypatch.setattr(provider, "STORAGE_BACKEND", "memory")
+    monkeypatch.setattr(provider, "_memory_admins", repository)
+
+    def add(**fields):
+        return asyncio.run(repository.insert({"email": "ops@example.com", "hashed_password": "x", **fields}))
+
+    return {"operator": _auth(add(role=OPERATOR_ROLE)), "tenant": _auth(add())}
+
+
+class _Outer:
+    def frame(self):
+        return sys._getframe()
+
+
+def test_collapse_stack_of_a_real_frame():
+    """Test stack labels on a live frame, outermost first with the thread as root"""
+    frame = _Outer().frame()
+
+    stack = collapse_stack(frame, "main")
+
+    root, *_, caller, leaf = stack.split(";")
+    assert root == "main"
+    assert caller.startswith("test_collapse_stack_of_a_real_frame (tests/test_profiler.py:")
+    # Qualified names on Python 3.11+, plain function names before that
+    assert leaf.split(" ")[0] in ("_Outer.frame", "frame")
+    assert leaf.endswith(f"(tests/test_profiler.py:{_Outer.frame.__code__.co_firstlineno})")
+
+
+def test_request_profiler_restarts_after_a_sampler_error(monkeypatch):
+    """Test that a crashed sampler thread doesn't stop later requests being profiled"""
+    profiler = RequestProfiler(sample_rate=1.0, interval=0.001)
+
+    def broken(frame):
+        raise RuntimeError("sampling failed")
+
+    async def profiled():
+        task = profiler.begin()
+        _spin(0.02)
+        await asyncio.sleep(0.02)
+        profiler.end(task, "GET /", None, 0.04)
+
+    monkeypatch.setattr(profiler_module, "collapse_stack", broken)
+    asyncio.run(profiled())
+    deadline = time.monotonic() + 1
+    while profiler._thread is not None and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert profiler._thread is None
+
+    monkeypatch.undo()
+    asyncio.run(profiled())
+    assert profiler.slowest()[0]["samples"] > 0
+
+
+def test_sample_threads_finds_hot_function():
+    """Test that a busy thread's function shows up in the collapsed stacks"""
+    worker = threading.Thread(target=_spin, args=(0.3,), name="busy")
+    worker.start()
+    samples = sample_threads(0.2, 0.005, [worker.ident])
+    worker.join()
+
+    stacks = list(samples)
+    assert stacks and all(stack.startswith("busy;") for stack in stacks)
+    assert any("_spin (tests/test_profiler.py:" in stack for stack in stacks)
+
+
+def test_request_profiler_keeps_slowest():
+    """Test that sampled requests are profiled and ranked by duration"""
+    profiler = RequestProfiler(sample_rate=1.0, keep=1, interval=0.001)
+    demo = FastAPI()
+    demo.add_middleware(RequestProfilingMiddleware, profiler=profiler)
+
+    @demo.get("/work/{seconds}")
+    async def work(seconds: float):
+        _spin(seconds)
+        return {}
+
+    client = TestClient(demo)
+    client.get("/work/0.01")
+    client.get("/work/0.1")
+    client.get("/work/0.02")
+
+    [slowest] = profiler.slowest()
+    assert slowest["route"] == "GET /work/{seconds}"
+    assert slowest["duration_ms"] >= 100
+    assert slowest["samples"] > 0
+    assert "_spin" in slowest["collapsed"]
+
+
+class TestDiagnosticsEndpoints:
+    """Access control and output"""
+
+    def test_requires_operator(self, admins):
+        """Test that admins without the stored operator role are refused, whatever their email"""
+        client = TestClient(app)
+        assert client.get("/admin/diagnostics/profile").status_code == 401
+        response = client.get("/admin/diagnostics/profile", headers=admins["tenant"])
+        assert response.status_code == 403
+        # A token for an admin that isn't stored
+        response = client.get("/admin/diagnostics/profile", headers=_auth("1"))
+        assert response.status_code == 403
+
+    def test_profile_returns_collapsed_stacks(self, admins):
+        """Test the flamegraph-compatible output"""
+        response = TestClient(app).get(
+            "/admin/diagnostics/profile", params={"seconds": 0.2, "all_threads": True},
+            headers=admins["operator"])
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        for line in response.text.splitlines():
+            stack, count = line.rsplit(" ", 1)
+            assert ";" in stack and int(count) > 0
@@ -0,0 +1,183 @@
+"""
+Tests for soft-deleted organizations and the purge sweeper
+"""
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.db import client as db_client
+from app.repositories import provider
+from app.repositories.memory import MemoryAdminRepository, MemoryOrganizationRepository
+from app.services import org_service, purge_service
+from app.services.purge_service import in_purge_window, parse_window, purge_deleted_organizations
+from benchmarks.fake_mongo import FakeCollection, FakeMotorClient, install
+
+NOW = datetime(2024, 6, 1, 3, 0)
+
+
+@pytest.fixture
+def db(monkeypatch):
+    """In-memory master database, with the database globals restored afterwards"""
+    for name in ("client", "database", "_db_initialized"):
+        monkeypatch.setattr(db_client, name, getattr(db_client, name))
+    monkeypatch.setattr(provider, "STORAGE_BACKEND", "mongodb")
+    monkeypatch.setattr(purge_service, "PURGE_RETENTION_DAYS", 30)
+    return install(FakeMotorClient(latency=0.001))
+
+
+def add_org(db, name, deleted_days_ago=None, **fields):
+    """Store an organization with a tenant collection and an admin"""
+    slug = f"org_{name.lower()}"
+    org_doc = {"organization_name": name, "slug": slug, "collection_name": slug,
+               "created_at": NOW, "updated_at": NOW, **fields}
+    if deleted_days_ago is not None:
+        org_doc["deleted_at"] = NOW - timedelta(days=deleted_days_ago)
+
+    async def insert():
+        org_id = (await db["organizations"].insert_one(org_doc)).inserted_id
+        await db[slug].insert_one({"created_at": NOW, "updated_at": NOW})
+        await db["admins"].insert_one({"email": f"admin@{slug}", "organization_id": str(org_id)})
+        return org_id
+
+    return asyncio.run(insert())
+
+
+def names(db, collection):
+    return sorted(doc.get("organization_name") or doc["email"]
+                  for doc in asyncio.run(db[collection].find({}).to_list()))
+
+
+class TestPurgeWindow:
+    """Off-peak window checks"""
+
+    def test_parse_window(self):
+        """Test parsing an HH:MM-HH:MM window"""
+        start, end = parse_window("02:00-05:30")
+        assert (start.hour, start.minute) == (2, 0)
+        assert (end.hour, end.minute) == (5, 30)
+
+    def test_inside_and_outside_window(self):
+        """Test a window within a single day"""
+        assert in_purge_window(datetime(2024, 1, 1, 3, 0), "02:00-05:00")
+        assert not in_purge_window(datetime(2024, 1, 1, 5, 0), "02:00-05:00")
+        assert not in_purge_window(datetime(2024, 1, 1, 12, 0), "02:00-05:00")
+
+    def test_window_wrapping_midnight(self):
+        """Test a window that wraps around midnight"""
+        assert in_purge_window(datetime(2024, 1, 1, 23, 0), "22:00-04:00")
+        assert in_purge_window(datetime(2024, 1, 1, 1, 0), "22:00-04:00")
+        assert not in_purge_window(datetime(2024, 1, 1, 12, 0), "22:00-04:00")
+
+
+def test_soft_deleted_organizations_are_hidden_from_reads(db):
+    """Test that get and list skip organizations pending purge"""
+    active_id = add_org(db, "Active")
+    deleted_id = add_org(db, "Deleted", deleted_days_ago=1)
+
+    assert asyncio.run(org_service.get_organization(str(active_id)))["organization_name"] == "Active"
+    assert asyncio.run(org_service.get_organization(str(deleted_id))) is None
+    assert asyncio.run(org_service.get_organization_by_name("Deleted")) is None
+    listed = asyncio.run(org_service.get_all_organizations())
+    assert [org["organization_name"] for org in listed] == ["Active"]
+
+
+def test_delete_is_soft(db):
+    """Test that deleting an organization keeps its data until the purge"""
+    add_org(db, "Acme")
+
+    assert asyncio.run(org_service.delete_organization_by_name("Acme")) is True
+
+    assert asyncio.run(org_service.get_organization_by_name("Acme")) is None
+    assert asyncio.run(db["organizations"].find_one({"organization_name": "Acme"}))["deleted_at"] is not None
+    assert asyncio.run(db["org_acme"].count_documents({})) == 1
+
+
+def test_purge_removes_only_organizations_past_retention(db):
+    """Test that the tenant collection, admins and record go, and nothing else"""
+    add_org(db, "Expired", deleted_days_ago=31)
+    add_org(db, "Recent", deleted_days_ago=29)
+    add_org(db, "Active")
+
+    assert asyncio.run(purge_deleted_organizations(now=NOW)) == 1
+
+    assert names(db, "organizations") == ["Active", "Recent"]
+    assert names(db, "admins") == ["admin@org_active", "admin@org_recent"]
+    collections = asyncio.run(db.list_collection_names())
+    assert "org_expired" not in collections
+    assert {"org_recent", "org_active"} <= set(collections)
+
+
+def test_purge_respects_live_claims_and_batch_size(db):
+    """Test that another sweeper's claim is skipped until it times out"""
+    add_org(db, "Claimed", deleted_days_ago=40, purge_claimed_at=NOW - timedelta(seconds=1))
+    add_org(db, "Abandoned", deleted_days_ago=40, purge_claimed_at=NOW - timedelta(hours=1))
+    add_org(db, "Waiting", deleted_days_ago=40)
+
+    assert asyncio.run(purge_deleted_organizations(batch_size=1, now=NOW)) == 1
+    assert asyncio.run(purge_deleted_organizations(now=NOW)) == 1
+    assert asyncio.run(purge_deleted_organizations(now=NOW)) == 0
+
+    assert names(db, "organizations") == ["Claimed"]
+
+
+def test_concurrent_sweepers_drop_each_collection_once(db, monkeypatch):
+    """Test that two sweepers share the work instead of both dropping every organization"""
+    for i in range(6):
+        add_org(db, f"Expired{i}", deleted_days_ago=31)
+    dropped = []
+    real_drop = FakeCollection.drop
+
+    async def recording_drop(self, **kwargs):
+        dropped.append(self.name)
+        await real_drop(self, **kwargs)
+
+    monkeypatch.setattr(FakeCollection, "drop", recording_drop)
+
+    async def two_sweepers():
+        return await asyncio.gather(
+            purge_deleted_organizations(now=NOW), purge_deleted_organizations(now=NOW))
+
+    first, second = asyncio.run(two_sweepers())
+
+    assert first + second == 6
+    assert first and second
+    assert sorted(dropped) == sorted(f"org_expired{i}" for i in range(6))
+    assert names(db, "organizations") == []
+
+
+def test_purge_never_drops_the_master_database(db):
+    """Test that a tenant database named after the master database is left for an operator"""
+    add_org(db, "Master", deleted_days_ago=31, tenancy="database",
+            database_name=db_client.DATABASE_NAME, collection_name="records")
+    add_org(db, "Expired", deleted_days_ago=31)
+
+    assert asyncio.run(purge_deleted_organizations(now=NOW)) == 1
+
+    assert db_client.DATABASE_NAME in db.client._databases
+    assert names(db, "organizations") == ["Master"]
+    assert names(db, "admins") == ["admin@org_master"]
+
+
+def test_purge_on_memory_storage(monkeypatch):
+    """Test that organizations and admins stored in memory are purged without a database"""
+    monkeypatch.setattr(db_client, "database", None)
+    monkeypatch.setattr(provider, "STORAGE_BACKEND", "memory")
+    monkeypatch.setattr(provider, "_memory_organizations", MemoryOrganizationRepository())
+    monkeypatch.setattr(provider, "_memory_admins", MemoryAdminRepository())
+    monkeypatch.setattr(purge_service, "PURGE_RETENTION_DAYS", 30)
+
+    async def scenario():
+        organizations, admins = provider.get_organization_repository(), provider.get_admin_repository()
+        expired_id = await organizations.insert({
+            "organization_name": "Expired", "slug": "org_expired", "collection_name": "org_expired",
+            "deleted_at": NOW - timedelta(days=31)})
+        await admins.insert({"email": "admin@org_expired", "organization_id": str(expired_id)})
+        await organizations.insert({"organization_name": "Active", "slug": "org_active"})
+
+        assert await purge_deleted_organizations(now=NOW) == 1
+        assert await organizations.find_by_slug("org_expired") is None
+        assert await admins.find_by_email("admin@org_expired") is None
+        assert (await organizations.find_by_slug("org_active"))["organization_name"] == "Active"
+
+    asyncio.run(scenario())
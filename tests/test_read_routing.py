@@ -0,0 +1,135 @@
+"""
+Tests for read-preference routing and per-member pool metrics
+
+The replica set test needs a replica set, e.g. the one in
+docker-compose.replica.yml:
+
+    MONGO_TEST_REPLICA_SET="mongodb://localhost:27021,localhost:27022,localhost:27023/?replicaSet=rs0" \\
+        pytest tests/test_read_routing.py
+"""
+import asyncio
+import os
+import uuid
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+from pymongo.read_preferences import Primary, SecondaryPreferred
+
+from app.auth.dependencies import OPERATOR_ROLE
+from app.db.monitoring import PoolMetricsListener
+from app.db.read_routing import build_read_preference
+from app.main import app
+from app.repositories import provider
+from app.repositories.memory import MemoryAdminRepository, MemoryOrganizationRepository
+from app.utils.jwt import create_access_token
+
+MONGO_TEST_REPLICA_SET = os.getenv("MONGO_TEST_REPLICA_SET")
+
+
+class TestReadPreference:
+    """Building read preferences from configuration"""
+
+    def test_secondary_preferred_with_staleness(self):
+        """Test that the staleness bound is applied"""
+        pref = build_read_preference("secondaryPreferred", max_staleness=120)
+        assert isinstance(pref, SecondaryPreferred)
+        assert pref.max_staleness == 120
+
+    def test_primary_ignores_staleness(self):
+        """Test that primary reads carry no staleness bound"""
+        assert isinstance(build_read_preference("primary", max_staleness=120), Primary)
+
+    def test_unknown_mode(self):
+        """Test that unknown modes are rejected"""
+        with pytest.raises(ValueError):
+            build_read_preference("fastest")
+
+
+class TestPoolMetrics:
+    """Pool counters are kept per member"""
+
+    def test_counters_per_member(self):
+        """Test checkouts, check-ins and roles for two members"""
+        listener = PoolMetricsListener()
+        primary = SimpleNamespace(address=("db1", 27017))
+        secondary = SimpleNamespace(address=("db2", 27017))
+
+        for event in (primary, secondary, secondary):
+            listener.connection_created(event)
+            listener.connection_check_out_started(event)
+            listener.connection_checked_out(event)
+        listener.connection_checked_in(secondary)
+        listener.description_changed(SimpleNamespace(
+            server_address=("db2", 27017),
+            new_description=SimpleNamespace(server_type_name="RSSecondary")))
+
+        snapshot = listener.snapshot()
+        assert snapshot["db1:27017"]["checkouts"] == 1
+        assert snapshot["db2:27017"]["open"] == 2
+        assert snapshot["db2:27017"]["checked_out"] == 1
+        assert snapshot["db2:27017"]["role"] == "RSSecondary"
+        assert snapshot["db1:27017"]["role"] == "Unknown"
+
+
+class TestOperatorOnlyReads:
+    """Endpoints exposing every tenant or the database topology"""
+
+    @pytest.fixture
+    def tokens(self, monkeypatch):
+        """Tokens of an operator and of an organization admin, stored in memory"""
+        monkeypatch.setattr(provider, "STORAGE_BACKEND", "memory")
+        monkeypatch.setattr(provider, "_memory_organizations", MemoryOrganizationRepository())
+        monkeypatch.setattr(provider, "_memory_admins", MemoryAdminRepository())
+
+        def token(**fields):
+            admin_id = asyncio.run(provider.get_admin_repository().insert(
+                {"email": "admin@example.com", "hashed_password": "x", **fields}))
+            access_token = create_access_token({"sub": str(admin_id), "email": "admin@example.com", "type": "admin"})
+            return {"Authorization": f"Bearer {access_token}"}
+
+        return {"operator": token(role=OPERATOR_ROLE), "tenant": token(organization_id=str(uuid.uuid4()))}
+
+    @pytest.mark.parametrize("path", ["/org/list", "/admin/db/pools"])
+    def test_refused_to_organization_admins(self, tokens, path):
+        """Test that a tenant admin can't list other tenants or the replica set members"""
+        client = TestClient(app)
+        assert client.get(path, headers=tokens["tenant"]).status_code == 403
+        assert client.get(path, headers=tokens["operator"]).status_code == 200
+
+
+@pytest.mark.skipif(not MONGO_TEST_REPLICA_SET, reason="MONGO_TEST_REPLICA_SET not set")
+def test_org_reads_use_secondaries(monkeypatch):
+    """Test that /org/get-style reads are served by a secondary"""
+    from app.db import client as db_client
+    from app.db.monitoring import pool_metrics
+    from app.models.organization import OrganizationCreate
+    from app.services.org_service import create_organization, get_organization_by_name
+
+    monkeypatch.setattr(db_client, "MONGODB_URL", MONGO_TEST_REPLICA_SET)
+
+    def secondary_checkouts():
+        return sum(member["checkouts"] for member in pool_metrics.snapshot().values()
+                   if member["role"] == "RSSecondary")
+
+    async def run():
+        await db_client.init_db()
+        try:
+            name = f"ReadRoutingOrg_{uuid.uuid4().hex[:8]}"
+            await create_organization(OrganizationCreate(organization_name=name))
+
+            # Read-your-writes holds on the primary
+            assert await get_organization_by_name(name) is not None
+
+            before = secondary_checkouts()
+            for _ in range(50):
+                if await get_organization_by_name(name, allow_secondary=True):
+                    break
+                await asyncio.sleep(0.1)
+            else:
+                pytest.fail("organization never replicated to a secondary")
+            assert secondary_checkouts() > before
+        finally:
+            await db_client.close_db()
+
+    asyncio.run(run())
@@ -0,0 +1,112 @@
+"""
+Tests for the liveness and cached readiness probes
+"""
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import main as app_main
+from app.db import client as db_client
+from app.utils import readiness
+from app.utils.readiness import ReadinessMonitor
+from benchmarks.fake_mongo import FakeMotorClient, install
+
+
+@pytest.fixture
+def mongo_backend(monkeypatch):
+    """MongoDB storage backend, with the database globals restored afterwards"""
+    for name in ("client", "database", "_db_initialized"):
+        monkeypatch.setattr(db_client, name, getattr(db_client, name))
+    monkeypatch.setattr(readiness.provider, "STORAGE_BACKEND", "mongodb")
+    monkeypatch.setattr(readiness.pool_metrics, "snapshot", lambda: {})
+    monkeypatch.setattr(readiness.loop_monitor, "lag", 0.0)
+
+
+def refresh(monitor=None):
+    monitor = monitor or ReadinessMonitor()
+    asyncio.run(monitor.refresh())
+    return monitor.status()
+
+
+def test_ready_with_a_responsive_database(mongo_backend):
+    """Test that a successful ping makes the worker ready and reports its latency"""
+    install(FakeMotorClient(latency=0.001))
+
+    status = refresh()
+
+    assert status["ready"] is True
+    assert status["checks"]["mongodb"]["ping_ms"] >= 1
+    assert status["checks"]["mongodb"]["circuit"] == "closed"
+
+
+def test_not_ready_when_the_ping_is_too_slow(mongo_backend, monkeypatch):
+    """Test that a ping over the timeout fails readiness"""
+    install(FakeMotorClient(latency=0.2))
+    monkeypatch.setattr(readiness, "READINESS_PING_TIMEOUT_SECONDS", 0.01)
+
+    status = refresh()
+
+    assert status["ready"] is False
+    assert "timed out" in status["checks"]["mongodb"]["error"]
+
+
+def test_not_ready_without_a_database(mongo_backend, monkeypatch):
+    """Test that an uninitialized database fails readiness on the MongoDB backend"""
+    monkeypatch.setattr(db_client, "_db_initialized", False)
+
+    assert refresh()["checks"]["mongodb"]["ok"] is False
+
+
+def test_memory_backend_skips_the_database(mongo_backend, monkeypatch):
+    """Test that the in-memory backend is ready without MongoDB"""
+    monkeypatch.setattr(readiness.provider, "STORAGE_BACKEND", "memory")
+
+    status = refresh()
+
+    assert status["ready"] is True
+    assert "skipped" in status["checks"]["mongodb"]
+
+
+def test_not_ready_when_saturated_or_lagging(mongo_backend, monkeypatch):
+    """Test the pool saturation and event loop lag thresholds"""
+    monkeypatch.setattr(readiness.provider, "STORAGE_BACKEND", "memory")
+    monkeypatch.setattr(readiness, "MAX_POOL_SIZE", 10)
+    monkeypatch.setattr(readiness.pool_metrics, "snapshot",
+                        lambda: {"db1:27017": {"checked_out": 10}, "db2:27017": {"checked_out": 2}})
+
+    pool = refresh()["checks"]["connection_pool"]
+    assert pool == {"ok": False, "saturation": 1.0, "members": {"db1:27017": 1.0, "db2:27017": 0.2}}
+
+    monkeypatch.setattr(readiness.pool_metrics, "snapshot", lambda: {})
+    monkeypatch.setattr(readiness.loop_monitor, "lag", 2.0)
+    status = refresh()
+    assert status["ready"] is False
+    assert status["checks"]["event_loop"]["ok"] is False
+
+
+def test_status_before_first_refresh_and_when_stale(mongo_backend, monkeypatch):
+    """Test that a missing or stale status is reported as not ready"""
+    monkeypatch.setattr(readiness.provider, "STORAGE_BACKEND", "memory")
+    monitor = ReadinessMonitor(max_age=0)
+
+    assert monitor.status() == {"ready": False, "reason": "starting", "checks": {}}
+    status = refresh(monitor)
+    assert status["ready"] is False
+    assert status["reason"] == "stale"
+
+
+def test_probe_endpoints(mongo_backend, monkeypatch):
+    """Test /livez and that /readyz serves the cached status without running checks"""
+    monkeypatch.setattr(readiness.provider, "STORAGE_BACKEND", "memory")
+    monitor = ReadinessMonitor()
+    monkeypatch.setattr(app_main, "readiness_monitor", monitor)
+    client = TestClient(app_main.app)
+
+    assert client.get("/livez").json() == {"status": "alive"}
+    assert client.get("/readyz").status_code == 503
+
+    asyncio.run(monitor.refresh())
+    response = client.get("/readyz")
+    assert response.status_code == 200
+    assert response.json()["ready"] is True
@@ -0,0 +1,221 @@
+"""
+Tests for the organization and admin repositories
+"""
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+
+from app.models.organization import OrganizationCreate, OrganizationUpdate
+from app.repositories import provider
+from app.repositories.memory import MemoryAdminRepository, MemoryOrganizationRepository
+from app.repositories.mongo import MongoAdminRepository, MongoOrganizationRepository
+from benchmarks.fake_mongo import FakeMotorClient
+
+
+def _org(name, **fields):
+    now = datetime.utcnow()
+    slug = f"org_{name.lower()}"
+    return {"organization_name": name, "slug": slug, "collection_name": slug,
+            "created_at": now, "updated_at": now, **fields}
+
+
+@pytest.fixture(params=["memory", "mongo"])
+def repositories(request):
+    """Both backends, the Motor one on the in-memory driver stand-in"""
+    if request.param == "memory":
+        return MemoryOrganizationRepository(), MemoryAdminRepository()
+    db = FakeMotorClient()["test"]
+    return MongoOrganizationRepository(db), MongoAdminRepository(db)
+
+
+def test_organization_lookups(repositories):
+    """Test the lookups every backend must agree on"""
+    organizations, _ = repositories
+
+    async def scenario():
+        acme_id = await organizations.insert(_org("Acme"))
+        legacy_id = await organizations.insert({"organization_name": "Legacy", "collection_name": "org_legacy"})
+        await organizations.insert(_org("Gone", deleted_at=datetime.utcnow()))
+
+        assert (await organizations.get_active(acme_id))["organization_name"] == "Acme"
+        assert (await organizations.get_active_by_name("Acme"))["_id"] == acme_id
+        assert await organizations.get_active_by_name("Gone") is None
+        # Slug checks see soft-deleted organizations and legacy collection names
+        assert (await organizations.find_by_slug("org_gone"))["deleted_at"] is not None
+        assert (await organizations.find_by_slug("org_legacy"))["_id"] == legacy_id
+        assert await organizations.find_by_slug("org_acme", exclude_id=acme_id) is None
+        assert (await organizations.find_by_collection_name("org_acme"))["_id"] == acme_id
+
+        names = [org["organization_name"] for org in await organizations.list_active()]
+        assert names == ["Acme", "Legacy"]
+        assert [org["organization_name"] for org in await organizations.list_active(skip=1, limit=1)] == ["Legacy"]
+
+    asyncio.run(scenario())
+
+
+def test_organization_writes(repositories):
+    """Test updates, soft deletes and that returned documents are copies"""
+    organizations, _ = repositories
+
+    async def scenario():
+        acme_id = await organizations.insert(_org("Acme"))
+
+        updated = await organizations.update_active(acme_id, {"organization_name": "Acme2", "slug": "org_acme2"})
+        assert updated["organization_name"] == "Acme2"
+        updated["organization_name"] = "mutated"
+        assert await organizations.get_active_by_name("Acme") is None
+        assert (await organizations.get_active_by_name("Acme2"))["_id"] == acme_id
+        assert (await organizations.find_by_slug("org_acme2"))["_id"] == acme_id
+
+        assert await organizations.soft_delete_by_name("Acme2", datetime.utcnow()) == acme_id
+        assert await organizations.soft_delete_by_name("Acme2", datetime.utcnow()) is None
+        assert await organizations.soft_delete(acme_id, datetime.utcnow()) is False
+        assert await organizations.update_active(acme_id, {"organization_name": "x"}) is None
+
+    asyncio.run(scenario())
+
+
+def test_routing_and_purge(repositories):
+    """Test tenant route lookups and claiming, then removing, deleted organizations"""
+    organizations, admins = repositories
+    now = datetime.utcnow()
+    expiry = now - timedelta(minutes=10)
+
+    async def scenario():
+        acme_id = await organizations.insert(_org("Acme", tenancy="pooled", collection_name="tenants_1"))
+        old_id = await organizations.insert(_org("Old", deleted_at=now - timedelta(days=40)))
+        older_id = await organizations.insert(_org("Older", deleted_at=now - timedelta(days=50)))
+        await organizations.insert(_org("Recent", deleted_at=now - timedelta(days=1)))
+        await admins.insert({"email": "a@old.example.com", "organization_id": str(old_id)})
+        await admins.insert({"email": "b@old.example.com", "organization_id": str(old_id)})
+
+        route = await organizations.get_active_route(acme_id)
+        assert route == {"_id": acme_id, "collection_name": "tenants_1", "tenancy": "pooled"}
+        assert await organizations.get_active_route(old_id) is None
+
+        cutoff = now - timedelta(days=30)
+        assert (await organizations.claim_purge(cutoff, expiry, now))["_id"] == older_id
+        assert (await organizations.claim_purge(cutoff, expiry, now))["_id"] == old_id
+        assert await organizations.claim_purge(cutoff, expiry, now) is None
+        # Abandoned claims are taken over
+        assert (await organizations.claim_purge(cutoff, now, now))["_id"] == older_id
+
+        assert await admins.delete_by_organization(str(old_id)) == 2
+        assert await admins.find_by_email("a@old.example.com") is None
+        assert await organizations.delete_purged(old_id) is True
+        assert await organizations.delete_purged(acme_id) is False
+        assert await organizations.find_by_slug("org_old") is None
+
+    asyncio.run(scenario())
+
+
+def test_migration_claims(repositories):
+    """Test claiming, fencing and switching an organization for a migration"""
+    organizations, _ = repositories
+    now = datetime.utcnow()
+    expiry = now - timedelta(minutes=30)
+
+    async def scenario():
+        pooled_id = await organizations.insert(_org("Pooled", tenancy="pooled", collection_name="tenants_1"))
+        await organizations.insert(_org("Shared", tenancy="pooled", collection_name="tenants_1"))
+        await organizations.insert(_org("Elsewhere", tenancy="pooled", collection_name="tenants_1", cluster="b"))
+        await organizations.insert(_org("Gone", tenancy="pooled", collection_name="tenants_2", deleted_at=now))
+        dedicated_id = await organizations.insert(_org("Dedicated"))
+
+        shared = await organizations.pooled_collections()
+        assert sorted(shared, key=lambda row: row.get("cluster", "")) == [
+            {"collection_name": "tenants_1"}, {"cluster": "b", "collection_name": "tenants_1"}]
+        assert await organizations.filter_pooled([dedicated_id, pooled_id, ObjectId()]) == [pooled_id]
+
+        assert await organizations.claim_migration(dedicated_id, expiry, now, tenancy="pooled") is None
+        assert (await organizations.claim_migration(pooled_id, expiry, now, tenancy="pooled"))["_id"] == pooled_id
+        assert await organizations.claim_migration(pooled_id, expiry, now) is None
+        await organizations.fence_writes(pooled_id)
+        assert (await organizations.get_active_route(pooled_id))["write_fenced"] is True
+
+        # The switch only applies if nothing moved the organization meanwhile
+        assert await organizations.complete_migration(
+            pooled_id, {"collection_name": "tenants_2"}, {"cluster": "b"}) is False
+        assert await organizations.complete_migration(
+            pooled_id, {"collection_name": "tenants_1", "cluster": [None, "default"]}, {"cluster": "b"}) is True
+        route = await organizations.get_active_route(pooled_id)
+        assert route["cluster"] == "b"
+        assert "write_fenced" not in route and "migration_started_at" not in route
+
+        assert await organizations.claim_migration(dedicated_id, expiry, now) is not None
+        await organizations.release_migration(dedicated_id)
+        assert await organizations.claim_migration(dedicated_id, expiry, now) is not None
+
+    asyncio.run(scenario())
+
+
+def test_admin_lookups(repositories):
+    """Test admin lookups by email and ID"""
+    _, admins = repositories
+
+    async def scenario():
+        admin_id = await admins.insert({"email": "a@example.com", "hashed_password": "h"})
+        assert (await admins.find_by_email("a@example.com"))["_id"] == admin_id
+        assert (await admins.get(admin_id))["email"] == "a@example.com"
+        assert await admins.find_by_email("b@example.com") is None
+        assert await admins.get(ObjectId()) is None
+
+    asyncio.run(scenario())
+
+
+def test_services_run_on_memory_storage():
+    """Test the organization lifecycle without any database"""
+    from app.services.auth_service import authenticate_admin
+    from app.services.org_service import (
+        create_organization,
+        delete_organization_by_name,
+        get_all_organizations,
+        get_organization_by_name,
+        update_organization_by_name,
+    )
+
+    async def scenario():
+        created = await create_organization(OrganizationCreate(
+            organization_name="Memory Org", admin_email="admin@memory.example.com", admin_password="secret-pw"))
+        assert created["slug"] == "org_memory_org"
+        assert (await get_organization_by_name("Memory Org"))["id"] == created["id"]
+
+        admin = await authenticate_admin("admin@memory.example.com", "secret-pw")
+        assert admin["organization_id"] == created["id"]
+        assert await authenticate_admin("admin@memory.example.com", "wrong") is None
+
+        updated = await update_organization_by_name("Memory Org", OrganizationUpdate(
+            current_organization_name="Memory Org", new_organization_name="Renamed Org"))
+        assert updated["collection_name"] == "org_renamed_org"
+        assert [org["organization_name"] for org in await get_all_organizations()] == ["Renamed Org"]
+
+        assert await delete_organization_by_name("Renamed Org") is True
+        assert await get_organization_by_name("Renamed Org") is None
+
+    provider.use_memory_storage()
+    try:
+        asyncio.run(scenario())
+    finally:
+        provider.use_mongo_storage()
+
+
+def test_admins_of_deleted_organizations_cannot_log_in():
+    """Test that soft-deleting an organization also ends its admins' logins"""
+    from app.services.auth_service import authenticate_admin
+    from app.services.org_service import create_organization, delete_organization_by_name
+
+    async def scenario():
+        await create_organization(OrganizationCreate(
+            organization_name="Closing Org", admin_email="admin@closing.example.com", admin_password="secret-pw"))
+        assert await authenticate_admin("admin@closing.example.com", "secret-pw") is not None
+
+        assert await delete_organization_by_name("Closing Org") is True
+        assert await authenticate_admin("admin@closing.example.com", "secret-pw") is None
+
+    provider.use_memory_storage()
+    try:
+        asyncio.run(scenario())
+    finally:
+        provider.use_mongo_storage()
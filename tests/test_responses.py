@@ -0,0 +1,68 @@
+"""
+Tests for the JSON response classes
+"""
+import json
+from datetime import date, datetime
+
+import pytest
+from bson import ObjectId
+
+from app.utils import responses
+
+ENCODERS = [responses.StdlibJSONResponse]
+if responses.orjson is not None:
+    ENCODERS.append(responses.ORJSONResponse)
+
+
+@pytest.mark.parametrize("response_class", ENCODERS, ids=lambda c: c.__name__)
+def test_encodes_documents_natively(response_class):
+    """Test that ObjectIds and datetimes need no conversion before responding"""
+    org_id = ObjectId()
+    content = {
+        "id": org_id,
+        "created_at": datetime(2024, 1, 2, 3, 4, 5, 600000),
+        "updated_at": datetime(2024, 1, 2, 3, 4, 5),
+        "day": date(2024, 1, 2),
+        "name": "Åcme",
+    }
+
+    body = json.loads(response_class(content=content).body)
+
+    assert body == {
+        "id": str(org_id),
+        "created_at": "2024-01-02T03:04:05.600000",
+        "updated_at": "2024-01-02T03:04:05",
+        "day": "2024-01-02",
+        "name": "Åcme",
+    }
+
+
+@pytest.mark.parametrize("response_class", ENCODERS, ids=lambda c: c.__name__)
+def test_rejects_unknown_types(response_class):
+    """Test that unsupported values still fail loudly instead of being stringified"""
+    with pytest.raises(TypeError):
+        response_class(content={"value": object()})
+
+
+def test_create_response_uses_configured_class():
+    """Test that create_response goes through the globally selected class"""
+    response = responses.create_response(data={"id": ObjectId()}, trace_id="t")
+
+    assert isinstance(response, responses.DefaultJSONResponse)
+    assert json.loads(response.body)["trace_id"] == "t"
+
+
+def test_unknown_encoder_is_rejected(monkeypatch):
+    """Test that a misspelt JSON_ENCODER fails at startup"""
+    monkeypatch.setattr(responses, "JSON_ENCODER", "ujson")
+
+    with pytest.raises(ValueError):
+        responses._select_encoder()
+
+
+def test_missing_orjson_falls_back_to_stdlib(monkeypatch):
+    """Test the fallback when orjson is selected but not installed"""
+    monkeypatch.setattr(responses, "JSON_ENCODER", "orjson")
+    monkeypatch.setattr(responses, "orjson", None)
+
+    assert responses._select_encoder() == "stdlib"
@@ -0,0 +1,84 @@
+"""
+Tests for the production launcher and graceful shutdown of background jobs
+"""
+import asyncio
+
+from app import server
+from app.utils import background
+
+
+def test_pool_is_split_across_workers(monkeypatch):
+    """Test that the MongoDB connection budget is shared by all workers"""
+    monkeypatch.setattr(server, "WEB_CONCURRENCY", "4")
+    monkeypatch.setattr(server, "MONGO_CONNECTION_BUDGET", 200)
+    monkeypatch.setattr(server, "MONGO_MAX_POOL_SIZE", "")
+
+    config = server.build_config()
+
+    assert config["workers"] == 4
+    assert config["pool_size"] == 50
+    assert server.pool_size_per_worker(3, 8) == 1
+
+
+def test_explicit_pool_size_wins(monkeypatch):
+    """Test that MONGO_MAX_POOL_SIZE overrides the budget"""
+    monkeypatch.setattr(server, "WEB_CONCURRENCY", "4")
+    monkeypatch.setattr(server, "MONGO_MAX_POOL_SIZE", "7")
+
+    assert server.build_config()["pool_size"] == 7
+
+
+def test_workers_default_to_available_cpus(monkeypatch):
+    """Test that the worker count follows CPU affinity and the cgroup quota"""
+    monkeypatch.setattr(server, "WEB_CONCURRENCY", "")
+    monkeypatch.setattr(server.os, "sched_getaffinity", lambda pid: set(range(8)))
+    monkeypatch.setattr(server, "_cgroup_cpu_limit", lambda: 2.5)
+
+    assert server.available_cpus() == 3
+    assert server.build_config()["workers"] == 3
+
+
+def test_stop_waits_for_work_in_progress():
+    """Test that shutdown lets running job work finish instead of abandoning it"""
+    finished = []
+
+    async def step():
+        await asyncio.sleep(0.05)
+        finished.append("step")
+
+    async def job():
+        while True:
+            await background.run_to_completion(step())
+
+    async def scenario():
+        background.start_background_task("test_job", job)
+        await asyncio.sleep(0.01)
+        await background.stop_background_tasks(grace=1)
+
+    asyncio.run(scenario())
+
+    assert finished == ["step"]
+
+
+def test_stop_cancels_work_past_the_grace_period():
+    """Test that work overrunning the grace period is cancelled"""
+    cancelled = []
+
+    async def step():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append("step")
+            raise
+
+    async def job():
+        await background.run_to_completion(step())
+
+    async def scenario():
+        background.start_background_task("test_job", job)
+        await asyncio.sleep(0.01)
+        await background.stop_background_tasks(grace=0.05)
+
+    asyncio.run(scenario())
+
+    assert cancelled == ["step"]
@@ -127,6 +127,11 @@ class TestSmoke:
             f"/org/delete?organization_name={test_org_name}")
         assert response.status_code == 401  # Unauthorized
 
+    def test_tenant_records_require_auth(self):
+        """Test that tenant data endpoints require authentication"""
+        response = client.get("/tenant/records")
+        assert response.status_code == 401
+
     def test_full_workflow(self, test_org_name, test_admin_email, test_admin_password):
         """Test complete workflow: create -> login -> get -> delete"""
         # Create organization
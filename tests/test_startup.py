@@ -0,0 +1,79 @@
+"""
+Tests for worker startup: lifespan, lazy components and the prebuilt OpenAPI schema
+"""
+import asyncio
+import json
+import subprocess
+import sys
+
+from fastapi import FastAPI
+
+from app import main as app_main
+from app import openapi
+from app.utils.background import get_background_tasks
+
+
+def test_lifespan_does_not_wait_for_index_creation(monkeypatch):
+    """Test that startup returns while the master indexes are still being created"""
+    calls = []
+
+    async def fake_init_db(create_indexes=True):
+        calls.append(("init_db", create_indexes))
+
+    monkeypatch.setattr(app_main.repositories, "STORAGE_BACKEND", "mongodb")
+    monkeypatch.setattr(app_main, "init_db", fake_init_db)
+
+    async def scenario():
+        release = asyncio.Event()
+
+        async def slow_indexes():
+            calls.append(("ensure_indexes", None))
+            await release.wait()
+
+        monkeypatch.setattr(app_main, "ensure_indexes", slow_indexes)
+        async with app_main.app.router.lifespan_context(app_main.app):
+            await asyncio.sleep(0)
+            running = {name for name, task in get_background_tasks().items() if not task.done()}
+        return running, get_background_tasks()
+
+    running, after_shutdown = asyncio.run(scenario())
+
+    assert calls == [("init_db", False), ("ensure_indexes", None)]
+    assert {"ensure_indexes", "loop_lag", "org_purge"} <= running
+    assert after_shutdown == {}
+
+
+def test_importing_the_app_skips_passlib():
+    """Test that the passlib context is only built when a fallback needs it"""
+    completed = subprocess.run(
+        [sys.executable, "-c", "import sys, app.main; print('passlib.context' in sys.modules)"],
+        capture_output=True, text=True, check=True)
+
+    assert completed.stdout.strip() == "False"
+
+
+def test_shipped_schema_is_up_to_date():
+    """Test that openapi.json matches the routes; regenerate with python -m app.openapi"""
+    assert openapi.main(["--check"]) == 0
+
+
+def test_prebuilt_schema_is_served(tmp_path):
+    """Test that a loaded schema is served as is instead of being generated"""
+    demo = FastAPI(version="2.0.0")
+    schema = {"openapi": "3.1.0", "info": {"title": "Prebuilt", "version": "2.0.0"}, "paths": {}}
+    path = tmp_path / "openapi.json"
+    path.write_text(json.dumps(schema))
+
+    assert openapi.load_openapi_schema(demo, str(path))
+    assert demo.openapi() == schema
+
+
+def test_stale_or_missing_schema_is_ignored(tmp_path):
+    """Test that schemas for another version, or unreadable files, fall back to generation"""
+    demo = FastAPI(version="2.0.0")
+    path = tmp_path / "openapi.json"
+    path.write_text(json.dumps({"openapi": "3.1.0", "info": {"title": "Old", "version": "1.0.0"}}))
+
+    assert not openapi.load_openapi_schema(demo, str(path))
+    assert not openapi.load_openapi_schema(demo, str(tmp_path / "missing.json"))
+    assert demo.openapi()["info"]["version"] == "2.0.0"
@@ -0,0 +1,300 @@
+"""
+Tests for tenancy helpers and tenant routing
+"""
+import asyncio
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+
+from app.db import client as db_client
+from app.db import placement
+from app.db.tenant_databases import tenant_databases
+from app.services import tenant_migration, tenant_router
+from app.services.tenancy import (
+    SHARED_COLLECTION_PREFIX,
+    TENANT_DATABASE_COLLECTION,
+    shared_collection_name,
+)
+from app.services.tenant_provisioning import drop_tenant_storage
+from app.services.tenant_router import (
+    TenantCollection,
+    TenantNotFoundError,
+    TenantWriteFencedError,
+    get_tenant_collection,
+    invalidate_tenant,
+)
+from benchmarks.fake_mongo import FakeMotorClient, install
+
+
+class RecordingCollection:
+    """Collection stand-in that records the filters and documents it receives"""
+
+    name = "shared_tenants_000"
+
+    def __init__(self):
+        self.calls = []
+
+    async def insert_one(self, document, **kwargs):
+        self.calls.append(("insert_one", document))
+
+    async def find_one(self, filter, *args, **kwargs):
+        self.calls.append(("find_one", filter))
+
+    async def delete_one(self, filter, **kwargs):
+        self.calls.append(("delete_one", filter))
+
+
+class TestTenancy:
+    """Pooled tenancy scoping"""
+
+    def test_shared_collection_name_is_stable(self):
+        """Test that a slug always maps to the same shared collection"""
+        name = shared_collection_name("org_acme_corp", 16)
+        assert name == shared_collection_name("org_acme_corp", 16)
+        assert name.startswith(SHARED_COLLECTION_PREFIX)
+        assert 0 <= int(name[len(SHARED_COLLECTION_PREFIX):]) < 16
+
+    def test_pooled_collection_injects_tenant_id(self):
+        """Test that pooled collections scope every filter and insert"""
+        raw = RecordingCollection()
+        collection = TenantCollection(raw, "t1", pooled=True)
+
+        async def run():
+            await collection.insert_one({"data": {}})
+            await collection.find_one({"_id": 1, "tenant_id": "t2"})
+            await collection.delete_one({"_id": 1})
+
+        asyncio.run(run())
+        assert raw.calls[0] == ("insert_one", {"data": {}, "tenant_id": "t1"})
+        assert raw.calls[1] == ("find_one", {"_id": 1, "tenant_id": "t1"})
+        assert raw.calls[2] == ("delete_one", {"_id": 1, "tenant_id": "t1"})
+
+    def test_dedicated_collection_passes_filters_through(self):
+        """Test that dedicated collections are not scoped"""
+        raw = RecordingCollection()
+        collection = TenantCollection(raw, "t1")
+
+        asyncio.run(collection.find_one({"_id": 1}))
+        assert raw.calls == [("find_one", {"_id": 1})]
+
+    def test_write_fenced_collection_refuses_writes(self):
+        """Test that a write-fenced tenant can still read but not write"""
+        raw = RecordingCollection()
+        collection = TenantCollection(raw, "t1", pooled=True, write_fenced=True)
+
+        asyncio.run(collection.find_one({"_id": 1}))
+        with pytest.raises(TenantWriteFencedError):
+            asyncio.run(collection.insert_one({"data": {}}))
+        assert raw.calls == [("find_one", {"_id": 1, "tenant_id": "t1"})]
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Monotonic clock the route cache reads, advanced by hand"""
+    clock = FakeClock()
+    monkeypatch.setattr(tenant_router, "time", clock)
+    monkeypatch.setattr(tenant_router, "TENANT_ROUTE_TTL_SECONDS", 60)
+    monkeypatch.setattr(tenant_router, "TENANT_POOLED_ROUTE_TTL_SECONDS", 5)
+    return clock
+
+
+@pytest.fixture
+def db(monkeypatch):
+    """In-memory master database, with empty route and handle caches"""
+    for name in ("client", "database", "_db_initialized"):
+        monkeypatch.setattr(db_client, name, getattr(db_client, name))
+    invalidate_tenant()
+    tenant_databases.clear()
+    yield install(FakeMotorClient())
+    invalidate_tenant()
+    tenant_databases.clear()
+
+
+def add_org(db, slug, **fields):
+    org_id = ObjectId()
+    asyncio.run(db["organizations"].insert_one(
+        {"_id": org_id, "slug": slug, "cluster": "default", "deleted_at": None, **fields}))
+    return org_id
+
+
+def add_database_org(db, slug):
+    return add_org(db, slug, tenancy="database", database_name=slug,
+                   collection_name=TENANT_DATABASE_COLLECTION)
+
+
+def names(collection):
+    return sorted(doc["name"] for doc in asyncio.run(collection.find({}).to_list()))
+
+
+class TestDatabaseTenancyRouting:
+    """Routing organizations that have a database of their own"""
+
+    def test_resolves_to_the_tenants_own_database(self, db):
+        """Test that each tenant's records go to its own database, unscoped"""
+        acme = str(add_database_org(db, "org_acme"))
+        globex = str(add_database_org(db, "org_globex"))
+
+        async def run():
+            await (await get_tenant_collection(acme)).insert_one({"name": "a"})
+            await (await get_tenant_collection(globex)).insert_one({"name": "g"})
+            return await get_tenant_collection(acme)
+
+        collection = asyncio.run(run())
+        assert not collection.pooled and collection.name == TENANT_DATABASE_COLLECTION
+        assert names(db.client["org_acme"][TENANT_DATABASE_COLLECTION]) == ["a"]
+        assert names(db.client["org_globex"][TENANT_DATABASE_COLLECTION]) == ["g"]
+        assert "tenant_id" not in asyncio.run(db.client["org_acme"][TENANT_DATABASE_COLLECTION].find_one({}))
+
+    def test_database_handles_are_reused(self, db, clock):
+        """Test that re-resolving a route reuses the cached database handle"""
+        acme = str(add_database_org(db, "org_acme"))
+
+        before = tenant_databases.stats()
+        first = asyncio.run(get_tenant_collection(acme))
+        invalidate_tenant(acme)
+        second = asyncio.run(get_tenant_collection(acme))
+        after = tenant_databases.stats()
+
+        assert first is not second
+        assert first.collection.database is second.collection.database
+        assert (after["misses"] - before["misses"], after["hits"] - before["hits"]) == (1, 1)
+
+    def test_unknown_and_deleted_tenants_are_not_found(self, db):
+        """Test that only active organizations resolve"""
+        deleted = add_database_org(db, "org_gone")
+        asyncio.run(db["organizations"].update_one({"_id": deleted}, {"$set": {"deleted_at": 1}}))
+
+        for organization_id in (str(deleted), str(ObjectId()), "not-an-id"):
+            with pytest.raises(TenantNotFoundError):
+                asyncio.run(get_tenant_collection(organization_id))
+
+
+class TestRouteCacheTTL:
+    """How long resolved routes are cached"""
+
+    def test_dedicated_route_cached_for_the_route_ttl(self, db, clock):
+        """Test that a database tenant's route is reused until TENANT_ROUTE_TTL_SECONDS"""
+        acme = add_database_org(db, "org_acme")
+        first = asyncio.run(get_tenant_collection(str(acme)))
+        asyncio.run(db["organizations"].update_one({"_id": acme}, {"$set": {"write_fenced": True}}))
+
+        clock.now += 59
+        assert asyncio.run(get_tenant_collection(str(acme))) is first
+        clock.now += 2
+        refreshed = asyncio.run(get_tenant_collection(str(acme)))
+        assert refreshed is not first and refreshed.write_fenced
+
+    @pytest.mark.parametrize("fields", [
+        {"tenancy": "pooled", "collection_name": "shared_tenants_001"},
+        {"tenancy": "database", "database_name": "org_acme", "collection_name": TENANT_DATABASE_COLLECTION,
+         "migration_started_at": 1},
+    ])
+    def test_short_ttl_for_tenants_about_to_move(self, db, clock, fields):
+        """Test that pooled and migrating tenants are only cached for the short route TTL"""
+        acme = str(add_org(db, "org_acme", **fields))
+        first = asyncio.run(get_tenant_collection(acme))
+
+        clock.now += 4
+        assert asyncio.run(get_tenant_collection(acme)) is first
+        clock.now += 2
+        assert asyncio.run(get_tenant_collection(acme)) is not first
+
+    def test_invalidation_drops_the_route(self, db, clock):
+        """Test that an invalidated route is resolved again before it expires"""
+        acme = str(add_database_org(db, "org_acme"))
+        first = asyncio.run(get_tenant_collection(acme))
+
+        invalidate_tenant(acme)
+
+        assert asyncio.run(get_tenant_collection(acme)) is not first
+
+
+class TestDropTenantStorage:
+    """Removing tenant data for good"""
+
+    def test_drops_the_tenants_database(self, db):
+        """Test that database tenancy drops the database and forgets its handle"""
+        acme = add_database_org(db, "org_acme")
+        add_database_org(db, "org_globex")
+
+        async def run():
+            await (await get_tenant_collection(str(acme))).insert_one({"name": "a"})
+            await db.client["org_globex"][TENANT_DATABASE_COLLECTION].insert_one({"name": "g"})
+            org_doc = await db["organizations"].find_one({"_id": acme})
+            await drop_tenant_storage(org_doc)
+            # Dropping again, as a resumed purge would, is a no-op
+            await drop_tenant_storage(org_doc)
+
+        asyncio.run(run())
+        assert "org_acme" not in db.client._databases
+        assert names(db.client["org_globex"][TENANT_DATABASE_COLLECTION]) == ["g"]
+        assert tenant_databases.stats()["size"] == 0
+
+    def test_deletes_only_a_pooled_tenants_documents(self, db):
+        """Test that pooled tenancy leaves the shared collection and its neighbours"""
+        shared = "shared_tenants_001"
+        acme = add_org(db, "org_acme", tenancy="pooled", collection_name=shared)
+        asyncio.run(db[shared].insert_one({"tenant_id": str(acme), "name": "a"}))
+        asyncio.run(db[shared].insert_one({"tenant_id": "neighbour", "name": "n"}))
+
+        asyncio.run(drop_tenant_storage(asyncio.run(db["organizations"].find_one({"_id": acme}))))
+
+        assert names(db[shared]) == ["n"]
+
+
+@pytest.fixture
+def second_cluster(db, monkeypatch):
+    """A second in-memory cluster tenants can move to"""
+    client = FakeMotorClient()
+    monkeypatch.setattr(placement, "_cluster_uris", {"second": "mongodb://second:27017"})
+    monkeypatch.setattr(placement, "_clients", {"second": client})
+    # No other worker caches routes, so the write fence needn't wait
+    monkeypatch.setattr(tenant_migration, "TENANT_ROUTE_TTL_SECONDS", 0)
+    monkeypatch.setattr(tenant_migration, "TENANT_POOLED_ROUTE_TTL_SECONDS", 0)
+    return client
+
+
+class TestDatabaseTenantMigration:
+    """Moving a database-per-tenant organization between clusters"""
+
+    def add_tenant(self, db):
+        acme = add_database_org(db, "org_acme")
+        now = datetime.utcnow()
+        asyncio.run(db.client["org_acme"][TENANT_DATABASE_COLLECTION].insert_one(
+            {"name": "a", "created_at": now, "updated_at": now}))
+        return acme
+
+    def test_source_database_is_dropped(self, db, second_cluster):
+        """Test that a moved tenant leaves no database behind on the old cluster"""
+        acme = self.add_tenant(db)
+
+        assert asyncio.run(tenant_migration.migrate_tenant_cluster(str(acme), "second"))
+
+        assert "org_acme" not in db.client._databases
+        assert names(second_cluster["org_acme"][TENANT_DATABASE_COLLECTION]) == ["a"]
+        assert asyncio.run(db["organizations"].find_one({"_id": acme}))["cluster"] == "second"
+
+    def test_failed_move_drops_the_target_database(self, db, second_cluster, monkeypatch):
+        """Test that rolling back removes the partial copy's whole database"""
+        acme = self.add_tenant(db)
+
+        async def failing_sync(*args, **kwargs):
+            raise RuntimeError("sync failed")
+
+        monkeypatch.setattr(tenant_migration, "sync_tenant_changes", failing_sync)
+        with pytest.raises(RuntimeError):
+            asyncio.run(tenant_migration.migrate_tenant_cluster(str(acme), "second"))
+
+        assert "org_acme" not in second_cluster._databases
+        assert names(db.client["org_acme"][TENANT_DATABASE_COLLECTION]) == ["a"]
+        org_doc = asyncio.run(db["organizations"].find_one({"_id": acme}))
+        assert org_doc["cluster"] == "default" and "migration_started_at" not in org_doc
@@ -0,0 +1,121 @@
+"""
+Tests for hot-tenant promotion from a shared to a dedicated collection
+"""
+import asyncio
+import os
+import subprocess
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+
+from app.db import client as db_client
+from app.db.leases import acquire_lease
+from app.services import tenant_migration, tenant_promotion
+from app.services.tenant_promotion import promote_tenant
+from benchmarks.fake_mongo import FakeMotorClient, install
+
+SHARED = "shared_tenants_3"
+HOT = ObjectId()
+NEIGHBOUR = str(ObjectId())
+
+
+@pytest.fixture
+def db(monkeypatch):
+    """In-memory master database holding one hot pooled tenant next to a neighbour"""
+    for name in ("client", "database", "_db_initialized"):
+        monkeypatch.setattr(db_client, name, getattr(db_client, name))
+    # No route caches to wait out
+    monkeypatch.setattr(tenant_migration, "TENANT_ROUTE_TTL_SECONDS", 0)
+    monkeypatch.setattr(tenant_migration, "TENANT_POOLED_ROUTE_TTL_SECONDS", 0)
+    database = install(FakeMotorClient())
+
+    async def setup():
+        now = datetime.utcnow()
+        await database["organizations"].insert_one({
+            "_id": HOT, "organization_name": "Hot", "slug": "org_hot",
+            "collection_name": SHARED, "tenancy": "pooled", "cluster": "default",
+        })
+        for tenant_id, count in ((str(HOT), 3), (NEIGHBOUR, 2)):
+            for i in range(count):
+                await database[SHARED].insert_one(
+                    {"tenant_id": tenant_id, "n": i, "created_at": now, "updated_at": now})
+
+    asyncio.run(setup())
+    return database
+
+
+def test_promotion_copies_syncs_and_cuts_over(db, monkeypatch):
+    """Test that the tenant ends up alone in its collection, including writes made during the copy"""
+    real_copy = tenant_promotion.copy_tenant_documents
+
+    async def copy_with_concurrent_writes(source, target, *args, **kwargs):
+        copied = await real_copy(source, target, *args, **kwargs)
+        now = datetime.utcnow()
+        await source.insert_one({"tenant_id": str(HOT), "n": 3, "created_at": now, "updated_at": now})
+        await source.delete_one({"tenant_id": str(HOT), "n": 0})
+        return copied
+
+    monkeypatch.setattr(tenant_promotion, "copy_tenant_documents", copy_with_concurrent_writes)
+
+    assert asyncio.run(promote_tenant(str(HOT))) is True
+
+    org = asyncio.run(db["organizations"].find_one({"_id": HOT}))
+    assert (org["collection_name"], org["tenancy"]) == ("org_hot", "collection")
+    assert "write_fenced" not in org and "migration_started_at" not in org
+    moved = asyncio.run(db["org_hot"].find({}).to_list())
+    assert sorted(doc["n"] for doc in moved) == [1, 2, 3]
+    assert all("tenant_id" not in doc for doc in moved)
+    left = asyncio.run(db[SHARED].find({}).to_list())
+    assert {doc["tenant_id"] for doc in left} == {NEIGHBOUR}
+
+
+def test_promotion_only_applies_to_pooled_tenants(db):
+    """Test that a tenant that was already promoted is not eligible"""
+    asyncio.run(db["organizations"].update_one({"_id": HOT}, {"$set": {"tenancy": "collection"}}))
+
+    assert asyncio.run(promote_tenant(str(HOT))) is False
+
+
+def test_failed_cutover_rolls_back(db, monkeypatch):
+    """Test that a tenant changed mid-promotion stays pooled, unfenced and intact"""
+    real_sync = tenant_promotion.sync_tenant_changes
+
+    async def sync_then_rename(*args, **kwargs):
+        await real_sync(*args, **kwargs)
+        await db["organizations"].update_one({"_id": HOT}, {"$set": {"collection_name": "elsewhere"}})
+
+    monkeypatch.setattr(tenant_promotion, "sync_tenant_changes", sync_then_rename)
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(promote_tenant(str(HOT)))
+
+    org = asyncio.run(db["organizations"].find_one({"_id": HOT}))
+    assert org["tenancy"] == "pooled"
+    assert "write_fenced" not in org and "migration_started_at" not in org
+    assert "org_hot" not in asyncio.run(db.list_collection_names())
+    assert asyncio.run(db[SHARED].count_documents({"tenant_id": str(HOT)})) == 3
+
+
+def test_lease_elects_a_single_runner(db):
+    """Test that one worker holds the promotion lease until it expires"""
+    now = datetime.utcnow()
+
+    assert asyncio.run(acquire_lease("tenant_promotion", "worker-a", 60, now))
+    assert not asyncio.run(acquire_lease("tenant_promotion", "worker-b", 60, now))
+    assert asyncio.run(acquire_lease("tenant_promotion", "worker-a", 60, now + timedelta(seconds=30)))
+    assert not asyncio.run(acquire_lease("tenant_promotion", "worker-b", 60, now + timedelta(seconds=60)))
+    assert asyncio.run(acquire_lease("tenant_promotion", "worker-b", 60, now + timedelta(seconds=91)))
+
+
+def test_promotion_is_off_by_default_even_in_pooled_mode():
+    """Test that no worker scans shared collections unless promotion is enabled"""
+    env = {key: value for key, value in os.environ.items() if key != "TENANT_PROMOTION_ENABLED"}
+    env["TENANCY_MODE"] = "pooled"
+    completed = subprocess.run(
+        [sys.executable, "-c",
+         "from app.services import tenant_promotion; print(tenant_promotion.TENANT_PROMOTION_ENABLED)"],
+        capture_output=True, text=True, check=True, env=env)
+
+    assert completed.stdout.strip() == "False"
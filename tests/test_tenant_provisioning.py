@@ -0,0 +1,185 @@
+"""
+Tests for eager tenant collection provisioning from the spare pool
+"""
+import asyncio
+
+import pytest
+from pymongo.errors import OperationFailure
+
+from app.db import client as db_client
+from app.db.leases import LEASE_COLLECTION, acquire_lease
+from app.models.organization import OrganizationCreate
+from app.repositories import provider
+from app.repositories.mongo import MongoOrganizationRepository
+from app.services import org_service, tenant_provisioning
+from app.services.tenancy import TENANT_DATABASE_COLLECTION, TENANT_DATABASE_PREFIX, tenant_database_name
+from app.services.tenant_provisioning import (
+    SPARE_COLLECTION_PREFIX,
+    check_tenant_database_name,
+    create_tenant_collection,
+    create_tenant_database,
+    drop_tenant_storage,
+    release_tenant_database,
+    replenish_spare_pool,
+    run_pool_replenisher,
+)
+from benchmarks.fake_mongo import FakeMotorClient, install
+
+
+@pytest.fixture
+def db(monkeypatch):
+    """In-memory master database, with the database globals restored afterwards"""
+    for name in ("client", "database", "_db_initialized"):
+        monkeypatch.setattr(db_client, name, getattr(db_client, name))
+    monkeypatch.setattr(provider, "STORAGE_BACKEND", "mongodb")
+    monkeypatch.setattr(org_service, "TENANCY_MODE", "collection")
+    database = install(FakeMotorClient())
+    asyncio.run(db_client.ensure_indexes())
+    return database
+
+
+def spares(db):
+    return asyncio.run(db.list_collection_names(
+        filter={"name": {"$regex": f"^{SPARE_COLLECTION_PREFIX}"}}))
+
+
+def indexes(db, collection_name):
+    return set(asyncio.run(db[collection_name].index_information()))
+
+
+def test_claims_a_spare_and_replenishes_the_pool(db):
+    """Test that a new tenant takes a pre-indexed spare and the pool is topped back up"""
+    assert asyncio.run(replenish_spare_pool(pool_size=2)) == 2
+
+    assert asyncio.run(create_tenant_collection("org_acme")) is True
+
+    assert len(spares(db)) == 1
+    assert {"created_at", "updated_at"} <= indexes(db, "org_acme")
+    assert asyncio.run(replenish_spare_pool(pool_size=2)) == 1
+    assert len(spares(db)) == 2
+
+
+def test_only_the_lease_holder_replenishes(db, monkeypatch):
+    """Test that workers not holding the pool lease leave the pool alone"""
+    monkeypatch.setattr(tenant_provisioning, "TENANT_POOL_REFILL_INTERVAL_SECONDS", 0.01)
+
+    async def run_replenisher():
+        task = asyncio.create_task(run_pool_replenisher())
+        await asyncio.sleep(0.05)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    assert asyncio.run(acquire_lease(tenant_provisioning.POOL_LEASE, "another-worker", 60))
+    asyncio.run(run_replenisher())
+    assert spares(db) == []
+
+    asyncio.run(db[LEASE_COLLECTION].delete_many({}))
+    asyncio.run(run_replenisher())
+    assert len(spares(db)) == tenant_provisioning.TENANT_POOL_SIZE
+
+
+def test_falls_back_to_inline_provisioning(db):
+    """Test that an empty pool builds the collection inline, and an existing one is adopted"""
+    assert spares(db) == []
+
+    assert asyncio.run(create_tenant_collection("org_acme")) is True
+    assert {"created_at", "updated_at"} <= indexes(db, "org_acme")
+    assert asyncio.run(create_tenant_collection("org_acme")) is False
+
+
+def test_spare_renamed_into_place_for_a_new_organization(db):
+    """Test that create_organization claims a spare under the organization's slug"""
+    asyncio.run(replenish_spare_pool(pool_size=1))
+
+    org = asyncio.run(org_service.create_organization(OrganizationCreate(organization_name="Acme")))
+
+    assert org["collection_name"] == "org_acme"
+    assert spares(db) == []
+    assert "org_acme" in asyncio.run(db.list_collection_names())
+
+
+def test_failed_insert_returns_the_collection_to_the_pool(db, monkeypatch):
+    """Test that a collection provisioned for an organization that wasn't stored isn't orphaned"""
+    async def failing_insert(self, org_doc):
+        raise OperationFailure("write failed")
+
+    monkeypatch.setattr(MongoOrganizationRepository, "insert", failing_insert)
+
+    with pytest.raises(OperationFailure):
+        asyncio.run(org_service.create_organization(OrganizationCreate(organization_name="Acme")))
+
+    assert "org_acme" not in asyncio.run(db.list_collection_names())
+    [spare] = spares(db)
+    assert {"created_at", "updated_at"} <= indexes(db, spare)
+
+
+def test_failed_insert_drops_the_tenant_database(db, monkeypatch):
+    """Test that database-per-tenant provisioning is undone when the record isn't stored"""
+    async def failing_insert(self, org_doc):
+        raise OperationFailure("write failed")
+
+    monkeypatch.setattr(org_service, "TENANCY_MODE", "database")
+    monkeypatch.setattr(MongoOrganizationRepository, "insert", failing_insert)
+
+    with pytest.raises(OperationFailure):
+        asyncio.run(org_service.create_organization(OrganizationCreate(organization_name="Acme")))
+
+    assert not [name for name in db.client._databases if name.startswith(TENANT_DATABASE_PREFIX)]
+
+
+def test_tenant_database_is_named_after_the_organization_id(db, monkeypatch):
+    """Test that an organization named like the master database doesn't get it"""
+    monkeypatch.setattr(org_service, "TENANCY_MODE", "database")
+
+    org = asyncio.run(org_service.create_organization(OrganizationCreate(organization_name="Master DB")))
+
+    assert org["slug"] == "org_master_db"
+    assert org["database_name"] == tenant_database_name(org["id"])
+    assert asyncio.run(db.client[org["database_name"]].list_collection_names()) == [TENANT_DATABASE_COLLECTION]
+    assert TENANT_DATABASE_COLLECTION not in asyncio.run(db.list_collection_names())
+
+
+@pytest.mark.parametrize("name", [
+    "admin", "LOCAL", "config", db_client.DATABASE_NAME, "", "a" * 64, "tenant.x", "tenant x", "tenant/x", "ten$ant",
+])
+def test_protected_and_invalid_database_names_are_refused(db, name):
+    """Test that no tenant database is created, released or dropped under a protected or invalid name"""
+    with pytest.raises(ValueError):
+        check_tenant_database_name(name)
+    with pytest.raises(ValueError):
+        asyncio.run(create_tenant_database(name))
+    with pytest.raises(ValueError):
+        asyncio.run(release_tenant_database(name))
+    with pytest.raises(ValueError):
+        asyncio.run(drop_tenant_storage({"_id": 1, "tenancy": "database", "database_name": name}))
+    assert db_client.DATABASE_NAME in db.client._databases
+
+
+def test_duplicate_insert_keeps_the_winners_collection(db, monkeypatch):
+    """Test that losing a create race reports a conflict and leaves the collection to the winner"""
+    winner = asyncio.run(org_service.create_organization(OrganizationCreate(organization_name="Acme")))
+    asyncio.run(db["org_acme"].insert_one({"owner": winner["id"]}))
+    # The loser's duplicate check ran before the winner's record was stored
+    real_find_by_slug = MongoOrganizationRepository.find_by_slug
+    calls = []
+
+    async def racing_find_by_slug(self, slug, exclude_id=None):
+        calls.append(slug)
+        if len(calls) == 1:
+            return None
+        return await real_find_by_slug(self, slug, exclude_id)
+
+    monkeypatch.setattr(MongoOrganizationRepository, "find_by_slug", racing_find_by_slug)
+
+    with pytest.raises(ValueError, match="already exists"):
+        asyncio.run(org_service.create_organization(OrganizationCreate(organization_name="Acme")))
+
+    assert asyncio.run(db["org_acme"].count_documents({})) == 1
+
+
+def test_release_leaves_collections_holding_documents(db):
+    """Test that a collection with documents is never returned to the pool"""
+    asyncio.run(db["org_acme"].insert_one({"name": "kept"}))
+
+    assert asyncio.run(tenant_provisioning.release_tenant_collection("org_acme")) is False
+    assert spares(db) == []
@@ -0,0 +1,117 @@
+"""
+Tests for W3C trace propagation and span recording
+"""
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.db.monitoring import CommandTracingListener
+from app.main import app
+from app.utils import tracing
+from app.utils.tracing import OTLPSpanExporter, SpanExporter, parse_traceparent, start_span, start_trace
+
+TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+PARENT_ID = "00f067aa0ba902b7"
+
+
+class ListExporter(SpanExporter):
+    def __init__(self):
+        super().__init__()
+        self.exported = []
+
+    def add(self, span):
+        self.exported.append(span)
+
+
+@pytest.fixture
+def exporter():
+    previous = tracing._exporter
+    exporter = ListExporter()
+    tracing.set_exporter(exporter)
+    yield exporter
+    tracing.set_exporter(previous)
+
+
+class TestTraceparent:
+    """Parsing the traceparent header"""
+
+    def test_valid(self):
+        """Test a sampled traceparent"""
+        assert parse_traceparent(f"00-{TRACE_ID}-{PARENT_ID}-01") == (TRACE_ID, PARENT_ID, True)
+
+    @pytest.mark.parametrize("header", [
+        None, "", "garbage", f"00-{'0' * 32}-{PARENT_ID}-01", f"00-{TRACE_ID}-{'0' * 16}-01",
+    ])
+    def test_invalid(self, header):
+        """Test that malformed or all-zero IDs start a new trace"""
+        assert parse_traceparent(header) is None
+
+
+class TestTracingMiddleware:
+    """Propagation through the app"""
+
+    def test_continues_incoming_trace(self, exporter):
+        """Test that the caller's trace ID is used for the response and spans"""
+        response = TestClient(app).post(
+            "/admin/login", json={"email": "nobody@example.com", "password": "x"},
+            headers={"traceparent": f"00-{TRACE_ID}-{PARENT_ID}-01"})
+
+        assert response.json()["trace_id"] == TRACE_ID
+        assert response.headers["x-trace-id"] == TRACE_ID
+        assert response.headers["traceparent"].startswith(f"00-{TRACE_ID}-")
+
+        spans = {span.name: span for span in exporter.exported}
+        server = spans["POST /admin/login"]
+        assert server.parent_id == PARENT_ID
+        assert spans["serialize"].parent_id == server.span_id
+
+    def test_starts_new_trace(self, exporter):
+        """Test that requests without a traceparent get a fresh trace"""
+        response = TestClient(app).get("/org/get", params={"organization_name": "Nope"})
+        trace_id = response.json()["trace_id"]
+        assert len(trace_id) == 32 and trace_id != TRACE_ID
+        assert response.headers["x-trace-id"] == trace_id
+
+    def test_unsampled_trace_not_exported(self, exporter):
+        """Test that the caller's sampling decision is honoured"""
+        response = TestClient(app).get("/health", headers={"traceparent": f"00-{TRACE_ID}-{PARENT_ID}-00"})
+        assert response.headers["x-trace-id"] == TRACE_ID
+        assert exporter.exported == []
+
+
+class TestSpans:
+    """Child spans outside HTTP"""
+
+    def test_mongodb_command_span(self, exporter):
+        """Test that driver events become client spans of the current span"""
+        listener = CommandTracingListener()
+        with start_trace("job") as root:
+            listener.started(SimpleNamespace(
+                command={"find": "organizations"}, command_name="find", database_name="org_master_db",
+                request_id=7, connection_id=("db1", 27017)))
+        listener.succeeded(SimpleNamespace(request_id=7, connection_id=("db1", 27017), duration_micros=1500))
+
+        command = next(span for span in exporter.exported if span.name == "mongodb.find")
+        assert command.parent_id == root.span_id
+        assert command.attributes["db.mongodb.collection"] == "organizations"
+        assert command.end_ns - command.start_ns == 1_500_000
+
+    def test_no_span_outside_trace(self, exporter):
+        """Test that start_span is a no-op without a current trace"""
+        with start_span("orphan") as span:
+            assert span is None
+        assert exporter.exported == []
+
+    def test_otlp_encoding(self, monkeypatch):
+        """Test the OTLP/JSON payload"""
+        monkeypatch.setattr(tracing, "_exporter", None)
+        with start_trace("GET /health") as span:
+            pass
+        span.sampled = True
+        span.attributes = {"http.status_code": 200}
+        payload = OTLPSpanExporter(service_name="svc").encode([span])
+        encoded = payload["resourceSpans"][0]["scopeSpans"][0]["spans"][0]
+        assert encoded["traceId"] == span.trace_id
+        assert encoded["kind"] == 2
+        assert encoded["attributes"] == [{"key": "http.status_code", "value": {"intValue": "200"}}]